@@ -209,9 +209,9 @@ async def calculate_kilometers(request: KilometersRequest) -> KilometersResponse
         # Si les rendez-vous ne sont pas fournis, les récupérer depuis Supabase
         if not request.appointments:
             storage = SupabaseStorage()
-            from supabase import create_client
+            from core.supabase_storage import get_supabase_client
 
-            supabase = create_client(storage.supabase_url, storage.supabase_key)
+            supabase = get_supabase_client(storage.supabase_url, storage.supabase_key)
 
             # Récupérer les RV de la plage, filtrés par mode de transport
             query = supabase.table('gazelle_appointments') \
@@ -238,15 +238,14 @@ async def get_alerts_history(limit: int = 50, offset: int = 0):
 
         # Query Supabase (alert_logs)
         # Utiliser sent_at si disponible, sinon created_at (fallback)
-        import requests
         # Essayer d'abord avec sent_at, si erreur 400 alors utiliser created_at
         url = f"{storage.api_url}/alert_logs?order=sent_at.desc&limit={limit}&offset={offset}"
-        response = requests.get(url, headers=storage._get_headers())
+        response = storage.session.get(url, headers=storage._get_headers())
         
         # Si sent_at n'existe pas encore, utiliser created_at
         if response.status_code == 400 and 'sent_at' in response.text:
             url = f"{storage.api_url}/alert_logs?order=created_at.desc&limit={limit}&offset={offset}"
-            response = requests.get(url, headers=storage._get_headers())
+            response = storage.session.get(url, headers=storage._get_headers())
 
         if response.status_code != 200:
             error_detail = response.text
@@ -342,9 +341,8 @@ async def get_stats():
         storage = get_storage()
 
         # Query Supabase pour stats (alert_logs)
-        import requests
         url = f"{storage.api_url}/alert_logs?select=*"
-        response = requests.get(url, headers=storage._get_headers())
+        response = storage.session.get(url, headers=storage._get_headers())
 
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="Erreur Supabase")
@@ -16,6 +16,7 @@ from modules.assistant.services.parser import get_parser, QueryType
 from modules.assistant.services.queries import get_queries
 from modules.assistant.services.vector_search import get_vector_search
 from modules.assistant.services.smart_query_engine import get_smart_engine
+from core.http_session import get_session
 
 
 router = APIRouter(prefix="/assistant", tags=["assistant"])
@@ -248,7 +249,6 @@ async def get_client_details(client_id: str):
     Inclut: contacts associés, pianos avec notes, service history, prochains RV.
     """
     try:
-        import requests
         queries = get_queries()
         print(f"🔍 /assistant/client -> lookup id: {client_id}")
         
@@ -270,11 +270,10 @@ async def get_client_details(client_id: str):
             # 1. Récupérer tous les pianos du client
             piano_ids = []
             try:
-                import requests
                 # Chercher les pianos qui ont ce client_external_id
                 pianos_url = f"{queries.storage.api_url}/gazelle_pianos"
                 pianos_url += f"?select=external_id,id&client_external_id=eq.{entity_id}"
-                pianos_response = requests.get(pianos_url, headers=queries.storage._get_headers())
+                pianos_response = get_session().get(pianos_url, headers=queries.storage._get_headers())
 
                 if pianos_response.status_code == 200:
                     pianos = pianos_response.json()
@@ -427,7 +426,7 @@ async def get_client_details(client_id: str):
                             f"&{eq_filters_str}"
                             f"&limit=5"
                         )
-                        resp_eq = requests.get(url_eq, headers=queries.storage._get_headers())
+                        resp_eq = get_session().get(url_eq, headers=queries.storage._get_headers())
                         print(f"   ↳ {ep} eq status {resp_eq.status_code}")
                         if resp_eq.status_code == 200 and resp_eq.json():
                             for item in resp_eq.json():
@@ -444,7 +443,7 @@ async def get_client_details(client_id: str):
                             f"&{ilike_filters_str}"
                             f"&limit=5"
                         )
-                        resp_ilike = requests.get(url_ilike, headers=queries.storage._get_headers())
+                        resp_ilike = get_session().get(url_ilike, headers=queries.storage._get_headers())
                         print(f"   ↳ {ep} ilike status {resp_ilike.status_code}")
                         if resp_ilike.status_code == 200 and resp_ilike.json():
                             for item in resp_ilike.json():
@@ -499,7 +498,7 @@ async def get_client_details(client_id: str):
             # Pianos avec leurs notes
             try:
                 pianos_url = f"{queries.storage.api_url}/gazelle_pianos?client_external_id=eq.{entity_id}&select=external_id,notes,make,model,serial_number,type,year,location&limit=10"
-                pianos_response = requests.get(pianos_url, headers=queries.storage._get_headers())
+                pianos_response = get_session().get(pianos_url, headers=queries.storage._get_headers())
                 if pianos_response.status_code == 200:
                     pianos = pianos_response.json()
                     details['pianos'] = []
@@ -527,7 +526,7 @@ async def get_client_details(client_id: str):
             # Contacts associés
             try:
                 contacts_url = f"{queries.storage.api_url}/gazelle_contacts?client_external_id=eq.{entity_id}&limit=10"
-                contacts_response = requests.get(contacts_url, headers=queries.storage._get_headers())
+                contacts_response = get_session().get(contacts_url, headers=queries.storage._get_headers())
                 if contacts_response.status_code == 200:
                     contacts = contacts_response.json()
                     if contacts:
@@ -1115,7 +1114,6 @@ def _enrich_appointments(appointments: list, queries) -> list:
     Enrichit les rendez-vous avec les détails complets des clients.
     Même logique que dans train_summaries.py.
     """
-    import requests
     
     for appt in appointments:
         entity_id = appt.get('client_external_id')
@@ -1152,7 +1150,7 @@ def _enrich_appointments(appointments: list, queries) -> list:
             # Récupérer les pianos avec leurs notes
             try:
                 pianos_url = f"{queries.storage.api_url}/gazelle_pianos?client_external_id=eq.{entity_id}&select=external_id,notes,make,model,serial_number,type,year,location&limit=10"
-                pianos_response = requests.get(pianos_url, headers=queries.storage._get_headers())
+                pianos_response = get_session().get(pianos_url, headers=queries.storage._get_headers())
                 if pianos_response.status_code == 200:
                     pianos = pianos_response.json()
                     appt['pianos'] = []
@@ -1199,7 +1197,7 @@ def _enrich_appointments(appointments: list, queries) -> list:
             # Récupérer les contacts associés
             try:
                 contacts_url = f"{queries.storage.api_url}/gazelle_contacts?client_external_id=eq.{entity_id}&limit=10"
-                contacts_response = requests.get(contacts_url, headers=queries.storage._get_headers())
+                contacts_response = get_session().get(contacts_url, headers=queries.storage._get_headers())
                 if contacts_response.status_code == 200:
                     contacts = contacts_response.json()
                     if contacts:
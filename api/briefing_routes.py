@@ -24,6 +24,8 @@ from modules.briefing.client_intelligence_service import (
     NarrativeBriefingService,
     save_feedback
 )
+from core.http_session import get_session
+from core.blocking_executor import offload_blocking, run_blocking
 
 router = APIRouter(prefix="/briefing", tags=["briefing"])
 
@@ -113,8 +115,8 @@ async def get_daily_briefings(
         if not skip_cache and not technician_id and not exclude_technician_id:
             try:
                 from modules.briefing.briefing_cache import BriefingCache
-                cache = BriefingCache()
-                briefings = cache.get_cached_briefings(target_date)
+                cache = await run_blocking(BriefingCache)
+                briefings = await run_blocking(cache.get_cached_briefings, target_date)
                 if briefings:
                     from_cache = True
                     print(f"⚡ Briefings servis depuis le cache ({len(briefings)})")
@@ -123,7 +125,7 @@ async def get_daily_briefings(
 
         # Fallback: générer à la demande (async!)
         if briefings is None:
-            service = NarrativeBriefingService()
+            service = await run_blocking(NarrativeBriefingService)
             briefings = await service.get_daily_briefings(
                 technician_id=technician_id,
                 exclude_technician_id=exclude_technician_id,
@@ -153,7 +155,8 @@ async def get_daily_briefings(
 
 
 @router.get("/search-clients", response_model=Dict[str, Any])
-async def search_clients(
+@offload_blocking
+def search_clients(
     q: str = Query(..., min_length=2, description="Terme de recherche (min 2 caractères)"),
     limit: int = Query(10, ge=1, le=50, description="Nombre max de résultats")
 ):
@@ -163,7 +166,6 @@ async def search_clients(
     """
     try:
         from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
 
         storage = SupabaseStorage()
         headers = storage._get_headers()
@@ -190,7 +192,7 @@ async def search_clients(
             f"&status=eq.ACTIVE"
             f"&limit={limit * 2}"  # marge pour le tri + déduplication
         )
-        resp = http_requests.get(url, headers=headers)
+        resp = get_session().get(url, headers=headers)
         if resp.status_code != 200:
             raise HTTPException(
                 status_code=resp.status_code,
@@ -242,7 +244,7 @@ async def get_client_briefing(client_id: str):
     Génère un briefing narratif pour un client spécifique.
     """
     try:
-        service = NarrativeBriefingService()
+        service = await run_blocking(NarrativeBriefingService)
         briefing = await service.generate_single_briefing(client_id)
 
         if "error" in briefing:
@@ -259,7 +261,8 @@ async def get_client_briefing(client_id: str):
 
 
 @router.get("/feedback", response_model=Dict[str, Any])
-async def list_feedback(
+@offload_blocking
+def list_feedback(
     client_id: Optional[str] = Query(None, description="Filtrer par client (None = tous)"),
     include_global: bool = Query(True, description="Inclure les règles globales")
 ):
@@ -267,10 +270,9 @@ async def list_feedback(
     Liste toutes les notes/corrections d'Allan.
     """
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         headers = storage._get_headers()
 
         url = f"{storage.api_url}/ai_training_feedback?is_active=eq.true&order=created_at.desc"
@@ -280,7 +282,7 @@ async def list_feedback(
             else:
                 url += f"&client_external_id=eq.{client_id}"
 
-        resp = http_requests.get(url, headers=headers)
+        resp = get_session().get(url, headers=headers)
         if resp.status_code != 200:
             raise HTTPException(status_code=500, detail=f"Erreur Supabase: {resp.text}")
 
@@ -312,7 +314,8 @@ async def list_feedback(
 
 
 @router.post("/feedback", response_model=Dict[str, Any])
-async def submit_feedback(request: FeedbackRequest):
+@offload_blocking
+def submit_feedback(request: FeedbackRequest):
     """
     Sauvegarde une correction de briefing.
     ⚠️ SUPER-UTILISATEUR SEULEMENT (Allan)
@@ -353,7 +356,8 @@ async def submit_feedback(request: FeedbackRequest):
 
 
 @router.post("/feedback/analyze", response_model=Dict[str, Any])
-async def analyze_feedback(request: AnalyzeFeedbackRequest):
+@offload_blocking
+def analyze_feedback(request: AnalyzeFeedbackRequest):
     """
     Analyse un commentaire d'Allan et suggère des actions concrètes.
     Retourne des suggestions client-spécifiques ET globales.
@@ -367,8 +371,8 @@ async def analyze_feedback(request: AnalyzeFeedbackRequest):
 
         api_key = os.getenv('ANTHROPIC_API_KEY')
         if not api_key:
-            from core.supabase_storage import SupabaseStorage
-            storage = SupabaseStorage(silent=True)
+            from core.supabase_storage import get_shared_storage
+            storage = get_shared_storage()
             try:
                 settings = storage.get_data('system_settings', filters={'key': 'anthropic_api_key'})
                 if settings and settings[0].get('value'):
@@ -446,7 +450,8 @@ IMPORTANT:
 
 
 @router.post("/feedback/apply", response_model=Dict[str, Any])
-async def apply_actions(request: ApplyActionsRequest):
+@offload_blocking
+def apply_actions(request: ApplyActionsRequest):
     """
     Sauvegarde les actions approuvées par Allan (client-spécifiques et/ou globales).
     """
@@ -482,19 +487,19 @@ async def apply_actions(request: ApplyActionsRequest):
 
 
 @router.delete("/feedback/{feedback_id}", response_model=Dict[str, Any])
-async def delete_feedback(feedback_id: str):
+@offload_blocking
+def delete_feedback(feedback_id: str):
     """
     Désactive une note/correction (soft delete).
     """
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         headers = storage._get_headers()
 
         url = f"{storage.api_url}/ai_training_feedback?id=eq.{feedback_id}"
-        resp = http_requests.patch(url, json={"is_active": False}, headers=headers)
+        resp = get_session().patch(url, json={"is_active": False}, headers=headers)
         if resp.status_code in (200, 204):
             return {"success": True, "message": "Note désactivée"}
         else:
@@ -507,7 +512,8 @@ async def delete_feedback(feedback_id: str):
 
 
 @router.post("/admin/migrate", response_model=Dict[str, Any])
-async def run_migration(request: Dict[str, Any]):
+@offload_blocking
+def run_migration(request: Dict[str, Any]):
     """
     Exécute une migration SQL via la connexion directe PostgreSQL de Supabase.
     Temporaire — à retirer après usage.
@@ -528,8 +534,8 @@ async def run_migration(request: Dict[str, Any]):
         if not service_key:
             raise HTTPException(status_code=500, detail="SERVICE_ROLE_KEY non disponible")
 
-        from supabase import create_client
-        client = create_client(supabase_url, service_key)
+        from core.supabase_storage import get_supabase_client
+        client = get_supabase_client(supabase_url, service_key)
 
         # Execute each statement via Supabase's rpc
         statements = [s.strip() for s in sql.split(';') if s.strip() and not s.strip().startswith('--')]
@@ -553,7 +559,8 @@ async def run_migration(request: Dict[str, Any]):
 
 
 @router.post("/admin/bootstrap-sql", response_model=Dict[str, Any])
-async def bootstrap_sql_runner(request: Dict[str, Any]):
+@offload_blocking
+def bootstrap_sql_runner(request: Dict[str, Any]):
     """
     Crée la fonction exec_sql dans PostgreSQL via le endpoint Supabase pg-meta.
     """
@@ -562,7 +569,7 @@ async def bootstrap_sql_runner(request: Dict[str, Any]):
         raise HTTPException(status_code=403, detail="Accès refusé")
 
     try:
-        import os, requests as http_requests
+        import os
 
         supabase_url = os.getenv('SUPABASE_URL', '')
         service_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY', '')
@@ -600,7 +607,7 @@ async def bootstrap_sql_runner(request: Dict[str, Any]):
             try:
                 if 'rpc' in endpoint:
                     continue
-                resp = http_requests.post(endpoint, headers=headers, json={"query": create_fn_sql})
+                resp = get_session().post(endpoint, headers=headers, json={"query": create_fn_sql})
                 if resp.status_code in (200, 201, 204):
                     return {"success": True, "message": "Function exec_sql created", "endpoint": endpoint}
             except Exception:
@@ -621,7 +628,8 @@ async def bootstrap_sql_runner(request: Dict[str, Any]):
 
 
 @router.get("/introspect/{type_name}", response_model=Dict[str, Any])
-async def introspect_gazelle_type(type_name: str):
+@offload_blocking
+def introspect_gazelle_type(type_name: str):
     """
     Introspection temporaire — montre tous les champs disponibles sur un type Gazelle.
     Ex: /briefing/introspect/PrivateClient
@@ -698,17 +706,18 @@ async def introspect_gazelle_type(type_name: str):
 
 
 @router.get("/admin/pda-compare", response_model=Dict[str, Any])
-async def pda_compare(secret: str = Query("")):
+@offload_blocking
+def pda_compare(secret: str = Query("")):
     """Compare le matching PDA v5 (actuel) vs v6 (nouveau) sur toutes les demandes."""
     if secret != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
 
     try:
-        from core.supabase_storage import SupabaseStorage
-        from modules.pda_v6_matcher import find_best_match, tech_name, REAL_TECHNICIAN_IDS
+        from core.supabase_storage import get_shared_storage
+        from modules.pda_v6_matcher import find_best_matches, tech_name, REAL_TECHNICIAN_IDS
         from datetime import datetime, timedelta
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         PDA_CLIENT_ID = "cli_HbEwl9rN11pSuDEU"
         cutoff = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
 
@@ -745,12 +754,14 @@ async def pda_compare(secret: str = Query("")):
         v5_matched = 0
         v6_matched = 0
 
-        for req in all_requests:
+        # v6 : index par date construit une fois, IA groupée par jour
+        v6_matches = find_best_matches(all_requests, gazelle_apts)
+
+        for req, v6_match in zip(all_requests, v6_matches):
             v5_apt_id = req.get('appointment_id')
             v5_apt = apt_index.get(v5_apt_id)
             v5_tech = req.get('technician_id')
 
-            v6_match = find_best_match(req, gazelle_apts)
             v6_apt_id = v6_match.get('external_id') if v6_match else None
             v6_tech = v6_match.get('technicien') if v6_match else None
             v6_method = v6_match.get('_matched_by', 'direct') if v6_match else None
@@ -817,7 +828,8 @@ async def pda_compare(secret: str = Query("")):
 
 
 @router.post("/admin/backfill-all", response_model=Dict[str, Any])
-async def backfill_all(request: Dict[str, Any]):
+@offload_blocking
+def backfill_all(request: Dict[str, Any]):
     """
     Backfill complet : appointments + timeline depuis 2017.
     Tourne en arrière-plan, retourne immédiatement.
@@ -852,7 +864,6 @@ async def backfill_all(request: Dict[str, Any]):
             print("=" * 60)
             try:
                 from core.timezone_utils import parse_gazelle_datetime, format_for_supabase
-                import requests as http_requests
 
                 all_entries = sync.api_client.get_timeline_entries(since_date=None, limit=None)
                 print(f"📥 {len(all_entries)} timeline entries récupérées de Gazelle")
@@ -890,7 +901,7 @@ async def backfill_all(request: Dict[str, Any]):
                         url = f"{sync.storage.api_url}/gazelle_timeline_entries"
                         headers = sync.storage._get_headers()
                         headers['Prefer'] = 'resolution=merge-duplicates'
-                        resp = http_requests.post(url, headers=headers, json=record)
+                        resp = get_session().post(url, headers=headers, json=record)
 
                         if resp.status_code in (200, 201, 409):
                             synced += 1
@@ -927,7 +938,8 @@ async def backfill_all(request: Dict[str, Any]):
 
 
 @router.post("/admin/flag", response_model=Dict[str, Any])
-async def set_feature_flag(request: Dict[str, Any]):
+@offload_blocking
+def set_feature_flag(request: Dict[str, Any]):
     """Active ou désactive un feature flag."""
     if request.get("secret") != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
@@ -938,22 +950,21 @@ async def set_feature_flag(request: Dict[str, Any]):
         raise HTTPException(status_code=400, detail="flag requis")
 
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         key = f"flag_{flag}"
         value = "true" if enabled else "false"
 
         url = f"{storage.api_url}/system_settings"
         headers = storage._get_headers()
         headers["Prefer"] = "resolution=merge-duplicates"
-        resp = http_requests.post(url, headers=headers, json={"key": key, "value": value})
+        resp = get_session().post(url, headers=headers, json={"key": key, "value": value})
 
         if resp.status_code in (200, 201):
-            # Vider le cache des flags
-            from core.feature_flags import _refresh_cache
-            _refresh_cache()
+            # Écriture traversante : le flag est actif tout de suite dans ce processus
+            from core.settings_cache import get_settings_cache
+            get_settings_cache().set_local(key, value)
             return {"success": True, "flag": flag, "enabled": enabled}
         else:
             raise HTTPException(status_code=500, detail=f"Erreur Supabase: {resp.text}")
@@ -964,7 +975,8 @@ async def set_feature_flag(request: Dict[str, Any]):
 
 
 @router.post("/admin/pda-scan", response_model=Dict[str, Any])
-async def pda_scan_now(request: Dict[str, Any]):
+@offload_blocking
+def pda_scan_now(request: Dict[str, Any]):
     """Lance un scan PDA/OSM immédiat (test)."""
     if request.get("secret") != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
@@ -978,7 +990,8 @@ async def pda_scan_now(request: Dict[str, Any]):
 
 
 @router.post("/admin/backfill-invoices", response_model=Dict[str, Any])
-async def backfill_invoices(request: Dict[str, Any]):
+@offload_blocking
+def backfill_invoices(request: Dict[str, Any]):
     """Backfill complet des factures depuis Gazelle. Tâche de fond."""
     if request.get("secret") != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
@@ -989,7 +1002,6 @@ async def backfill_invoices(request: Dict[str, Any]):
         try:
             from core.gazelle_api_client import GazelleAPIClient
             from core.supabase_storage import SupabaseStorage
-            import requests as http_requests
 
             api = GazelleAPIClient()
             storage = SupabaseStorage()
@@ -1029,7 +1041,7 @@ async def backfill_invoices(request: Dict[str, Any]):
                         "due_on": str(due_on)[:10] or None,
                     }
 
-                    resp = http_requests.post(
+                    resp = get_session().post(
                         f"{storage.api_url}/gazelle_invoices",
                         headers=headers, json=record
                     )
@@ -1055,7 +1067,7 @@ async def backfill_invoices(request: Dict[str, Any]):
                             "taxable": item.get("taxable", True),
                             "sequence_number": item.get("sequenceNumber"),
                         }
-                        item_resp = http_requests.post(
+                        item_resp = get_session().post(
                             f"{storage.api_url}/gazelle_invoice_items",
                             headers=headers, json=item_record
                         )
@@ -1083,13 +1095,14 @@ async def backfill_invoices(request: Dict[str, Any]):
 
 
 @router.get("/admin/test-invoices", response_model=Dict[str, Any])
-async def test_invoices(secret: str = Query("")):
+@offload_blocking
+def test_invoices(secret: str = Query("")):
     """Test: combien de factures dans Gazelle vs Supabase."""
     if secret != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
     try:
-        from core.supabase_storage import SupabaseStorage
-        storage = SupabaseStorage(silent=True)
+        from core.supabase_storage import get_shared_storage
+        storage = get_shared_storage()
         sb_result = storage.client.table("gazelle_invoices").select("id", count="exact").limit(1).execute()
         sb_count = sb_result.count if hasattr(sb_result, 'count') and sb_result.count else 0
 
@@ -1118,7 +1131,8 @@ async def test_invoices(secret: str = Query("")):
 
 
 @router.get("/admin/search-invoices", response_model=Dict[str, Any])
-async def search_invoices(
+@offload_blocking
+def search_invoices(
     secret: str = Query(""),
     q: str = Query(""),
     client_id: str = Query(""),
@@ -1131,8 +1145,8 @@ async def search_invoices(
     if secret != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
     try:
-        from core.supabase_storage import SupabaseStorage
-        storage = SupabaseStorage(silent=True)
+        from core.supabase_storage import get_shared_storage
+        storage = get_shared_storage()
 
         # Recherche dans les factures
         query = storage.client.table("gazelle_invoices").select("*")
@@ -1169,7 +1183,8 @@ async def search_invoices(
 
 
 @router.get("/admin/search-timeline", response_model=Dict[str, Any])
-async def search_timeline(
+@offload_blocking
+def search_timeline(
     secret: str = Query(""),
     q: str = Query(""),
     date: str = Query(""),
@@ -1184,8 +1199,8 @@ async def search_timeline(
     if not q and not date and not date_from and not client_id:
         raise HTTPException(status_code=400, detail="Au moins un filtre requis (q, date, date_from, client_id)")
     try:
-        from core.supabase_storage import SupabaseStorage
-        storage = SupabaseStorage(silent=True)
+        from core.supabase_storage import get_shared_storage
+        storage = get_shared_storage()
         query = storage.client.table('gazelle_timeline_entries').select(
             'client_id,occurred_at,entry_type,title,description,user_id'
         )
@@ -1219,17 +1234,18 @@ async def search_timeline(
 
 
 @router.get("/admin/pda-stats", response_model=Dict[str, Any])
-async def pda_appointment_stats(secret: str = Query(""), since: str = Query("2025-08-01")):
+@offload_blocking
+def pda_appointment_stats(secret: str = Query(""), since: str = Query("2025-08-01")):
     """Statistiques des RV Place des Arts par jour/heure depuis une date."""
     if secret != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
     try:
-        from core.supabase_storage import SupabaseStorage
+        from core.supabase_storage import get_shared_storage
         from collections import defaultdict
         from datetime import datetime as dt
         import re
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         PDA_CLIENT_ID = "cli_HbEwl9rN11pSuDEU"
 
         result = storage.client.table('gazelle_appointments').select(
@@ -1290,13 +1306,14 @@ async def pda_appointment_stats(secret: str = Query(""), since: str = Query("202
 
 
 @router.get("/admin/timeline-stats", response_model=Dict[str, Any])
-async def timeline_stats(secret: str = Query("")):
+@offload_blocking
+def timeline_stats(secret: str = Query("")):
     """Nombre d'entrées timeline par année dans Supabase."""
     if secret != "ptm-migrate-2026":
         raise HTTPException(status_code=403, detail="Accès refusé")
     try:
-        from core.supabase_storage import SupabaseStorage
-        storage = SupabaseStorage(silent=True)
+        from core.supabase_storage import get_shared_storage
+        storage = get_shared_storage()
         stats = {}
         total = 0
         for year in range(2016, 2027):
@@ -1314,7 +1331,8 @@ async def timeline_stats(secret: str = Query("")):
 
 
 @router.post("/follow-up/resolve", response_model=Dict[str, Any])
-async def resolve_follow_up(request: ResolveFollowUpRequest):
+@offload_blocking
+def resolve_follow_up(request: ResolveFollowUpRequest):
     """
     Marque un follow-up comme résolu.
     """
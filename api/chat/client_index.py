@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Index inverse local pour la recherche client intelligente.
+
+Pourquoi : search_clients_intelligent lancait 3 requetes `ilike '*terme*'` par
+terme (clients, timeline, pianos) puis relisait jusqu'a 6000 entrees timeline
+pour le recompte exact. Un ilike a joker initial ne peut utiliser aucun index :
+le cout suivait TOUT l'historique timeline.
+
+Ici : un index inverse SQLite (fichier local, CLIENT_SEARCH_INDEX_PATH) sur
+  - notes client (personal_notes, preference_notes, city)
+  - notes de pianos (notes, location, marque/modele)
+  - texte timeline (title + description, hors courriels/SMS)
+avec pliage des accents, racinisation legere FR/EN et frequences documentaires
+par terme (vocab.df). Une recherche multi-termes = quelques lectures d'index
+en memoire locale (millisecondes), et les poids de rarete sont EXACTS (nombre
+de clients distincts par terme, sans troncature).
+
+Maintenance :
+  - reconstruction complete depuis Supabase (rebuild) si l'index manque ou a
+    plus de CLIENT_SEARCH_INDEX_MAX_AGE secondes (en arriere-plan) ;
+  - rafraichissement incremental cote API (refresh_incremental) toutes les
+    CLIENT_SEARCH_INDEX_REFRESH secondes : la sync de production tourne sur
+    GitHub Actions, hors de ce processus, donc l'API relit elle-meme les
+    clients/pianos modifies (updated_at) et la timeline recente (occurred_at) ;
+  - mise a jour incrementale par la sync (upsert_clients / upsert_pianos /
+    upsert_timeline), seulement si l'index existe deja sur cette machine.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[2] / "data" / "client_search_index.sqlite"
+INDEX_PATH = Path(os.getenv("CLIENT_SEARCH_INDEX_PATH", str(_DEFAULT_PATH)))
+MAX_AGE = int(os.getenv("CLIENT_SEARCH_INDEX_MAX_AGE", str(24 * 3600)))
+# Un peu sous la periode de la tache planifiee (5 min) pour qu'elle agisse a chaque passage
+REFRESH_EVERY = int(os.getenv("CLIENT_SEARCH_INDEX_REFRESH", "240"))
+# Relecture incrementale : marge sur updated_at (horloges, sync en cours) et
+# fenetre occurred_at pour la timeline (pas de updated_at ; la sync importe
+# les entrees des derniers jours)
+REFRESH_MARGIN = timedelta(minutes=15)
+TIMELINE_LOOKBACK = timedelta(days=int(os.getenv("CLIENT_SEARCH_INDEX_TIMELINE_LOOKBACK_DAYS", "2")))
+
+_CLIENT_SELECT = "external_id,first_name,last_name,company_name,city,personal_notes,preference_notes"
+_PIANO_SELECT = "external_id,client_external_id,make,model,notes,location"
+_TIMELINE_SELECT = "external_id,client_id,entry_type,occurred_at,title,description"
+
+# Entrees timeline exclues (communications automatiques, pas de contenu client)
+EXCLUDED_TIMELINE_TYPES = {
+    "CONTACT_EMAIL_AUTOMATED", "CONTACT_EMAIL_MANUAL", "CONTACT_SMS_AUTOMATED",
+    "CONTACT_SMS_MANUAL", "SCHEDULED_MESSAGE_EMAIL", "SCHEDULED_MESSAGE_SMS", "CONTACT_EMAIL",
+}
+
+_CLIENT_NOTE_FIELDS = ("personal_notes", "preference_notes", "city")
+
+# Suffixes retires (texte deja plie : sans accents), du plus long au plus court.
+# FR et EN melanges : l'atelier ecrit dans les deux langues.
+_SUFFIXES = (
+    "issements", "issement", "ations", "ation", "ements", "ement", "ments", "ment",
+    "euses", "euse", "eurs", "eur", "ences", "ence", "ances", "ance", "iques", "ique",
+    "ites", "ite", "ings", "ing", "ies", "ied", "ees", "ee", "es", "er", "ed", "ly",
+    "s", "x", "e",
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY, client_id TEXT NOT NULL, source TEXT NOT NULL,
+    date TEXT, text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL, doc_id TEXT NOT NULL, client_id TEXT NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS vocab (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS clients (
+    external_id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT,
+    company_name TEXT, city TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents, un caractere par caractere du texte.
+
+    Chaque caractere est plie seul (lower() puis NFKD, premier caractere garde) :
+    lower() allonge certains caracteres ("I" pointe -> 2), d'ou le pliage un par
+    un pour que les positions restent celles du texte d'origine (extraits).
+    """
+    out = []
+    for ch in text or "":
+        decomposed = unicodedata.normalize("NFKD", ch.lower())
+        out.append(decomposed[0] if decomposed else ch)
+    return "".join(out)
+
+
+def stem(token: str) -> str:
+    """Racinisation legere FR/EN (restauration/restaure -> restaur)."""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(text: str) -> list:
+    """Texte -> liste des racines (ordre conserve, doublons possibles)."""
+    return [stem(t) for t in _TOKEN_RE.findall(fold(text)) if len(t) >= 2]
+
+
+class ClientSearchIndex:
+    """Index inverse SQLite (un fichier), partage entre threads via un verrou."""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn = None
+        self._building = False
+
+    # ------------------------------------------------------------------ base
+    def _connect(self, path: Path = None):
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def built_at(self) -> float:
+        if not self.exists():
+            return 0.0
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key='built_at'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def is_ready(self) -> bool:
+        return self.built_at() > 0
+
+    def _meta(self, key: str):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def refreshed_at(self) -> float:
+        """Derniere mise a jour depuis Supabase (reconstruction ou incrementale)."""
+        if not self.exists():
+            return 0.0
+        return float(self._meta("refreshed_at") or 0) or self.built_at()
+
+    # ------------------------------------------------------------- ecriture
+    @staticmethod
+    def _put_doc(conn, doc_id, client_id, source, text, date=None):
+        """Remplace un document : retire ses anciens termes, indexe les nouveaux."""
+        old_terms = [r[0] for r in conn.execute("SELECT term FROM postings WHERE doc_id=?", (doc_id,))]
+        if old_terms:
+            conn.executemany("UPDATE vocab SET df = df - 1 WHERE term=?", [(t,) for t in old_terms])
+            conn.execute("DELETE FROM postings WHERE doc_id=?", (doc_id,))
+        text = (text or "").strip()
+        if not text or not client_id:
+            conn.execute("DELETE FROM docs WHERE doc_id=?", (doc_id,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO docs (doc_id, client_id, source, date, text) VALUES (?,?,?,?,?)",
+            (doc_id, client_id, source, date, text),
+        )
+        terms = set(analyze(text))
+        conn.executemany("INSERT INTO postings (term, doc_id, client_id) VALUES (?,?,?)",
+                         [(t, doc_id, client_id) for t in terms])
+        conn.executemany("INSERT INTO vocab (term, df) VALUES (?, 1) "
+                         "ON CONFLICT(term) DO UPDATE SET df = df + 1", [(t,) for t in terms])
+
+    @staticmethod
+    def _put_client(conn, c):
+        cid = c.get("external_id")
+        if not cid:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO clients (external_id, first_name, last_name, company_name, city) "
+            "VALUES (?,?,?,?,?)",
+            (cid, c.get("first_name"), c.get("last_name"), c.get("company_name"), c.get("city")),
+        )
+        for fld in _CLIENT_NOTE_FIELDS:
+            if fld in c:
+                ClientSearchIndex._put_doc(conn, f"client:{cid}:{fld}", cid, "note", c.get(fld))
+
+    @staticmethod
+    def _piano_text(p) -> str:
+        make_model = " ".join(x for x in [p.get("make"), p.get("model")] if x)
+        return " - ".join(x for x in [p.get("notes"), p.get("location"), make_model] if x)
+
+    @staticmethod
+    def _put_piano(conn, p):
+        if p.get("external_id"):
+            ClientSearchIndex._put_doc(conn, f"piano:{p['external_id']}", p.get("client_external_id"),
+                                       "piano", ClientSearchIndex._piano_text(p))
+
+    @staticmethod
+    def _timeline_text(e) -> str:
+        return "\n".join(x for x in [e.get("title"), e.get("description")] if x)
+
+    @staticmethod
+    def _put_timeline(conn, e, keep_existing_text=False):
+        ext_id = e.get("external_id")
+        if not ext_id:
+            return
+        doc_id = f"timeline:{ext_id}"
+        if e.get("entry_type") in EXCLUDED_TIMELINE_TYPES:
+            ClientSearchIndex._put_doc(conn, doc_id, None, "timeline", "")
+            return
+        text = ClientSearchIndex._timeline_text(e)
+        if not text and keep_existing_text:
+            # La sync omet title/description vides (pour ne pas ecraser) : idem ici
+            return
+        ClientSearchIndex._put_doc(conn, doc_id, e.get("client_id"), "timeline",
+                                   text, str(e.get("occurred_at") or "")[:10] or None)
+
+    def upsert_clients(self, records):
+        with self._lock, self.conn:
+            for c in records:
+                self._put_client(self.conn, c)
+
+    def upsert_pianos(self, records):
+        with self._lock, self.conn:
+            for p in records:
+                self._put_piano(self.conn, p)
+
+    def upsert_timeline(self, records):
+        with self._lock, self.conn:
+            for e in records:
+                self._put_timeline(self.conn, e, keep_existing_text=True)
+
+    def rebuild(self, storage) -> dict:
+        """Reconstruit l'index complet depuis Supabase dans un fichier temporaire, puis le
+        recopie dans l'index vivant par l'API backup de SQLite.
+
+        Pas de os.replace ni de suppression des fichiers -wal/-shm : d'autres
+        processus (workers uvicorn) peuvent avoir l'index ouvert ; la copie passe
+        par le verrouillage SQLite et ils voient le nouvel index a leur prochaine
+        transaction de lecture.
+        """
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_files = (tmp_path, Path(f"{tmp_path}-wal"), Path(f"{tmp_path}-shm"))
+        for p in tmp_files:
+            if p.exists():
+                p.unlink()
+        counts = {"clients": 0, "pianos": 0, "timeline": 0}
+        t0 = time.time()
+        # Curseur incremental : tout ce qui change pendant la lecture sera relu
+        since = datetime.now(timezone.utc).isoformat()
+        conn = self._connect(tmp_path)
+        try:
+            with conn:
+                for c in storage.iter_data("gazelle_clients", key_column="external_id", select=_CLIENT_SELECT):
+                    self._put_client(conn, c)
+                    counts["clients"] += 1
+                for p in storage.iter_data("gazelle_pianos", key_column="external_id", select=_PIANO_SELECT):
+                    self._put_piano(conn, p)
+                    counts["pianos"] += 1
+                for e in storage.iter_data(
+                        "gazelle_timeline_entries", key_column="external_id", select=_TIMELINE_SELECT):
+                    self._put_timeline(conn, e)
+                    counts["timeline"] += 1
+                conn.execute("DELETE FROM vocab WHERE df <= 0")
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                    ("built_at", str(time.time())), ("refreshed_at", str(time.time())), ("since", since)])
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            with self._lock:
+                conn.backup(self.conn)
+        finally:
+            conn.close()
+            for p in tmp_files:
+                if p.exists():
+                    p.unlink()
+
+        print(f"🔎 Index recherche client reconstruit en {time.time() - t0:.1f}s : {counts}")
+        return counts
+
+    @staticmethod
+    def _fetch_since(storage, table, column, select, since) -> list:
+        """Lignes de `table` avec column >= since, paginees (Range) jusqu'a une page incomplete."""
+        url = (f"{storage.api_url}/{table}?select={select}&{column}=gte.{quote(since)}"
+               f"&order={column}.asc,external_id.asc")
+        rows, offset = [], 0
+        while True:
+            headers = storage._get_headers()
+            headers["Range-Unit"] = "items"
+            headers["Range"] = f"{offset}-{offset + storage.MAX_ROWS - 1}"
+            resp = storage.session.get(url, headers=headers, timeout=30)
+            if resp.status_code not in (200, 206):
+                raise ConnectionError(f"{table}: Supabase {resp.status_code} {resp.text[:200]}")
+            page = resp.json() or []
+            rows.extend(page)
+            if len(page) < storage.MAX_ROWS:
+                return rows
+            offset += len(page)
+
+    def refresh_incremental(self, storage) -> dict:
+        """Relit depuis Supabase ce qui a change depuis la derniere mise a jour.
+
+        Clients et pianos : updated_at >= curseur - REFRESH_MARGIN. Timeline
+        (sans updated_at) : occurred_at >= curseur - TIMELINE_LOOKBACK. Le
+        curseur n'avance que si les trois lectures ont reussi.
+        """
+        t0 = time.time()
+        now = datetime.now(timezone.utc)
+        try:
+            cursor = datetime.fromisoformat(self._meta("since"))
+        except (TypeError, ValueError):
+            cursor = datetime.fromtimestamp(self.refreshed_at(), timezone.utc)
+        clients = self._fetch_since(storage, "gazelle_clients", "updated_at", _CLIENT_SELECT,
+                                    (cursor - REFRESH_MARGIN).isoformat())
+        pianos = self._fetch_since(storage, "gazelle_pianos", "updated_at", _PIANO_SELECT,
+                                   (cursor - REFRESH_MARGIN).isoformat())
+        timeline = self._fetch_since(storage, "gazelle_timeline_entries", "occurred_at", _TIMELINE_SELECT,
+                                     (cursor - TIMELINE_LOOKBACK).isoformat())
+        with self._lock, self.conn:
+            for c in clients:
+                self._put_client(self.conn, c)
+            for p in pianos:
+                self._put_piano(self.conn, p)
+            for e in timeline:
+                self._put_timeline(self.conn, e)
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                ("refreshed_at", str(time.time())), ("since", now.isoformat())])
+        counts = {"clients": len(clients), "pianos": len(pianos), "timeline": len(timeline)}
+        print(f"🔎 Index recherche client rafraichi en {time.time() - t0:.1f}s : {counts}")
+        return counts
+
+    def refresh_in_background(self, storage):
+        """Dans un thread : rebuild() si l'index manque ou est trop vieux, sinon
+        refresh_incremental() si la derniere mise a jour date de plus de REFRESH_EVERY."""
+        with self._lock:
+            if self._building:
+                return
+            now = time.time()
+            if not self.is_ready() or now - self.built_at() >= MAX_AGE:
+                job, label = self.rebuild, "Reconstruction index recherche client echouee"
+            elif now - self.refreshed_at() >= REFRESH_EVERY:
+                job, label = self.refresh_incremental, "Rafraichissement index recherche client echoue"
+            else:
+                return
+            self._building = True
+
+        def run():
+            try:
+                job(storage)
+            except Exception as exc:
+                print(f"⚠️ {label}: {exc}")
+            finally:
+                with self._lock:
+                    self._building = False
+
+        threading.Thread(target=run, name="client-index-rebuild", daemon=True).start()
+
+    # ------------------------------------------------------------- lecture
+    def _match_term(self, term: str) -> set:
+        """doc_ids contenant TOUTES les racines du terme (chacune en sous-chaine
+        d'un terme du vocabulaire, comme l'ancien ilike '*terme*')."""
+        docs = None
+        for s in dict.fromkeys(analyze(term)):
+            vocab = [r[0] for r in self.conn.execute(
+                "SELECT term FROM vocab WHERE df > 0 AND instr(term, ?) > 0", (s,))]
+            found = set()
+            for i in range(0, len(vocab), 500):
+                chunk = vocab[i:i + 500]
+                found.update(r[0] for r in self.conn.execute(
+                    f"SELECT doc_id FROM postings WHERE term IN ({','.join('?' * len(chunk))})", chunk))
+            docs = found if docs is None else docs & found
+            if not docs:
+                return set()
+        return docs or set()
+
+    def search(self, terms: list) -> dict:
+        """
+        Recherche multi-termes exacte.
+
+        Returns:
+            {'matches': {client_id: {'terms': set, 'hits': [(source, texte, date, terme)]}},
+             'clients': {client_id: fiche}}
+        """
+        matches = defaultdict(lambda: {"terms": set(), "hits": []})
+        with self._lock:
+            docs_by_term = {term: self._match_term(term) for term in terms}
+            all_docs = set().union(*docs_by_term.values()) if docs_by_term else set()
+            rows = {}
+            ids = list(all_docs)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for doc_id, cid, source, date, text in self.conn.execute(
+                        f"SELECT doc_id, client_id, source, date, text FROM docs "
+                        f"WHERE doc_id IN ({','.join('?' * len(chunk))})", chunk):
+                    rows[doc_id] = (cid, source, date, text)
+            for term, doc_ids in docs_by_term.items():
+                for doc_id in doc_ids:
+                    if doc_id in rows:
+                        cid, source, date, text = rows[doc_id]
+                        matches[cid]["terms"].add(term)
+                        matches[cid]["hits"].append((source, text, date, term))
+            cids = list(matches)
+            clients = {}
+            for i in range(0, len(cids), 500):
+                chunk = cids[i:i + 500]
+                for ext_id, fn, ln, comp, city in self.conn.execute(
+                        f"SELECT external_id, first_name, last_name, company_name, city FROM clients "
+                        f"WHERE external_id IN ({','.join('?' * len(chunk))})", chunk):
+                    clients[ext_id] = {"external_id": ext_id, "first_name": fn, "last_name": ln,
+                                       "company_name": comp, "city": city}
+        # Meme ordre que l'ancien recompte : notes, timeline (plus recente d'abord), pianos
+        rank = {"note": 0, "timeline": 1, "piano": 2}
+        for m in matches.values():
+            m["hits"].sort(key=lambda h: (rank.get(h[0], 3), -_date_key(h[2])))
+        return {"matches": dict(matches), "clients": clients}
+
+    def snippet(self, text: str, term: str, width: int = 55) -> str:
+        """Extrait centre sur la 1re occurrence (pliee) d'une racine du terme."""
+        folded = fold(text)
+        for s in analyze(term):
+            i = folded.find(s)
+            if i >= 0:
+                start, end = max(0, i - 20), min(len(text), i + len(s) + width)
+                snip = re.sub(r"\s+", " ", text[start:end]).strip()
+                return ("..." if start > 0 else "") + snip + ("..." if end < len(text) else "")
+        return re.sub(r"\s+", " ", text)[:width].strip()
+
+
+def _date_key(date) -> int:
+    try:
+        return int(str(date).replace("-", "")[:8])
+    except (TypeError, ValueError):
+        return 0
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_client_search_index() -> ClientSearchIndex:
+    """Index partage du processus (singleton)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ClientSearchIndex()
+    return _index
+
+
+def update_client_search_index(kind: str, records: list):
+    """Hook de sync : met a jour l'index local s'il existe sur cette machine.
+
+    Sur un runner ephemere (GitHub Actions) l'index n'existe pas : rien a faire,
+    l'API le rafraichit elle-meme (refresh_incremental, tache planifiee).
+    """
+    index = get_client_search_index()
+    if not records or not index.exists():
+        return
+    {"clients": index.upsert_clients,
+     "pianos": index.upsert_pianos,
+     "timeline": index.upsert_timeline}[kind](records)
@@ -12,7 +12,12 @@ cherchant a travers TOUS les champs texte ou l'info peut vivre :
 Principe (aligne sur le plan de fiabilite Ma Journee) : on rend la PROVENANCE.
 Chaque correspondance affiche d'ou elle vient (note / timeline + date / piano).
 
-Deux passes :
+Chemin rapide : l'index inverse local (api/chat/client_index.py) donne en une
+passe, en memoire, les correspondances EXACTES de chaque terme (accents plies,
+racines FR/EN). Les deux passes ci-dessous ne servent plus que tant que l'index
+n'est pas encore construit sur cette machine (ou s'il echoue).
+
+Deux passes (repli Supabase) :
   1) DECOUVERTE : une requete par terme (avec limite) -> liste de clients candidats.
   2) RECOMPTE EXACT : pour les candidats, on relit leurs donnees scopees par client
      (sans troncature) et on recompte TOUS les termes. Indispensable car un terme
@@ -22,8 +27,9 @@ Deux passes :
 import json
 import re
 from collections import defaultdict
+from core.http_session import get_session
+from api.chat.client_index import get_client_search_index
 
-import requests
 
 _EMAIL_TYPES = ("CONTACT_EMAIL_AUTOMATED,CONTACT_EMAIL_MANUAL,CONTACT_SMS_AUTOMATED,"
                 "CONTACT_SMS_MANUAL,SCHEDULED_MESSAGE_EMAIL,SCHEDULED_MESSAGE_SMS,CONTACT_EMAIL")
@@ -83,7 +89,9 @@ def extract_terms(query: str, anthropic=None) -> list:
                 "utile (ex. 'restaur' pour restaure/restauration ; 'hilaire' pour Saint-Hilaire). "
                 'Reponds UNIQUEMENT en JSON : {"termes": ["...", "..."]} (max 6).'
             )
-            resp = anthropic.messages.create(
+            from core.llm_gateway import get_llm_gateway
+            resp = get_llm_gateway().create(
+                "client_search_terms", client=anthropic,
                 model="claude-haiku-4-5-20251001", max_tokens=150,
                 system=sys_prompt, messages=[{"role": "user", "content": query}],
             )
@@ -110,6 +118,68 @@ def _snippet(text: str, term: str, width: int = 55) -> str:
     return ("..." if start > 0 else "") + snip + ("..." if end < len(text) else "")
 
 
+def _rank(query: str, cand: list, exact: dict, limit: int) -> list:
+    """Classement par rarete (exacte) ; un terme rare (lieu, marque) pese plus."""
+    tc = defaultdict(set)
+    for cid, e in exact.items():
+        for t in e["terms"]:
+            tc[t].add(cid)
+    w = {t: 1.0 / max(1, len(c)) for t, c in tc.items()}
+    distinctive = {t for t, c in tc.items() if len(c) <= max(8, len(cand) // 3)}
+
+    final = [cid for cid in cand if exact[cid]["terms"]
+             and (len(exact[cid]["terms"]) >= 2 or any(t in distinctive for t in exact[cid]["terms"]))]
+    final.sort(key=lambda cid: (sum(w[t] for t in exact[cid]["terms"]), len(exact[cid]["terms"])), reverse=True)
+    return final[:limit]
+
+
+def _format(query: str, final: list, clients_by: dict, exact: dict) -> str:
+    def name_of(c):
+        c = c or {}
+        return (c.get("company_name")
+                or " ".join(x for x in [c.get("first_name"), c.get("last_name")] if x) or "(sans nom)")
+
+    lines = [f"{len(final)} client(s) correspondent a « {query} » :", ""]
+    for i, cid in enumerate(final, 1):
+        c = clients_by.get(cid) or {}
+        city = c.get("city") or ""
+        lines.append(f"{i}. {name_of(c)} ({cid})" + (f" - {city}" if city else ""))
+        lines.append(f"   Criteres : {', '.join(sorted(exact[cid]['terms']))}")
+        seen = set()
+        for source, snip, date in exact[cid]["hits"]:
+            if not snip or snip in seen:
+                continue
+            seen.add(snip)
+            label = {"note": "Note", "piano": "Piano",
+                     "timeline": f"Timeline {date}" if date else "Timeline"}[source]
+            lines.append(f"   - {label} : « {snip} »")
+            if len(seen) >= 3:
+                break
+        lines.append("")
+    return "\n".join(lines).strip()
+
+
+def _search_with_index(index, query: str, terms: list, limit: int) -> str:
+    """Une seule passe, exacte, sur l'index local (pas de troncature ni de recompte)."""
+    found = index.search(terms)
+    matches = found["matches"]
+    if not matches:
+        return f"Aucun client ne correspond a « {query} »."
+
+    # Meme borne que la passe 2 (150 candidats) pour le seuil "distinctif"
+    cand = sorted(matches, key=lambda cid: len(matches[cid]["terms"]), reverse=True)[:150]
+    exact = {
+        cid: {"terms": matches[cid]["terms"],
+              "hits": [(source, index.snippet(text, term, date and 45 or 55), date)
+                       for source, text, date, term in matches[cid]["hits"]]}
+        for cid in cand
+    }
+    final = _rank(query, cand, exact, limit)
+    if not final:
+        return f"Aucun client ne correspond clairement a « {query} »."
+    return _format(query, final, found["clients"], exact)
+
+
 def search_clients_intelligent(storage, query: str, anthropic=None, limit: int = 8) -> str:
     if not query or not query.strip():
         return "Aucun critere de recherche fourni."
@@ -117,11 +187,20 @@ def search_clients_intelligent(storage, query: str, anthropic=None, limit: int =
     if not terms:
         return f"Je n'ai pas pu degager de critere clair de « {query} »."
 
+    index = get_client_search_index()
+    try:
+        # (Re)construit l'index en arriere-plan s'il manque ou est trop vieux
+        index.refresh_in_background(storage)
+        if index.is_ready():
+            return _search_with_index(index, query, terms, limit)
+    except Exception as exc:
+        print(f"⚠️ Index recherche client indisponible, repli Supabase: {exc}")
+
     headers, api = storage._get_headers(), storage.api_url
 
     def get(url):
         try:
-            r = requests.get(url, headers=headers, timeout=20)
+            r = get_session().get(url, headers=headers, timeout=20)
             return r.json() if r.status_code == 200 else []
         except Exception:
             return []
@@ -196,41 +275,7 @@ def search_clients_intelligent(storage, query: str, anthropic=None, limit: int =
         scan(pn.get("client_external_id"),
              pn.get("notes") or pn.get("location") or f"{pn.get('make', '')} {pn.get('model', '')}", "piano")
 
-    # Classement par rarete (exacte) ; un terme rare (lieu, marque) pese plus.
-    tc = defaultdict(set)
-    for cid, e in exact.items():
-        for t in e["terms"]:
-            tc[t].add(cid)
-    w = {t: 1.0 / max(1, len(c)) for t, c in tc.items()}
-    distinctive = {t for t, c in tc.items() if len(c) <= max(8, len(cand) // 3)}
-
-    final = [cid for cid in cand if exact[cid]["terms"]
-             and (len(exact[cid]["terms"]) >= 2 or any(t in distinctive for t in exact[cid]["terms"]))]
-    final.sort(key=lambda cid: (sum(w[t] for t in exact[cid]["terms"]), len(exact[cid]["terms"])), reverse=True)
-    final = final[:limit]
+    final = _rank(query, cand, exact, limit)
     if not final:
         return f"Aucun client ne correspond clairement a « {query} »."
-
-    def name_of(c):
-        c = c or {}
-        return (c.get("company_name")
-                or " ".join(x for x in [c.get("first_name"), c.get("last_name")] if x) or "(sans nom)")
-
-    lines = [f"{len(final)} client(s) correspondent a « {query} » :", ""]
-    for i, cid in enumerate(final, 1):
-        c = clients_by.get(cid) or {}
-        city = c.get("city") or ""
-        lines.append(f"{i}. {name_of(c)} ({cid})" + (f" - {city}" if city else ""))
-        lines.append(f"   Criteres : {', '.join(sorted(exact[cid]['terms']))}")
-        seen = set()
-        for source, snip, date in exact[cid]["hits"]:
-            if not snip or snip in seen:
-                continue
-            seen.add(snip)
-            label = {"note": "Note", "piano": "Piano",
-                     "timeline": f"Timeline {date}" if date else "Timeline"}[source]
-            lines.append(f"   - {label} : « {snip} »")
-            if len(seen) >= 3:
-                break
-        lines.append("")
-    return "\n".join(lines).strip()
+    return _format(query, final, clients_by, exact)
@@ -6,6 +6,7 @@ Priorise les zones denses et fréquemment visitées.
 """
 
 # Mapping code postal (3 premiers caractères) → Quartier
+# (centroïdes de ces RTA pour les distances hors ligne : core/fsa_distance.py)
 MTL_POSTAL_TO_NEIGHBORHOOD = {
     # ============================================================
     # MONTRÉAL CENTRAL & PLATEAU
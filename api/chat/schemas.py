@@ -33,6 +33,7 @@ class AppointmentOverview(BaseModel):
     billing_client: Optional[str] = Field(None, description="Institution qui paie (si différent du contact)")
     neighborhood: str = Field(..., description="Quartier/Ville", example="Plateau Mont-Royal")
     address_short: str = Field(..., description="Adresse courte", example="4520 rue St-Denis")
+    postal_code: Optional[str] = Field(None, description="Code postal (estimation des trajets)", example="H2J 2L3")
 
     # Piano (Info rapide)
     piano_brand: Optional[str] = Field(None, description="Marque", example="Yamaha")
@@ -5,13 +5,19 @@ Architecture modulaire pour faciliter migration V6.
 """
 
 from typing import List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, time
+import hashlib
+import math
 import re
 import pytz
 import asyncio
 import logging
+import threading
 
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 
 logger = logging.getLogger(__name__)
 from modules.assistant import ConversationHandler
@@ -25,6 +31,8 @@ from .schemas import (
     TimelineEntry,
 )
 from .geo_mapping import get_neighborhood_from_postal_code
+from core.fsa_distance import get_fsa_engine
+from modules.assistant.services.distance_calculator import HOME_POSTAL_CODES
 
 
 class ChatService:
@@ -557,76 +565,22 @@ class V5DataProvider:
     def get_appointment_detail(self, appointment_id: str) -> AppointmentDetail:
         """
         Récupère les détails complets d'un rendez-vous.
-        """
-        import requests
-
-        # 1. Récupérer l'appointment avec tous les détails
-        url = f"{self.storage.api_url}/gazelle_appointments"
-        headers = self.storage._get_headers()
-
-        params = {
-            "select": "*,client:client_external_id(*)",
-            "external_id": f"eq.{appointment_id}"
-        }
 
-        response = requests.get(url, headers=headers, params=params)
-
-        if response.status_code != 200 or not response.json():
-            raise ValueError(f"Appointment {appointment_id} not found")
-
-        apt_raw = response.json()[0]
+        Appointment + client + pianos + timeline en UN aller-retour PostgREST
+        (ressources imbriquées) ; si la relation n'est pas exposée, repli sur
+        appointment puis pianos/timeline en parallèle.
+        """
 
-        # 2. Récupérer les pianos du CLIENT et leur timeline
-        timeline_entries = []
+        # 1-2. Appointment avec client, pianos du client et timeline du client
+        apt_raw = self._fetch_appointment_bundle(appointment_id)
         client = apt_raw.get("client")
 
+        timeline_entries = []
         if client:
-            client_id = client.get("external_id")
-
-            # Récupérer les pianos de ce client
-            pianos_url = f"{self.storage.api_url}/gazelle_pianos"
-            pianos_params = {
-                "select": "external_id,make,model,serial_number",
-                "client_external_id": f"eq.{client_id}"
-            }
-
-            pianos_response = requests.get(pianos_url, headers=headers, params=pianos_params)
-
-            # Récupérer la timeline du CLIENT (pas par piano individuel)
-            # La plupart des timeline entries sont liées au client directement
-            # Augmenter limite à 50 pour capturer vrais services (pas seulement emails)
-            timeline_url = f"{self.storage.api_url}/gazelle_timeline_entries"
-
-            # PostgREST: Récupérer timeline (on filtrera après pour garder les notes importantes)
-            timeline_params = {
-                "select": "occurred_at,entry_type,title,description,entry_date,event_type,metadata",
-                "client_external_id": f"eq.{client_id}",
-                # Inclure: SERVICE_ENTRY_MANUAL, APPOINTMENT, PIANO_MEASUREMENT, NOTE (pour "Prochain RV: ...")
-                "entry_type": "in.(SERVICE_ENTRY_MANUAL,APPOINTMENT,PIANO_MEASUREMENT,NOTE)",
-                "order": "occurred_at.desc",
-                "limit": 50
-            }
-
-            timeline_response = requests.get(timeline_url, headers=headers, params=timeline_params)
-
-            if timeline_response.status_code == 200:
-                timeline_raw = timeline_response.json()
-                # Mapper toutes les entrées
-                all_entries = [self._map_to_timeline_entry(entry) for entry in timeline_raw]
-
-                # Filtrer les entrées inutiles (garder si summary OU details utiles)
-                # NOTE: Ne pas réassigner timeline_entries = [] car ça crée une variable locale!
-                # On doit modifier la liste existante via une variable intermédiaire
-                filtered = []
-                for entry in all_entries:
-                    is_summary_useful = self._is_useful_note(entry.summary)
-                    is_details_useful = self._is_useful_note(entry.details)
-
-                    if is_summary_useful or is_details_useful:
-                        filtered.append(entry)
-
-                # Maintenant affecter la liste filtrée à la variable outer scope
-                timeline_entries = filtered
+            # Filtrer les entrées inutiles (garder si summary OU details utiles)
+            for entry in map(self._map_to_timeline_entry, client.get("timeline") or []):
+                if self._is_useful_note(entry.summary) or self._is_useful_note(entry.details):
+                    timeline_entries.append(entry)
 
         # 3. Construire les objets
         overview = self._map_to_overview(apt_raw, apt_raw.get("appointment_date"))
@@ -666,6 +620,85 @@ class V5DataProvider:
             photos=[]  # TODO: Ajouter si photos disponibles
         )
 
+    # Timeline du CLIENT (pas par piano individuel) : la plupart des entrées
+    # sont liées au client directement. 50 entrées pour capturer les vrais
+    # services (pas seulement les emails) ; on filtre ensuite les notes utiles.
+    _TIMELINE_SELECT = "occurred_at,entry_type,title,description,entry_date,event_type,metadata"
+    # SERVICE_ENTRY_MANUAL, APPOINTMENT, PIANO_MEASUREMENT, NOTE (pour "Prochain RV: ...")
+    _TIMELINE_TYPES = "in.(SERVICE_ENTRY_MANUAL,APPOINTMENT,PIANO_MEASUREMENT,NOTE)"
+    _TIMELINE_LIMIT = 50
+    _PIANOS_SELECT = "external_id,make,model,type,serial_number,dampp_chaser_installed"
+
+    # False après un refus de PostgREST (relation non exposée) : repli direct
+    _embedded_detail_supported = True
+
+    def _fetch_appointment_bundle(self, appointment_id: str) -> Dict[str, Any]:
+        """
+        Appointment brut avec client["pianos"] et client["timeline"] (desc, max 50).
+
+        Raises:
+            ValueError: Si l'appointment est introuvable
+        """
+        url = f"{self.storage.api_url}/gazelle_appointments"
+        headers = self.storage._get_headers()
+
+        if V5DataProvider._embedded_detail_supported:
+            params = {
+                "select": (
+                    "*,client:client_external_id(*,"
+                    f"pianos:gazelle_pianos({self._PIANOS_SELECT}),"
+                    f"timeline:gazelle_timeline_entries({self._TIMELINE_SELECT}))"
+                ),
+                "external_id": f"eq.{appointment_id}",
+                "client.timeline.entry_type": self._TIMELINE_TYPES,
+                "client.timeline.order": "occurred_at.desc",
+                "client.timeline.limit": self._TIMELINE_LIMIT,
+            }
+            response = get_session().get(url, headers=headers, params=params)
+            if response.status_code == 200:
+                rows = response.json()
+                if not rows:
+                    raise ValueError(f"Appointment {appointment_id} not found")
+                return rows[0]
+            if response.status_code == 400:
+                # PGRST200/201 : relation absente ou ambiguë dans le schéma
+                logger.warning(f"Détail RV: imbrication refusée ({response.text[:200]}), repli parallèle")
+                V5DataProvider._embedded_detail_supported = False
+
+        params = {
+            "select": "*,client:client_external_id(*)",
+            "external_id": f"eq.{appointment_id}"
+        }
+        response = get_session().get(url, headers=headers, params=params)
+        if response.status_code != 200 or not response.json():
+            raise ValueError(f"Appointment {appointment_id} not found")
+        apt_raw = response.json()[0]
+
+        client = apt_raw.get("client")
+        if client:
+            client_id = client.get("external_id")
+
+            def fetch(table: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+                resp = get_session().get(f"{self.storage.api_url}/{table}", headers=headers, params=params)
+                return resp.json() if resp.status_code == 200 else []
+
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                pianos = pool.submit(fetch, "gazelle_pianos", {
+                    "select": self._PIANOS_SELECT,
+                    "client_external_id": f"eq.{client_id}",
+                })
+                timeline = pool.submit(fetch, "gazelle_timeline_entries", {
+                    "select": self._TIMELINE_SELECT,
+                    "client_external_id": f"eq.{client_id}",
+                    "entry_type": self._TIMELINE_TYPES,
+                    "order": "occurred_at.desc",
+                    "limit": self._TIMELINE_LIMIT,
+                })
+                client["pianos"] = pianos.result()
+                client["timeline"] = timeline.result()
+
+        return apt_raw
+
     def search_clients(self, search_term: str, limit: int = 20) -> str:
         """
         Recherche des clients et contacts dans Supabase.
@@ -677,7 +710,6 @@ class V5DataProvider:
         Returns:
             Résumé textuel des résultats
         """
-        import requests
         from urllib.parse import quote
 
         if not search_term:
@@ -701,7 +733,7 @@ class V5DataProvider:
                         f"&{field}=ilike.{search_pattern}"
                         f"&limit={limit}"
                     )
-                    clients_resp = requests.get(clients_url, headers=headers)
+                    clients_resp = get_session().get(clients_url, headers=headers)
                     if clients_resp.status_code == 200:
                         for client in clients_resp.json():
                             client_id = client.get("external_id")
@@ -721,7 +753,7 @@ class V5DataProvider:
                         f"&{field}=ilike.{search_pattern}"
                         f"&limit={limit}"
                     )
-                    contacts_resp = requests.get(contacts_url, headers=headers)
+                    contacts_resp = get_session().get(contacts_url, headers=headers)
                     if contacts_resp.status_code == 200:
                         for contact in contacts_resp.json():
                             contact_id = contact.get("external_id")
@@ -762,7 +794,7 @@ class V5DataProvider:
                     else:
                         continue  # Skip si pas de client lié
 
-                appointments_resp = requests.get(appointments_url, headers=headers)
+                appointments_resp = get_session().get(appointments_url, headers=headers)
                 rdv_count = len(appointments_resp.json()) if appointments_resp.status_code == 200 else 0
 
                 location = f"{city} {postal_code}".strip() if city or postal_code else "Lieu inconnu"
@@ -1109,6 +1141,7 @@ class V5DataProvider:
             billing_client=billing_client,
             neighborhood=neighborhood,
             address_short=address_short,
+            postal_code=(client.get("postal_code") or None) if client else None,
             piano_brand=piano_brand,
             piano_model=piano_model,
             piano_type=piano_type,
@@ -1135,67 +1168,72 @@ class V5DataProvider:
         - Choses à surveiller
         """
         client = apt_raw.get("client") or {}
-        notes = apt_raw.get("notes") or ""
-        notes_lower = notes.lower()
-
-        # === ANIMAUX ===
-        dog_name = self._extract_dog_name(notes)
-        dog_breed = self._extract_dog_breed(notes)
-        cat_name = self._extract_cat_name(notes)
-
-        # === CODE D'ACCÈS ===
-        access_code = self._extract_access_code(notes)
+        fields = self._extract_comfort_fields(apt_raw.get("notes") or "")
 
-        # === INSTRUCTIONS D'ACCÈS DÉTAILLÉES ===
-        access_instructions = self._extract_access_instructions(notes)
-
-        # === STATIONNEMENT ===
-        parking_info = self._extract_parking_info(notes)
-
-        # === ÉTAGE ===
-        floor_number = self._extract_floor_number(notes)
+        return ComfortInfo(
+            contact_name=client.get("first_name") or client.get("company_name"),
+            # === TÉLÉPHONE / EMAIL ===
+            contact_phone=client.get("phone"),
+            contact_email=client.get("email"),
+            **fields
+        )
 
-        # === TÉLÉPHONE ===
-        contact_phone = client.get("phone")
+    # Extraction "confort" mémorisée par empreinte des notes (LRU borné) :
+    # les mêmes notes reviennent à chaque ouverture du RV et dans la journée.
+    _COMFORT_CACHE_SIZE = 2048
+    _comfort_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    _comfort_cache_lock = threading.Lock()
 
-        # === EMAIL ===
-        contact_email = client.get("email")
+    def _extract_comfort_fields(self, notes: str) -> Dict[str, Any]:
+        """
+        Champs ComfortInfo tirés des notes seules (regex), mémorisés par hash des notes.
 
-        # === PRÉFÉRENCES ACCORDAGE ===
-        preferred_tuning_hz = self._extract_tuning_preference(notes)
+        Args:
+            notes: Notes du rendez-vous
 
-        # === PIANO SENSIBLE CLIMAT ===
-        climate_sensitive = any(kw in notes_lower for kw in [
-            "sensible", "humidité", "température", "dampp", "pls", "piano life saver"
-        ])
+        Returns:
+            Dict des champs ComfortInfo (animaux, accès, stationnement, étage, langue, etc.)
+        """
+        key = hashlib.sha1(notes.encode("utf-8")).hexdigest()
+        cache = V5DataProvider._comfort_cache
+        with V5DataProvider._comfort_cache_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return dict(cache[key])
 
-        # === NOTES SPÉCIALES (Choses à surveiller) ===
-        # Filtrer et extraire seulement les infos importantes
-        special_notes = self._extract_special_notes(notes)
-        
-        # === PRÉFÉRENCE LINGUISTIQUE ===
-        preferred_language = self._extract_language_preference(notes)
-        
-        # === TEMPÉRAMENT ===
-        temperament = self._extract_temperament(notes)
+        notes_lower = notes.lower()
+        fields = {
+            # === ANIMAUX ===
+            "dog_name": self._extract_dog_name(notes),
+            "dog_breed": self._extract_dog_breed(notes),
+            "cat_name": self._extract_cat_name(notes),
+            # === CODE D'ACCÈS ===
+            "access_code": self._extract_access_code(notes),
+            # === INSTRUCTIONS D'ACCÈS DÉTAILLÉES ===
+            "access_instructions": self._extract_access_instructions(notes),
+            # === STATIONNEMENT ===
+            "parking_info": self._extract_parking_info(notes),
+            # === ÉTAGE ===
+            "floor_number": self._extract_floor_number(notes),
+            # === PRÉFÉRENCES ACCORDAGE ===
+            "preferred_tuning_hz": self._extract_tuning_preference(notes),
+            # === PIANO SENSIBLE CLIMAT ===
+            "climate_sensitive": any(kw in notes_lower for kw in [
+                "sensible", "humidité", "température", "dampp", "pls", "piano life saver"
+            ]),
+            # === NOTES SPÉCIALES (Choses à surveiller) ===
+            "special_notes": self._extract_special_notes(notes),
+            # === PRÉFÉRENCE LINGUISTIQUE ===
+            "preferred_language": self._extract_language_preference(notes),
+            # === TEMPÉRAMENT ===
+            "temperament": self._extract_temperament(notes),
+        }
 
-        return ComfortInfo(
-            contact_name=client.get("first_name") or client.get("company_name"),
-            contact_phone=contact_phone,
-            contact_email=contact_email,
-            access_code=access_code,
-            access_instructions=access_instructions,
-            parking_info=parking_info,
-            floor_number=floor_number,
-            dog_name=dog_name,
-            dog_breed=dog_breed,
-            cat_name=cat_name,
-            special_notes=special_notes,
-            preferred_tuning_hz=preferred_tuning_hz,
-            climate_sensitive=climate_sensitive,
-            preferred_language=preferred_language,
-            temperament=temperament
-        )
+        with V5DataProvider._comfort_cache_lock:
+            cache[key] = fields
+            if len(cache) > self._COMFORT_CACHE_SIZE:
+                cache.popitem(last=False)
+        return dict(fields)
 
     def _map_to_timeline_entry(self, entry_raw: Dict[str, Any]) -> TimelineEntry:
         """
@@ -1464,10 +1502,14 @@ class V5DataProvider:
             # Créer un datetime pour aujourd'hui à cette heure
             first_apt_time = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
 
-            # Estimer temps de trajet basé sur le quartier
-            # TODO: Utiliser l'API de distance réelle
+            # Temps de trajet maison -> premier RV : estimation hors ligne par
+            # RTA (core/fsa_distance.py), sinon selon le quartier
+            home_postal = HOME_POSTAL_CODES.get(day_overview.technician_name)
+            leg = get_fsa_engine().estimate(home_postal, first_apt.postal_code) if home_postal and first_apt.postal_code else None
             neighborhood = first_apt.neighborhood.lower()
-            if any(word in neighborhood for word in ["plateau", "mile-end", "rosemont"]):
+            if leg:
+                travel_minutes = round(leg['duration_s'] / 60)
+            elif any(word in neighborhood for word in ["plateau", "mile-end", "rosemont"]):
                 travel_minutes = 20
             elif any(word in neighborhood for word in ["laval", "longueuil", "brossard"]):
                 travel_minutes = 30
@@ -1496,12 +1538,28 @@ class V5DataProvider:
         """
         Calcule la distance totale de la journée.
 
-        TODO: Intégrer avec l'API Google Maps pour distances réelles.
-        Pour l'instant, estimation basée sur le nombre de quartiers différents.
+        Maison -> RV1 -> ... -> Maison estimé hors ligne par RTA
+        (core/fsa_distance.py) quand la maison et tous les codes postaux sont
+        connus ; sinon estimation basée sur le nombre de quartiers différents.
         """
         if not day_overview.appointments:
             return "Aucun rendez-vous pour cette journée."
 
+        home_postal = HOME_POSTAL_CODES.get(day_overview.technician_name)
+        stops = [apt.postal_code for apt in day_overview.appointments]
+        if home_postal and all(stops):
+            waypoints = [home_postal] + stops + [home_postal]
+            km, minutes = get_fsa_engine().matrix(waypoints[:-1], waypoints[1:])
+            total_km, total_min = float(km.diagonal().sum()), float(minutes.diagonal().sum())
+            if not math.isnan(total_km):
+                return (
+                    f"Distance totale estimée: ~{total_km:.0f} km\n\n"
+                    f"Rendez-vous: {len(stops)}\n"
+                    f"Temps de route estimé: ~{total_min:.0f} min\n\n"
+                    f"⚠️ Note: Estimation à vol d'oiseau corrigée (centroïdes des codes postaux). "
+                    f"Pour une distance précise, utiliser Google Maps."
+                )
+
         # Compter les quartiers uniques
         neighborhoods_set = set()
         for apt in day_overview.appointments:
@@ -79,6 +79,8 @@ async def execute_action(req: ExecuteRequest):
         pending['id'],
         response={'note': 'Confirmé par utilisateur. Création/modification à finaliser manuellement.'},
         status='confirmed',
+        user_id=pending.get('user_id'),
+        action_type=pending.get('action_type'),
     )
 
     return {
@@ -4,12 +4,12 @@ Lecture des tables chat_clients, chat_photo_analyses, chat_sessions.
 """
 
 import os
-import requests as http_requests
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 from pydantic import BaseModel
-from core.supabase_storage import SupabaseStorage
+from core.supabase_storage import SupabaseStorage, get_shared_storage
 from core.slack_notifier import SlackNotifier
+from core.http_session import get_session
 
 router = APIRouter(prefix="/chat-stats", tags=["chat-stats"])
 
@@ -18,7 +18,7 @@ def _supabase_get(storage: SupabaseStorage, path: str):
     """Helper: GET request vers Supabase REST API."""
     url = f"{storage.api_url}/{path}"
     headers = storage._get_headers()
-    response = http_requests.get(url, headers=headers, timeout=10)
+    response = get_session().get(url, headers=headers, timeout=10)
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail=f"Supabase: {response.text}")
     return response.json()
@@ -33,7 +33,7 @@ async def get_chat_summary():
     - Intérêts des clients
     """
     try:
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
 
         # Stats globales (vue)
         stats = _supabase_get(storage, "v_chat_stats?select=*")
@@ -66,7 +66,7 @@ async def get_chat_clients(limit: int = 50):
     Liste des clients identifiés (avec email), triés par dernier contact.
     """
     try:
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         limit = min(limit, 200)
 
         clients = _supabase_get(
@@ -91,7 +91,7 @@ async def get_recent_analyses(limit: int = 30):
     Dernières analyses photo (marque, score, verdict).
     """
     try:
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         limit = min(limit, 100)
 
         analyses = _supabase_get(
@@ -117,7 +117,7 @@ async def get_client_detail(email: str):
     Détail d'un client par email: infos + ses analyses photo.
     """
     try:
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
 
         # Client info
         clients = _supabase_get(storage, f"chat_clients?email=eq.{email}&select=*")
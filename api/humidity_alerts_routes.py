@@ -7,6 +7,7 @@ from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 from apscheduler.schedulers.background import BackgroundScheduler
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 
 router = APIRouter(prefix="/humidity-alerts", tags=["humidity-alerts"])
 
@@ -152,8 +153,7 @@ async def get_all_alerts(limit: int = 100, resolved: bool = None):
 
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -209,8 +209,7 @@ async def get_alerts_stats():
         url = f"{storage.api_url}/humidity_alerts_active?select=*"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -273,8 +272,7 @@ async def get_unresolved_alerts(limit: int = 100):
         url = f"{storage.api_url}/humidity_alerts_active?select=*&is_resolved=eq.false&archived=eq.false&order=observed_at.desc&limit={limit}"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -315,8 +313,7 @@ async def get_resolved_alerts(limit: int = 100):
         url = f"{storage.api_url}/humidity_alerts_active?select=*&is_resolved=eq.true&archived=eq.false&order=resolved_at.desc&limit={limit}"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -358,8 +355,7 @@ async def get_archived_alerts(limit: int = 100):
         url = f"{storage.api_url}/humidity_alerts?select=*,client_name:gazelle_clients(company_name),piano_make:gazelle_pianos(make),piano_model:gazelle_pianos(model)&archived=eq.true&order=updated_at.desc&limit={limit}"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -396,7 +392,6 @@ async def resolve_alert(alert_id: str, request: ResolveAlertRequest):
         storage = SupabaseStorage()
 
         # Appeler la fonction Postgres
-        import requests
         url = f"{storage.api_url}/rpc/resolve_humidity_alert"
         headers = storage._get_headers()
         payload = {
@@ -404,7 +399,7 @@ async def resolve_alert(alert_id: str, request: ResolveAlertRequest):
             "notes": request.resolution_notes
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_session().post(url, headers=headers, json=payload)
 
         if response.status_code not in [200, 204]:
             raise HTTPException(
@@ -435,12 +430,11 @@ async def archive_alert(alert_id: str):
         storage = SupabaseStorage()
 
         # Appeler la fonction Postgres
-        import requests
         url = f"{storage.api_url}/rpc/archive_humidity_alert"
         headers = storage._get_headers()
         payload = {"alert_id": alert_id}
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_session().post(url, headers=headers, json=payload)
 
         if response.status_code not in [200, 204]:
             raise HTTPException(
@@ -25,9 +25,10 @@ import os
 import re
 from typing import Dict, Any, Optional, List
 from fastapi import APIRouter, HTTPException, Query, Path as PathParam
-from core.supabase_storage import SupabaseStorage
+from core.supabase_storage import SupabaseStorage, get_supabase_client
 from core.gazelle_api_client import GazelleAPIClient
-from supabase import create_client
+from core.blocking_executor import offload_blocking
+from core.piano_list_cache import get_piano_list_cache, invalidates_piano_list
 
 router = APIRouter(tags=["institutions"])
 
@@ -137,7 +138,7 @@ def discover_and_sync_institutions() -> Dict[str, Any]:
             logging.error("❌ Configuration Supabase manquante pour discovery")
             return {"success": False, "error": "Configuration Supabase manquante"}
         
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
         
         api_client = get_api_client()
         if not api_client:
@@ -259,7 +260,7 @@ def get_institution_config(slug: str) -> Dict[str, Any]:
 
     # Charger depuis Supabase
     try:
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         import os
 
         supabase_url = os.getenv("SUPABASE_URL")
@@ -271,7 +272,7 @@ def get_institution_config(slug: str) -> Dict[str, Any]:
                 detail="Configuration Supabase manquante (SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)"
             )
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Query institutions table
         response = supabase.table('institutions').select('*').eq('slug', slug).eq('active', True).execute()
@@ -308,8 +309,170 @@ def get_institution_config(slug: str) -> Dict[str, Any]:
         )
 
 
+# Champs Gazelle d'un piano, partagés par la requête simple et la requête en lot
+GAZELLE_PIANO_FIELDS = """
+                  id
+                  serialNumber
+                  make
+                  model
+                  location
+                  type
+                  status
+                  notes
+                  calculatedLastService
+                  calculatedNextService
+                  serviceIntervalMonths
+                  tags
+"""
+
+
+def fetch_gazelle_pianos_batch(client_ids: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Charge les pianos Gazelle de plusieurs institutions en UNE requête GraphQL.
+
+    Chaque institution devient un alias (i0: allPianos(clientId: ...), i1: ...).
+    Si la requête groupée échoue (complexité, client invalide...), repli sur
+    des requêtes simultanées, une par institution, sous le limiteur de débit
+    partagé de core.gazelle_parallel_fetch.
+
+    Args:
+        client_ids: {slug: gazelle_client_id}
+
+    Returns:
+        {slug: [pianos Gazelle]} (slug absent si son chargement a échoué)
+    """
+    if not client_ids:
+        return {}
+    api_client = get_api_client()
+    if not api_client:
+        raise HTTPException(status_code=500, detail="Client API Gazelle non disponible")
+
+    slugs = list(client_ids)
+    aliases = {f"i{idx}": slug for idx, slug in enumerate(slugs)}
+    var_defs = ", ".join(f"$c{idx}: String!" for idx in range(len(slugs)))
+    selections = "\n".join(
+        f"  {alias}: allPianos(clientId: $c{alias[1:]}) {{ nodes {{ {GAZELLE_PIANO_FIELDS} }} }}"
+        for alias in aliases
+    )
+    query = f"query InstitutionPianos({var_defs}) {{\n{selections}\n}}"
+    variables = {f"c{idx}": str(client_ids[slug]) for idx, slug in enumerate(slugs)}
+
+    try:
+        data = api_client._execute_query(query, variables).get("data") or {}
+        result = {slug: (data.get(alias) or {}).get("nodes", []) for alias, slug in aliases.items()}
+        logging.info(f"📋 Pianos de {len(slugs)} institutions en 1 requête Gazelle")
+        return result
+    except Exception as e:
+        logging.warning(f"⚠️ Requête groupée allPianos échouée ({e}) — requêtes simultanées")
+
+    from concurrent.futures import ThreadPoolExecutor
+    from core.gazelle_parallel_fetch import ParallelWindowFetcher
+
+    fetcher = ParallelWindowFetcher()
+    single_query = f"""
+    query AllPianos($clientId: String!) {{
+      allPianos(clientId: $clientId) {{ nodes {{ {GAZELLE_PIANO_FIELDS} }} }}
+    }}
+    """
+
+    def _one(slug):
+        try:
+            res = fetcher.call(lambda: api_client._execute_query(single_query, {"clientId": str(client_ids[slug])}))
+            return slug, res.get("data", {}).get("allPianos", {}).get("nodes", [])
+        except Exception as err:
+            logging.error(f"❌ Pianos Gazelle {slug}: {err}")
+            return slug, None
+
+    with ThreadPoolExecutor(max_workers=min(fetcher.max_workers, len(slugs))) as pool:
+        return {slug: nodes for slug, nodes in pool.map(_one, slugs) if nodes is not None}
+
+
+def _piano_list_cache_entry(slug: str, include_inactive: bool,
+                            gazelle_pianos: Optional[List[Dict[str, Any]]] = None):
+    """Clé de cache et chargeur de la liste servie par la route de l'institution.
+
+    /vincent-dindy/pianos a sa propre route (api/vincent_dindy.py, chargeur et
+    clé "vdi-pianos") : la réutiliser pour que le préchargement serve aussi
+    cette page.
+    """
+    if slug == "vincent-dindy":
+        from api.vincent_dindy import _load_pianos
+        return ("vincent-dindy", "vdi-pianos", include_inactive), lambda: _load_pianos(include_inactive)
+    return (slug, "pianos", include_inactive), \
+        lambda: _load_institution_pianos(slug, include_inactive, gazelle_pianos)
+
+
+def load_all_institution_pianos(slugs: Optional[List[str]] = None,
+                                include_inactive: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Charge les listes de pianos fusionnées de plusieurs institutions et les
+    place dans le cache mémoire (même clé que la route de chaque institution).
+
+    Seules les institutions absentes du cache (ou périmées) interrogent
+    Gazelle, en une requête groupée ; le résultat fusionné REMPLACE l'entrée
+    en cache (pas de valeur périmée servie après avoir payé la requête). La
+    fusion overlays/fiches de service se fait en parallèle. Le chargement à
+    froid coûte ainsi la plus lente des requêtes, pas leur somme.
+
+    Args:
+        slugs: Institutions à charger (défaut: toutes les institutions actives)
+        include_inactive: Inclure les pianos masqués (tag "non")
+
+    Returns:
+        {slug: {"pianos": [...], "count": N, "institution": nom}}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if slugs is None:
+        slugs = [inst["slug"] for inst in list_institutions()["institutions"]]
+    cache = get_piano_list_cache()
+
+    configs = {}
+    for slug in slugs:
+        try:
+            configs[slug] = get_institution_config(slug)
+        except HTTPException as e:
+            logging.warning(f"⚠️ Institution {slug} ignorée: {e.detail}")
+
+    # vincent-dindy garde son propre chargeur (requête Gazelle différente)
+    to_fetch = {slug: cfg["gazelle_client_id"] for slug, cfg in configs.items()
+                if slug != "vincent-dindy"
+                and not cache.is_fresh(_piano_list_cache_entry(slug, include_inactive)[0])}
+    prefetched = fetch_gazelle_pianos_batch(to_fetch)
+
+    def _one(slug):
+        try:
+            key, loader = _piano_list_cache_entry(slug, include_inactive, prefetched.get(slug))
+            data = cache.load(key, loader) if slug in prefetched else cache.get(key, loader)
+            return slug, {**data, "institution": data.get("institution") or configs[slug].get("name")}
+        except Exception as e:
+            logging.error(f"❌ Pianos {slug}: {e}")
+            return slug, None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(configs))) as pool:
+        return {slug: data for slug, data in pool.map(_one, list(configs)) if data is not None}
+
+
+@router.get("/institutions/all-pianos", response_model=Dict[str, Any])
+@offload_blocking
+def get_all_institution_pianos(
+    slugs: Optional[str] = Query(None, description="Slugs séparés par des virgules (défaut: toutes)"),
+    include_inactive: bool = Query(False, description="Inclure les pianos masqués")
+) -> Dict[str, Any]:
+    """
+    Pianos de plusieurs institutions en un appel (tableau de bord unifié).
+
+    Returns:
+        {"institutions": {slug: {"pianos": [...], "count": N, "institution": nom}}, "count": 2}
+    """
+    slug_list = [s.strip() for s in slugs.split(",") if s.strip()] if slugs else None
+    data = load_all_institution_pianos(slug_list, include_inactive)
+    return {"institutions": data, "count": len(data)}
+
+
 @router.get("/{institution}/pianos", response_model=Dict[str, Any])
-async def get_institution_pianos(
+@offload_blocking
+def get_institution_pianos(
     institution: str = PathParam(..., description="Institution slug (ex: vincent-dindy, orford)"),
     include_inactive: bool = Query(False, description="Inclure les pianos masqués")
 ) -> Dict[str, Any]:
@@ -333,6 +496,28 @@ async def get_institution_pianos(
             "count": 42,
             "institution": "Vincent d'Indy"
         }
+
+    Servi depuis le cache mémoire (core/piano_list_cache) : rafraîchi en
+    arrière-plan après PIANO_CACHE_TTL, invalidé par les routes d'écriture.
+    """
+    return _cached_institution_pianos(institution, include_inactive)
+
+
+def _cached_institution_pianos(institution: str, include_inactive: bool) -> Dict[str, Any]:
+    """Liste fusionnée servie depuis le cache mémoire (même entrée que /{institution}/pianos)."""
+    return get_piano_list_cache().get(
+        (institution, "pianos", include_inactive),
+        lambda: _load_institution_pianos(institution, include_inactive),
+    )
+
+
+def _load_institution_pianos(institution: str, include_inactive: bool,
+                             gazelle_pianos: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Charge et fusionne pianos Gazelle + overlays + fiches de service (sans cache).
+
+    Args:
+        gazelle_pianos: Pianos Gazelle déjà chargés (fetch_gazelle_pianos_batch) ;
+            None -> requête allPianos pour cette seule institution
     """
     # Charger config depuis Supabase
     config = get_institution_config(institution)
@@ -345,30 +530,18 @@ async def get_institution_pianos(
 
         logging.info(f"🔍 Chargement pianos {institution} (client_id: {client_id})")
 
-        # 1. Charger pianos depuis Gazelle
-        query = """
-        query AllPianos($clientId: String!) {
-          allPianos(clientId: $clientId) {
-            nodes {
-              id
-              serialNumber
-              make
-              model
-              location
-              type
-              status
-              notes
-              calculatedLastService
-              calculatedNextService
-              serviceIntervalMonths
-              tags
-            }
-          }
-        }
-        """
+        # 1. Charger pianos depuis Gazelle (sauf si déjà chargés en lot)
+        if gazelle_pianos is None:
+            query = f"""
+            query AllPianos($clientId: String!) {{
+              allPianos(clientId: $clientId) {{
+                nodes {{ {GAZELLE_PIANO_FIELDS} }}
+              }}
+            }}
+            """
 
-        result = api_client._execute_query(query, {"clientId": str(client_id)})
-        gazelle_pianos = result.get("data", {}).get("allPianos", {}).get("nodes", [])
+            result = api_client._execute_query(query, {"clientId": str(client_id)})
+            gazelle_pianos = result.get("data", {}).get("allPianos", {}).get("nodes", [])
 
         logging.info(f"📋 {len(gazelle_pianos)} pianos Gazelle pour {institution}")
 
@@ -380,8 +553,8 @@ async def get_institution_pianos(
         service_records_by_piano = {}
         last_pushed_by_piano = {}
         try:
-            from supabase import create_client as _create_client
-            _sb = _create_client(
+            from core.supabase_storage import get_supabase_client
+            _sb = get_supabase_client(
                 os.getenv("SUPABASE_URL"),
                 os.getenv("SUPABASE_SERVICE_ROLE_KEY")
             )
@@ -569,7 +742,9 @@ async def get_institution_pianos(
 
 
 @router.put("/{institution}/pianos/{piano_id}")
-async def update_institution_piano(
+@offload_blocking
+@invalidates_piano_list()
+def update_institution_piano(
     institution: str = PathParam(..., description="Institution slug"),
     piano_id: str = PathParam(..., description="ID du piano"),
     update: Dict[str, Any] = {}
@@ -655,7 +830,8 @@ async def update_institution_piano(
 
 
 @router.get("/{institution}/activity", response_model=Dict[str, Any])
-async def get_institution_activity(
+@offload_blocking
+def get_institution_activity(
     institution: str = PathParam(..., description="Institution slug"),
     limit: int = Query(20, description="Nombre max d'activités")
 ) -> Dict[str, Any]:
@@ -669,11 +845,11 @@ async def get_institution_activity(
         # Récupérer les profils utilisateurs pour mapper updated_by (email) vers first_name
         users_map = {}
         try:
-            from supabase import create_client
+            from core.supabase_storage import get_supabase_client
             supabase_url = os.getenv("SUPABASE_URL")
             supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
             if supabase_url and supabase_key:
-                supabase = create_client(supabase_url, supabase_key)
+                supabase = get_supabase_client(supabase_url, supabase_key)
                 users_response = supabase.table('users').select('email,first_name').execute()
                 if users_response.data:
                     for user in users_response.data:
@@ -718,14 +894,15 @@ async def get_institution_activity(
 
 
 @router.get("/{institution}/stats", response_model=Dict[str, Any])
-async def get_institution_stats(
+@offload_blocking
+def get_institution_stats(
     institution: str = PathParam(..., description="Institution slug")
 ) -> Dict[str, Any]:
     """Route dynamique pour les statistiques."""
     config = get_institution_config(institution)
 
     try:
-        data = await get_institution_pianos(institution, include_inactive=True)
+        data = _cached_institution_pianos(institution, include_inactive=True)
         all_pianos = data["pianos"]
 
         pianos_actifs = sum(1 for p in all_pianos if not p.get("hasNonTag", False))
@@ -763,7 +940,7 @@ def list_institutions() -> Dict[str, Any]:
         }
     """
     try:
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         import os
 
         supabase_url = os.getenv("SUPABASE_URL")
@@ -772,7 +949,7 @@ def list_institutions() -> Dict[str, Any]:
         if not supabase_url or not supabase_key:
             raise HTTPException(status_code=500, detail="Configuration Supabase manquante")
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         response = supabase.table('institutions').select('slug, name, options').eq('active', True).execute()
 
@@ -796,7 +973,8 @@ def list_institutions() -> Dict[str, Any]:
 
 
 @router.get("/{institution}/tournees")
-async def get_institution_tournees(
+@offload_blocking
+def get_institution_tournees(
     institution: str = PathParam(..., description="Slug de l'institution (vincent-dindy, orford, etc.)")
 ):
     """
@@ -820,7 +998,7 @@ async def get_institution_tournees(
         institution_name = config.get('name', institution)
 
         # 2. Charger tournées depuis Supabase avec filtre etablissement
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -828,7 +1006,7 @@ async def get_institution_tournees(
         if not supabase_url or not supabase_key:
             raise HTTPException(status_code=500, detail="Configuration Supabase manquante")
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Filtre par etablissement
         response = supabase.table('tournees').select('*').eq('etablissement', institution).execute()
@@ -853,7 +1031,9 @@ async def get_institution_tournees(
 
 
 @router.post("/{institution}/clean-orphan-statuses")
-async def clean_orphan_statuses(
+@offload_blocking
+@invalidates_piano_list()
+def clean_orphan_statuses(
     institution: str = PathParam(..., description="Slug de l'institution (orford uniquement pour l'instant)")
 ):
     """
@@ -877,7 +1057,7 @@ async def clean_orphan_statuses(
     """
     try:
         storage = get_supabase_storage()
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         import os
         
         # Charger config
@@ -896,7 +1076,7 @@ async def clean_orphan_statuses(
         if not supabase_url or not supabase_key:
             raise HTTPException(status_code=500, detail="Configuration Supabase manquante")
         
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
         
         # 1. Récupérer toutes les tournées de l'institution
         tournees_response = supabase.table('tournees').select('id,piano_ids').eq('etablissement', institution).execute()
@@ -957,7 +1137,8 @@ async def clean_orphan_statuses(
 
 
 @router.delete("/{institution}/tournees/{tournee_id}")
-async def delete_institution_tournee(
+@offload_blocking
+def delete_institution_tournee(
     institution: str = PathParam(..., description="Slug de l'institution"),
     tournee_id: str = PathParam(..., description="ID de la tournée à supprimer")
 ):
@@ -979,7 +1160,7 @@ async def delete_institution_tournee(
         config = get_institution_config(institution)
 
         # 2. Supprimer la tournée dans Supabase
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -987,7 +1168,7 @@ async def delete_institution_tournee(
         if not supabase_url or not supabase_key:
             raise HTTPException(status_code=500, detail="Configuration Supabase manquante")
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Vérifier que la tournée appartient à l'institution
         response = supabase.table('tournees').select('*').eq('id', tournee_id).execute()
@@ -1022,7 +1203,8 @@ async def delete_institution_tournee(
 
 
 @router.get("/{institution}/pianos-ready-for-push")
-async def get_institution_pianos_ready_for_push(
+@offload_blocking
+def get_institution_pianos_ready_for_push(
     institution: str = PathParam(..., description="Slug de l'institution"),
     tournee_id: Optional[str] = Query(None, description="Filtrer par tournée"),
     limit: int = Query(100, description="Nombre max de pianos")
@@ -1054,7 +1236,7 @@ async def get_institution_pianos_ready_for_push(
         config = get_institution_config(institution)
 
         # 2. Construire la requête SQL avec filtre institution
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -1062,7 +1244,7 @@ async def get_institution_pianos_ready_for_push(
         if not supabase_url or not supabase_key:
             raise HTTPException(status_code=500, detail="Configuration Supabase manquante")
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         logging.info(f"Recherche pianos prets pour push - institution={institution}, tournee_id={tournee_id}, limit={limit}")
 
@@ -12,7 +12,10 @@ from pydantic import BaseModel
 from core.supabase_storage import SupabaseStorage
 from core.email_notifier import get_email_notifier
 from core.gazelle_api_client import GazelleAPIClient
+from core.fuzzy_dedup import find_similar_pairs
 import difflib
+import hashlib
+import json
 import logging
 from datetime import datetime, timedelta
 
@@ -21,6 +24,7 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from scripts.inventory_checker_v5 import run_stock_check
+from core.blocking_executor import offload_blocking
 
 router = APIRouter(prefix="/inventaire", tags=["inventaire"])
 
@@ -133,7 +137,8 @@ def get_supabase_storage() -> SupabaseStorage:
 # ============================================================
 
 @router.get("/catalogue", response_model=Dict[str, Any])
-async def get_catalogue(
+@offload_blocking
+def get_catalogue(
     categorie: Optional[str] = None,
     has_commission: Optional[bool] = None,
     variant_group: Optional[str] = None,
@@ -199,7 +204,8 @@ async def get_catalogue(
 
 
 @router.post("/catalogue", response_model=Dict[str, Any])
-async def create_produit(produit: ProduitCatalogueCreate):
+@offload_blocking
+def create_produit(produit: ProduitCatalogueCreate):
     """
     Ajoute un nouveau produit au catalogue.
     """
@@ -225,7 +231,8 @@ async def create_produit(produit: ProduitCatalogueCreate):
 
 
 @router.delete("/catalogue/{code_produit}", response_model=Dict[str, Any])
-async def delete_produit(code_produit: str):
+@offload_blocking
+def delete_produit(code_produit: str):
     """
     Supprime un produit du catalogue.
     """
@@ -259,7 +266,8 @@ async def delete_produit(code_produit: str):
 # ============================================================
 
 @router.get("/techniciens/all", response_model=Dict[str, Any])
-async def get_all_techniciens_inventory():
+@offload_blocking
+def get_all_techniciens_inventory():
     """
     Récupère l'inventaire de TOUS les techniciens.
 
@@ -299,7 +307,8 @@ async def get_all_techniciens_inventory():
 
 
 @router.get("/stock/{technicien}", response_model=Dict[str, Any])
-async def get_stock_technicien(technicien: str):
+@offload_blocking
+def get_stock_technicien(technicien: str):
     """
     Récupère l'inventaire complet d'un technicien.
 
@@ -323,7 +332,8 @@ async def get_stock_technicien(technicien: str):
 
 
 @router.post("/stock", response_model=Dict[str, Any])
-async def mettre_a_jour_stock(maj: MiseAJourStock):
+@offload_blocking
+def mettre_a_jour_stock(maj: MiseAJourStock):
     """
     Met à jour directement le stock d'un produit (format V4).
     Calcule automatiquement l'ajustement nécessaire.
@@ -388,7 +398,8 @@ async def mettre_a_jour_stock(maj: MiseAJourStock):
 
 
 @router.post("/stock/ajuster", response_model=Dict[str, Any])
-async def ajuster_stock(ajustement: AjustementStock):
+@offload_blocking
+def ajuster_stock(ajustement: AjustementStock):
     """
     Ajuste le stock d'un produit pour un technicien (delta).
 
@@ -427,7 +438,8 @@ async def ajuster_stock(ajustement: AjustementStock):
 
 
 @router.post("/comment", response_model=Dict[str, Any])
-async def envoyer_commentaire(commentaire: CommentaireInventaire):
+@offload_blocking
+def envoyer_commentaire(commentaire: CommentaireInventaire):
     """
     Envoie un commentaire rapide sur l'inventaire (email au CTO).
     Format V4: Le technicien peut envoyer une demande/observation au CTO par email.
@@ -471,7 +483,8 @@ async def envoyer_commentaire(commentaire: CommentaireInventaire):
 # ============================================================
 
 @router.get("/transactions", response_model=Dict[str, Any])
-async def get_transactions(
+@offload_blocking
+def get_transactions(
     technicien: Optional[str] = None,
     code_produit: Optional[str] = None,
     limit: int = 100
@@ -514,7 +527,8 @@ class BatchOrderUpdate(BaseModel):
 
 
 @router.patch("/catalogue/batch-order", response_model=Dict[str, Any])
-async def update_batch_order(batch: BatchOrderUpdate):
+@offload_blocking
+def update_batch_order(batch: BatchOrderUpdate):
     """
     Met à jour l'ordre d'affichage de plusieurs produits en batch.
 
@@ -577,7 +591,8 @@ async def update_batch_order(batch: BatchOrderUpdate):
 
 
 @router.put("/catalogue/{code_produit}", response_model=Dict[str, Any])
-async def update_produit(code_produit: str, produit: ProduitCatalogueUpdate):
+@offload_blocking
+def update_produit(code_produit: str, produit: ProduitCatalogueUpdate):
     """
     Met à jour un produit du catalogue.
     """
@@ -623,7 +638,8 @@ async def update_produit(code_produit: str, produit: ProduitCatalogueUpdate):
 # ============================================================
 
 @router.get("/stats/{technicien}", response_model=Dict[str, Any])
-async def get_stats_technicien(technicien: str):
+@offload_blocking
+def get_stats_technicien(technicien: str):
     """
     Récupère les statistiques d'inventaire pour un technicien.
 
@@ -679,7 +695,8 @@ async def get_stats_technicien(technicien: str):
 # ============================================================
 
 @router.post("/check-stock", response_model=Dict[str, Any])
-async def check_inventory_stock(
+@offload_blocking
+def check_inventory_stock(
     technicien: Optional[str] = None,
     seuil_critique: float = 5.0
 ):
@@ -728,7 +745,8 @@ async def check_inventory_stock(
 # ============================================================
 
 @router.patch("/catalogue/batch-type-commission", response_model=Dict[str, Any])
-async def batch_update_type_commission(update: BatchTypeCommissionUpdate):
+@offload_blocking
+def batch_update_type_commission(update: BatchTypeCommissionUpdate):
     """
     Met à jour le type et/ou la commission de plusieurs produits en batch.
 
@@ -832,7 +850,8 @@ class ProductMergeRequest(BaseModel):
 
 
 @router.post("/catalogue/merge", response_model=Dict[str, Any])
-async def merge_products(request: ProductMergeRequest):
+@offload_blocking
+def merge_products(request: ProductMergeRequest):
     """
     Fusionne deux produits en transférant les quantités.
 
@@ -969,7 +988,8 @@ def fuzzy_similarity(str1: str, str2: str) -> float:
 
 
 @router.get("/gazelle/products", response_model=Dict[str, Any])
-async def get_gazelle_products():
+@offload_blocking
+def get_gazelle_products():
     """
     Récupère la liste des produits depuis Gazelle Master Service Items.
 
@@ -1016,8 +1036,45 @@ async def get_gazelle_products():
         raise HTTPException(status_code=500, detail=f"Erreur Gazelle API: {str(e)}")
 
 
+def _duplicates_cache_key(local_products: List[Dict], gazelle_products: List[Dict], threshold: float) -> str:
+    """Empreinte des champs qui influencent la détection de doublons."""
+    local = [
+        (p.get('code_produit'), p.get('nom'), p.get('prix_unitaire'), p.get('description'),
+         p.get('gazelle_product_id'), p.get('gazelle_item_id'))
+        for p in local_products
+    ]
+    gazelle = [
+        (p.get('id'), p.get('name_fr'), p.get('amount'), p.get('description_fr'))
+        for p in gazelle_products
+    ]
+    raw = json.dumps([local, gazelle, threshold], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _DuplicatesCache:
+    """Derniers résultats de find-duplicates, par empreinte du catalogue."""
+
+    MAX_ENTRIES = 8
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        self._entries.pop(key, None)
+        self._entries[key] = result
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.pop(next(iter(self._entries)))
+
+
+_duplicates_cache = _DuplicatesCache()
+
+
 @router.get("/gazelle/find-duplicates", response_model=Dict[str, Any])
-async def find_duplicate_products(threshold: float = 0.80):
+@offload_blocking
+def find_duplicate_products(threshold: float = 0.80):
     """
     Détecte les doublons potentiels dans le catalogue local et/ou avec Gazelle.
 
@@ -1050,77 +1107,74 @@ async def find_duplicate_products(threshold: float = 0.80):
             gazelle_available = False
             print(f"⚠️ Gazelle non disponible: {str(e)}. Détection de doublons uniquement dans le catalogue local.")
 
+        # Résultat en cache tant que le catalogue (local + Gazelle) et le seuil ne changent pas
+        cache_key = _duplicates_cache_key(local_products, gazelle_products, threshold)
+        cached = _duplicates_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
         # Détecter les doublons dans le catalogue local
-        for i, local1 in enumerate(local_products):
-            local1_name = local1.get('nom', '').lower()
-            local1_code = local1.get('code_produit', '')
-            
-            for j, local2 in enumerate(local_products[i+1:], start=i+1):
-                local2_name = local2.get('nom', '').lower()
-                local2_code = local2.get('code_produit', '')
-                
-                # Calculer similarité entre produits locaux
-                similarity = fuzzy_similarity(local1_name, local2_name)
-                
-                if similarity >= threshold:
-                    duplicates.append({
-                        "local_code": local1_code,
-                        "local_nom": local1.get('nom'),
-                        "duplicate_code": local2_code,
-                        "duplicate_nom": local2.get('nom'),
-                        "similarity": round(similarity * 100, 1),
-                        "type": "local"
-                    })
+        # (blocage par trigrammes puis SequenceMatcher, voir core/fuzzy_dedup.py)
+        local_names = [local.get('nom') or '' for local in local_products]
+        for i, j, similarity in find_similar_pairs(local_names, threshold=threshold):
+            local1, local2 = local_products[i], local_products[j]
+            duplicates.append({
+                "local_code": local1.get('code_produit', ''),
+                "local_nom": local1.get('nom'),
+                "duplicate_code": local2.get('code_produit', ''),
+                "duplicate_nom": local2.get('nom'),
+                "similarity": round(similarity * 100, 1),
+                "type": "local"
+            })
 
         # Comparer avec Gazelle si disponible
         if gazelle_available and gazelle_products:
-            for local in local_products:
-                # ✅ EXCLUSION AUTOMATIQUE: Ignorer les produits déjà associés à Gazelle
-                # Supporter les deux noms de colonne (legacy + nouveau)
-                if local.get('gazelle_product_id') or local.get('gazelle_item_id'):
-                    continue
-
-                local_name = local.get('nom', '')
-                if not local_name:
-                    continue
-
-                for gazelle_p in gazelle_products:
-                    # Utiliser name_fr (déjà extrait dans get_products)
-                    gazelle_name = gazelle_p.get('name_fr', '')
-                    if not gazelle_name:
-                        continue
-
-                    # Calculer similarité
-                    similarity = fuzzy_similarity(local_name, gazelle_name)
-
-                    if similarity >= threshold:
-                        duplicates.append({
-                            "local_code": local.get('code_produit'),
-                            "local_nom": local.get('nom'),
-                            "local_price": local.get('prix_unitaire', 0),
-                            "local_description": local.get('description', ''),
-                            "gazelle_id": gazelle_p.get('id'),
-                            "gazelle_nom": gazelle_p.get('name_fr', ''),
-                            "gazelle_price": float(gazelle_p.get('amount', 0)) / 100,  # Convertir centimes → dollars
-                            "gazelle_description": gazelle_p.get('description_fr', ''),
-                            "similarity": round(similarity * 100, 1),
-                            "price_diff": abs(
-                                float(local.get('prix_unitaire', 0)) -
-                                (float(gazelle_p.get('amount', 0)) / 100)  # Convertir centimes → dollars
-                            ),
-                            "type": "gazelle"
-                        })
+            # ✅ EXCLUSION AUTOMATIQUE: Ignorer les produits déjà associés à Gazelle
+            # Supporter les deux noms de colonne (legacy + nouveau)
+            unlinked = [
+                local for local in local_products
+                if not (local.get('gazelle_product_id') or local.get('gazelle_item_id'))
+                and local.get('nom', '')
+            ]
+            # Utiliser name_fr (déjà extrait dans get_products)
+            named_gazelle = [g for g in gazelle_products if g.get('name_fr', '')]
+
+            pairs = find_similar_pairs(
+                [local.get('nom', '') for local in unlinked],
+                [g.get('name_fr', '') for g in named_gazelle],
+                threshold=threshold
+            )
+            for i, j, similarity in pairs:
+                local, gazelle_p = unlinked[i], named_gazelle[j]
+                duplicates.append({
+                    "local_code": local.get('code_produit'),
+                    "local_nom": local.get('nom'),
+                    "local_price": local.get('prix_unitaire', 0),
+                    "local_description": local.get('description', ''),
+                    "gazelle_id": gazelle_p.get('id'),
+                    "gazelle_nom": gazelle_p.get('name_fr', ''),
+                    "gazelle_price": float(gazelle_p.get('amount', 0)) / 100,  # Convertir centimes → dollars
+                    "gazelle_description": gazelle_p.get('description_fr', ''),
+                    "similarity": round(similarity * 100, 1),
+                    "price_diff": abs(
+                        float(local.get('prix_unitaire', 0)) -
+                        (float(gazelle_p.get('amount', 0)) / 100)  # Convertir centimes → dollars
+                    ),
+                    "type": "gazelle"
+                })
 
         # Trier par similarité décroissante
         duplicates.sort(key=lambda x: x['similarity'], reverse=True)
 
-        return {
+        result = {
             "success": True,
             "duplicates": duplicates,
             "count": len(duplicates),
             "threshold": threshold,
             "gazelle_available": gazelle_available
         }
+        _duplicates_cache.put(cache_key, result)
+        return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur détection doublons: {str(e)}")
@@ -1134,7 +1188,8 @@ class ProductMerge(BaseModel):
 
 
 @router.post("/catalogue/merge", response_model=Dict[str, Any])
-async def merge_products(merge: ProductMerge):
+@offload_blocking
+def merge_products(merge: ProductMerge):
     """
     Fusionne deux produits: transfère l'inventaire de source vers target, puis supprime source.
 
@@ -1242,7 +1297,8 @@ class GazelleMapping(BaseModel):
 
 
 @router.post("/catalogue/map-gazelle", response_model=Dict[str, Any])
-async def map_to_gazelle_product(mapping: GazelleMapping):
+@offload_blocking
+def map_to_gazelle_product(mapping: GazelleMapping):
     """
     Associe un produit local à un produit Gazelle.
 
@@ -1322,7 +1378,8 @@ async def map_to_gazelle_product(mapping: GazelleMapping):
 
 
 @router.delete("/catalogue/{code_produit}", response_model=Dict[str, Any])
-async def delete_product(code_produit: str):
+@offload_blocking
+def delete_product(code_produit: str):
     """
     Supprime un produit (ou le marque comme inactif).
 
@@ -1379,7 +1436,8 @@ class GazelleImportProduct(BaseModel):
 
 
 @router.post("/catalogue/import-gazelle", response_model=Dict[str, Any])
-async def import_gazelle_product(import_data: GazelleImportProduct):
+@offload_blocking
+def import_gazelle_product(import_data: GazelleImportProduct):
     """
     Importe un produit Gazelle dans le catalogue local.
 
@@ -1463,7 +1521,8 @@ async def import_gazelle_product(import_data: GazelleImportProduct):
 
 
 @router.post("/catalogue/sync-gazelle")
-async def sync_all_gazelle_products():
+@offload_blocking
+def sync_all_gazelle_products():
     """
     Synchronise automatiquement tous les produits déjà associés à Gazelle.
 
@@ -1562,7 +1621,8 @@ async def sync_all_gazelle_products():
 
 
 @router.post("/catalogue/sync-gazelle-smart")
-async def sync_gazelle_products_smart(force: bool = False, max_age_hours: int = 24):
+@offload_blocking
+def sync_gazelle_products_smart(force: bool = False, max_age_hours: int = 24):
     """
     Synchronise intelligemment les produits Gazelle - seulement si nécessaire.
     
@@ -1721,7 +1781,8 @@ async def sync_gazelle_products_smart(force: bool = False, max_age_hours: int =
 
 
 @router.post("/catalogue/import-all-msl")
-async def import_all_msl_items():
+@offload_blocking
+def import_all_msl_items():
     """
     Importe TOUS les items du Master Service List (MSL) de Gazelle.
     
@@ -1913,7 +1974,8 @@ class ServiceConsumptionRule(BaseModel):
 
 
 @router.post("/service-consumption/rules")
-async def create_consumption_rule(rule: ServiceConsumptionRule):
+@offload_blocking
+def create_consumption_rule(rule: ServiceConsumptionRule):
     """
     Crée une règle de consommation (service → matériel).
     
@@ -1962,7 +2024,8 @@ class BatchServiceConsumptionRules(BaseModel):
 
 
 @router.post("/service-consumption/rules/batch")
-async def create_consumption_rules_batch(batch: BatchServiceConsumptionRules):
+@offload_blocking
+def create_consumption_rules_batch(batch: BatchServiceConsumptionRules):
     """
     Crée plusieurs règles de consommation pour un service en une fois.
     
@@ -2032,7 +2095,8 @@ async def create_consumption_rules_batch(batch: BatchServiceConsumptionRules):
 
 
 @router.get("/service-consumption/rules")
-async def get_consumption_rules(
+@offload_blocking
+def get_consumption_rules(
     service_gazelle_id: Optional[str] = None,
     group_by_service: bool = False
 ):
@@ -2093,7 +2157,8 @@ async def get_consumption_rules(
 
 
 @router.delete("/service-consumption/rules/{rule_id}")
-async def delete_consumption_rule(rule_id: str):
+@offload_blocking
+def delete_consumption_rule(rule_id: str):
     """Supprime une règle de consommation."""
     try:
         storage = SupabaseStorage()
@@ -2115,7 +2180,8 @@ async def delete_consumption_rule(rule_id: str):
 
 
 @router.post("/service-consumption/apply-from-invoice")
-async def apply_consumption_from_invoice(
+@offload_blocking
+def apply_consumption_from_invoice(
     invoice_id: str,
     invoice_item_id: str,
     service_gazelle_id: str,
@@ -2201,7 +2267,8 @@ async def apply_consumption_from_invoice(
 # ============================================================
 
 @router.get("/deduction-logs", response_model=Dict[str, Any])
-async def get_deduction_logs(limit: int = 100):
+@offload_blocking
+def get_deduction_logs(limit: int = 100):
     """
     Récupère les logs de déductions d'inventaire automatiques depuis sync_logs.
 
@@ -2244,7 +2311,8 @@ async def get_deduction_logs(limit: int = 100):
 
 
 @router.get("/deduction-summary", response_model=Dict[str, Any])
-async def get_deduction_summary(days: int = 30):
+@offload_blocking
+def get_deduction_summary(days: int = 30):
     """
     Récupère un résumé des déductions d'inventaire sur les X derniers jours.
 
@@ -2318,7 +2386,8 @@ async def get_deduction_summary(days: int = 30):
 
 
 @router.post("/process-deductions", response_model=Dict[str, Any])
-async def trigger_deduction_processing(days: int = 7):
+@offload_blocking
+def trigger_deduction_processing(days: int = 7):
     """
     Déclenche le traitement des déductions d'inventaire automatiques.
 
@@ -2366,7 +2435,8 @@ async def trigger_deduction_processing(days: int = 7):
 # ============================================================
 
 @router.get("/deduction-config/global-rule", response_model=Dict[str, Any])
-async def get_global_deduction_rule():
+@offload_blocking
+def get_global_deduction_rule():
     """
     Récupère la configuration de la règle globale de déduction automatique.
 
@@ -2413,7 +2483,8 @@ class GlobalDeductionRuleUpdate(BaseModel):
 
 
 @router.put("/deduction-config/global-rule", response_model=Dict[str, Any])
-async def update_global_deduction_rule(config: GlobalDeductionRuleUpdate):
+@offload_blocking
+def update_global_deduction_rule(config: GlobalDeductionRuleUpdate):
     """
     Met à jour la règle globale de déduction automatique.
 
@@ -2473,7 +2544,8 @@ class KeywordDeductionRule(BaseModel):
 
 
 @router.get("/deduction-config/keyword-rules", response_model=Dict[str, Any])
-async def get_keyword_deduction_rules():
+@offload_blocking
+def get_keyword_deduction_rules():
     """
     Récupère toutes les règles de déduction par mots-clés.
 
@@ -2503,7 +2575,8 @@ async def get_keyword_deduction_rules():
 
 
 @router.post("/deduction-config/keyword-rules", response_model=Dict[str, Any])
-async def create_keyword_deduction_rule(rule: KeywordDeductionRule):
+@offload_blocking
+def create_keyword_deduction_rule(rule: KeywordDeductionRule):
     """
     Crée une nouvelle règle de déduction par mot-clé.
 
@@ -2551,7 +2624,8 @@ async def create_keyword_deduction_rule(rule: KeywordDeductionRule):
 
 
 @router.delete("/deduction-config/keyword-rules/{rule_id}", response_model=Dict[str, Any])
-async def delete_keyword_deduction_rule(rule_id: int):
+@offload_blocking
+def delete_keyword_deduction_rule(rule_id: int):
     """
     Supprime une règle de déduction par mot-clé.
 
@@ -2581,7 +2655,8 @@ async def delete_keyword_deduction_rule(rule_id: int):
 
 
 @router.post("/deduction-config/preview", response_model=Dict[str, Any])
-async def preview_deductions(days: int = 7):
+@offload_blocking
+def preview_deductions(days: int = 7):
     """
     Génère un aperçu des déductions qui seraient créées SANS les appliquer.
 
@@ -11,6 +11,7 @@ import time
 import hmac
 import hashlib
 import asyncio
+import importlib
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -82,6 +83,17 @@ def _deferred_startup():
     except Exception as e:
         print(f"[startup] Erreur initialisation des singletons: {e}")
 
+    # Cache system_settings (flags, cles API) : premier chargement + thread de
+    # rafraichissement, avant que les requetes ne consultent les flags.
+    try:
+        from core.settings_cache import get_settings_cache
+        settings = get_settings_cache()
+        settings.start()
+        settings.get("")  # attend le premier chargement (borne par SETTINGS_INITIAL_WAIT)
+        print(f"[startup] Cache system_settings: {settings.stats()['keys']} cles")
+    except Exception as e:
+        print(f"[startup] Erreur cache system_settings: {e}")
+
     # Discovery automatique des institutions depuis Gazelle
     try:
         from api.institutions import discover_and_sync_institutions
@@ -89,6 +101,11 @@ def _deferred_startup():
         result = discover_and_sync_institutions()
         if result.get("success"):
             print(f"[startup] {result.get('synced_count', 0)} institutions synchronisees: {', '.join(result.get('institutions', []))}")
+            # Pre-charger les pianos de toutes les institutions (1 requete Gazelle groupee)
+            from api.institutions import load_all_institution_pianos
+            warmed = load_all_institution_pianos(result.get('institutions'))
+            counts = ", ".join(f"{slug}={data['count']}" for slug, data in warmed.items())
+            print(f"[startup] Cache pianos: {counts}")
         else:
             print(f"[startup] Discovery echoue: {result.get('error', 'Erreur inconnue')}")
     except Exception as e:
@@ -527,10 +544,32 @@ async def root() -> Dict[str, Any]:
     }
 
 
+# Metriques de /health : (module, lecture). Import et lecture proteges un par un.
+_HEALTH_STATS = {
+    "http": ("core.http_session", lambda m: m.get_http_stats()),
+    "blocking": ("core.blocking_executor", lambda m: m.get_blocking_stats()),
+    "piano_cache": ("core.piano_list_cache", lambda m: m.get_piano_list_cache().stats()),
+    "llm": ("core.llm_gateway", lambda m: m.get_llm_gateway().stats()),
+    "settings": ("core.settings_cache", lambda m: m.get_settings_cache().stats()),
+    "distance": ("core.distance_service", lambda m: m.get_distance_service().stats()),
+}
+
+
+def _safe_stats(module_name: str, read) -> Dict[str, Any]:
+    """Une metrique en erreur ne doit jamais faire echouer /health (Render redemarrerait le service)."""
+    try:
+        return read(importlib.import_module(module_name))
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
 @app.get("/health")
-async def health() -> Dict[str, str]:
-    """Vérification de l'état de l'API."""
-    return {"status": "healthy"}
+async def health() -> Dict[str, Any]:
+    """Vérification de l'état de l'API (+ métriques en mémoire : pool HTTP, pool bloquant, cache pianos, appels IA, system_settings, distances)."""
+    result: Dict[str, Any] = {"status": "healthy"}
+    for name, (module_name, read) in _HEALTH_STATS.items():
+        result[name] = _safe_stats(module_name, read)
+    return result
 
 
 # ============================================================
@@ -11,7 +11,6 @@ import logging
 import threading
 from pathlib import Path
 from typing import List, Literal, Optional, Dict, Any
-import requests
 import json
 from datetime import datetime, timedelta, timezone
 import time
@@ -33,10 +32,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.supabase_storage import SupabaseStorage  # noqa: E402
 from core.gazelle_api_client import GazelleAPIClient  # noqa: E402
+from core.http_session import get_session  # noqa: E402
 from modules.place_des_arts.services.event_parser import EventParser  # noqa: E402
 from modules.place_des_arts.services.event_manager import EventManager  # noqa: E402
 from modules.place_des_arts.services.email_parser import parse_email_text  # noqa: E402
 from modules.place_des_arts.services.concert_search import rechercher_concert  # noqa: E402
+from core.blocking_executor import offload_blocking, run_blocking
 
 router = APIRouter(prefix="/place-des-arts", tags=["place-des-arts"])
 
@@ -291,7 +292,7 @@ def find_learned_correction(block_text: str) -> Optional[Dict[str, Any]]:
     try:
         # Récupérer toutes les corrections (on pourrait optimiser avec une recherche côté Supabase)
         url = f"{storage.api_url}/parsing_corrections?select=*"
-        resp = requests.get(url, headers=storage._get_headers())
+        resp = storage.session.get(url, headers=storage._get_headers())
 
         if resp.status_code != 200:
             return None
@@ -346,7 +347,7 @@ def find_duplicate_candidates(row: Dict[str, Any]) -> List[str]:
         "limit=50"
     ]
     url = f"{storage.api_url}/place_des_arts_requests?{'&'.join(params)}"
-    resp = requests.get(url, headers=storage._get_headers())
+    resp = storage.session.get(url, headers=storage._get_headers())
     if resp.status_code != 200:
         return []
     candidates = resp.json() or []
@@ -422,7 +423,8 @@ async def health_check():
 
 
 @router.get("/pianos", response_model=Dict[str, Any])
-async def get_pianos(include_inactive: bool = False):
+@offload_blocking
+def get_pianos(include_inactive: bool = False):
     """
     Récupère tous les pianos Place des Arts depuis Gazelle API.
     
@@ -618,7 +620,7 @@ def list_requests(  # sync volontaire: I/O bloquant -> threadpool, boucle libre
     params.append(f"limit={limit}")
 
     url = f"{storage.api_url}/place_des_arts_requests?{'&'.join(params)}"
-    resp = requests.get(url, headers=storage._get_headers())
+    resp = storage.session.get(url, headers=storage._get_headers())
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
     
@@ -702,7 +704,8 @@ def list_requests(  # sync volontaire: I/O bloquant -> threadpool, boucle libre
 
 
 @router.get("/export")
-async def export_csv(month: str = None):
+@offload_blocking
+def export_csv(month: str = None):
     """
     Export CSV enrichi des demandes Place des Arts.
     Si month est fourni (format YYYY-MM), filtre par ce mois.
@@ -723,7 +726,7 @@ async def export_csv(month: str = None):
         last_day = monthrange(year, mon)[1]
         url += f"&appointment_date=gte.{month}-01&appointment_date=lte.{month}-{last_day}"
 
-    resp = requests.get(url, headers=storage._get_headers())
+    resp = storage.session.get(url, headers=storage._get_headers())
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
 
@@ -835,7 +838,8 @@ def stats():  # sync volontaire: I/O bloquant -> threadpool, boucle libre
 
 
 @router.get("/requests/{request_id}/gazelle-piano-id")
-async def get_gazelle_piano_id(request_id: str):
+@offload_blocking
+def get_gazelle_piano_id(request_id: str):
     """
     Récupère l'ID Gazelle du piano associé à une demande Place des Arts.
     
@@ -849,7 +853,7 @@ async def get_gazelle_piano_id(request_id: str):
         
         # Récupérer la demande
         url = f"{storage.api_url}/place_des_arts_requests?id=eq.{request_id}&select=*&limit=1"
-        resp = requests.get(url, headers=storage._get_headers())
+        resp = storage.session.get(url, headers=storage._get_headers())
         if resp.status_code != 200:
             raise HTTPException(status_code=resp.status_code, detail="Demande non trouvée")
         
@@ -941,7 +945,8 @@ async def get_gazelle_piano_id(request_id: str):
 
 
 @router.post("/requests/push-to-gazelle")
-async def push_to_gazelle(payload: PushToGazelleRequest):
+@offload_blocking
+def push_to_gazelle(payload: PushToGazelleRequest):
     """
     Pousse une note de service vers Gazelle via createEvent.
     
@@ -989,7 +994,8 @@ async def push_to_gazelle(payload: PushToGazelleRequest):
 
 
 @router.post("/requests/update-cell")
-async def update_cell(payload: UpdateCellRequest):
+@offload_blocking
+def update_cell(payload: UpdateCellRequest):
     manager = get_manager()
     result = manager.update_cell(payload.request_id, payload.field, payload.value)
     if not result.get("ok"):
@@ -998,7 +1004,8 @@ async def update_cell(payload: UpdateCellRequest):
 
 
 @router.post("/requests/update-status-batch")
-async def update_status_batch(payload: StatusBatchRequest):
+@offload_blocking
+def update_status_batch(payload: StatusBatchRequest):
     manager = get_manager()
     result = manager.update_status_batch(payload.request_ids, payload.status, payload.billed_by)
     if not result.get("ok"):
@@ -1007,7 +1014,8 @@ async def update_status_batch(payload: StatusBatchRequest):
 
 
 @router.post("/requests/bill")
-async def bill_requests(payload: StatusBatchRequest):
+@offload_blocking
+def bill_requests(payload: StatusBatchRequest):
     manager = get_manager()
     result = manager.bill_requests(payload.request_ids, payload.billed_by or "system")
     if not result.get("ok"):
@@ -1016,7 +1024,8 @@ async def bill_requests(payload: StatusBatchRequest):
 
 
 @router.post("/requests/delete")
-async def delete_requests(payload: DeleteRequest):
+@offload_blocking
+def delete_requests(payload: DeleteRequest):
     manager = get_manager()
     result = manager.delete_requests(payload.request_ids)
     if not result.get("ok"):
@@ -1025,7 +1034,8 @@ async def delete_requests(payload: DeleteRequest):
 
 
 @router.post("/requests/create")
-async def create_request(payload: Dict[str, Any]):
+@offload_blocking
+def create_request(payload: Dict[str, Any]):
     """Crée manuellement une demande PDA."""
     try:
         today_iso = datetime.now(timezone.utc).date().isoformat()
@@ -1067,7 +1077,8 @@ async def create_request(payload: Dict[str, Any]):
 
 
 @router.get("/requests/find-duplicates")
-async def find_duplicates():
+@offload_blocking
+def find_duplicates():
     """
     Trouve les doublons sans les supprimer.
     Retourne la liste des enregistrements qui seraient supprimés.
@@ -1078,7 +1089,8 @@ async def find_duplicates():
 
 
 @router.post("/requests/delete-duplicates")
-async def delete_duplicates():
+@offload_blocking
+def delete_duplicates():
     manager = get_manager()
     result = manager.delete_duplicates()
     if not result.get("ok", True):
@@ -1091,7 +1103,8 @@ async def delete_duplicates():
 # ------------------------------------------------------------
 
 @router.post("/preview")
-async def preview_email(payload: PreviewRequest):
+@offload_blocking
+def preview_email(payload: PreviewRequest):
     """
     Prévisualisation import email (parsing texte, sans écriture).
 
@@ -1280,7 +1293,8 @@ class ImportPreviewRequest(BaseModel):
 
 
 @router.post("/import-preview")
-async def import_preview(payload: ImportPreviewRequest):
+@offload_blocking
+def import_preview(payload: ImportPreviewRequest):
     """
     Import depuis les données de preview (avec corrections manuelles).
     Utilise directement les données passées sans re-parser.
@@ -1302,7 +1316,7 @@ async def import_preview(payload: ImportPreviewRequest):
                     "limit=1"
                 ]
                 url = f"{storage.api_url}/place_des_arts_requests?{'&'.join(params)}"
-                resp = requests.get(url, headers=storage._get_headers())
+                resp = storage.session.get(url, headers=storage._get_headers())
                 if resp.status_code == 200:
                     data = resp.json()
                     return bool(data and isinstance(data, list) and len(data) > 0)
@@ -1380,7 +1394,8 @@ async def import_preview(payload: ImportPreviewRequest):
 
 
 @router.post("/import")
-async def import_email(payload: ImportRequest):
+@offload_blocking
+def import_email(payload: ImportRequest):
     """
     Import email/texte : parse, normalise, UPSERT.
     """
@@ -1406,7 +1421,7 @@ async def import_email(payload: ImportRequest):
                     "limit=1"
                 ]
                 url = f"{storage.api_url}/place_des_arts_requests?{'&'.join(params)}"
-                resp = requests.get(url, headers=storage._get_headers())
+                resp = storage.session.get(url, headers=storage._get_headers())
                 if resp.status_code == 200:
                     data = resp.json()
                     return bool(data and isinstance(data, list) and len(data) > 0)
@@ -1608,7 +1623,8 @@ def sync_manual(payload: SyncManualRequest, background_tasks: BackgroundTasks):
 
 
 @router.post("/requests/{request_id}/verify-technician")
-async def verify_technician_in_gazelle(
+@offload_blocking
+def verify_technician_in_gazelle(
     request_id: str,
     payload: Dict[str, Any]
 ):
@@ -1672,7 +1688,8 @@ async def verify_technician_in_gazelle(
 
 
 @router.post("/validate-gazelle-rv")
-async def validate_gazelle_rv(payload: Dict[str, Any]):
+@offload_blocking
+def validate_gazelle_rv(payload: Dict[str, Any]):
     """
     Vérifie qu'un RV Gazelle est bien lié à une demande avant de la marquer
     « Créé Gazelle ». Retourne {"found": bool, "appointment_id": ...}.
@@ -1712,7 +1729,8 @@ async def validate_gazelle_rv(payload: Dict[str, Any]):
 
 
 @router.post("/requests/sync-completed-live")
-async def sync_completed_live(days: int = 45):
+@offload_blocking
+def sync_completed_live(days: int = 45):
     """Marque COMPLETED les demandes RÉCENTES dont le RV est COMPLETE dans Gazelle,
     en interrogeant Gazelle EN DIRECT (pas la copie locale, qui peut être en retard).
 
@@ -1737,7 +1755,7 @@ async def sync_completed_live(days: int = 45):
         "limit=300",
     ]
     url = f"{storage.api_url}/place_des_arts_requests?{'&'.join(params)}"
-    resp = requests.get(url, headers=storage._get_headers())
+    resp = storage.session.get(url, headers=storage._get_headers())
     rows = resp.json() if resp.status_code == 200 else []
 
     q = "query($id:String!){ event(eventId:$id){ status } }"
@@ -1771,7 +1789,8 @@ async def sync_completed_live(days: int = 45):
 
 
 @router.post("/check-completed")
-async def check_completed_requests():
+@offload_blocking
+def check_completed_requests():
     """
     Vérifie toutes les demandes PDA pour trouver les RV complétés dans Gazelle
     qui ne sont pas encore marqués comme complétés.
@@ -2037,7 +2056,8 @@ async def check_completed_requests():
 
 
 @router.get("/diagnostic")
-async def diagnostic():
+@offload_blocking
+def diagnostic():
     """
     Diagnostic rapide (stub).
     """
@@ -2071,10 +2091,11 @@ async def import_requests_csv(
     except Exception as exc:  # pragma: no cover - stub
         raise HTTPException(status_code=400, detail=f"CSV invalide: {exc}") from exc
 
+    # Écritures Supabase bloquantes : hors de la boucle d'événements
     if dry_run:
-        result = manager.import_csv_preview(rows)
+        result = await run_blocking(manager.import_csv_preview, rows)
     else:
-        result = manager.import_csv(rows, on_conflict=on_conflict)
+        result = await run_blocking(manager.import_csv, rows, on_conflict=on_conflict)
 
     return ImportCSVResponse(
         dry_run=dry_run,
@@ -2117,7 +2138,8 @@ class LearningCorrectionRequest(BaseModel):
 
 
 @router.post("/learn")
-async def save_correction(payload: LearningCorrectionRequest):
+@offload_blocking
+def save_correction(payload: LearningCorrectionRequest):
     """
     Enregistre une correction manuelle pour améliorer le parser.
     Utilisé quand l'utilisateur corrige des champs après parsing.
@@ -2152,7 +2174,7 @@ async def save_correction(payload: LearningCorrectionRequest):
             "Prefer": "resolution=merge-duplicates"
         }
 
-        resp = requests.post(url, headers=headers, json=correction_data)
+        resp = get_session().post(url, headers=headers, json=correction_data)
 
         if resp.status_code not in (200, 201):
             raise HTTPException(
@@ -2173,7 +2195,8 @@ async def save_correction(payload: LearningCorrectionRequest):
 
 
 @router.get("/learning-stats")
-async def get_learning_stats():
+@offload_blocking
+def get_learning_stats():
     """
     Retourne des statistiques sur les corrections d'apprentissage.
     """
@@ -2182,7 +2205,7 @@ async def get_learning_stats():
     try:
         # Compter les corrections par champ
         url = f"{storage.api_url}/parsing_corrections?select=*"
-        resp = requests.get(url, headers=storage._get_headers())
+        resp = storage.session.get(url, headers=storage._get_headers())
 
         if resp.status_code != 200:
             return {"success": False, "corrections": []}
@@ -2222,7 +2245,8 @@ async def get_learning_stats():
 
 
 @router.get("/appointments/today", response_model=Dict[str, Any])
-async def get_today_appointments():
+@offload_blocking
+def get_today_appointments():
     """
     Récupère les rendez-vous du jour pour Place des Arts depuis Supabase.
     Sync matinale à 7h00 et 17h00 via cron job.
@@ -2244,7 +2268,7 @@ async def get_today_appointments():
     """
     try:
         from datetime import date
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -2255,7 +2279,7 @@ async def get_today_appointments():
                 detail="Configuration Supabase manquante"
             )
         
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
         today = date.today().isoformat()
         
         # ID client Place des Arts
@@ -2378,7 +2402,8 @@ def _save_dismissed_orphan_ids(storage, ids: set):
 
 
 @router.post("/orphans/dismiss")
-async def dismiss_orphan(body: dict):
+@offload_blocking
+def dismiss_orphan(body: dict):
     """Ignorer un service orphelin (persistant)."""
     appointment_id = body.get('appointment_id')
     if not appointment_id:
@@ -2392,7 +2417,8 @@ async def dismiss_orphan(body: dict):
 
 
 @router.post("/orphans/restore")
-async def restore_orphan(body: dict):
+@offload_blocking
+def restore_orphan(body: dict):
     """Restaurer un service orphelin précédemment ignoré."""
     appointment_id = body.get('appointment_id')
     if not appointment_id:
@@ -2406,7 +2432,8 @@ async def restore_orphan(body: dict):
 
 
 @router.get("/orphans/dismissed")
-async def list_dismissed_orphans():
+@offload_blocking
+def list_dismissed_orphans():
     """Liste les IDs des orphelins ignorés."""
     storage = get_storage()
     ids = _get_dismissed_orphan_ids(storage)
@@ -2418,7 +2445,8 @@ async def list_dismissed_orphans():
 # ------------------------------------------------------------
 
 @router.post("/email-scanner/run")
-async def run_email_scanner():
+@offload_blocking
+def run_email_scanner():
     """
     Déclenche manuellement un scan Gmail pour les demandes PDA.
 
@@ -2440,7 +2468,8 @@ async def run_email_scanner():
 
 
 @router.get("/email-scanner/history")
-async def email_scanner_history(limit: int = Query(default=20, le=100)):
+@offload_blocking
+def email_scanner_history(limit: int = Query(default=20, le=100)):
     """
     Historique des emails PDA traités automatiquement.
 
@@ -2462,7 +2491,8 @@ async def email_scanner_history(limit: int = Query(default=20, le=100)):
 
 
 @router.get("/email-scanner/status")
-async def email_scanner_status():
+@offload_blocking
+def email_scanner_status():
     """
     Statut du scanner Gmail (connecté, dernière exécution, etc.).
     """
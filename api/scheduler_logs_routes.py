@@ -5,6 +5,7 @@ Routes API pour les logs du scheduler (tâches planifiées)
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 from datetime import datetime, timezone, timedelta
 
 router = APIRouter(prefix="/scheduler-logs", tags=["scheduler-logs"])
@@ -35,8 +36,7 @@ async def get_recent_scheduler_logs(limit: int = 30):
         url = f"{storage.api_url}/scheduler_logs?select=*&order=started_at.desc&limit={limit}"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -89,8 +89,7 @@ async def get_scheduler_stats():
         url = f"{storage.api_url}/scheduler_logs?select=*&started_at=gte.{yesterday}&order=started_at.desc"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
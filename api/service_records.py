@@ -18,6 +18,8 @@ from typing import Dict, Any, Optional, List
 from fastapi import APIRouter, HTTPException, Query, Path as PathParam
 from pydantic import BaseModel
 
+from core.piano_list_cache import invalidates_piano_list
+
 router = APIRouter(prefix="/service-records", tags=["service-records"])
 
 # ============================================================
@@ -168,6 +170,7 @@ async def get_last_pushed_record(
 
 
 @router.put("/{institution}/piano/{piano_id}/notes")
+@invalidates_piano_list()
 async def upsert_service_notes(
     institution: str = PathParam(...),
     piano_id: str = PathParam(...),
@@ -218,8 +221,8 @@ async def upsert_service_notes(
         # Copier a_faire depuis l'overlay si disponible
         a_faire = ""
         try:
-            from core.supabase_storage import SupabaseStorage
-            storage = SupabaseStorage(silent=True)
+            from core.supabase_storage import get_shared_storage
+            storage = get_shared_storage()
             overlay = storage.get_piano_updates(piano_id)
             if overlay:
                 a_faire = overlay.get("a_faire", "") or ""
@@ -252,6 +255,7 @@ async def upsert_service_notes(
 
 
 @router.post("/{institution}/piano/{piano_id}/complete")
+@invalidates_piano_list()
 async def complete_service_record(
     institution: str = PathParam(...),
     piano_id: str = PathParam(...),
@@ -304,6 +308,7 @@ async def complete_service_record(
 
 
 @router.post("/{institution}/piano/{piano_id}/close-and-new")
+@invalidates_piano_list()
 async def close_and_start_new(
     institution: str = PathParam(...),
     piano_id: str = PathParam(...),
@@ -363,6 +368,7 @@ async def close_and_start_new(
 
 
 @router.post("/{institution}/validate")
+@invalidates_piano_list()
 async def validate_service_records(
     institution: str = PathParam(...),
     body: ServiceRecordValidate = ServiceRecordValidate()
@@ -421,6 +427,7 @@ class PushRequest(BaseModel):
 
 
 @router.post("/{institution}/push")
+@invalidates_piano_list()
 async def push_validated_to_gazelle(
     institution: str = PathParam(...),
     body: PushRequest = PushRequest()
@@ -514,8 +521,8 @@ async def push_validated_to_gazelle(
 
         # Nettoyer overlays (même en mode skip)
         try:
-            from core.supabase_storage import SupabaseStorage
-            storage = SupabaseStorage(silent=True)
+            from core.supabase_storage import get_shared_storage
+            storage = get_shared_storage()
             for pid in piano_ids:
                 storage.update_piano(pid, {
                     "travail": "",
@@ -696,8 +703,8 @@ async def push_validated_to_gazelle(
         # 'proposed'/'top' ne peut être que DÉLIBÉRÉ, donc l'affichage peut lui
         # laisser la priorité.
         try:
-            from core.supabase_storage import SupabaseStorage
-            storage = SupabaseStorage(silent=True)
+            from core.supabase_storage import get_shared_storage
+            storage = get_shared_storage()
             for pid in pushed_piano_ids:
                 storage.update_piano(pid, {
                     "travail": "",
@@ -824,6 +831,7 @@ async def get_push_history(
 
 
 @router.patch("/{institution}/record/{record_id}/soft-delete")
+@invalidates_piano_list()
 async def soft_delete_record(
     institution: str = PathParam(...),
     record_id: str = PathParam(...)
@@ -865,6 +873,7 @@ async def soft_delete_record(
 
 
 @router.patch("/{institution}/record/{record_id}/clear-a-faire")
+@invalidates_piano_list()
 async def clear_a_faire(
     institution: str = PathParam(...),
     record_id: str = PathParam(...)
@@ -909,8 +918,8 @@ async def clear_a_faire(
     try:
         piano_id = existing.data[0].get("piano_id")
         if piano_id:
-            from core.supabase_storage import SupabaseStorage
-            storage = SupabaseStorage(silent=True)
+            from core.supabase_storage import get_shared_storage
+            storage = get_shared_storage()
             storage.update_piano(piano_id, {"a_faire": ""}, institution_slug=institution)
     except Exception as e:
         logging.warning(f"Sync a_faire vers overlay échouée: {e}")
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, Any, List
 from datetime import datetime, timedelta, timezone
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 
 router = APIRouter(prefix="/sync-logs", tags=["sync-logs"])
 
@@ -35,8 +36,7 @@ async def get_recent_sync_logs(limit: int = 20):
         url = f"{storage.api_url}/sync_logs?select=*&order=created_at.desc&limit={limit}"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
@@ -91,8 +91,7 @@ async def get_sync_stats():
         url = f"{storage.api_url}/sync_logs?select=*&created_at=gte.{yesterday}&order=created_at.desc"
         headers = storage._get_headers()
 
-        import requests
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
 
         if response.status_code != 200:
             raise HTTPException(
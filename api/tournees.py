@@ -14,6 +14,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 
 # Imports locaux
+from core.blocking_executor import offload_blocking
 from core.supabase_storage import SupabaseStorage
 
 
@@ -35,6 +36,14 @@ class TourneeCreate(BaseModel):
     status: str = "planifiee"  # planifiee, en_cours, terminee
 
 
+class DayRouteOptimize(BaseModel):
+    """Modèle pour optimiser l'ordre de visite d'une journée."""
+    technician_id: str
+    date: date
+    window_slack_minutes: Optional[float] = None  # None = ordre libre
+    offline: bool = False  # True = estimation par RTA, aucune requête Google
+
+
 class TourneeUpdate(BaseModel):
     """Modèle pour mettre à jour une tournée."""
     nom: Optional[str] = None
@@ -103,6 +112,36 @@ async def create_tournee(tournee: TourneeCreate):
         raise HTTPException(status_code=500, detail=f"Erreur création tournée: {str(e)}")
 
 
+@router.post("/optimize-day", response_model=Dict[str, Any])
+@offload_blocking
+def optimize_day(request: DayRouteOptimize):
+    """
+    Suggère un meilleur ordre de visite pour la journée d'un technicien.
+
+    Body:
+        - technician_id: ID Gazelle du technicien (usr_...)
+        - date: Date de la journée (YYYY-MM-DD)
+        - window_slack_minutes: Tolérance autour de l'heure de chaque RV (optionnelle)
+        - offline: Estimation hors ligne seulement (défaut: false)
+
+    Returns:
+        Ordre actuel vs optimisé (km, minutes), km_saved, minutes_saved
+    """
+    from modules.assistant.services.route_optimizer import optimize_technician_day
+
+    try:
+        return optimize_technician_day(
+            request.technician_id,
+            request.date.isoformat(),
+            window_slack_minutes=request.window_slack_minutes,
+            offline=request.offline,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur optimisation tournée: {str(e)}")
+
+
 @router.get("/list", response_model=Dict[str, Any])
 async def list_tournees(
     technicien: Optional[str] = None,
@@ -17,6 +17,9 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from core.supabase_storage import SupabaseStorage
 from core.gazelle_api_client import GazelleAPIClient
+from core.http_session import get_session
+from core.blocking_executor import offload_blocking
+from core.piano_list_cache import get_piano_list_cache, invalidates_piano_list
 
 router = APIRouter(prefix="/vincent-dindy", tags=["vincent-dindy"])
 
@@ -91,7 +94,8 @@ def get_csv_path() -> str:
 
 
 @router.get("/pianos", response_model=Dict[str, Any])
-async def get_pianos(include_inactive: bool = False):
+@offload_blocking
+def get_pianos(include_inactive: bool = False):
     """
     Récupère tous les pianos depuis Gazelle API.
 
@@ -103,7 +107,18 @@ async def get_pianos(include_inactive: bool = False):
     - Tag "non" dans Gazelle = piano masqué de l'inventaire/tournées
     - Filtre par défaut = masque les pianos avec tag "non"
     - Supabase = Modifications dynamiques (status, notes, etc.)
+
+    Servi depuis le cache mémoire (core/piano_list_cache) : rafraîchi en
+    arrière-plan après PIANO_CACHE_TTL, invalidé par les routes d'écriture.
     """
+    return get_piano_list_cache().get(
+        ("vincent-dindy", "vdi-pianos", include_inactive),
+        lambda: _load_pianos(include_inactive),
+    )
+
+
+def _load_pianos(include_inactive: bool) -> Dict[str, Any]:
+    """Charge et fusionne pianos Gazelle + overlays + fiches de service (sans cache)."""
     try:
         # Charger client_id depuis Supabase institutions
         from api.institutions import get_institution_config
@@ -158,8 +173,8 @@ async def get_pianos(include_inactive: bool = False):
         service_records_by_piano = {}
         last_pushed_at_by_piano = {}
         try:
-            import supabase as _sb_mod
-            _sb = _sb_mod.create_client(
+            from core.supabase_storage import get_supabase_client
+            _sb = get_supabase_client(
                 os.getenv("SUPABASE_URL"),
                 os.getenv("SUPABASE_SERVICE_ROLE_KEY")
             )
@@ -330,7 +345,8 @@ class PianoUpdate(BaseModel):
 
 
 @router.get("/pianos/{piano_id}", response_model=Dict[str, Any])
-async def get_piano(piano_id: str):
+@offload_blocking
+def get_piano(piano_id: str):
     """Récupère les détails d'un piano spécifique depuis le CSV."""
     try:
         csv_path = get_csv_path()
@@ -391,7 +407,9 @@ async def get_piano(piano_id: str):
 
 
 @router.put("/pianos/{piano_id}", response_model=Dict[str, Any])
-async def update_piano(piano_id: str, update: PianoUpdate):
+@offload_blocking
+@invalidates_piano_list("vincent-dindy")
+def update_piano(piano_id: str, update: PianoUpdate):
     """Met à jour un piano (sauvegarde dans Supabase)."""
     try:
         # Note: On ne vérifie plus si le piano existe dans Gazelle pour des raisons de performance.
@@ -459,8 +477,8 @@ async def update_piano(piano_id: str, update: PianoUpdate):
         # Sync bidirectionnelle : si a_faire vidé dans overlay, vider aussi dans service records actifs
         if is_clearing_a_faire:
             try:
-                from supabase import create_client
-                sb = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+                from core.supabase_storage import get_supabase_client
+                sb = get_supabase_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
                 sb.table("piano_service_records") \
                     .update({"a_faire": ""}) \
                     .eq("piano_id", piano_id) \
@@ -502,7 +520,9 @@ async def update_piano(piano_id: str, update: PianoUpdate):
 
 
 @router.put("/pianos/batch", response_model=Dict[str, Any])
-async def batch_update_pianos(updates: List[Dict[str, Any]]):
+@offload_blocking
+@invalidates_piano_list("vincent-dindy")
+def batch_update_pianos(updates: List[Dict[str, Any]]):
     """
     Met à jour plusieurs pianos en une seule requête (batch update).
     Beaucoup plus rapide que plusieurs requêtes individuelles.
@@ -560,7 +580,8 @@ async def batch_update_pianos(updates: List[Dict[str, Any]]):
 
 
 @router.post("/reports", response_model=Dict[str, Any])
-async def submit_report(report: TechnicianReport):
+@offload_blocking
+def submit_report(report: TechnicianReport):
     """
     Soumet un rapport de technicien et le pousse vers Gazelle (système modulaire multi-institutions).
 
@@ -733,7 +754,8 @@ async def submit_report(report: TechnicianReport):
 
 
 @router.get("/reports", response_model=Dict[str, Any])
-async def list_reports(status: Optional[str] = None, limit: int = 50):
+@offload_blocking
+def list_reports(status: Optional[str] = None, limit: int = 50):
     """
     Liste les rapports sauvegardés depuis Supabase.
     
@@ -764,7 +786,8 @@ async def list_reports(status: Optional[str] = None, limit: int = 50):
 
 
 @router.get("/reports/{report_id}", response_model=Dict[str, Any])
-async def get_report(report_id: str):
+@offload_blocking
+def get_report(report_id: str):
     """Récupère un rapport spécifique par son ID depuis Supabase."""
     try:
         storage = get_supabase_storage()
@@ -782,7 +805,8 @@ async def get_report(report_id: str):
 
 
 @router.get("/activity", response_model=Dict[str, Any])
-async def get_activity(limit: int = 20):
+@offload_blocking
+def get_activity(limit: int = 20):
     """
     Récupère l'historique d'activité (qui a modifié quoi, quand).
 
@@ -821,7 +845,8 @@ async def get_activity(limit: int = 20):
 
 
 @router.get("/pianos/{piano_id}/history", response_model=Dict[str, Any])
-async def get_piano_history(piano_id: str, limit: int = 20):
+@offload_blocking
+def get_piano_history(piano_id: str, limit: int = 20):
     """
     Récupère l'historique de service d'un piano depuis gazelle_timeline_entries.
 
@@ -839,7 +864,6 @@ async def get_piano_history(piano_id: str, limit: int = 20):
             "count": 5
         }
     """
-    import requests
 
     try:
         storage = get_supabase_storage()
@@ -853,7 +877,7 @@ async def get_piano_history(piano_id: str, limit: int = 20):
         url += f"&limit={limit}"
 
         print(f"🔍 Requête historique piano: {url}")
-        response = requests.get(url, headers=storage._get_headers())
+        response = storage.session.get(url, headers=storage._get_headers())
 
         if response.status_code != 200:
             print(f"⚠️ Erreur timeline entries: {response.status_code} - {response.text[:200]}")
@@ -905,7 +929,8 @@ async def get_piano_history(piano_id: str, limit: int = 20):
 
 
 @router.get("/stats", response_model=Dict[str, Any])
-async def get_stats():
+@offload_blocking
+def get_stats():
     """Retourne des statistiques sur les rapports depuis Supabase."""
     try:
         storage = get_supabase_storage()
@@ -966,7 +991,8 @@ class TourneeUpdate(BaseModel):
 
 
 @router.get("/tournees", response_model=Dict[str, Any])
-async def get_tournees():
+@offload_blocking
+def get_tournees():
     """
     Récupère toutes les tournées depuis Supabase.
 
@@ -976,7 +1002,7 @@ async def get_tournees():
     """
     try:
         import logging
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -985,7 +1011,7 @@ async def get_tournees():
             logging.warning("⚠️ Supabase non configuré, retour liste vide")
             return {"tournees": [], "count": 0}
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Requête vers la table tournees
         response = supabase.table('tournees').select('*').execute()
@@ -1009,7 +1035,8 @@ async def get_tournees():
 
 
 @router.post("/tournees", response_model=Dict[str, Any])
-async def create_tournee(tournee: TourneeCreate):
+@offload_blocking
+def create_tournee(tournee: TourneeCreate):
     """
     Crée une nouvelle tournée dans Supabase.
 
@@ -1035,7 +1062,7 @@ async def create_tournee(tournee: TourneeCreate):
     """
     try:
         import logging
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         import time
 
         supabase_url = os.getenv("SUPABASE_URL")
@@ -1047,7 +1074,7 @@ async def create_tournee(tournee: TourneeCreate):
                 detail="Configuration Supabase manquante (SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)"
             )
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Générer un ID unique pour la tournée
         tournee_id = f"tournee_{int(time.time() * 1000)}"
@@ -1087,7 +1114,8 @@ async def create_tournee(tournee: TourneeCreate):
 
 
 @router.patch("/tournees/{tournee_id}", response_model=Dict[str, Any])
-async def update_tournee(tournee_id: str, update: TourneeUpdate):
+@offload_blocking
+def update_tournee(tournee_id: str, update: TourneeUpdate):
     """
     Met à jour une tournée existante dans Supabase.
 
@@ -1109,7 +1137,7 @@ async def update_tournee(tournee_id: str, update: TourneeUpdate):
     """
     try:
         import logging
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -1120,7 +1148,7 @@ async def update_tournee(tournee_id: str, update: TourneeUpdate):
                 detail="Configuration Supabase manquante"
             )
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Préparer les données (exclure None)
         update_data = {}
@@ -1194,7 +1222,8 @@ async def update_tournee(tournee_id: str, update: TourneeUpdate):
 
 
 @router.delete("/tournees/{tournee_id}", response_model=Dict[str, Any])
-async def delete_tournee(tournee_id: str):
+@offload_blocking
+def delete_tournee(tournee_id: str):
     """
     Supprime une tournée de Supabase.
 
@@ -1209,7 +1238,7 @@ async def delete_tournee(tournee_id: str):
     """
     try:
         import logging
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -1220,7 +1249,7 @@ async def delete_tournee(tournee_id: str):
                 detail="Configuration Supabase manquante"
             )
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Supprimer de Supabase
         response = supabase.table('tournees').delete().eq('id', tournee_id).execute()
@@ -1246,7 +1275,8 @@ async def delete_tournee(tournee_id: str):
 
 
 @router.post("/tournees/{tournee_id}/pianos/{gazelle_id}", response_model=Dict[str, Any])
-async def add_piano_to_tournee(tournee_id: str, gazelle_id: str):
+@offload_blocking
+def add_piano_to_tournee(tournee_id: str, gazelle_id: str):
     """
     Ajoute un piano à une tournée.
 
@@ -1263,7 +1293,7 @@ async def add_piano_to_tournee(tournee_id: str, gazelle_id: str):
     """
     try:
         import logging
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -1274,7 +1304,7 @@ async def add_piano_to_tournee(tournee_id: str, gazelle_id: str):
                 detail="Configuration Supabase manquante"
             )
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Récupérer la tournée
         response = supabase.table('tournees').select('piano_ids').eq('id', tournee_id).execute()
@@ -1321,7 +1351,8 @@ async def add_piano_to_tournee(tournee_id: str, gazelle_id: str):
 
 
 @router.delete("/tournees/{tournee_id}/pianos/{gazelle_id}", response_model=Dict[str, Any])
-async def remove_piano_from_tournee(tournee_id: str, gazelle_id: str):
+@offload_blocking
+def remove_piano_from_tournee(tournee_id: str, gazelle_id: str):
     """
     Retire un piano d'une tournée.
 
@@ -1338,7 +1369,7 @@ async def remove_piano_from_tournee(tournee_id: str, gazelle_id: str):
     """
     try:
         import logging
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -1349,7 +1380,7 @@ async def remove_piano_from_tournee(tournee_id: str, gazelle_id: str):
                 detail="Configuration Supabase manquante"
             )
 
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Récupérer la tournée
         response = supabase.table('tournees').select('piano_ids').eq('id', tournee_id).execute()
@@ -1408,7 +1439,9 @@ class PushToGazelleRequest(BaseModel):
 
 
 @router.post("/push-to-gazelle", response_model=Dict[str, Any], deprecated=True)
-async def push_to_gazelle(request: PushToGazelleRequest):
+@offload_blocking
+@invalidates_piano_list("vincent-dindy")
+def push_to_gazelle(request: PushToGazelleRequest):
     """
     ⚠️ DÉPRÉCIÉ — Utiliser POST /service-records/{institution}/push à la place.
     Ce endpoint reste actif pour compatibilité mais sera supprimé.
@@ -1470,7 +1503,8 @@ async def push_to_gazelle(request: PushToGazelleRequest):
 
 
 @router.get("/pianos-ready-for-push", response_model=Dict[str, Any])
-async def get_pianos_ready_for_push(
+@offload_blocking
+def get_pianos_ready_for_push(
     tournee_id: Optional[str] = None,
     limit: int = 100
 ):
@@ -1560,20 +1594,20 @@ def _sh_table_request(method: str = "GET", params: str = "",
         "Content-Type": "application/json",
         "Prefer": prefer,
     }
-    import requests as _req
     if method == "GET":
-        return _req.get(url, headers=headers)
+        return get_session().get(url, headers=headers)
     elif method == "POST":
-        return _req.post(url, headers=headers, json=json_body)
+        return get_session().post(url, headers=headers, json=json_body)
     elif method == "PATCH":
-        return _req.patch(url, headers=headers, json=json_body)
+        return get_session().patch(url, headers=headers, json=json_body)
     elif method == "DELETE":
-        return _req.delete(url, headers=headers)
+        return get_session().delete(url, headers=headers)
     raise ValueError(f"Méthode non supportée: {method}")
 
 
 @router.get("/service-history", response_model=List[Dict[str, Any]])
-async def get_service_history(limit: int = 100, include_imported: bool = False):
+@offload_blocking
+def get_service_history(limit: int = 100, include_imported: bool = False):
     """Retourne l'historique des services validés/poussés, anti-chronologique."""
     status_filter = "" if include_imported else "&status=in.(validated,pushed,error)"
     r = _sh_table_request(params=f"select=*&order=validated_at.desc&limit={limit}{status_filter}")
@@ -1583,7 +1617,9 @@ async def get_service_history(limit: int = 100, include_imported: bool = False):
 
 
 @router.post("/service-history/validate", response_model=Dict[str, Any])
-async def validate_service_history(body: ServiceHistoryValidateRequest):
+@offload_blocking
+@invalidates_piano_list("vincent-dindy")
+def validate_service_history(body: ServiceHistoryValidateRequest):
     """
     Valide un ou plusieurs pianos :
     1. Archive les notes dans vdi_service_history
@@ -1670,7 +1706,9 @@ async def validate_service_history(body: ServiceHistoryValidateRequest):
 
 
 @router.put("/service-history/{entry_id}", response_model=Dict[str, Any])
-async def edit_service_history(entry_id: str, body: ServiceHistoryEditRequest):
+@offload_blocking
+@invalidates_piano_list("vincent-dindy")
+def edit_service_history(entry_id: str, body: ServiceHistoryEditRequest):
     """Modifier une entrée validée (pas encore poussée)."""
     # Vérifier que l'entrée existe et est modifiable
     r = _sh_table_request(params=f"id=eq.{entry_id}&select=status")
@@ -1700,7 +1738,9 @@ async def edit_service_history(entry_id: str, body: ServiceHistoryEditRequest):
 
 
 @router.post("/service-history/push-tournee", response_model=Dict[str, Any], deprecated=True)
-async def push_tournee(body: ServiceHistoryPushRequest):
+@offload_blocking
+@invalidates_piano_list("vincent-dindy")
+def push_tournee(body: ServiceHistoryPushRequest):
     """
     ⚠️ DÉPRÉCIÉ — Utiliser POST /service-records/{institution}/push à la place.
     Pousse toutes les entrées validées vers Gazelle en UN SEUL rendez-vous multi-pianos.
@@ -1923,7 +1963,9 @@ async def push_tournee(body: ServiceHistoryPushRequest):
 # ==========================================
 
 @router.post("/service-history/tournee-terminee", response_model=Dict[str, Any])
-async def tournee_terminee(institution_slug: str = "vincent-dindy"):
+@offload_blocking
+@invalidates_piano_list(param="institution_slug")
+def tournee_terminee(institution_slug: str = "vincent-dindy"):
     """
     Nettoyage complet après une tournée :
     1. Vide le champ 'travail' des overlays legacy (vincent_dindy_piano_updates)
@@ -1954,8 +1996,8 @@ async def tournee_terminee(institution_slug: str = "vincent-dindy"):
     # 2. Marquer les fiches draft/completed orphelines comme 'abandoned'
     sr_cleaned = 0
     try:
-        from supabase import create_client as _create_sb
-        sb = _create_sb(
+        from core.supabase_storage import get_supabase_client
+        sb = get_supabase_client(
             os.getenv("SUPABASE_URL"),
             os.getenv("SUPABASE_SERVICE_ROLE_KEY")
         )
@@ -1997,7 +2039,8 @@ _timeline_cache = {}  # { client_id: { "entries": [...], "fetched_at": datetime
 _TIMELINE_CACHE_TTL = 300  # 5 minutes
 
 @router.get("/pianos/{piano_id}/timeline", response_model=Dict[str, Any])
-async def get_piano_timeline(piano_id: str, limit: int = 50, institution: str = "vincent-dindy"):
+@offload_blocking
+def get_piano_timeline(piano_id: str, limit: int = 50, institution: str = "vincent-dindy"):
     """
     Récupère l'historique complet d'entretien d'un piano.
 
@@ -2188,15 +2231,14 @@ def _vdi_table_request(table: str, method: str = "GET", params: str = "",
         "Content-Type": "application/json",
         "Prefer": prefer,
     }
-    import requests as _req
     if method == "GET":
-        r = _req.get(url, headers=headers)
+        r = get_session().get(url, headers=headers)
     elif method == "POST":
-        r = _req.post(url, headers=headers, json=json_body)
+        r = get_session().post(url, headers=headers, json=json_body)
     elif method == "PATCH":
-        r = _req.patch(url, headers=headers, json=json_body)
+        r = get_session().patch(url, headers=headers, json=json_body)
     elif method == "DELETE":
-        r = _req.delete(url, headers=headers)
+        r = get_session().delete(url, headers=headers)
     else:
         raise ValueError(f"Méthode HTTP non supportée: {method}")
     return r
@@ -2205,7 +2247,8 @@ def _vdi_table_request(table: str, method: str = "GET", params: str = "",
 # ---------- GUEST routes ----------
 
 @vdi_router.get("/guest/{tech_token}/pianos")
-async def vdi_guest_get_pianos(tech_token: str):
+@offload_blocking
+def vdi_guest_get_pianos(tech_token: str):
     """
     Liste les pianos VDI pour un invité.
     Retourne les pianos triés : prioritaires (🟢) en premier, puis par location.
@@ -2298,7 +2341,8 @@ async def vdi_guest_get_pianos(tech_token: str):
 
 
 @vdi_router.put("/guest/{tech_token}/pianos/{piano_id}/note")
-async def vdi_guest_save_note(tech_token: str, piano_id: str, body: VdiGuestNoteUpdate):
+@offload_blocking
+def vdi_guest_save_note(tech_token: str, piano_id: str, body: VdiGuestNoteUpdate):
     """
     Auto-save (upsert) d'une note dans le buffer.
     Appelé par le debounce côté front (500 ms).
@@ -2336,7 +2380,8 @@ async def vdi_guest_save_note(tech_token: str, piano_id: str, body: VdiGuestNote
 # ---------- ADMIN routes ----------
 
 @vdi_router.post("/internal/ensure-token")
-async def vdi_ensure_token(body: VdiGuestTechCreate):
+@offload_blocking
+def vdi_ensure_token(body: VdiGuestTechCreate):
     """
     Auto-provision: retourne le token existant pour ce tech_name,
     ou en crée un nouveau. Utilisé par l'UI React (derrière PIN).
@@ -2364,7 +2409,8 @@ async def vdi_ensure_token(body: VdiGuestTechCreate):
 
 
 @vdi_router.post("/admin/guest-technicians")
-async def vdi_create_guest(body: VdiGuestTechCreate):
+@offload_blocking
+def vdi_create_guest(body: VdiGuestTechCreate):
     """Crée un lien invité (token) pour un technicien externe."""
     token = str(_uuid.uuid4())
     row = {
@@ -2380,7 +2426,8 @@ async def vdi_create_guest(body: VdiGuestTechCreate):
 
 
 @vdi_router.get("/admin/guest-technicians")
-async def vdi_list_guests():
+@offload_blocking
+def vdi_list_guests():
     """Liste tous les techniciens invités."""
     r = _vdi_table_request("vdi_guest_technicians", params="select=*&order=created_at.desc")
     if r.status_code != 200:
@@ -2389,7 +2436,8 @@ async def vdi_list_guests():
 
 
 @vdi_router.delete("/admin/guest-technicians/{tech_token}")
-async def vdi_deactivate_guest(tech_token: str):
+@offload_blocking
+def vdi_deactivate_guest(tech_token: str):
     """Désactive un lien invité."""
     r = _vdi_table_request("vdi_guest_technicians", method="PATCH",
                            params=f"tech_token=eq.{tech_token}",
@@ -2400,7 +2448,8 @@ async def vdi_deactivate_guest(tech_token: str):
 
 
 @vdi_router.post("/admin/priority/{piano_id}")
-async def vdi_set_priority(piano_id: str):
+@offload_blocking
+def vdi_set_priority(piano_id: str):
     """Marque un piano comme prioritaire (🟢)."""
     row = {"piano_id": piano_id, "set_by": "nicolas", "created_at": datetime.utcnow().isoformat()}
     r = _vdi_table_request("vdi_priority_pianos", method="POST", json_body=row,
@@ -2412,7 +2461,8 @@ async def vdi_set_priority(piano_id: str):
 
 
 @vdi_router.delete("/admin/priority/{piano_id}")
-async def vdi_remove_priority(piano_id: str):
+@offload_blocking
+def vdi_remove_priority(piano_id: str):
     """Retire le marqueur prioritaire d'un piano."""
     r = _vdi_table_request("vdi_priority_pianos", method="DELETE",
                            params=f"piano_id=eq.{piano_id}")
@@ -2422,7 +2472,8 @@ async def vdi_remove_priority(piano_id: str):
 
 
 @vdi_router.get("/admin/buffer")
-async def vdi_get_buffer(status_filter: Optional[str] = None):
+@offload_blocking
+def vdi_get_buffer(status_filter: Optional[str] = None):
     """
     Retourne toutes les notes du buffer.
     ?status_filter=draft|validated|pushed
@@ -2437,7 +2488,8 @@ async def vdi_get_buffer(status_filter: Optional[str] = None):
 
 
 @vdi_router.put("/admin/buffer/{note_id}")
-async def vdi_admin_edit_note(note_id: str, body: VdiGuestNoteUpdate):
+@offload_blocking
+def vdi_admin_edit_note(note_id: str, body: VdiGuestNoteUpdate):
     """Nicolas peut éditer une note du buffer avant validation."""
     r = _vdi_table_request("vdi_notes_buffer", method="PATCH",
                            params=f"id=eq.{note_id}",
@@ -2448,7 +2500,8 @@ async def vdi_admin_edit_note(note_id: str, body: VdiGuestNoteUpdate):
 
 
 @vdi_router.post("/admin/buffer/validate")
-async def vdi_validate_notes(body: VdiBufferValidation):
+@offload_blocking
+def vdi_validate_notes(body: VdiBufferValidation):
     """Marque un lot de notes comme 'validated' (prêtes pour bundle push)."""
     for nid in body.note_ids:
         _vdi_table_request("vdi_notes_buffer", method="PATCH",
@@ -2458,7 +2511,8 @@ async def vdi_validate_notes(body: VdiBufferValidation):
 
 
 @vdi_router.post("/admin/bundle-push")
-async def vdi_bundle_push(body: VdiBundlePushRequest):
+@offload_blocking
+def vdi_bundle_push(body: VdiBundlePushRequest):
     """
     Bundle Push vers Gazelle :
     1. Récupère les notes validées
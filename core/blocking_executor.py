@@ -0,0 +1,103 @@
+"""
+Exécution des appels bloquants (requests, supabase .execute(), GazelleAPIClient)
+hors de la boucle d'événements uvicorn.
+
+Problème : la plupart des routes de inventaire / institutions / place_des_arts /
+vincent_dindy / briefing sont `async def` mais appellent directement du code
+bloquant. Une requête Gazelle lente gelait TOUTE la boucle : /health et le
+webhook Zoom attendaient derrière elle, et les requêtes concurrentes passaient
+une par une.
+
+Modèle d'exécution :
+- @offload_blocking sur une route au corps synchrone : la route reste
+  awaitable (les appels internes `await get_institution_pianos(...)` marchent
+  toujours), mais son corps tourne dans un pool de threads borné.
+- await run_blocking(fn, ...) pour une portion bloquante dans une route qui
+  doit rester async (ex: après `await file.read()`).
+
+Le pool est dédié (API_BLOCKING_WORKERS, défaut 32) : une rafale d'appels
+Gazelle lents ne peut pas épuiser le pool par défaut d'anyio qu'utilisent les
+routes `def` et les dépendances FastAPI.
+
+Usage:
+    from core.blocking_executor import offload_blocking, run_blocking
+
+    @router.get("/pianos")
+    @offload_blocking
+    def get_pianos():
+        return storage.get_data("gazelle_pianos")
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+BLOCKING_WORKERS = int(os.getenv("API_BLOCKING_WORKERS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"active": 0, "pending": 0, "completed": 0, "max_active": 0}
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Retourne le pool borné partagé (singleton)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=BLOCKING_WORKERS, thread_name_prefix="api-blocking"
+                )
+    return _executor
+
+
+def _tracked(fn: Callable, *args, **kwargs) -> Any:
+    with _stats_lock:
+        _stats["pending"] -= 1
+        _stats["active"] += 1
+        _stats["max_active"] = max(_stats["max_active"], _stats["active"])
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        with _stats_lock:
+            _stats["active"] -= 1
+            _stats["completed"] += 1
+
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Exécute fn(*args, **kwargs) dans le pool borné sans bloquer la boucle.
+
+    Le contexte (contextvars) de la requête est propagé au thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    with _stats_lock:
+        _stats["pending"] += 1
+    call = functools.partial(ctx.run, _tracked, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_blocking_executor(), call)
+
+
+def offload_blocking(fn: Callable) -> Callable:
+    """
+    Transforme une fonction synchrone en coroutine exécutée dans le pool borné.
+
+    functools.wraps conserve la signature (FastAPI lit les paramètres et
+    l'annotation de retour via __wrapped__).
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def get_blocking_stats() -> Dict[str, Any]:
+    """Occupation du pool (threads actifs, en attente, pic), pour /health."""
+    with _stats_lock:
+        return {"workers": BLOCKING_WORKERS, **_stats}
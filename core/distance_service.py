@@ -0,0 +1,386 @@
+"""
+Service de distances/durées routières (Google Distance Matrix) avec cache
+persistant, partagé par TravelFeeCalculator et calculate_day_route.
+
+Avant : un appel HTTP Distance Matrix PAR paire origine → destination
+(3 par soumission de frais, 1 par segment à chaque affichage d'une journée),
+sans aucun cache : une même soumission ou une même journée revue repayait
+tous ses appels.
+
+Ici :
+- Clé de cache = (mode, tranche horaire, origine, destination) normalisées :
+  une adresse qui contient un code postal complet est identifiée par ce code
+  ("780 Lanthier, Montréal, QC H4N 2A1" et "H4N 2A1" -> "H4N2A1") ; sinon
+  texte en minuscules, sans accents ni ponctuation. fsa() expose la RTA
+  (3 premiers caractères) pour les estimations hors ligne.
+- Tranche horaire (trafic) : semaine/fin de semaine x nuit, pointe AM,
+  jour, pointe PM, soirée. Sans heure de départ future, Google ignore le
+  trafic : tranche "any".
+- Seules les paires manquantes sont facturées : dans une même tranche, les
+  origines qui demandent les mêmes destinations partagent une requête
+  multi-origines/multi-destinations (découpée aux limites Google : 25
+  origines, 25 destinations, 100 éléments). Une matrice complète (matrix())
+  part donc en un seul produit ; les segments d'une journée (A→B, B→C…)
+  coûtent un élément chacun, requêtes lancées en parallèle.
+- Cache mémoire + SQLite (DISTANCE_CACHE_PATH, défaut
+  data/distance_cache.sqlite ; vide = mémoire seulement), TTL
+  DISTANCE_CACHE_TTL (défaut 30 jours). Les erreurs par paire (NOT_FOUND,
+  ZERO_RESULTS) ne sont pas mises en cache.
+- stats() : requêtes, éléments facturés, hits mémoire/disque, taux de hit.
+
+Usage:
+    from core.distance_service import get_distance_service
+
+    service = get_distance_service()
+    leg = service.distance("H4N 2A1", "H3B 4W8", api_key=key)
+    # -> {'distance_m': 9800, 'duration_s': 1140, 'distance_text': '9,8 km', ...}
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.http_session import get_session
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "distance_cache.sqlite"
+CACHE_PATH = os.getenv("DISTANCE_CACHE_PATH", str(_DEFAULT_PATH))
+CACHE_TTL = float(os.getenv("DISTANCE_CACHE_TTL", str(30 * 24 * 3600)))
+MAX_MEMORY_ENTRIES = 20000
+
+MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+# Limites Distance Matrix par requête
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+# Requêtes Distance Matrix simultanées pour un même lookup
+MAX_PARALLEL_REQUESTS = 4
+
+_POSTAL_RE = re.compile(r"\b([A-Z]\d[A-Z])\s?(\d[A-Z]\d)\b")
+_FSA_RE = re.compile(r"\b([A-Z]\d[A-Z])\b")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS distance_cache (
+    key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL
+);
+"""
+
+_service: Optional["DistanceService"] = None
+_service_lock = threading.Lock()
+
+Pair = Tuple[str, str, Optional[datetime]]
+
+
+def postal_code(address: str) -> Optional[str]:
+    """Code postal canadien complet trouvé dans l'adresse (ex: "H4N2A1"), sinon None."""
+    match = _POSTAL_RE.search((address or "").upper())
+    return match.group(1) + match.group(2) if match else None
+
+
+def fsa(address: str) -> Optional[str]:
+    """RTA (3 premiers caractères du code postal) trouvée dans l'adresse, sinon None."""
+    match = _FSA_RE.search((address or "").upper()) or _POSTAL_RE.search((address or "").upper())
+    return match.group(1) if match else None
+
+
+def normalize_place(address: str) -> str:
+    """Identifiant de lieu pour le cache (code postal complet si présent)."""
+    code = postal_code(address)
+    if code:
+        return code
+    text = unicodedata.normalize("NFKD", (address or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def time_bucket(departure_time: Optional[datetime]) -> str:
+    """Tranche horaire de trafic d'une heure de départ (passé ou None -> "any")."""
+    if departure_time is None:
+        return "any"
+    now = datetime.now(departure_time.tzinfo) if departure_time.tzinfo else datetime.now()
+    if departure_time <= now:
+        return "any"
+    hour = departure_time.hour
+    if hour < 6:
+        band = "night"
+    elif hour < 10:
+        band = "am_peak"
+    elif hour < 15:
+        band = "midday"
+    elif hour < 19:
+        band = "pm_peak"
+    else:
+        band = "evening"
+    return f"{'we' if departure_time.weekday() >= 5 else 'wd'}_{band}"
+
+
+class DistanceService:
+    """Cache (mémoire + SQLite) et regroupement des appels Distance Matrix."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Tuple[float, Dict]] = {}
+        self._conn = None
+        self._stats = {
+            "lookups": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "api_requests": 0, "api_elements": 0, "errors": 0,
+        }
+
+    # ------------------------------------------------------------- disque
+    def _disk(self):
+        if self.path is None:
+            return None
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                self._conn = conn
+            except Exception as e:
+                logging.warning(f"⚠️ Cache distances sur disque désactivé ({self.path}): {e}")
+                self.path = None
+                return None
+        return self._conn
+
+    def _get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] >= now:
+                self._stats["memory_hits"] += 1
+                return entry[1]
+            conn = self._disk()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM distance_cache WHERE key = ? AND expires_at >= ?",
+                    (key, now),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logging.warning(f"⚠️ Lecture cache distances: {e}")
+                return None
+            if not row:
+                return None
+            value = json.loads(row[0])
+            self._memory[key] = (row[1], value)
+            self._stats["disk_hits"] += 1
+            return value
+
+    def _put_many(self, entries: List[Tuple[str, Dict]]):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            if len(self._memory) + len(entries) > MAX_MEMORY_ENTRIES:
+                self._memory.clear()  # le disque garde tout ; la mémoire se repeuple
+            for key, value in entries:
+                self._memory[key] = (expires_at, value)
+            conn = self._disk()
+            if conn is None or not entries:
+                return
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO distance_cache VALUES (?, ?, ?)",
+                        [(key, json.dumps(value, ensure_ascii=False), expires_at) for key, value in entries],
+                    )
+                    conn.execute("DELETE FROM distance_cache WHERE expires_at < ?", (time.time(),))
+            except sqlite3.Error as e:
+                logging.warning(f"⚠️ Écriture cache distances: {e}")
+
+    # ---------------------------------------------------------------- API
+    def _request(self, origins: List[str], destinations: List[str], mode: str,
+                 departure_time: Optional[datetime], api_key: str) -> Dict[Tuple[int, int], Dict]:
+        """Une requête Distance Matrix ; éléments par (index origine, index destination)."""
+        params = {
+            "origins": "|".join(origins),
+            "destinations": "|".join(destinations),
+            "mode": mode,
+            "units": "metric",
+            "language": "fr",
+            "key": api_key,
+        }
+        if time_bucket(departure_time) != "any":
+            params["departure_time"] = int(departure_time.timestamp())
+
+        with self._lock:
+            self._stats["api_requests"] += 1
+            self._stats["api_elements"] += len(origins) * len(destinations)
+        resp = get_session().get(MATRIX_URL, params=params, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("status") != "OK":
+            raise ValueError(f"Google Maps API error: {data.get('status')}")
+
+        elements = {}
+        for i, row in enumerate(data.get("rows", [])):
+            for j, element in enumerate(row.get("elements", [])):
+                elements[(i, j)] = element
+        return elements
+
+    @staticmethod
+    def _chunks(origins: List[str], destinations: List[str]):
+        for d0 in range(0, len(destinations), MAX_DESTINATIONS):
+            dests = destinations[d0:d0 + MAX_DESTINATIONS]
+            step = max(1, min(MAX_ORIGINS, MAX_ELEMENTS // len(dests)))
+            for o0 in range(0, len(origins), step):
+                yield origins[o0:o0 + step], dests
+
+    def _fetch(self, places: Dict[str, str], origin_keys: List[str], dest_keys: List[str],
+               mode: str, bucket: str, departure_time: Optional[datetime],
+               api_key: str) -> Dict[Tuple[str, str], Dict]:
+        """Remplit le produit origines x destinations (par blocs) ; retourne les éléments bruts."""
+        results: Dict[Tuple[str, str], Dict] = {}
+        to_cache = []
+        for o_chunk, d_chunk in self._chunks(origin_keys, dest_keys):
+            elements = self._request([places[k] for k in o_chunk], [places[k] for k in d_chunk],
+                                     mode, departure_time, api_key)
+            for (i, j), element in elements.items():
+                pair = (o_chunk[i], d_chunk[j])
+                if element.get("status") == "OK":
+                    value = {
+                        "distance_m": element["distance"]["value"],
+                        "duration_s": element["duration"]["value"],
+                        "distance_text": element["distance"].get("text"),
+                        "duration_text": element["duration"].get("text"),
+                    }
+                    if "duration_in_traffic" in element:
+                        value["duration_in_traffic_s"] = element["duration_in_traffic"]["value"]
+                    to_cache.append((f"{mode}|{bucket}|{pair[0]}|{pair[1]}", value))
+                    results[pair] = value
+                else:
+                    results[pair] = {"error": element.get("status", "UNKNOWN")}
+        self._put_many(to_cache)
+        return results
+
+    def lookup(self, pairs: Iterable[Pair], api_key: str, mode: str = "driving") -> List[Dict]:
+        """
+        Distances de plusieurs paires, cache d'abord puis requêtes groupées pour les seules paires manquantes.
+
+        Args:
+            pairs: [(origine, destination, heure_de_départ ou None), ...]
+            api_key: Clé Google Maps (utilisée seulement pour les paires manquantes)
+            mode: "driving" ou "bicycling"
+
+        Returns:
+            Un dict par paire, dans l'ordre : distance_m, duration_s, distance_text,
+            duration_text (+ duration_in_traffic_s) ; {'error': statut} si Google
+            n'a pas de trajet ; {'error': message} si la requête a échoué.
+        """
+        pairs = list(pairs)
+        results: List[Optional[Dict]] = [None] * len(pairs)
+        places: Dict[str, str] = {}
+        # tranche -> (clés de paires manquantes, index, heure de départ représentative)
+        missing: Dict[str, Dict] = {}
+
+        for idx, (origin, destination, departure_time) in enumerate(pairs):
+            o_key, d_key = normalize_place(origin), normalize_place(destination)
+            places.setdefault(o_key, origin)
+            places.setdefault(d_key, destination)
+            bucket = time_bucket(departure_time)
+            if o_key == d_key:
+                results[idx] = {"distance_m": 0, "duration_s": 0, "distance_text": "0 km", "duration_text": "0 min"}
+                continue
+            cached = self._get(f"{mode}|{bucket}|{o_key}|{d_key}")
+            if cached is not None:
+                results[idx] = cached
+                continue
+            group = missing.setdefault(bucket, {"pairs": [], "departure": departure_time})
+            group["pairs"].append((idx, o_key, d_key))
+            if departure_time and group["departure"] and departure_time < group["departure"]:
+                group["departure"] = departure_time
+
+        with self._lock:
+            self._stats["lookups"] += len(pairs)
+            self._stats["misses"] += sum(len(g["pairs"]) for g in missing.values())
+
+        # Requêtes = (tranche, origines ayant le même ensemble de destinations) :
+        # on ne paie jamais d'élément origine x destination non demandé
+        batches = []
+        for bucket, group in missing.items():
+            dests_by_origin: Dict[str, List[str]] = {}
+            for _, o_key, d_key in group["pairs"]:
+                dests = dests_by_origin.setdefault(o_key, [])
+                if d_key not in dests:
+                    dests.append(d_key)
+            origins_by_dests: Dict[Tuple[str, ...], List[str]] = {}
+            for o_key, dests in dests_by_origin.items():
+                origins_by_dests.setdefault(tuple(sorted(dests)), []).append(o_key)
+            for dests, origin_keys in origins_by_dests.items():
+                batches.append((bucket, group["departure"], origin_keys, list(dests)))
+
+        def fetch(batch) -> Tuple[Dict[Tuple[str, str], Dict], str]:
+            bucket, departure, origin_keys, dest_keys = batch
+            try:
+                return self._fetch(places, origin_keys, dest_keys, mode, bucket, departure, api_key), "NOT_RETURNED"
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                return {}, f"Request failed: {e}"
+
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_REQUESTS, len(batches))) as pool:
+                outcomes = list(pool.map(fetch, batches))
+        else:
+            outcomes = [fetch(r) for r in batches]
+
+        fetched: Dict[Tuple[str, str, str], Dict] = {}
+        for (bucket, _, origin_keys, dest_keys), (elements, error) in zip(batches, outcomes):
+            for o_key in origin_keys:
+                for d_key in dest_keys:
+                    fetched[(bucket, o_key, d_key)] = elements.get((o_key, d_key)) or {"error": error}
+        for bucket, group in missing.items():
+            for idx, o_key, d_key in group["pairs"]:
+                results[idx] = fetched[(bucket, o_key, d_key)]
+        return results
+
+    def matrix(self, origins: List[str], destinations: List[str], api_key: str,
+               departure_time: Optional[datetime] = None,
+               mode: str = "driving") -> Dict[Tuple[str, str], Dict]:
+        """Toutes les paires origines x destinations, indexées par (origine, destination)."""
+        pairs = [(o, d, departure_time) for o in origins for d in destinations]
+        return {(o, d): r for (o, d, _), r in zip(pairs, self.lookup(pairs, api_key, mode))}
+
+    def distance(self, origin: str, destination: str, api_key: str,
+                 departure_time: Optional[datetime] = None, mode: str = "driving") -> Dict:
+        """
+        Une paire (cache d'abord).
+
+        Raises:
+            ValueError: Si Google ne retourne pas de trajet ou si la requête échoue
+        """
+        result = self.lookup([(origin, destination, departure_time)], api_key, mode)[0]
+        if "error" in result:
+            raise ValueError(f"Route calculation error: {result['error']}")
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Compteurs et taux de hit, pour /health."""
+        with self._lock:
+            s = dict(self._stats)
+            s["memory_entries"] = len(self._memory)
+        hits = s["memory_hits"] + s["disk_hits"]
+        s["hit_rate"] = round(hits / s["lookups"], 3) if s["lookups"] else 0.0
+        s["disk"] = str(self.path) if self.path else None
+        return s
+
+
+def get_distance_service() -> DistanceService:
+    """Retourne le service partagé (singleton)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = DistanceService()
+    return _service
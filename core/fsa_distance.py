@@ -0,0 +1,228 @@
+"""
+Estimation de distances/durées SANS réseau, à partir des centroïdes des RTA
+(3 premiers caractères du code postal) du Grand Montréal.
+
+Avant : sans clé Google, TravelFeeCalculator comptait 40 km / 30 min pour
+tout le monde, et le chat devinait le trajet à partir de mots-clés du
+quartier ("plateau" -> 20 min, "laval" -> 30 min...).
+
+Ici :
+- FSA_CENTROIDS : centroïde (lat, lon) approximatif de chaque RTA couverte
+  (toutes celles de MTL_POSTAL_TO_NEIGHBORHOOD, plus l'île, Laval, la
+  Rive-Sud et la Rive-Nord proches). Précision de l'ordre du kilomètre.
+- La matrice haversine RTA x RTA est calculée une fois (numpy) ; une
+  requête n'est ensuite qu'une indexation de tableau (des milliers de
+  paires par milliseconde).
+- Modèle routier : km_route = km_vol_d'oiseau x FSA_ROAD_FACTOR (même RTA :
+  FSA_INTRA_KM) ; minutes = FSA_MINUTES_BASE + km_route x FSA_MINUTES_PER_KM.
+  Les paramètres se recalibrent sur les trajets Google déjà en cache
+  (calibrate(), scripts/calibrate_fsa_distance.py).
+
+Usage:
+    from core.fsa_distance import get_fsa_engine
+
+    engine = get_fsa_engine()
+    leg = engine.estimate("780 Lanthier, Montréal, QC H4N 2A1", "H3B 4W8")
+    # -> {'distance_m': 9400, 'duration_s': 1080, ..., 'estimated': True}
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.distance_service import fsa
+
+ROAD_FACTOR = float(os.getenv("FSA_ROAD_FACTOR", "1.35"))
+INTRA_FSA_KM = float(os.getenv("FSA_INTRA_KM", "1.5"))
+MINUTES_BASE = float(os.getenv("FSA_MINUTES_BASE", "4"))
+MINUTES_PER_KM = float(os.getenv("FSA_MINUTES_PER_KM", "1.6"))
+
+_EARTH_RADIUS_KM = 6371.0
+
+# RTA -> (latitude, longitude) du centroïde (approximatif)
+FSA_CENTROIDS: Dict[str, Tuple[float, float]] = {
+    # Est de l'île
+    'H1A': (45.680, -73.500), 'H1B': (45.640, -73.510), 'H1C': (45.665, -73.545),
+    'H1E': (45.637, -73.585), 'H1G': (45.610, -73.620), 'H1H': (45.595, -73.640),
+    'H1J': (45.612, -73.575), 'H1K': (45.615, -73.550), 'H1L': (45.600, -73.535),
+    'H1M': (45.595, -73.560), 'H1N': (45.583, -73.545), 'H1P': (45.595, -73.600),
+    'H1R': (45.580, -73.610), 'H1S': (45.575, -73.590), 'H1T': (45.565, -73.575),
+    'H1V': (45.555, -73.545), 'H1W': (45.545, -73.545), 'H1X': (45.560, -73.565),
+    'H1Y': (45.550, -73.580), 'H1Z': (45.570, -73.620),
+    # Centre, Plateau, Villeray, Ahuntsic
+    'H2A': (45.565, -73.600), 'H2B': (45.570, -73.660), 'H2C': (45.555, -73.655),
+    'H2E': (45.555, -73.615), 'H2G': (45.545, -73.590), 'H2H': (45.537, -73.575),
+    'H2J': (45.527, -73.583), 'H2K': (45.530, -73.555), 'H2L': (45.520, -73.565),
+    'H2M': (45.550, -73.645), 'H2N': (45.540, -73.650), 'H2P': (45.545, -73.625),
+    'H2R': (45.540, -73.615), 'H2S': (45.535, -73.600), 'H2T': (45.525, -73.595),
+    'H2V': (45.520, -73.610), 'H2W': (45.517, -73.582), 'H2X': (45.512, -73.570),
+    'H2Y': (45.505, -73.555), 'H2Z': (45.505, -73.565),
+    # Centre-ville, Sud-Ouest, Côte-des-Neiges, Westmount, NDG
+    'H3A': (45.505, -73.575), 'H3B': (45.500, -73.568), 'H3C': (45.495, -73.555),
+    'H3E': (45.465, -73.545), 'H3G': (45.497, -73.580), 'H3H': (45.492, -73.585),
+    'H3J': (45.485, -73.575), 'H3K': (45.480, -73.560), 'H3L': (45.545, -73.665),
+    'H3M': (45.530, -73.700), 'H3N': (45.530, -73.630), 'H3P': (45.515, -73.645),
+    'H3R': (45.520, -73.655), 'H3S': (45.500, -73.625), 'H3T': (45.503, -73.615),
+    'H3V': (45.495, -73.610), 'H3W': (45.490, -73.630), 'H3X': (45.480, -73.640),
+    'H3Y': (45.485, -73.595), 'H3Z': (45.487, -73.583),
+    'H4A': (45.475, -73.610), 'H4B': (45.465, -73.630), 'H4C': (45.478, -73.585),
+    'H4E': (45.460, -73.595), 'H4G': (45.460, -73.570), 'H4H': (45.450, -73.580),
+    'H4J': (45.530, -73.710), 'H4K': (45.525, -73.730), 'H4L': (45.515, -73.680),
+    'H4M': (45.500, -73.690), 'H4N': (45.525, -73.665), 'H4P': (45.495, -73.660),
+    'H4R': (45.505, -73.720), 'H4S': (45.490, -73.740), 'H4T': (45.495, -73.700),
+    'H4V': (45.470, -73.660), 'H4W': (45.475, -73.650), 'H4X': (45.455, -73.650),
+    'H4Y': (45.460, -73.740), 'H4Z': (45.500, -73.562),
+    # LaSalle, Lachine, Ouest-de-l'Île
+    'H8N': (45.440, -73.620), 'H8P': (45.430, -73.610), 'H8R': (45.435, -73.660),
+    'H8S': (45.440, -73.690), 'H8T': (45.455, -73.700), 'H8Y': (45.505, -73.810),
+    'H8Z': (45.495, -73.830), 'H9A': (45.490, -73.800), 'H9B': (45.475, -73.790),
+    'H9C': (45.495, -73.890), 'H9E': (45.500, -73.905), 'H9G': (45.485, -73.825),
+    'H9H': (45.450, -73.870), 'H9J': (45.455, -73.865), 'H9K': (45.480, -73.890),
+    'H9P': (45.455, -73.760), 'H9R': (45.450, -73.800), 'H9S': (45.445, -73.745),
+    'H9W': (45.430, -73.860), 'H9X': (45.410, -73.950),
+    # Laval
+    'H7A': (45.670, -73.590), 'H7B': (45.665, -73.575), 'H7C': (45.625, -73.640),
+    'H7E': (45.615, -73.670), 'H7G': (45.565, -73.695), 'H7H': (45.630, -73.740),
+    'H7J': (45.640, -73.740), 'H7K': (45.625, -73.725), 'H7L': (45.610, -73.790),
+    'H7M': (45.605, -73.720), 'H7N': (45.560, -73.705), 'H7P': (45.575, -73.825),
+    'H7R': (45.545, -73.865), 'H7S': (45.560, -73.740), 'H7T': (45.570, -73.760),
+    'H7V': (45.535, -73.740), 'H7W': (45.545, -73.770), 'H7X': (45.530, -73.810),
+    'H7Y': (45.545, -73.850),
+    # Rive-Sud
+    'J3V': (45.530, -73.345), 'J3Y': (45.505, -73.410), 'J4B': (45.595, -73.445),
+    'J4G': (45.545, -73.470), 'J4H': (45.535, -73.505), 'J4J': (45.525, -73.485),
+    'J4K': (45.535, -73.515), 'J4L': (45.525, -73.465), 'J4M': (45.545, -73.445),
+    'J4N': (45.555, -73.455), 'J4P': (45.500, -73.505), 'J4R': (45.495, -73.515),
+    'J4S': (45.505, -73.495), 'J4T': (45.505, -73.465), 'J4V': (45.485, -73.475),
+    'J4W': (45.465, -73.460), 'J4X': (45.455, -73.475), 'J4Y': (45.455, -73.440),
+    'J4Z': (45.440, -73.490), 'J5A': (45.370, -73.565), 'J5R': (45.415, -73.495),
+    # Rive-Nord
+    'J5Y': (45.755, -73.440), 'J6A': (45.740, -73.460), 'J6W': (45.700, -73.640),
+    'J6X': (45.690, -73.620), 'J6Y': (45.705, -73.650), 'J7A': (45.635, -73.800),
+    'J7B': (45.670, -73.880), 'J7C': (45.670, -73.860), 'J7E': (45.640, -73.830),
+    'J7G': (45.620, -73.840), 'J7H': (45.610, -73.850), 'J7J': (45.660, -74.030),
+    'J7P': (45.560, -73.900), 'J7R': (45.560, -73.920),
+}
+
+_engine: Optional["FSADistanceEngine"] = None
+_engine_lock = threading.Lock()
+
+
+def haversine_matrix(lat1: np.ndarray, lon1: np.ndarray,
+                     lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Distances à vol d'oiseau (km) entre deux listes de points (degrés) : matrice len1 x len2."""
+    lat1, lon1 = np.radians(lat1)[:, None], np.radians(lon1)[:, None]
+    lat2, lon2 = np.radians(lat2)[None, :], np.radians(lon2)[None, :]
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class FSADistanceEngine:
+    """Matrice RTA x RTA précalculée + modèle routier (facteur de détour, vitesse)."""
+
+    def __init__(self, centroids: Dict[str, Tuple[float, float]] = FSA_CENTROIDS,
+                 road_factor: float = ROAD_FACTOR, intra_km: float = INTRA_FSA_KM,
+                 minutes_base: float = MINUTES_BASE, minutes_per_km: float = MINUTES_PER_KM):
+        self.codes = list(centroids)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        coords = np.array([centroids[c] for c in self.codes], dtype=float)
+        crow = haversine_matrix(coords[:, 0], coords[:, 1], coords[:, 0], coords[:, 1])
+
+        self.road_km = crow * road_factor
+        np.fill_diagonal(self.road_km, intra_km)
+        self.minutes = minutes_base + self.road_km * minutes_per_km
+        self.params = {
+            "road_factor": road_factor, "intra_km": intra_km,
+            "minutes_base": minutes_base, "minutes_per_km": minutes_per_km,
+        }
+
+    def locate(self, address: str) -> Optional[int]:
+        """Index de la RTA de l'adresse (ou du code postal), None si inconnue."""
+        code = fsa(address)
+        return self.index.get(code) if code else None
+
+    def matrix(self, origins: List[str], destinations: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distances (km) et durées (min) estimées, matrices len(origins) x len(destinations).
+
+        Les adresses dont la RTA est inconnue donnent NaN sur leur ligne/colonne.
+        """
+        oi = np.array([-1 if i is None else i for i in map(self.locate, origins)], dtype=int)
+        di = np.array([-1 if j is None else j for j in map(self.locate, destinations)], dtype=int)
+        km = self.road_km[np.ix_(oi, di)]
+        minutes = self.minutes[np.ix_(oi, di)]
+        unknown = (oi[:, None] < 0) | (di[None, :] < 0)
+        return np.where(unknown, np.nan, km), np.where(unknown, np.nan, minutes)
+
+    def estimate(self, origin: str, destination: str) -> Optional[Dict]:
+        """
+        Trajet estimé, au format du service de distances (core/distance_service.py).
+
+        Returns:
+            distance_m, duration_s, distance_text, duration_text, estimated=True ;
+            None si une des deux RTA est inconnue
+        """
+        i, j = self.locate(origin), self.locate(destination)
+        if i is None or j is None:
+            return None
+        km, minutes = float(self.road_km[i, j]), float(self.minutes[i, j])
+        return {
+            "distance_m": int(round(km * 1000)),
+            "duration_s": int(round(minutes * 60)),
+            "distance_text": f"~{km:.1f} km",
+            "duration_text": f"~{minutes:.0f} min",
+            "estimated": True,
+        }
+
+
+def calibrate(samples: Iterable[Tuple[str, str, float, float]]) -> Dict[str, float]:
+    """
+    Ajuste le modèle routier sur des trajets réels (ex: cache Google).
+
+    Args:
+        samples: [(origine, destination, distance_m, duration_s), ...]
+
+    Returns:
+        road_factor (médiane km_route / km_vol_d'oiseau, RTA différentes),
+        intra_km (médiane dans une même RTA), minutes_base / minutes_per_km
+        (moindres carrés minutes ~ km_route), n (paires utilisées)
+    """
+    coords, ratios, intra, road, minutes = FSA_CENTROIDS, [], [], [], []
+    for origin, destination, distance_m, duration_s in samples:
+        a, b = fsa(origin), fsa(destination)
+        if a not in coords or b not in coords or not distance_m:
+            continue
+        km = distance_m / 1000.0
+        road.append(km)
+        minutes.append(duration_s / 60.0)
+        if a == b:
+            intra.append(km)
+            continue
+        crow = float(haversine_matrix(np.array([coords[a][0]]), np.array([coords[a][1]]),
+                                      np.array([coords[b][0]]), np.array([coords[b][1]]))[0, 0])
+        if crow > 0.5:
+            ratios.append(km / crow)
+
+    result = {"n": len(road)}
+    if ratios:
+        result["road_factor"] = round(float(np.median(ratios)), 3)
+    if intra:
+        result["intra_km"] = round(float(np.median(intra)), 2)
+    if len(road) >= 2:
+        slope, intercept = np.polyfit(np.array(road), np.array(minutes), 1)
+        result["minutes_per_km"] = round(float(slope), 3)
+        result["minutes_base"] = round(float(intercept), 2)
+    return result
+
+
+def get_fsa_engine() -> FSADistanceEngine:
+    """Retourne le moteur partagé (matrice calculée une seule fois)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FSADistanceEngine()
+    return _engine
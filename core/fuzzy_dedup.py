@@ -0,0 +1,137 @@
+"""
+Recherche de paires de chaînes similaires (doublons de catalogue) sans
+comparer toutes les paires.
+
+Avant : /inventaire/gazelle/find-duplicates passait CHAQUE paire
+(local x local, local x Gazelle) dans difflib.SequenceMatcher : O(n²)
+alignements Python par requête, quelques secondes dès ~1000 produits.
+
+Ici, trois étages :
+1. Blocage par trigrammes (texte en minuscules, bordé d'espaces) avec
+   filtre de préfixe : chaque nom n'est indexé que par ses trigrammes les
+   plus RARES ; deux noms ne deviennent candidats que s'ils partagent un de
+   ces trigrammes. Le seuil de Dice sur les trigrammes est dérivé du seuil
+   de similarité (_candidate_dice) avec une marge mesurée, pas prouvée :
+   le blocage est APPROXIMATIF. Pour limiter les pertes, il n'est utilisé
+   qu'à partir de BLOCKING_MIN_THRESHOLD et pour des noms d'au moins
+   SHORT_TEXT caractères ; sinon la paire est comparée exhaustivement
+   (les trigrammes bordés d'espaces ne bornent rien sur des noms courts).
+2. Filtres bon marché : Dice des trigrammes (mêmes réserves), puis bornes
+   exactes real_quick_ratio / quick_ratio de SequenceMatcher.
+3. Score final : SequenceMatcher.ratio() (même valeur qu'avant), avec
+   l'analyse de la 2e chaîne mise en cache (set_seq2) par groupe.
+
+Usage:
+    pairs = find_similar_pairs(["Corde no. 12", "corde no 12", "Feutre"], threshold=0.8)
+    # -> [(0, 1, 0.9565...)]
+"""
+
+import difflib
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# Sous ce seuil, le blocage perd des paires (ex: 0.7) : comparaison exhaustive.
+# Au-dessus, pertes rares mais possibles (transpositions de blocs sur noms perturbés)
+BLOCKING_MIN_THRESHOLD = 0.80
+# Noms plus courts : toujours comparés à tous les autres
+SHORT_TEXT = 12
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _candidate_dice(threshold: float) -> float:
+    """Dice minimal sur les trigrammes pour une similarité >= threshold.
+
+    Une différence de caractère casse au plus 3 trigrammes ; les
+    transpositions de blocs en cassent davantage, d'où la marge (mesurée,
+    pas garantie : 0.9 -> Dice >= 0.45 sur des noms de pièces perturbés).
+    """
+    return max(0.0, 3 * threshold - 2.25)
+
+
+def _prefix(grams: Set[str], rank: Dict[str, int], dice: float) -> List[str]:
+    """Trigrammes les plus rares, assez nombreux pour garantir une intersection."""
+    ordered = sorted(grams, key=rank.__getitem__)
+    min_overlap = dice * len(ordered) / (2 - dice) if dice else 1
+    return ordered[:max(1, len(ordered) - math.ceil(min_overlap) + 1)]
+
+
+def find_similar_pairs(
+    left: List[str],
+    right: Optional[List[str]] = None,
+    threshold: float = 0.80
+) -> List[Tuple[int, int, float]]:
+    """
+    Paires (i, j, similarité) avec SequenceMatcher(a.lower(), b.lower()).ratio() >= threshold.
+
+    Args:
+        left: Noms à comparer
+        right: Seconde liste (None = paires i < j à l'intérieur de left)
+        threshold: Seuil de similarité (0.0-1.0)
+
+    Returns:
+        Paires triées par (i, j) ; j indexe right (ou left si right=None).
+        Exact sous BLOCKING_MIN_THRESHOLD et pour les noms courts ; au-delà,
+        le blocage par trigrammes peut exceptionnellement manquer une paire.
+    """
+    self_join = right is None
+    a_texts = [(s or "").lower() for s in left]
+    b_texts = a_texts if self_join else [(s or "").lower() for s in right]
+    a_grams = [_trigrams(t) for t in a_texts]
+    b_grams = a_grams if self_join else [_trigrams(t) for t in b_texts]
+
+    # Rareté globale des trigrammes (les plus rares d'abord dans les préfixes)
+    freq: Dict[str, int] = defaultdict(int)
+    for grams in a_grams + ([] if self_join else b_grams):
+        for g in grams:
+            freq[g] += 1
+    rank = {g: r for r, g in enumerate(sorted(freq, key=lambda g: (freq[g], g)))}
+
+    # Paires comparées sans blocage : seuil bas, ou un des deux noms court
+    exhaustive = threshold < BLOCKING_MIN_THRESHOLD
+    a_short = {i for i, t in enumerate(a_texts) if exhaustive or len(t) < SHORT_TEXT}
+    b_short = a_short if self_join else {j for j, t in enumerate(b_texts) if exhaustive or len(t) < SHORT_TEXT}
+
+    dice = _candidate_dice(threshold)
+    index: Dict[str, List[int]] = defaultdict(list)
+    for j, grams in enumerate(b_grams):
+        if j not in b_short:
+            for g in _prefix(grams, rank, dice):
+                index[g].append(j)
+
+    # Candidats groupés par j : SequenceMatcher garde l'analyse de b (set_seq2)
+    candidates: Dict[int, Set[int]] = defaultdict(set)
+    for i, grams in enumerate(a_grams):
+        if i in a_short:
+            targets = range(len(b_texts))
+        else:
+            targets = [j for g in _prefix(grams, rank, dice) for j in index.get(g, ())]
+            targets += b_short
+        for j in targets:
+            if not self_join or j > i:
+                candidates[j].add(i)
+
+    pairs = []
+    matcher = difflib.SequenceMatcher(None)
+    for j, group in candidates.items():
+        matcher.set_seq2(b_texts[j])
+        gb = b_grams[j]
+        for i in group:
+            ga = a_grams[i]
+            blocked = i not in a_short and j not in b_short
+            if blocked and 2 * len(ga & gb) < dice * (len(ga) + len(gb)):
+                continue
+            matcher.set_seq1(a_texts[i])
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= threshold:
+                pairs.append((i, j, ratio))
+
+    pairs.sort()
+    return pairs
@@ -7,11 +7,15 @@ Gère l'authentification OAuth2, le refresh des tokens, et les requêtes GraphQL
 
 import json
 import os
+import threading
 import time
 import requests
 from dotenv import load_dotenv
 from typing import Dict, List, Optional, Any
 
+from core.http_session import get_session
+from core.gazelle_parallel_fetch import AdaptiveRateLimiter, ParallelWindowFetcher, split_date_window
+
 # Chemin vers le dossier racine du projet
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 
@@ -25,6 +29,16 @@ load_dotenv(env_path)
 API_URL = "https://gazelleapp.io/graphql/private/"
 OAUTH_TOKEN_URL = "https://gazelleapp.io/developer/oauth/token"
 
+# Taille des sous-fenêtres pour la récupération parallèle (jours)
+APPOINTMENT_WINDOW_DAYS = 30
+TIMELINE_WINDOW_DAYS = 7
+
+
+# Sérialise le refresh OAuth (401) entre threads et instances du processus :
+# des refresh concurrents se disputeraient le refresh_token et s'écraseraient
+# mutuellement dans system_settings
+_token_refresh_lock = threading.Lock()
+
 
 class GazelleAPIClient:
     """Client pour l'API GraphQL de Gazelle."""
@@ -40,6 +54,13 @@ class GazelleAPIClient:
             token_path = os.path.join(CONFIG_DIR, 'token.json')
         self.token_path = token_path
 
+        # Session HTTP partagée du processus (keep-alive vers gazelleapp.io)
+        self.session = get_session()
+
+        # Budget de requêtes optionnel : si défini, CHAQUE appel GraphQL de ce
+        # client passe par le limiteur (ex: GazellePushService en parallèle)
+        self.rate_limiter: Optional[AdaptiveRateLimiter] = None
+
         # Force credentials from DEPLOY_NOW.md
         self.client_id = os.getenv('GAZELLE_CLIENT_ID') or 'yCLgIwBusPMX9bZHtbzePvcNUisBQ9PeA4R93OwKwNE'
         self.client_secret = os.getenv('GAZELLE_CLIENT_SECRET') or 'CHiMzcYZ2cVgBCjQ7vDCxr3jIE5xkLZ_9v4VkU-O9Qc'
@@ -140,7 +161,7 @@ class GazelleAPIClient:
         }
         
         try:
-            response = requests.post(OAUTH_TOKEN_URL, data=payload)
+            response = self.session.post(OAUTH_TOKEN_URL, data=payload)
             response.raise_for_status()
             
             new_token_data = response.json()
@@ -198,8 +219,20 @@ class GazelleAPIClient:
             'variables': variables or {}
         }
 
+        # Une lecture peut être rejouée sur 429/5xx ; une mutation jamais
+        # (risque de doubler un événement/une mesure dans Gazelle).
+        is_read = not query.lstrip().startswith('mutation')
+
         try:
-            response = requests.post(API_URL, json=payload, headers=headers)
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            t0 = time.monotonic()
+            response = self.session.post(API_URL, json=payload, headers=headers, idempotent=is_read)
+            if self.rate_limiter:
+                if response.status_code == 429:
+                    self.rate_limiter.on_throttle()
+                else:
+                    self.rate_limiter.on_success(time.monotonic() - t0)
 
             # AUTO-REFRESH: Si 401, tenter de rafraîchir automatiquement
             if response.status_code == 401:
@@ -207,11 +240,19 @@ class GazelleAPIClient:
 
                 # Essayer de rafraîchir avec refresh_token
                 try:
-                    self._refresh_token()
-                    print("✅ Token rafraîchi, nouvel essai...")
-
-                    # Recharger le token depuis Supabase
-                    self.token_data = self._load_token()
+                    # Un seul refresh à la fois (workers parallèles : fenêtres,
+                    # prefetch, push) ; les autres reprennent le nouveau token
+                    with _token_refresh_lock:
+                        if self.token_data.get('access_token') == access_token:
+                            # Un autre client du processus a peut-être déjà rafraîchi
+                            latest = self._load_token()
+                            if latest.get('access_token') != access_token:
+                                self.token_data = latest
+                            else:
+                                self._refresh_token()
+                                print("✅ Token rafraîchi, nouvel essai...")
+                                # Recharger le token depuis Supabase
+                                self.token_data = self._load_token()
                     new_access_token = self.token_data['access_token']
                     
                     # Reconstruire les headers selon le type de token
@@ -224,7 +265,7 @@ class GazelleAPIClient:
                         headers['Authorization'] = f"Bearer {new_access_token}"
 
                     # Retry la requête
-                    response = requests.post(API_URL, json=payload, headers=headers)
+                    response = self.session.post(API_URL, json=payload, headers=headers, idempotent=is_read)
 
                 except Exception as refresh_error:
                     print(f"❌ Échec du refresh automatique: {refresh_error}")
@@ -269,6 +310,54 @@ class GazelleAPIClient:
             print(f"   Traceback: {traceback.format_exc()}")
             raise ConnectionError(f"Erreur lors de l'appel API: {e}")
     
+    def _paginate_connection(
+        self,
+        fetcher: ParallelWindowFetcher,
+        query: str,
+        field: str,
+        variables: Dict[str, Any],
+        page_size: int = 100,
+        stop: Optional[Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Parcourt toutes les pages d'une connexion GraphQL ($first/$after).
+
+        Chaque page passe par fetcher.call (limiteur de débit adaptatif).
+
+        Args:
+            fetcher: Moteur parallèle (porte le limiteur partagé)
+            query: Requête GraphQL acceptant $first et $after
+            field: Nom de la connexion dans data (ex: 'allEventsBatched')
+            variables: Variables fixes (filtres)
+            page_size: Taille de page
+            stop: Prédicat optionnel node -> bool ; arrête la pagination au
+                premier node qui le satisfait (exclu du résultat)
+
+        Returns:
+            Liste des nodes dans l'ordre des pages
+        """
+        nodes_out = []
+        cursor = None
+        while True:
+            page_vars = dict(variables, first=page_size, after=cursor)
+            result = fetcher.call(lambda: self._execute_query(query, page_vars))
+
+            connection = ((result or {}).get('data') or {}).get(field) or {}
+            if 'edges' in connection:
+                nodes = [edge['node'] for edge in connection.get('edges') or [] if 'node' in edge]
+            else:
+                nodes = connection.get('nodes') or []
+
+            for node in nodes:
+                if stop is not None and stop(node):
+                    return nodes_out
+                nodes_out.append(node)
+
+            page_info = connection.get('pageInfo') or {}
+            if not nodes or not page_info.get('hasNextPage'):
+                return nodes_out
+            cursor = page_info.get('endCursor')
+
     def get_clients(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Récupère tous les clients depuis l'API.
@@ -502,7 +591,6 @@ class GazelleAPIClient:
             Liste de dictionnaires contenant les données des rendez-vous
         """
         from datetime import datetime, timedelta
-        import time
 
         # FIXED: Permettre override de la date de début pour récupérer historique
         if start_date_override:
@@ -556,44 +644,21 @@ class GazelleAPIClient:
             # Note: Pas de filtre "status" → récupère TOUS les statuts (ACTIVE, COMPLETED, CANCELLED, etc.)
         }
 
-        # Pagination automatique (pattern V4 - lignes 136-189)
-        all_events = []
-        cursor = None
-        page_size = 100
-        page_count = 0
-
-        print(f"📅 Récupération appointments ({start_date} → {end_date})...")
-
-        while True:
-            page_count += 1
-            time.sleep(0.2)  # Délai entre requêtes (V4)
-
-            variables = {
-                "first": page_size,
-                "after": cursor,
-                "filters": filters
-            }
-
-            result = self._execute_query(query, variables)
-
-            if not result:
-                break
+        # Pagination : sous-fenêtres de 30 jours tirées en parallèle (chacune
+        # avec son curseur), débit réglé par le limiteur adaptatif au lieu du
+        # sleep(0.2) fixe entre pages.
+        fetcher = ParallelWindowFetcher()
+        windows = split_date_window(start_date, end_date, days=APPOINTMENT_WINDOW_DAYS)
 
-            data_connection = result.get('data', {}).get('allEventsBatched', {})
-            if not data_connection:
-                break
-
-            nodes = data_connection.get('nodes', [])
-            all_events.extend(nodes)
-
-            print(f"   Page {page_count}: {len(nodes)} appointments récupérés (total: {len(all_events)})")
+        print(f"📅 Récupération appointments ({start_date} → {end_date}, {len(windows)} fenêtres)...")
 
-            # Vérifier si page suivante
-            page_info = data_connection.get('pageInfo', {})
-            if not page_info.get('hasNextPage'):
-                break
+        def fetch_window(win_start: str, win_end: str) -> List[Dict[str, Any]]:
+            window_filters = dict(filters, startOn=win_start, endOn=win_end)
+            return self._paginate_connection(
+                fetcher, query, 'allEventsBatched', {"filters": window_filters}
+            )
 
-            cursor = page_info.get('endCursor')
+        all_events = fetcher.fetch(windows, fetch_window)
 
         # Limiter si nécessaire
         if limit and len(all_events) > limit:
@@ -602,6 +667,52 @@ class GazelleAPIClient:
         print(f"✅ {len(all_events)} appointments récupérés depuis l'API")
         return all_events
 
+    def get_events_by_ids(self, event_ids: List[str], batch_size: int = 50) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Récupère des événements précis par ID, en une requête GraphQL aliasée par lot.
+
+        Remplace get_appointments() (fenêtre complète paginée) quand on n'a
+        besoin que de quelques RV (ex: confirmedByClient des RV de demain).
+
+        Args:
+            event_ids: IDs Gazelle (evt_xxx)
+            batch_size: Nombre d'événements par requête
+
+        Returns:
+            {event_id: event} ; None si Gazelle répond que l'événement n'existe pas.
+            Un ID absent du résultat = état inconnu (erreur API).
+        """
+        fields = "id title start status type confirmedByClient client { id } user { id }"
+        ids = list(dict.fromkeys(i for i in event_ids if i))
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            params = ", ".join(f"$id{k}: String!" for k in range(len(batch)))
+            aliases = "\n".join(f"e{k}: event(eventId: $id{k}) {{ {fields} }}" for k in range(len(batch)))
+            query = f"query EventsByIds({params}) {{\n{aliases}\n}}"
+            try:
+                data = self._execute_query(query, {f"id{k}": i for k, i in enumerate(batch)}).get("data") or {}
+                for k, event_id in enumerate(batch):
+                    results[event_id] = data.get(f"e{k}")
+            except ValueError:
+                # Une erreur GraphQL invalide tout le lot (ex: un ID supprimé) :
+                # on isole les IDs un par un
+                for event_id in batch:
+                    try:
+                        data = self._execute_query(
+                            f"query EventById($id0: String!) {{ e0: event(eventId: $id0) {{ {fields} }} }}",
+                            {"id0": event_id},
+                        ).get("data") or {}
+                        results[event_id] = data.get("e0")
+                    except ValueError as e:
+                        if "not found" in str(e).lower():
+                            results[event_id] = None
+                        else:
+                            print(f"⚠️ Événement {event_id} illisible: {e}")
+
+        return results
+
     def get_invoices(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Récupère toutes les factures depuis l'API.
@@ -763,17 +874,36 @@ class GazelleAPIClient:
         print(f"✅ {len(products_transformed)} produits/services récupérés depuis Master Service Items")
         return products_transformed
 
-    def get_timeline_entries(self, limit: Optional[int] = None, since_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_timeline_entries(
+        self,
+        limit: Optional[int] = None,
+        since_date: Optional[str] = None,
+        until_date: Optional[str] = None,
+        parallel: bool = True,
+    ) -> List[Dict[str, Any]]:
         """
         Récupère les entrées de timeline (notes techniques, mesures, événements).
 
+        Avec since_date et sans limit, la fenêtre est découpée en sous-fenêtres
+        de TIMELINE_WINDOW_DAYS jours tirées en parallèle (voir
+        _get_timeline_entries_parallel). Sinon : parcours séquentiel du curseur.
+
         Args:
             limit: Nombre maximum d'entrées (None = toutes)
             since_date: Date ISO depuis laquelle récupérer les entrées (mode incrémental)
+            until_date: Date ISO de fin (exclue, mode parallèle uniquement ; défaut: maintenant)
+            parallel: False pour forcer le parcours séquentiel
 
         Returns:
             Liste de dictionnaires contenant les timeline entries
         """
+        if parallel and since_date and not limit:
+            try:
+                return self._get_timeline_entries_parallel(since_date, until_date)
+            except ValueError as e:
+                # Erreur de schéma GraphQL (ex: orderBy refusé) -> mode séquentiel
+                print(f"⚠️ Récupération parallèle timeline impossible ({e}), mode séquentiel")
+
         # Construire la query avec filtre de date optionnel
         # NOTE: occurredAtGet signifie >= (Greater Than or Equal), pas ==
         # TODO: Vérifier les VRAIS noms de champs avec NotebookLM
@@ -853,6 +983,81 @@ class GazelleAPIClient:
         print(f"✅ {len(all_entries)} entrées timeline récupérées depuis l'API")
         return all_entries
 
+    def _get_timeline_entries_parallel(self, since_date: str, until_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Récupère les timeline entries de [since_date, until_date[ par sous-fenêtres parallèles.
+
+        L'API n'expose qu'une borne basse (occurredAtGet) : chaque sous-fenêtre
+        est tirée en ordre OCCURRED_AT_ASC depuis son début, et la pagination
+        s'arrête dès qu'une entrée atteint le début de la fenêtre suivante.
+
+        Args:
+            since_date: Date ISO de début (incluse)
+            until_date: Date ISO de fin (exclue, défaut: aucune borne haute)
+
+        Returns:
+            Entrées triées chronologiquement, sans doublons
+        """
+        from datetime import datetime, timezone
+
+        def parse(value: str) -> datetime:
+            dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+            return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+        end_dt = parse(until_date) if until_date else datetime.now(timezone.utc)
+        windows = split_date_window(since_date, end_dt, days=TIMELINE_WINDOW_DAYS)
+
+        # Bornes effectives : la 1re fenêtre part exactement de since_date,
+        # les suivantes à minuit UTC ; chaque fenêtre s'arrête au début de la suivante.
+        # Sans until_date, la dernière fenêtre reste ouverte (comme le mode séquentiel,
+        # qui renvoie aussi les entrées datées dans le futur).
+        starts = [since_date] + [f"{win_start}T00:00:00Z" for win_start, _ in windows[1:]]
+        last_cutoff = parse(until_date) if until_date else None
+        cutoffs = {win_start: (parse(starts[i + 1]) if i + 1 < len(starts) else last_cutoff)
+                   for i, (win_start, _) in enumerate(windows)}
+        start_of = {win_start: starts[i] for i, (win_start, _) in enumerate(windows)}
+
+        query = """
+        query GetTimelineEntriesAsc($first: Int, $after: String, $occurredAtGet: CoreDateTime) {
+            allTimelineEntries(first: $first, after: $after, occurredAtGet: $occurredAtGet, orderBy: OCCURRED_AT_ASC) {
+                edges {
+                    node {
+                        id
+                        occurredAt
+                        type
+                        summary
+                        comment
+                        client { id }
+                        piano { id }
+                        invoice { id }
+                        estimate { id }
+                        user { id }
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        """
+
+        fetcher = ParallelWindowFetcher()
+        print(f"📄 Récupération timeline ({since_date} → {end_dt.isoformat()}, {len(windows)} fenêtres)...")
+
+        def fetch_window(win_start: str, _win_end: str) -> List[Dict[str, Any]]:
+            cutoff = cutoffs[win_start]
+            return self._paginate_connection(
+                fetcher, query, 'allTimelineEntries',
+                {"occurredAtGet": start_of[win_start]},
+                stop=lambda node: cutoff is not None and bool(node.get('occurredAt'))
+                and parse(node['occurredAt']) >= cutoff,
+            )
+
+        all_entries = fetcher.fetch(windows, fetch_window)
+        print(f"✅ {len(all_entries)} entrées timeline récupérées depuis l'API")
+        return all_entries
+
     def get_recent_timeline_entries_for_client(self, client_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
         Récupère les N dernières entrées timeline pour un client SANS filtre de date.
@@ -0,0 +1,210 @@
+"""
+Moteur de récupération parallèle pour les requêtes Gazelle paginées par date.
+
+Avant : get_appointments / get_timeline_entries (et les scripts backfill_*)
+marchaient le curseur page par page, avec un time.sleep(0.2) fixe entre
+chaque page -> une fenêtre de 10 ans = des milliers d'allers-retours en série.
+
+Ici :
+1. La fenêtre [début, fin] est découpée en sous-fenêtres indépendantes
+   (split_date_window), chacune ayant son propre curseur.
+2. Les sous-fenêtres sont tirées en parallèle par un pool de threads borné
+   (GAZELLE_FETCH_WORKERS, défaut 4) qui partage la Session keep-alive.
+3. Un limiteur adaptatif (AdaptiveRateLimiter, AIMD) règle le débit global :
+   +rate tant que la latence reste sous la cible, /2 sur un 429 ou une
+   latence anormale, avec pause de refroidissement.
+4. Le résultat est fusionné de façon déterministe : ordre des sous-fenêtres,
+   puis ordre des pages, dédoublonné par id (premier vu gagne).
+
+Usage:
+    from core.gazelle_parallel_fetch import ParallelWindowFetcher, split_date_window
+    fetcher = ParallelWindowFetcher(max_workers=4)
+    windows = split_date_window('2020-01-01', '2026-01-01', days=90)
+    rows = fetcher.fetch(windows, lambda start, end: fetch_window(start, end))
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger("ptm.gazelle_fetch")
+
+MAX_WORKERS = int(os.getenv("GAZELLE_FETCH_WORKERS", "4"))
+# Débit initial/min/max en requêtes par seconde (tous threads confondus)
+INITIAL_RATE = float(os.getenv("GAZELLE_FETCH_RATE", "5"))
+MIN_RATE = 0.5
+MAX_RATE = float(os.getenv("GAZELLE_FETCH_MAX_RATE", "20"))
+# Latence au-delà de laquelle on considère que Gazelle sature
+TARGET_LATENCY = float(os.getenv("GAZELLE_FETCH_TARGET_LATENCY", "2.0"))
+THROTTLE_COOLDOWN = 5.0  # secondes de pause globale après un 429
+PAGE_RETRIES = 3
+
+DateLike = Union[str, date, datetime]
+
+
+class AdaptiveRateLimiter:
+    """Limiteur de débit partagé entre threads, à croissance additive / décroissance multiplicative.
+
+    Chaque appel passe par acquire() (espacement minimal entre deux requêtes),
+    puis signale son issue via on_success(latence) ou on_throttle().
+    """
+
+    def __init__(self, rate: float = INITIAL_RATE, min_rate: float = MIN_RATE,
+                 max_rate: float = MAX_RATE, target_latency: float = TARGET_LATENCY):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "slowdowns": 0}
+
+    def acquire(self):
+        """Bloque jusqu'au prochain créneau disponible."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1.0 / self.rate
+            self.stats["requests"] += 1
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self, latency: float):
+        """Ajuste le débit selon la latence observée."""
+        with self._lock:
+            if latency > self.target_latency:
+                self.rate = max(self.min_rate, self.rate * 0.7)
+                self.stats["slowdowns"] += 1
+            else:
+                self.rate = min(self.max_rate, self.rate + 0.5)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """429 reçu : débit divisé par deux et pause globale."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after else THROTTLE_COOLDOWN
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self.stats["throttled"] += 1
+        logger.warning(f"Gazelle 429 : débit réduit à {self.rate:.1f} req/s, pause {pause:.0f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "rate": round(self.rate, 2)}
+
+
+def _to_date(value: DateLike) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)[:10]).date()
+
+
+def split_date_window(start: DateLike, end: DateLike, days: int = 30) -> List[Tuple[str, str]]:
+    """
+    Découpe [start, end] en sous-fenêtres contiguës de `days` jours.
+
+    Les bornes sont inclusives et ne se chevauchent pas :
+    ('2024-01-01', '2024-01-30'), ('2024-01-31', '2024-02-29'), ...
+
+    Args:
+        start: Date de début (YYYY-MM-DD, date ou datetime)
+        end: Date de fin incluse
+        days: Taille d'une sous-fenêtre en jours
+
+    Returns:
+        Liste ordonnée de tuples (début, fin) au format YYYY-MM-DD
+    """
+    start_d, end_d = _to_date(start), _to_date(end)
+    days = max(1, days)
+    windows = []
+    cur = start_d
+    while cur <= end_d:
+        win_end = min(cur + timedelta(days=days - 1), end_d)
+        windows.append((cur.isoformat(), win_end.isoformat()))
+        cur = win_end + timedelta(days=1)
+    return windows
+
+
+def _is_throttle_error(exc: Exception) -> bool:
+    return "429" in str(exc) or "Too Many Requests" in str(exc)
+
+
+class ParallelWindowFetcher:
+    """Tire des sous-fenêtres en parallèle et fusionne le résultat de façon déterministe."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, limiter: Optional[AdaptiveRateLimiter] = None):
+        self.max_workers = max(1, max_workers)
+        self.limiter = limiter or AdaptiveRateLimiter()
+
+    def call(self, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Exécute une requête (une page) sous le contrôle du limiteur.
+
+        Les 429 (déjà rejoués par la Session) réduisent le débit global et
+        la page est retentée ; toute autre erreur remonte telle quelle.
+        """
+        for attempt in range(PAGE_RETRIES + 1):
+            self.limiter.acquire()
+            t0 = time.monotonic()
+            try:
+                result = fn()
+            except ConnectionError as e:
+                if not _is_throttle_error(e) or attempt >= PAGE_RETRIES:
+                    raise
+                self.limiter.on_throttle()
+                continue
+            self.limiter.on_success(time.monotonic() - t0)
+            return result
+        raise ConnectionError("Gazelle: nombre maximal de tentatives atteint")
+
+    def fetch(
+        self,
+        windows: List[Tuple[str, str]],
+        fetch_window: Callable[[str, str], List[Dict[str, Any]]],
+        key: str = "id",
+    ) -> List[Dict[str, Any]]:
+        """
+        Exécute fetch_window(début, fin) pour chaque sous-fenêtre en parallèle.
+
+        Args:
+            windows: Sous-fenêtres ordonnées (voir split_date_window)
+            fetch_window: Fonction qui pagine UNE sous-fenêtre (doit passer
+                chaque page par self.call pour profiter du limiteur)
+            key: Champ servant au dédoublonnage (événements à cheval sur deux fenêtres)
+
+        Returns:
+            Liste fusionnée : ordre des fenêtres puis des pages, sans doublons
+        """
+        if not windows:
+            return []
+
+        t0 = time.monotonic()
+        workers = min(self.max_workers, len(windows))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gazelle-fetch") as pool:
+            futures = [pool.submit(fetch_window, start, end) for start, end in windows]
+            # result() dans l'ordre de soumission -> fusion déterministe
+            parts = [f.result() for f in futures]
+
+        merged = []
+        seen = set()
+        for part in parts:
+            for row in part or []:
+                row_key = row.get(key) if isinstance(row, dict) else None
+                if row_key is not None:
+                    if row_key in seen:
+                        continue
+                    seen.add(row_key)
+                merged.append(row)
+
+        stats = self.limiter.snapshot()
+        print(f"   ⚡ {len(windows)} fenêtres / {workers} workers: {len(merged)} éléments en "
+              f"{time.monotonic() - t0:.1f}s ({stats['requests']} requêtes, "
+              f"{stats['throttled']} x 429, débit final {stats['rate']} req/s)")
+        return merged
@@ -8,17 +8,175 @@ Ce service gère:
 - Gestion des erreurs avec retry logic
 - Mise à jour du sync_status dans Supabase
 
+push_batch pousse plusieurs pianos EN PARALLÈLE (GAZELLE_PUSH_WORKERS, défaut 4) :
+- toutes les requêtes GraphQL du service partagent un budget global
+  (AdaptiveRateLimiter, GAZELLE_PUSH_RATE req/s au départ, réduit sur 429) ;
+- un piano en échec est reprogrammé avec backoff exponentiel SANS bloquer les
+  autres (file de reprise, pas de time.sleep dans les workers) ;
+- chaque service a une clé d'idempotence (piano + note + date de complétion)
+  inscrite dans gazelle_push_ledger : un lot relancé réutilise l'événement déjà
+  créé au lieu d'en créer un second ;
+- progress_callback reçoit l'avancement après chaque piano.
+
 Usage:
     service = GazellePushService()
     result = service.push_batch(piano_ids=["ins_abc123", "ins_def456"])
 """
 
+import hashlib
+import heapq
+import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from core.gazelle_api_client import GazelleAPIClient
+from core.gazelle_parallel_fetch import AdaptiveRateLimiter
 from core.supabase_storage import SupabaseStorage
 
+PUSH_WORKERS = int(os.getenv("GAZELLE_PUSH_WORKERS", "4"))
+PUSH_RATE = float(os.getenv("GAZELLE_PUSH_RATE", "4"))
+LEDGER_TABLE = "gazelle_push_ledger"
+# Réservation 'pending' plus vieille que ça = worker mort : la clé passe en
+# 'unknown' (vérification manuelle), jamais reprise automatiquement
+PENDING_CLAIM_TTL = 600
+
+
+class _PushLedger:
+    """Registre d'idempotence : mémoire du processus + table gazelle_push_ledger.
+
+    Sans la table (migration non appliquée), seul le registre mémoire protège
+    les retries d'un même processus.
+    """
+
+    def __init__(self, supabase: SupabaseStorage):
+        self.supabase = supabase
+        self._lock = threading.Lock()
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._table_ok = True
+
+    def _table(self):
+        return self.supabase.client.table(LEDGER_TABLE)
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self._table_ok:
+            return None
+        try:
+            rows = self._table().select("*").eq("idempotency_key", key).limit(1).execute().data
+            return rows[0] if rows else None
+        except Exception as e:
+            print(f"⚠️  {LEDGER_TABLE} indisponible ({e}) — idempotence en mémoire seulement")
+            self._table_ok = False
+            return None
+
+    def claim(self, key: str, piano_id: str) -> Tuple[str, Optional[str]]:
+        """
+        Réserve la clé avant de créer l'événement Gazelle.
+
+        La réservation est un INSERT seul (ignore-duplicates) : si deux lots
+        réservent la même clé en même temps, un seul reçoit la ligne insérée.
+
+        Returns:
+            ('claimed', None)   -> à nous de pousser
+            ('pushed', event_id) -> déjà créé, réutiliser l'événement
+            ('busy', None)      -> un autre worker/lot pousse ce service
+            ('unknown', None)   -> réservation abandonnée (worker mort ou
+                                   enregistrement raté) : l'événement existe
+                                   peut-être, à vérifier dans Gazelle
+        """
+        with self._lock:
+            local = self._local.get(key)
+            if local and local["status"] == "pushed":
+                return "pushed", local["gazelle_event_id"]
+            if local:
+                return "busy", None
+            self._local[key] = {"status": "pending", "gazelle_event_id": None}
+
+        if not self._table_ok:
+            return "claimed", None
+        try:
+            inserted = self._table().upsert({
+                "idempotency_key": key,
+                "piano_id": piano_id,
+                "status": "pending",
+                "updated_at": datetime.now().astimezone().isoformat(),
+            }, on_conflict="idempotency_key", ignore_duplicates=True).execute().data
+        except Exception as e:
+            print(f"⚠️  {LEDGER_TABLE} indisponible ({e}) — idempotence en mémoire seulement")
+            self._table_ok = False
+            return "claimed", None
+        if inserted:
+            return "claimed", None
+
+        # Clé déjà présente : jamais reprise automatiquement
+        with self._lock:
+            self._local.pop(key, None)
+        row = self._read(key) or {}
+        if row.get("status") == "pushed" and row.get("gazelle_event_id"):
+            with self._lock:
+                self._local[key] = {"status": "pushed", "gazelle_event_id": row["gazelle_event_id"]}
+            return "pushed", row["gazelle_event_id"]
+        if row.get("status") == "pending":
+            try:
+                claimed_at = datetime.fromisoformat(
+                    str(row.get("updated_at") or row.get("created_at")).replace("Z", "+00:00"))
+                age = (datetime.now().astimezone() - claimed_at).total_seconds()
+            except (TypeError, ValueError):
+                age = PENDING_CLAIM_TTL
+            if age < PENDING_CLAIM_TTL:
+                return "busy", None
+            # Worker mort avant OU après la création de l'événement : on ne
+            # sait pas lequel, donc pas de nouvelle création.
+            self._mark_unknown(key)
+        return "unknown", None
+
+    def _mark_unknown(self, key: str, event_id: Optional[str] = None):
+        try:
+            self._table().update({
+                "status": "unknown",
+                "gazelle_event_id": event_id,
+                "updated_at": datetime.now().astimezone().isoformat(),
+            }).eq("idempotency_key", key).neq("status", "pushed").execute()
+        except Exception as e:
+            print(f"⚠️  Marquage 'unknown' {LEDGER_TABLE}: {e}")
+
+    def record(self, key: str, event_id: str):
+        """Événement Gazelle créé : à partir d'ici, plus jamais recréé.
+
+        Si l'écriture échoue, la ligne est marquée 'unknown' (avec l'id de
+        l'événement) plutôt que laissée 'pending', qui deviendrait reprenable.
+        """
+        with self._lock:
+            self._local[key] = {"status": "pushed", "gazelle_event_id": event_id}
+        if not self._table_ok:
+            return
+        for attempt in range(3):
+            try:
+                self._table().update({
+                    "status": "pushed",
+                    "gazelle_event_id": event_id,
+                    "updated_at": datetime.now().astimezone().isoformat(),
+                }).eq("idempotency_key", key).execute()
+                return
+            except Exception as e:
+                print(f"⚠️  Enregistrement {LEDGER_TABLE} ({event_id}), essai {attempt + 1}: {e}")
+                time.sleep(0.5 * (attempt + 1))
+        self._mark_unknown(key, event_id)
+
+    def release(self, key: str):
+        """Échec AVANT la création de l'événement : la clé redevient libre."""
+        with self._lock:
+            if (self._local.get(key) or {}).get("status") == "pushed":
+                return
+            self._local.pop(key, None)
+        if self._table_ok:
+            try:
+                self._table().delete().eq("idempotency_key", key).eq("status", "pending").execute()
+            except Exception as e:
+                print(f"⚠️  Libération {LEDGER_TABLE}: {e}")
+
 
 class GazellePushService:
     """Service pour push intelligent de pianos vers Gazelle."""
@@ -26,7 +184,16 @@ class GazellePushService:
     def __init__(self):
         """Initialise le service avec clients API."""
         self.api_client = GazelleAPIClient()
+        # Budget global de requêtes Gazelle, partagé par tous les workers du lot
+        self.api_client.rate_limiter = AdaptiveRateLimiter(rate=PUSH_RATE)
         self.supabase = SupabaseStorage()
+        self.ledger = _PushLedger(self.supabase)
+
+    @staticmethod
+    def idempotency_key(piano_id: str, service_note: str, completed_marker: Optional[str]) -> str:
+        """Clé stable d'un service : même piano + même note + même complétion = même clé."""
+        raw = f"{piano_id}|{service_note}|{completed_marker or datetime.now().date().isoformat()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
 
     def get_pianos_ready_for_push(
         self,
@@ -173,49 +340,55 @@ class GazellePushService:
             or datetime.now(MONTREAL_TZ).isoformat()
         )
 
+        # completed_at (ou la tournée) fixe la clé : updated_at bouge à chaque
+        # mark_piano_push_error et casserait l'idempotence entre deux lots.
+        idempotency_key = piano_data.get('idempotency_key') or self.idempotency_key(
+            piano_id, service_note, completed_at or piano_data.get('completed_in_tournee_id')
+        )
+
         if dry_run:
             return {
                 'status': 'success',
                 'piano_id': piano_id,
                 'message': 'Dry run - aucune action effectuée',
-                'service_note': service_note
+                'service_note': service_note,
+                'idempotency_key': idempotency_key
             }
 
-        try:
-            # 1. Récupérer client_id du piano
-            piano_query = """
-            query GetPianoClient($pianoId: String!) {
-                piano(id: $pianoId) {
-                    id
-                    client {
-                        id
-                    }
-                }
+        claim, existing_event_id = self.ledger.claim(idempotency_key, piano_id)
+        if claim == 'busy':
+            return {
+                'status': 'error',
+                'piano_id': piano_id,
+                'error': 'Push déjà en cours pour ce service (autre lot)',
+                'idempotency_key': idempotency_key,
+                'retryable': False
             }
-            """
-            piano_result = self.api_client._execute_query(piano_query, {"pianoId": piano_id})
-            piano_gql_data = piano_result.get("data", {}).get("piano", {})
-
-            if not piano_gql_data:
-                raise ValueError(f"Piano {piano_id} non trouvé dans Gazelle")
-
-            client_id = piano_gql_data.get("client", {}).get("id")
-            if not client_id:
-                raise ValueError(f"Piano {piano_id} n'a pas de client associé")
-
-            # 2. Push service note + measurements avec la date de complétion
-            result = self.api_client.push_technician_service_with_measurements(
-                piano_id=piano_id,
-                technician_note=service_note,
-                service_type="TUNING",
-                technician_id=technician_id,
-                client_id=client_id,
-                event_date=event_date  # Utiliser la date de complétion au lieu de maintenant
-            )
-
-            service_note_event = result['service_note']
-            measurement = result.get('measurement')
-            parsed_values = result.get('parsed_values')
+
+        if claim == 'unknown':
+            return {
+                'status': 'error',
+                'piano_id': piano_id,
+                'error': ("Réservation abandonnée dans gazelle_push_ledger : l'événement existe "
+                          "peut-être déjà, vérifier dans Gazelle puis corriger la ligne"),
+                'idempotency_key': idempotency_key,
+                'retryable': False
+            }
+
+        recorded = claim == 'pushed'
+        try:
+            if recorded:
+                # Événement déjà créé par une tentative précédente : ne pas le recréer
+                print(f"♻️  {piano_id}: événement {existing_event_id} déjà créé, réutilisé")
+                service_note_event = {'id': existing_event_id}
+                measurement = None
+                parsed_values = None
+            else:
+                service_note_event, measurement, parsed_values = self._create_gazelle_service(
+                    piano_id, service_note, technician_id, event_date
+                )
+                self.ledger.record(idempotency_key, service_note_event['id'])
+                recorded = True
 
             # 3. Mettre à jour sync_status dans Supabase
             self.supabase.client.rpc(
@@ -232,26 +405,70 @@ class GazellePushService:
                 'gazelle_event_id': service_note_event['id'],
                 'measurement_created': measurement is not None,
                 'parsed_values': parsed_values,
-                'service_note': service_note
+                'service_note': service_note,
+                'idempotency_key': idempotency_key,
+                'deduplicated': claim == 'pushed'
             }
 
         except Exception as e:
+            if not recorded:
+                self.ledger.release(idempotency_key)
             # Marquer comme erreur dans Supabase
             error_message = str(e)
-            self.supabase.client.rpc(
-                'mark_piano_push_error',
-                {
-                    'p_piano_id': piano_id,
-                    'p_error_message': error_message
-                }
-            ).execute()
+            try:
+                self.supabase.client.rpc(
+                    'mark_piano_push_error',
+                    {
+                        'p_piano_id': piano_id,
+                        'p_error_message': error_message
+                    }
+                ).execute()
+            except Exception as mark_err:
+                print(f"⚠️  mark_piano_push_error {piano_id}: {mark_err}")
 
             return {
                 'status': 'error',
                 'piano_id': piano_id,
-                'error': error_message
+                'error': error_message,
+                'idempotency_key': idempotency_key
             }
 
+    def _create_gazelle_service(self, piano_id: str, service_note: str,
+                                technician_id: str, event_date: str) -> Tuple[Dict, Optional[Dict], Optional[Dict]]:
+        """Crée l'événement de service (+ mesure) dans Gazelle. Returns (event, measurement, parsed_values)."""
+        # 1. Récupérer client_id du piano
+        piano_query = """
+        query GetPianoClient($pianoId: String!) {
+            piano(id: $pianoId) {
+                id
+                client {
+                    id
+                }
+            }
+        }
+        """
+        piano_result = self.api_client._execute_query(piano_query, {"pianoId": piano_id})
+        piano_gql_data = piano_result.get("data", {}).get("piano", {})
+
+        if not piano_gql_data:
+            raise ValueError(f"Piano {piano_id} non trouvé dans Gazelle")
+
+        client_id = piano_gql_data.get("client", {}).get("id")
+        if not client_id:
+            raise ValueError(f"Piano {piano_id} n'a pas de client associé")
+
+        # 2. Push service note + measurements avec la date de complétion
+        result = self.api_client.push_technician_service_with_measurements(
+            piano_id=piano_id,
+            technician_note=service_note,
+            service_type="TUNING",
+            technician_id=technician_id,
+            client_id=client_id,
+            event_date=event_date  # Utiliser la date de complétion au lieu de maintenant
+        )
+
+        return result['service_note'], result.get('measurement'), result.get('parsed_values')
+
     def push_batch(
         self,
         piano_ids: Optional[List[str]] = None,
@@ -259,10 +476,12 @@ class GazellePushService:
         technician_id: str = "usr_HcCiFk7o0vZ9xAI0",
         dry_run: bool = False,
         max_retries: int = 3,
-        retry_delay: float = 1.0
+        retry_delay: float = 1.0,
+        max_workers: int = PUSH_WORKERS,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> Dict[str, Any]:
         """
-        Push multiple pianos vers Gazelle avec retry logic.
+        Push multiple pianos vers Gazelle en parallèle avec retry logic.
 
         Args:
             piano_ids: Liste de piano IDs à pusher (prioritaire)
@@ -270,14 +489,18 @@ class GazellePushService:
             technician_id: ID du technicien
             dry_run: Si True, simule le push
             max_retries: Nombre de tentatives en cas d'erreur
-            retry_delay: Délai entre tentatives (secondes)
+            retry_delay: Délai avant la 1re reprise (secondes, doublé à chaque échec)
+            max_workers: Pianos poussés simultanément
+            progress_callback: Appelé après chaque piano terminé avec
+                {done, total, pushed, errors, piano_id, status}
 
         Returns:
             Dict avec:
                 - success: bool
                 - pushed_count: int
                 - error_count: int
-                - results: List[Dict]
+                - deduplicated_count: int (événements déjà créés, réutilisés)
+                - results: List[Dict] (dans l'ordre des pianos)
                 - summary: str
         """
         # 1. Récupérer pianos prêts pour push
@@ -295,85 +518,112 @@ class GazellePushService:
                 'summary': 'Aucun piano prêt pour push'
             }
 
-        results = []
-        pushed_count = 0
-        error_count = 0
-
-        # 2. Push chaque piano
-        for piano_data in pianos_to_push:
-            piano_id = piano_data['piano_id']
-            print(f"\n{'='*70}")
-            print(f"Push piano: {piano_id}")
-            print(f"{'='*70}")
+        total = len(pianos_to_push)
+        workers = max(1, min(max_workers, total))
+        results: Dict[int, Dict[str, Any]] = {}
+        attempts = [0] * total
+        progress = {'done': 0, 'total': total, 'pushed': 0, 'errors': 0}
+        t0 = time.monotonic()
 
-            # Retry logic
-            last_error = None
-            for attempt in range(1, max_retries + 1):
+        print(f"\n{'='*70}")
+        print(f"Push de {total} pianos ({workers} en parallèle)")
+        print(f"{'='*70}")
+
+        # 2. Push : file des pianos prêts + file de reprise (heap par échéance).
+        # Un piano en échec attend son backoff dans la file de reprise ; les
+        # workers continuent avec les autres pianos pendant ce temps.
+        ready = deque(range(total))
+        delayed: List[Tuple[float, int]] = []
+        running = {}
+
+        def _finish(idx: int, result: Dict[str, Any]):
+            results[idx] = result
+            progress['done'] += 1
+            if result['status'] == 'success':
+                progress['pushed'] += 1
+                suffix = f" → {result['gazelle_event_id']}" if result.get('gazelle_event_id') else ""
+                if result.get('deduplicated'):
+                    suffix += " (déjà créé)"
+                print(f"✅ [{progress['done']}/{total}] {result['piano_id']}{suffix}")
+            else:
+                progress['errors'] += 1
+                print(f"❌ [{progress['done']}/{total}] {result['piano_id']}: {result.get('error')} "
+                      f"(après {attempts[idx]} tentative(s))")
+            if progress_callback:
                 try:
-                    result = self.push_piano_to_gazelle(
-                        piano_data=piano_data,
+                    progress_callback({**progress, 'piano_id': result['piano_id'], 'status': result['status']})
+                except Exception as cb_err:
+                    print(f"⚠️  progress_callback: {cb_err}")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gazelle-push") as pool:
+            while ready or delayed or running:
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    ready.append(heapq.heappop(delayed)[1])
+
+                while ready and len(running) < workers:
+                    idx = ready.popleft()
+                    attempts[idx] += 1
+                    future = pool.submit(
+                        self.push_piano_to_gazelle,
+                        piano_data=pianos_to_push[idx],
                         technician_id=technician_id,
                         dry_run=dry_run
                     )
-
-                    if result['status'] == 'success':
-                        print(f"✅ Push réussi (tentative {attempt}/{max_retries})")
-                        if result.get('gazelle_event_id'):
-                            print(f"   Événement Gazelle: {result['gazelle_event_id']}")
-                        if result.get('measurement_created'):
-                            print(f"   Measurement créé: {result.get('parsed_values')}")
-
-                        results.append(result)
-                        pushed_count += 1
-                        break  # Succès, passer au piano suivant
-
-                    else:
-                        # Erreur API, retry
-                        last_error = result.get('error', 'Unknown error')
-                        print(f"⚠️  Erreur (tentative {attempt}/{max_retries}): {last_error}")
-
-                        if attempt < max_retries:
-                            # Backoff exponentiel
-                            delay = retry_delay * (2 ** (attempt - 1))
-                            print(f"   Retry dans {delay}s...")
-                            time.sleep(delay)
-                        else:
-                            # Max retries atteint
-                            print(f"❌ Échec après {max_retries} tentatives")
-                            results.append(result)
-                            error_count += 1
-
-                except Exception as e:
-                    last_error = str(e)
-                    print(f"❌ Exception (tentative {attempt}/{max_retries}): {last_error}")
-
-                    if attempt < max_retries:
-                        delay = retry_delay * (2 ** (attempt - 1))
-                        print(f"   Retry dans {delay}s...")
-                        time.sleep(delay)
-                    else:
-                        results.append({
-                            'status': 'error',
-                            'piano_id': piano_id,
-                            'error': last_error
-                        })
-                        error_count += 1
+                    running[future] = idx
+
+                timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+                if not running:
+                    # Seulement des reprises en attente : rien d'autre à faire
+                    time.sleep(timeout or 0)
+                    continue
+
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = running.pop(future)
+                    piano_id = pianos_to_push[idx]['piano_id']
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'status': 'error', 'piano_id': piano_id, 'error': str(e)}
+
+                    if (result['status'] == 'success'
+                            or attempts[idx] >= max_retries
+                            or result.get('retryable') is False):
+                        _finish(idx, result)
+                        continue
+
+                    # Backoff exponentiel, sans bloquer les autres pianos
+                    delay = retry_delay * (2 ** (attempts[idx] - 1))
+                    print(f"⚠️  {piano_id}: {result.get('error', 'Unknown error')} "
+                          f"(tentative {attempts[idx]}/{max_retries}) — reprise dans {delay:.0f}s")
+                    heapq.heappush(delayed, (time.monotonic() + delay, idx))
+
+        ordered = [results[idx] for idx in range(total)]
+        pushed_count = progress['pushed']
+        error_count = progress['errors']
+        deduplicated_count = sum(1 for r in ordered if r.get('deduplicated'))
 
         # 3. Résumé
-        summary = f"{pushed_count}/{len(pianos_to_push)} pianos pushés avec succès"
+        summary = f"{pushed_count}/{total} pianos pushés avec succès"
         if error_count > 0:
             summary += f", {error_count} erreurs"
+        if deduplicated_count:
+            summary += f", {deduplicated_count} déjà créés (non dupliqués)"
 
+        limiter = self.api_client.rate_limiter.snapshot() if self.api_client.rate_limiter else {}
         print(f"\n{'='*70}")
-        print(f"RÉSUMÉ: {summary}")
+        print(f"RÉSUMÉ: {summary} en {time.monotonic() - t0:.1f}s "
+              f"({limiter.get('requests', 0)} requêtes Gazelle, {limiter.get('throttled', 0)} x 429)")
         print(f"{'='*70}\n")
 
         return {
             'success': error_count == 0,
             'pushed_count': pushed_count,
             'error_count': error_count,
-            'total_pianos': len(pianos_to_push),
-            'results': results,
+            'deduplicated_count': deduplicated_count,
+            'total_pianos': total,
+            'results': ordered,
             'summary': summary
         }
 
@@ -0,0 +1,166 @@
+"""
+Couche HTTP partagée (pool de connexions keep-alive) pour Supabase et Gazelle.
+
+Avant : chaque appel passait par requests.get/post au niveau module, sans
+Session -> une poignée de main TCP+TLS complète à CHAQUE requête (≈100-300 ms
+vers Supabase/Gazelle depuis Render). Ici : une Session unique par processus,
+avec un pool borné par hôte, un timeout par défaut, et un retry avec backoff
+sur 429/5xx.
+
+Règle de retry : seules les requêtes idempotentes sont rejouées (GET, HEAD,
+PUT, DELETE, OPTIONS). Un POST peut l'être en passant idempotent=True
+(ex: UPSERT merge-duplicates, requête GraphQL de lecture) — jamais par défaut,
+pour ne pas doubler une mutation Gazelle.
+
+Usage:
+    from core.http_session import get_session, get_http_stats
+    session = get_session()
+    resp = session.get(url, headers=headers)
+    resp = session.post(url, json=rows, headers=headers, idempotent=True)
+    print(get_http_stats())  # latences / connexions ouvertes par hôte
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("ptm.http")
+
+# Taille du pool par hôte (connexions gardées ouvertes) et nombre d'hôtes
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+# Timeout par défaut (connexion, lecture) si l'appelant n'en donne pas
+DEFAULT_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "60")),
+)
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5  # secondes : 0.5, 1, 2...
+BACKOFF_MAX = 10.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+
+class PooledSession(requests.Session):
+    """Session requests avec pool borné, timeout par défaut, retry et métriques."""
+
+    def __init__(self):
+        super().__init__()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            pool_block=False,
+            max_retries=0,  # les retries sont gérés ci-dessous (backoff + métriques)
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self._adapter = adapter
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def request(self, method, url, *args, idempotent: Optional[bool] = None, **kwargs):
+        """Exécute la requête avec timeout par défaut et retry sur 429/5xx."""
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        method_upper = str(method).upper()
+        retryable = idempotent if idempotent is not None else method_upper in IDEMPOTENT_METHODS
+        host = urlsplit(url).netloc
+
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, time.perf_counter() - t0, error=True)
+                if not retryable or attempt >= MAX_RETRIES:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method_upper} {host}: {type(e).__name__}, retry {attempt + 1}/{MAX_RETRIES} dans {delay:.1f}s")
+            else:
+                self._record(host, time.perf_counter() - t0, error=response.status_code >= 500)
+                if response.status_code not in RETRY_STATUSES or not retryable or attempt >= MAX_RETRIES:
+                    return response
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"{method_upper} {host}: HTTP {response.status_code}, retry {attempt + 1}/{MAX_RETRIES} dans {delay:.1f}s")
+                response.close()
+
+            attempt += 1
+            with self._stats_lock:
+                self._stats[host]["retries"] += 1
+            time.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Délai avant le prochain essai (Retry-After prioritaire, sinon exponentiel)."""
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        return min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+
+    def _record(self, host: str, elapsed: float, error: bool = False):
+        with self._stats_lock:
+            s = self._stats.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0,
+                "total_ms": 0.0, "max_ms": 0.0,
+            })
+            ms = elapsed * 1000
+            s["requests"] += 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+            if error:
+                s["errors"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Compteurs par hôte : requêtes, erreurs, retries, latences, connexions ouvertes.
+
+        connections_opened << requests = les poignées de main TLS économisées.
+        """
+        opened = {}
+        try:
+            for key in list(self._adapter.poolmanager.pools.keys()):
+                pool = self._adapter.poolmanager.pools[key]
+                opened[pool.host] = opened.get(pool.host, 0) + getattr(pool, "num_connections", 0)
+        except Exception:
+            pass
+
+        with self._stats_lock:
+            result = {}
+            for host, s in self._stats.items():
+                result[host] = {
+                    "requests": s["requests"],
+                    "errors": s["errors"],
+                    "retries": s["retries"],
+                    "avg_ms": round(s["total_ms"] / s["requests"], 1) if s["requests"] else 0.0,
+                    "max_ms": round(s["max_ms"], 1),
+                    "connections_opened": opened.get(host.split(":")[0], 0),
+                }
+            return result
+
+
+_session: Optional[PooledSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> PooledSession:
+    """Retourne la session HTTP partagée du processus (singleton)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession()
+    return _session
+
+
+def get_http_stats() -> Dict[str, Dict[str, Any]]:
+    """Métriques de la session partagée (vide si aucun appel encore)."""
+    if _session is None:
+        return {}
+    return _session.stats()
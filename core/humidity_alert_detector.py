@@ -5,9 +5,11 @@ Cherche des mots-clés indiquant des problèmes d'humidité dans les rapports.
 """
 
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Tuple
 from datetime import datetime
 
+from core.keyword_matcher import KeywordMatcher
+
 
 # Mots-clés indicateurs de problèmes d'humidité
 HUMIDITY_KEYWORDS = {
@@ -42,6 +44,28 @@ HUMIDITY_KEYWORDS = {
 }
 
 
+def _required_literals(pattern: str) -> Set[str]:
+    """Morceaux littéraux (2+ caractères) que toute correspondance doit contenir."""
+    literals = set()
+    for piece in pattern.split(".*"):
+        for run in re.split(r"\[[^\]]*\]", piece):
+            if len(run) >= 2 and not re.search(r"[.*+?()|\\^${}]", run):
+                literals.add(run)
+    return literals
+
+
+# Regex compilées une fois + littéraux requis : l'automate élimine en un
+# passage les motifs impossibles, seules les regex plausibles sont évaluées.
+_COMPILED_PATTERNS: List[Tuple[str, str, Any, Set[str]]] = [
+    (alert_type, pattern, re.compile(pattern, re.IGNORECASE), _required_literals(pattern))
+    for alert_type, patterns in HUMIDITY_KEYWORDS.items()
+    for pattern in patterns
+]
+_LITERAL_MATCHER = KeywordMatcher(
+    literal for _, _, _, literals in _COMPILED_PATTERNS for literal in literals
+)
+
+
 def detect_humidity_issue(notes: str) -> Optional[Dict[str, Any]]:
     """
     Détecte si les notes du technicien mentionnent un problème d'humidité.
@@ -61,25 +85,28 @@ def detect_humidity_issue(notes: str) -> Optional[Dict[str, Any]]:
         return None
 
     notes_lower = notes.lower()
-
-    # Vérifier chaque catégorie de mots-clés
-    for alert_type, patterns in HUMIDITY_KEYWORDS.items():
-        for pattern in patterns:
-            match = re.search(pattern, notes_lower, re.IGNORECASE)
-            if match:
-                # Déterminer la sévérité
-                severity = "warning"
-                if alert_type in ["dampp_chaser", "cover_removed"]:
-                    severity = "critical"  # Problèmes structurels plus graves
-                elif "9[0-9]%" in pattern or "[12][0-9]%" in pattern:
-                    severity = "critical"  # Humidité extrême
-
-                return {
-                    "alert_type": alert_type,
-                    "matched_pattern": match.group(0),
-                    "severity": severity,
-                    "detected_at": datetime.utcnow().isoformat()
-                }
+    # casefold : IGNORECASE apparie aussi des variantes (ex. "ſ" long) que lower() garde
+    present = _LITERAL_MATCHER.matched(notes_lower.casefold())
+
+    # Vérifier chaque catégorie de mots-clés (même ordre qu'avant)
+    for alert_type, pattern, regex, literals in _COMPILED_PATTERNS:
+        if not literals <= present:
+            continue
+        match = regex.search(notes_lower)
+        if match:
+            # Déterminer la sévérité
+            severity = "warning"
+            if alert_type in ["dampp_chaser", "cover_removed"]:
+                severity = "critical"  # Problèmes structurels plus graves
+            elif "9[0-9]%" in pattern or "[12][0-9]%" in pattern:
+                severity = "critical"  # Humidité extrême
+
+            return {
+                "alert_type": alert_type,
+                "matched_pattern": match.group(0),
+                "severity": severity,
+                "detected_at": datetime.utcnow().isoformat()
+            }
 
     return None
 
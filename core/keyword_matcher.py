@@ -0,0 +1,143 @@
+"""
+Automate multi-mots-clés (Aho-Corasick) partagé par les détecteurs d'alertes
+humidité (HumidityScanner.detect_issue, core/humidity_alert_detector.py).
+
+Avant : chaque note était relue une fois PAR mot-clé (`kw in texte`, ~100
+mots-clés entre problèmes, résolutions et contextes) et les regex étaient
+recompilées/relues à chaque appel.
+
+Ici : l'automate est construit une fois, puis déplié en table de
+transitions complète (aucun retour par lien d'échec pendant la lecture) ;
+un seul passage sur la note donne TOUTES les occurrences (chevauchantes
+comprises) avec leurs positions.
+Les détecteurs consultent ensuite l'ensemble des mots trouvés dans l'ordre
+de leur configuration : résultats identiques à l'ancien balayage.
+
+Pliage des accents optionnel (fold_accents=True, ou "fold_accents": true
+dans config/alerts/config.json) : "enlevee" trouve alors "enlevée". Désactivé
+par défaut pour garder exactement les mêmes détections.
+
+Usage:
+    matcher = KeywordMatcher(["housse enlevée", "pls débranché"])
+    matcher.find_all("Housse enlevée, PLS débranché")
+    # -> [(0, 14, "housse enlevée"), (16, 29, "pls débranché")]
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def fold_accents(text: str) -> str:
+    """Retire les accents caractère par caractère (MÊME longueur que le texte)."""
+    out = []
+    for ch in text:
+        decomposed = unicodedata.normalize("NFKD", ch)
+        out.append(decomposed[0] if decomposed else ch)
+    return "".join(out)
+
+
+class KeywordMatcher:
+    """Automate Aho-Corasick sur des mots-clés en minuscules."""
+
+    def __init__(self, keywords: Iterable[str], fold: bool = False):
+        self.fold = fold
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for keyword in dict.fromkeys(k for k in keywords if k):
+            self._add(keyword)
+        self._build_links()
+        self._build_table()
+
+    def normalize(self, text: str) -> str:
+        """Minuscules (+ pliage des accents si activé), comme les mots-clés."""
+        text = text.lower()
+        return fold_accents(text) if self.fold else text
+
+    def _add(self, keyword: str):
+        node = 0
+        for ch in self.normalize(keyword):
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(keyword)
+
+    def _build_links(self):
+        # Parcours en largeur : lien d'échec = plus long suffixe propre présent
+        self._bfs_order = [0]
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            self._bfs_order.append(node)
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _build_table(self):
+        # Transitions complètes état -> caractère -> état (absent = racine),
+        # en ordre de profondeur : l'état d'échec est toujours déjà calculé.
+        alphabet = {ch for edges in self._goto for ch in edges}
+        table: List[Dict[str, int]] = [{} for _ in self._goto]
+        for node in self._bfs_order:
+            edges = self._goto[node]
+            for ch in alphabet:
+                if ch in edges:
+                    table[node][ch] = edges[ch]
+                elif node:
+                    target = table[self._fail[node]].get(ch, 0)
+                    if target:
+                        table[node][ch] = target
+        self._step = [edges.get for edges in table]
+        self._outputs = {node: out for node, out in enumerate(self._out) if out}
+
+    def _scan(self, text: str):
+        step, outputs = self._step, self._outputs
+        node = 0
+        for i, ch in enumerate(text):
+            node = step[node](ch, 0)
+            if node in outputs:
+                yield i, outputs[node]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Toutes les occurrences en un passage.
+
+        Returns:
+            [(début, fin, mot-clé), ...] triées par position de fin ; positions
+            dans le texte normalisé (identiques au texte d'origine sauf rares
+            caractères dont la minuscule change de longueur).
+        """
+        if not text:
+            return []
+        hits = []
+        for end, keywords in self._scan(self.normalize(text)):
+            for keyword in keywords:
+                length = len(self.normalize(keyword))
+                hits.append((end + 1 - length, end + 1, keyword))
+        return hits
+
+    def matched(self, text: str) -> Set[str]:
+        """Ensemble des mots-clés présents dans le texte (sans positions)."""
+        if not text:
+            return set()
+        # Boucle dédiée (sans générateur) : c'est le chemin chaud des détecteurs
+        step, outputs = self._step, self._outputs
+        found: Set[str] = set()
+        node = 0
+        for ch in self.normalize(text):
+            node = step[node](ch, 0)
+            if node in outputs:
+                found.update(outputs[node])
+        return found
@@ -0,0 +1,352 @@
+"""
+Passerelle partagée pour les appels Claude (messages.create).
+
+Avant : chaque module créait son client Anthropic et rappelait l'IA pour des
+prompts identiques (rescan humidité, retry de sync PDA, même note relue par
+le notifier de retards, même question de chat). Chaque rescan coûtait autant
+que le premier passage.
+
+Ici :
+- Cache adressé par contenu : clé = sha256(modèle, system, messages, outils,
+  paramètres) après normalisation des espaces (un prompt qui ne diffère que
+  par l'indentation ou des espaces de fin de ligne tombe sur la même clé).
+- Deux niveaux : LRU en mémoire (LLM_CACHE_MAX_ENTRIES) + fichier SQLite
+  local (LLM_CACHE_PATH, vide = mémoire seulement), chaque entrée avec un
+  TTL (LLM_CACHE_TTL, défaut 7 jours ; cache_ttl=0 à l'appel = pas de cache).
+- Coalescence : deux threads qui envoient le même prompt en même temps ne
+  font qu'UN appel ; le second attend le résultat du premier.
+- Comptabilité par call_site : appels, hits, coalescés, erreurs, tokens
+  in/out, latence — exposée dans /health.
+
+Les réponses tronquées (stop_reason=max_tokens) ne sont pas mises en cache.
+
+Usage:
+    from core.llm_gateway import get_llm_gateway
+
+    response = get_llm_gateway().create(
+        "humidity_scanner",
+        model="claude-haiku-4-5-20251001",
+        max_tokens=200,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    text = response.content[0].text
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "llm_cache.sqlite"
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(_DEFAULT_PATH))
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "20000"))
+
+# Élagage du fichier SQLite toutes les N écritures
+_PRUNE_EVERY = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY, call_site TEXT, value TEXT NOT NULL,
+    created_at REAL NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used);
+"""
+
+_gateway: Optional["LLMGateway"] = None
+_gateway_lock = threading.Lock()
+
+
+def _normalize_text(text: str) -> str:
+    """Espaces de fin de ligne retirés, espaces/tabulations et lignes vides multiples réduits."""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _normalize(value: Any) -> Any:
+    """Normalise récursivement les textes d'un system/messages."""
+    if isinstance(value, str):
+        return _normalize_text(value)
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """Empreinte stable d'un appel messages.create (paramètres normalisés)."""
+    payload = dict(params)
+    for field in ("system", "messages"):
+        if field in payload:
+            payload[field] = _normalize(payload[field])
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _block_to_dict(block: Any) -> Dict[str, Any]:
+    if hasattr(block, "model_dump"):
+        return block.model_dump()
+    if isinstance(block, dict):
+        return dict(block)
+    return {k: v for k, v in vars(block).items() if not k.startswith("_")}
+
+
+def _serialize(response: Any) -> Dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    return {
+        "model": getattr(response, "model", None),
+        "stop_reason": getattr(response, "stop_reason", None),
+        "content": [_block_to_dict(b) for b in (getattr(response, "content", None) or [])],
+        "usage": {
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        },
+    }
+
+
+def _deserialize(value: Dict[str, Any]) -> SimpleNamespace:
+    """Réponse rejouée depuis le cache : mêmes attributs que l'objet du SDK."""
+    return SimpleNamespace(
+        model=value.get("model"),
+        stop_reason=value.get("stop_reason"),
+        content=[SimpleNamespace(**block) for block in value.get("content") or []],
+        usage=SimpleNamespace(**(value.get("usage") or {})),
+        from_cache=True,
+    )
+
+
+class _Inflight:
+    """Appel en cours partagé entre threads (coalescence)."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMGateway:
+    """Cache + coalescence + comptabilité autour de client.messages.create."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL,
+                 max_entries: int = MAX_MEMORY_ENTRIES):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, _Inflight] = {}
+        self._client = None
+        self._conn = None
+        self._disk_lock = threading.Lock()
+        self._writes = 0
+        self._sites: Dict[str, Dict[str, float]] = {}
+
+    # ------------------------------------------------------------ client
+    def _default_client(self):
+        if self._client is None:
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise RuntimeError("ANTHROPIC_API_KEY non configurée")
+            from anthropic import Anthropic
+            self._client = Anthropic(api_key=api_key)
+        return self._client
+
+    # ------------------------------------------------------------- disque
+    def _disk(self):
+        if self.path is None:
+            return None
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                self._conn = conn
+            except Exception as e:
+                logging.warning(f"⚠️ Cache LLM sur disque désactivé ({self.path}): {e}")
+                self.path = None
+                return None
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._disk_lock:
+            conn = self._disk()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key=?", (key,)
+                ).fetchone()
+                if not row:
+                    return None
+                if row[1] < time.time():
+                    conn.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE llm_cache SET last_used=? WHERE key=?", (time.time(), key))
+                conn.commit()
+                return json.loads(row[0]), row[1]
+            except Exception as e:
+                logging.warning(f"⚠️ Lecture cache LLM: {e}")
+                return None
+
+    def _disk_put(self, key: str, call_site: str, value: Dict[str, Any], expires_at: float):
+        with self._disk_lock:
+            conn = self._disk()
+            if conn is None:
+                return
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, call_site, json.dumps(value, ensure_ascii=False, default=str),
+                     now, expires_at, now),
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+                    conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache "
+                        "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (MAX_DISK_ENTRIES,),
+                    )
+                conn.commit()
+            except Exception as e:
+                logging.warning(f"⚠️ Écriture cache LLM: {e}")
+
+    # ------------------------------------------------------------ mémoire
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                if entry[0] >= time.time():
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+        entry = self._disk_get(key)
+        if entry is None:
+            return None
+        self._remember(key, entry[0], entry[1])
+        return entry[0]
+
+    def _remember(self, key: str, value: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # -------------------------------------------------------- comptabilité
+    def _record(self, call_site: str, outcome: str, latency: float = 0.0, response: Any = None):
+        usage = getattr(response, "usage", None) if response is not None else None
+        with self._lock:
+            site = self._sites.setdefault(call_site, {
+                "calls": 0, "api_calls": 0, "cache_hits": 0, "coalesced": 0, "errors": 0,
+                "input_tokens": 0, "output_tokens": 0, "latency_ms": 0.0,
+            })
+            site["calls"] += 1
+            site[outcome] += 1
+            if outcome == "api_calls":
+                site["input_tokens"] += getattr(usage, "input_tokens", 0) or 0
+                site["output_tokens"] += getattr(usage, "output_tokens", 0) or 0
+                site["latency_ms"] += latency * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs par call_site (tokens, latence moyenne, taux de hit), pour /health."""
+        with self._lock:
+            sites = {}
+            for name, s in self._sites.items():
+                api_calls = s["api_calls"]
+                sites[name] = {
+                    **{k: v for k, v in s.items() if k != "latency_ms"},
+                    "avg_latency_ms": round(s["latency_ms"] / api_calls) if api_calls else 0,
+                    "hit_rate": round((s["cache_hits"] + s["coalesced"]) / s["calls"], 3) if s["calls"] else 0.0,
+                }
+            return {
+                "memory_entries": len(self._memory),
+                "disk": str(self.path) if self.path else None,
+                "call_sites": sites,
+            }
+
+    # -------------------------------------------------------------- appel
+    def create(self, call_site: str, *, client: Any = None,
+               cache_ttl: Optional[float] = None, **params) -> Any:
+        """
+        Équivalent de client.messages.create(**params), avec cache et coalescence.
+
+        Args:
+            call_site: Nom de l'appelant (comptabilité), ex: "humidity_scanner"
+            client: Client Anthropic existant (sinon client partagé, ANTHROPIC_API_KEY)
+            cache_ttl: Durée de vie en secondes (défaut LLM_CACHE_TTL, 0 = pas de cache)
+            **params: Paramètres de messages.create (model, max_tokens, system, messages...)
+
+        Returns:
+            La réponse du SDK, ou un équivalent (content/usage/stop_reason,
+            from_cache=True) rejoué depuis le cache.
+
+        Les exceptions de l'API remontent à l'appelant (et aux appels coalescés).
+        """
+        ttl = self.ttl if cache_ttl is None else cache_ttl
+        key = cache_key(params)
+
+        if ttl > 0:
+            cached = self._lookup(key)
+            if cached is not None:
+                self._record(call_site, "cache_hits")
+                return _deserialize(cached)
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _Inflight()
+
+        if not leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                self._record(call_site, "errors")
+                raise inflight.error
+            self._record(call_site, "coalesced")
+            return inflight.response
+
+        t0 = time.perf_counter()
+        try:
+            response = (client or self._default_client()).messages.create(**params)
+        except BaseException as e:
+            inflight.error = e
+            self._record(call_site, "errors")
+            raise
+        else:
+            inflight.response = response
+            self._record(call_site, "api_calls", time.perf_counter() - t0, response)
+            if ttl > 0 and getattr(response, "stop_reason", None) != "max_tokens":
+                value = _serialize(response)
+                expires_at = time.time() + ttl
+                self._remember(key, value, expires_at)
+                self._disk_put(key, call_site, value, expires_at)
+            return response
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.done.set()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Retourne la passerelle partagée (singleton)."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
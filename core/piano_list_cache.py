@@ -0,0 +1,221 @@
+"""
+Cache en mémoire (stale-while-revalidate) des listes de pianos fusionnées
+servies par /{institution}/pianos et /vincent-dindy/pianos.
+
+Avant : chaque chargement de page relançait une requête allPianos Gazelle,
+puis relisait les overlays (vincent_dindy_piano_updates) et les fiches de
+service (piano_service_records). En tournée, les techniciens rechargent ces
+pages sans arrêt.
+
+Modèle :
+- Entrée fraîche (< PIANO_CACHE_TTL, défaut 60 s) : servie depuis la mémoire.
+- Entrée périmée : servie IMMÉDIATEMENT, et un rafraîchissement est lancé en
+  arrière-plan (un seul à la fois par clé).
+- Entrée trop vieille (> PIANO_CACHE_MAX_STALE, défaut 15 min) ou absente :
+  chargement synchrone ; les requêtes simultanées attendent le même chargement.
+- Écriture (update_piano, fiches de service) : invalidate(slug) supprime les
+  entrées de l'institution ; un rafraîchissement en vol lancé AVANT
+  l'invalidation ne réécrit pas sa donnée périmée (numéro de génération).
+
+Usage:
+    from core.piano_list_cache import get_piano_list_cache, invalidates_piano_list
+
+    return get_piano_list_cache().get(("orford", "pianos", False), lambda: _load(...))
+
+    @router.put("/{institution}/pianos/{piano_id}")
+    @offload_blocking
+    @invalidates_piano_list()
+    def update_institution_piano(institution: str, ...): ...
+"""
+
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+TTL_SECONDS = float(os.getenv("PIANO_CACHE_TTL", "60"))
+MAX_STALE_SECONDS = float(os.getenv("PIANO_CACHE_MAX_STALE", "900"))
+
+_cache: Optional["StaleWhileRevalidateCache"] = None
+_cache_lock = threading.Lock()
+
+
+class StaleWhileRevalidateCache:
+    """Cache clé -> valeur, rafraîchi en arrière-plan après expiration du TTL.
+
+    Les clés sont des tuples dont le premier élément est le slug de
+    l'institution (sert à l'invalidation).
+    """
+
+    def __init__(self, ttl: float = TTL_SECONDS, max_stale: float = MAX_STALE_SECONDS):
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._refreshing: set = set()
+        self._generation: Dict[str, int] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0,
+                       "refreshes": 0, "refresh_errors": 0, "invalidations": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _store(self, key: Hashable, value: Any, generation: int):
+        with self._lock:
+            # Invalidation survenue pendant le chargement -> donnée possiblement périmée
+            if self._generation.get(key[0], 0) == generation:
+                self._entries[key] = (time.monotonic(), value)
+
+    def is_fresh(self, key: Hashable) -> bool:
+        """True si la clé est en cache et plus jeune que le TTL (sans compter de hit)."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return bool(entry) and time.monotonic() - entry[0] < self.ttl
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Retourne la valeur en cache, ou la charge via loader().
+
+        Les exceptions du loader (ex: HTTPException) remontent à l'appelant
+        lors d'un chargement synchrone ; en arrière-plan, la valeur périmée
+        est conservée.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self._count("hits")
+                return entry[1]
+            if age < self.max_stale:
+                self._count("stale_hits")
+                self._refresh_in_background(key, loader)
+                return entry[1]
+
+        # Absente ou trop vieille : un seul chargement, les autres attendent
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+                generation = self._generation.get(key[0], 0)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._count("hits")
+                return entry[1]
+            self._count("misses")
+            value = loader()
+            self._store(key, value, generation)
+            return value
+
+    def load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Charge la valeur via loader() et remplace l'entrée, même fraîche ou
+        périmée (ex: données Gazelle déjà récupérées en lot par l'appelant).
+        """
+        with self._key_lock(key):
+            with self._lock:
+                generation = self._generation.get(key[0], 0)
+            value = loader()
+            self._store(key, value, generation)
+            self._count("refreshes")
+            return value
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            generation = self._generation.get(key[0], 0)
+
+        def _run():
+            try:
+                with self._key_lock(key):
+                    value = loader()
+                self._store(key, value, generation)
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_errors")
+                logging.warning(f"⚠️ Rafraîchissement cache pianos {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_run, name="piano-cache-refresh", daemon=True).start()
+
+    def invalidate(self, slug: Optional[str] = None):
+        """Supprime les entrées d'une institution (toutes si slug=None)."""
+        with self._lock:
+            if slug is None:
+                for s in {k[0] for k in self._entries} | set(self._generation):
+                    self._generation[s] = self._generation.get(s, 0) + 1
+                self._entries.clear()
+            else:
+                self._generation[slug] = self._generation.get(slug, 0) + 1
+                for key in [k for k in self._entries if k[0] == slug]:
+                    del self._entries[key]
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs hit/miss, pour /health."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+            hit_rate = (self._stats["hits"] + self._stats["stale_hits"]) / lookups if lookups else 0.0
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": round(hit_rate, 3),
+                "ttl_s": self.ttl,
+            }
+
+
+def get_piano_list_cache() -> StaleWhileRevalidateCache:
+    """Retourne le cache partagé (singleton)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StaleWhileRevalidateCache()
+    return _cache
+
+
+def invalidates_piano_list(slug: Optional[str] = None, param: str = "institution") -> Callable:
+    """
+    Décorateur de route d'écriture : invalide le cache de l'institution
+    après l'exécution (succès ou erreur — l'écriture a pu être partielle).
+
+    Args:
+        slug: Institution fixe (ex: "vincent-dindy"), sinon lue dans le
+            paramètre `param` de la route
+        param: Nom du paramètre de route contenant le slug
+
+    functools.wraps conserve la signature pour FastAPI.
+    """
+    def decorator(fn: Callable) -> Callable:
+        def _invalidate(kwargs):
+            get_piano_list_cache().invalidate(slug or kwargs.get(param))
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _invalidate(kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _invalidate(kwargs)
+        return wrapper
+
+    return decorator
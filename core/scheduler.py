@@ -593,6 +593,22 @@ def task_process_late_assignment_queue():
         raise
 
 
+def task_refresh_client_search_index():
+    """
+    Rafraîchit l'index local de recherche client (api/chat/client_index.py).
+
+    La sync de production tourne sur GitHub Actions : son hook ne touche pas
+    l'index de l'API. Toutes les 5 minutes, l'API relit elle-même les
+    clients/pianos/timeline modifiés (seulement si l'index existe ici).
+    """
+    from api.chat.client_index import get_client_search_index
+    from core.supabase_storage import get_shared_storage
+
+    index = get_client_search_index()
+    if index.exists():
+        index.refresh_in_background(get_shared_storage())
+
+
 def task_sync_appointments_only(triggered_by='scheduler', user_email=None):
     """
     16:30 - Sync Appointments uniquement
@@ -726,7 +742,7 @@ def task_rappel_validation():
 
     try:
         import os
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         from core.email_notifier import EmailNotifier
 
         sb_url = os.getenv("SUPABASE_URL")
@@ -735,7 +751,7 @@ def task_rappel_validation():
             print("⚠️ Config Supabase manquante, rappel annulé")
             return
 
-        sb = create_client(sb_url, sb_key)
+        sb = get_supabase_client(sb_url, sb_key)
 
         # Chercher fiches completed (en attente de validation)
         response = (
@@ -911,6 +927,17 @@ def configure_jobs(scheduler: BackgroundScheduler):
     )
     print("   ✅ Toutes les 5 min - Traitement Late Assignment configurée")
 
+    # Toutes les 5 minutes - Rafraîchissement incrémental de l'index de recherche client
+    scheduler.add_job(
+        task_refresh_client_search_index,
+        trigger=CronTrigger(minute='*/5', timezone='America/Montreal'),
+        id='client_search_index_refresh',
+        name='Rafraîchissement index recherche client (toutes les 5 min)',
+        replace_existing=True,
+        max_instances=1
+    )
+    print("   ✅ Toutes les 5 min - Rafraîchissement index recherche client configuré")
+
     # 09:00 - RELANCE LOUISE (J-7)
     scheduler.add_job(
         task_relance_louise_j7,
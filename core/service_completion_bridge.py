@@ -268,7 +268,7 @@ def get_supported_institutions() -> list[str]:
     """Retourne la liste des institutions supportées."""
     # Charger depuis la table Supabase institutions
     try:
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
         import os
         import logging
         
@@ -279,7 +279,7 @@ def get_supported_institutions() -> list[str]:
             print("⚠️  Configuration Supabase manquante pour liste institutions")
             return []
         
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client(supabase_url, supabase_key)
         response = supabase.table('institutions').select('slug').eq('active', True).execute()
         
         return [inst['slug'] for inst in response.data]
@@ -0,0 +1,253 @@
+"""
+Cache en mémoire de la table system_settings (feature flags, clés API,
+dates d'alerte, seuils), rafraîchi en arrière-plan.
+
+Avant : is_enabled() relançait un GET Supabase toutes les 60 s DEPUIS la
+requête qui tombait sur l'expiration, et get_system_setting() faisait un
+aller-retour (avec retries) à chaque lecture de clé API ou de date d'alerte.
+
+Ici :
+- Toute la table est chargée en UNE requête, puis rechargée par un thread
+  de fond toutes les SETTINGS_REFRESH_SECONDS (défaut 60 s).
+- Les lectures ne touchent jamais le réseau ; seule la toute première
+  lecture du processus attend le chargement initial (au plus
+  SETTINGS_INITIAL_WAIT secondes), normalement déjà fait au démarrage.
+- TTL par clé : get(key, max_age=10) déclenche un rechargement de fond si
+  la valeur est plus vieille, sans attendre.
+- save_system_setting / delete_system_setting / get_system_setting
+  mettent le cache à jour (écriture traversante) ; on_change(prefix, cb)
+  prévient les abonnés quand une valeur change (écriture ou rechargement).
+
+Usage:
+    from core.settings_cache import get_settings_cache
+
+    settings = get_settings_cache()
+    if settings.get_bool("flag_pda_v6_matcher"):
+        ...
+    api_key = settings.get_str("google_maps_api_key")
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REFRESH_SECONDS = float(os.getenv("SETTINGS_REFRESH_SECONDS", "60"))
+INITIAL_WAIT_SECONDS = float(os.getenv("SETTINGS_INITIAL_WAIT", "5"))
+
+_MISSING = object()
+_TRUE_VALUES = ("true", "1", "yes", "on", "oui")
+
+_cache: Optional["SettingsCache"] = None
+_cache_lock = threading.Lock()
+
+
+class SettingsCache:
+    """Instantané de system_settings + thread de rafraîchissement."""
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._snapshot_at = 0.0
+        self._loaded = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Tuple[str, Callable[[str, Any], None]]] = []
+        self._stats = {"refreshes": 0, "refresh_errors": 0, "writes": 0}
+
+    # ------------------------------------------------------------ chargement
+    def _fetch_all(self) -> Dict[str, Any]:
+        from core.supabase_storage import get_shared_storage
+
+        storage = get_shared_storage()
+        values: Dict[str, Any] = {}
+        offset = 0
+        while True:
+            resp = storage.session.get(
+                f"{storage.api_url}/system_settings",
+                headers=storage._get_headers(),
+                params={"select": "key,value", "order": "key",
+                        "offset": offset, "limit": storage.MAX_ROWS},
+                timeout=15,
+            )
+            resp.raise_for_status()
+            rows = resp.json()
+            for row in rows:
+                values[row.get("key")] = row.get("value")
+            if len(rows) < storage.MAX_ROWS:
+                return values
+            offset += len(rows)
+
+    def refresh(self) -> bool:
+        """Recharge toute la table (bloquant). Retourne False en cas d'échec."""
+        started = time.time()
+        try:
+            values = self._fetch_all()
+        except Exception as e:
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+            logging.warning(f"⚠️ Rafraîchissement system_settings échoué: {e}")
+            # Même en échec, les lecteurs n'attendent qu'une fois (valeurs par défaut)
+            self._loaded.set()
+            return False
+
+        changed = []
+        with self._lock:
+            for key in set(self._values) | set(values):
+                # Une écriture locale plus récente que le début du chargement gagne
+                if self._loaded_at.get(key, 0) > started:
+                    continue
+                old, new = self._values.get(key, _MISSING), values.get(key, _MISSING)
+                if new is _MISSING:
+                    self._values.pop(key, None)
+                    self._loaded_at.pop(key, None)
+                else:
+                    self._values[key] = new
+                    self._loaded_at[key] = started
+                if old != new and self._snapshot_at:
+                    changed.append((key, None if new is _MISSING else new))
+            self._snapshot_at = started
+            self._stats["refreshes"] += 1
+        self._loaded.set()
+        for key, value in changed:
+            self._notify(key, value)
+        return True
+
+    def _run(self):
+        while True:
+            self.refresh()
+            self._wake.wait(self.refresh_seconds)
+            self._wake.clear()
+
+    def start(self):
+        """Démarre le thread de fond (idempotent) ; le 1er chargement part tout de suite."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="settings-refresh", daemon=True)
+                self._thread.start()
+
+    def request_refresh(self):
+        """Demande un rechargement au thread de fond, sans attendre."""
+        self.start()
+        self._wake.set()
+
+    # --------------------------------------------------------------- lecture
+    def get(self, key: str, default: Any = None, max_age: Optional[float] = None) -> Any:
+        """
+        Valeur en cache (jamais d'appel réseau, sauf attente du 1er chargement).
+
+        Args:
+            key: Clé system_settings
+            default: Valeur si la clé est absente
+            max_age: TTL propre à cette clé (s) ; plus vieille -> rechargement de fond
+        """
+        if not self._loaded.is_set():
+            self.start()
+            self._loaded.wait(INITIAL_WAIT_SECONDS)
+        with self._lock:
+            value = self._values.get(key, _MISSING)
+            loaded_at = self._loaded_at.get(key, self._snapshot_at)
+        if max_age is not None and time.time() - loaded_at > max_age:
+            self.request_refresh()
+        return default if value is _MISSING or value is None else value
+
+    def get_str(self, key: str, default: Optional[str] = None, **kwargs) -> Optional[str]:
+        value = self.get(key, _MISSING, **kwargs)
+        if value is _MISSING:
+            return default
+        return value if isinstance(value, str) else json.dumps(value)
+
+    def get_bool(self, key: str, default: bool = False, **kwargs) -> bool:
+        value = self.get(key, _MISSING, **kwargs)
+        if value is _MISSING:
+            return default
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in _TRUE_VALUES
+
+    def get_int(self, key: str, default: Optional[int] = None, **kwargs) -> Optional[int]:
+        try:
+            return int(self.get(key, default, **kwargs))
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: Optional[float] = None, **kwargs) -> Optional[float]:
+        try:
+            return float(self.get(key, default, **kwargs))
+        except (TypeError, ValueError):
+            return default
+
+    def get_json(self, key: str, default: Any = None, **kwargs) -> Any:
+        """Valeur JSON (accepte un JSONB déjà décodé ou une chaîne JSON)."""
+        value = self.get(key, _MISSING, **kwargs)
+        if value is _MISSING:
+            return default
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return default
+        return value
+
+    def items(self, prefix: str = "") -> Dict[str, Any]:
+        """Copie des clés commençant par prefix (ex: "flag_")."""
+        self.get("")  # attente éventuelle du 1er chargement
+        with self._lock:
+            return {k: v for k, v in self._values.items() if k.startswith(prefix)}
+
+    # ------------------------------------------------------------ écriture
+    def set_local(self, key: str, value: Any):
+        """Écriture traversante : appelé après une écriture réussie en base."""
+        with self._lock:
+            old = self._values.get(key, _MISSING)
+            self._values[key] = value
+            self._loaded_at[key] = time.time()
+            self._stats["writes"] += 1
+        if old != value:
+            self._notify(key, value)
+
+    def forget(self, key: str):
+        """Suppression en base -> suppression du cache."""
+        with self._lock:
+            old = self._values.pop(key, _MISSING)
+            self._loaded_at[key] = time.time()
+            self._stats["writes"] += 1
+        if old is not _MISSING:
+            self._notify(key, None)
+
+    def on_change(self, prefix: str, callback: Callable[[str, Any], None]):
+        """Abonne callback(key, nouvelle_valeur) aux clés commençant par prefix."""
+        with self._lock:
+            self._listeners.append((prefix, callback))
+
+    def _notify(self, key: str, value: Any):
+        with self._lock:
+            listeners = [cb for prefix, cb in self._listeners if key.startswith(prefix)]
+        for callback in listeners:
+            try:
+                callback(key, value)
+            except Exception as e:
+                logging.warning(f"⚠️ Abonné system_settings '{key}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs + âge de l'instantané, pour /health."""
+        with self._lock:
+            return {
+                **self._stats,
+                "keys": len(self._values),
+                "age_s": round(time.time() - self._snapshot_at) if self._snapshot_at else None,
+            }
+
+
+def get_settings_cache() -> SettingsCache:
+    """Retourne le cache partagé (singleton)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SettingsCache()
+    return _cache
@@ -8,13 +8,75 @@ Plus rapide, fiable et scalable que GitHub Gist.
 import os
 import json
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime
-import requests
+from urllib.parse import quote
+import threading
+
+from core.http_session import get_session
+
+# Clients supabase-py partagés par (url, clé) : create_client() instancie un
+# client httpx complet (et son pool) ; le recréer à chaque requête jetait le
+# pool de connexions et forçait une nouvelle poignée de main TLS.
+_clients: Dict[tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+# Instance SupabaseStorage partagée (voir get_shared_storage)
+_shared_storage = None
+
+
+def get_supabase_client(supabase_url: Optional[str] = None, supabase_key: Optional[str] = None):
+    """
+    Retourne un client supabase-py partagé pour le processus.
+
+    Args:
+        supabase_url: URL du projet (défaut: SUPABASE_URL)
+        supabase_key: Clé API (défaut: SUPABASE_SERVICE_ROLE_KEY puis SUPABASE_KEY)
+
+    Returns:
+        Client supabase-py (réutilisé tant que url/clé ne changent pas)
+    """
+    url = supabase_url or os.environ.get('SUPABASE_URL')
+    key = supabase_key or os.getenv('SUPABASE_SERVICE_ROLE_KEY', os.getenv('SUPABASE_KEY'))
+    cache_key = (url, key)
+    client = _clients.get(cache_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(cache_key)
+            if client is None:
+                from supabase import create_client
+                client = create_client(url, key)
+                _clients[cache_key] = client
+    return client
+
+
+def get_shared_storage() -> 'SupabaseStorage':
+    """Retourne une instance SupabaseStorage partagée (silencieuse) pour le processus."""
+    global _shared_storage
+    if _shared_storage is None:
+        with _clients_lock:
+            if _shared_storage is None:
+                _shared_storage = SupabaseStorage(silent=True)
+    return _shared_storage
+
+
+def _settings_cache():
+    # Import tardif : core.settings_cache lit system_settings via get_shared_storage
+    from core.settings_cache import get_settings_cache
+    return get_settings_cache()
 
 
 class SupabaseStorage:
     """Gère le stockage des modifications de pianos dans Supabase."""
+
+    # Plafond de lignes par réponse côté PostgREST (max-rows Supabase, défaut 1000).
+    # Au-delà, PostgREST tronque EN SILENCE : toute lecture pagine donc par pages
+    # de cette taille au plus.
+    MAX_ROWS = int(os.getenv('SUPABASE_MAX_ROWS', '1000'))
+    # Clé primaire des tables sans colonne "id" (tri par défaut de iter_data)
+    PRIMARY_KEYS = {
+        "system_settings": "key",
+    }
     
     def __init__(self, supabase_url: Optional[str] = None, supabase_key: Optional[str] = None, silent: bool = False):
         """
@@ -39,11 +101,13 @@ class SupabaseStorage:
 
         self.api_url = f"{self.supabase_url}/rest/v1"
         self.table = "vincent_dindy_piano_updates"
+
+        # Session HTTP partagée du processus (pool keep-alive, retry, métriques)
+        self.session = get_session()
         
-        # Créer un client Supabase pour compatibilité avec ConversationHandler
+        # Client Supabase (partagé) pour compatibilité avec ConversationHandler
         try:
-            from supabase import create_client
-            self.client = create_client(self.supabase_url, self.supabase_key)
+            self.client = get_supabase_client(self.supabase_url, self.supabase_key)
         except ImportError:
             # Si le package supabase n'est pas installé, créer un client None
             self.client = None
@@ -74,7 +138,7 @@ class SupabaseStorage:
         """
         try:
             url = f"{self.api_url}/{self.table}?piano_id=eq.{piano_id}&select=*"
-            response = requests.get(url, headers=self._get_headers())
+            response = self.session.get(url, headers=self._get_headers())
             
             if response.status_code == 200:
                 data = response.json()
@@ -104,7 +168,7 @@ class SupabaseStorage:
             if institution_slug:
                 url += f"&institution_slug=eq.{institution_slug}"
 
-            response = requests.get(url, headers=self._get_headers())
+            response = self.session.get(url, headers=self._get_headers())
 
             if response.status_code == 200:
                 data = response.json()
@@ -151,7 +215,7 @@ class SupabaseStorage:
             headers["Prefer"] = "resolution=merge-duplicates,return=representation"
 
             url = f"{self.api_url}/{self.table}"
-            response = requests.post(url, headers=headers, json=data)
+            response = self.session.post(url, headers=headers, json=data)
 
             if response.status_code in [200, 201, 204]:
                 print(f"✅ Piano {piano_id} sauvegardé dans Supabase pour {institution_slug} (UPSERT)")
@@ -197,7 +261,7 @@ class SupabaseStorage:
             headers["Prefer"] = "resolution=merge-duplicates"
 
             url = f"{self.api_url}/{self.table}"
-            response = requests.post(url, headers=headers, json=data)
+            response = self.session.post(url, headers=headers, json=data)
 
             if response.status_code in [200, 201]:
                 print(f"✅ {len(updates)} pianos sauvegardés dans Supabase (batch UPSERT)")
@@ -224,7 +288,7 @@ class SupabaseStorage:
         """
         try:
             url = f"{self.api_url}/{self.table}?piano_id=eq.{piano_id}"
-            response = requests.delete(url, headers=self._get_headers())
+            response = self.session.delete(url, headers=self._get_headers())
 
             return response.status_code == 204
 
@@ -310,7 +374,7 @@ class SupabaseStorage:
                 # Mode UPSERT standard pour autres tables : insère ou met à jour
                 headers["Prefer"] = "resolution=merge-duplicates"
                 url = f"{self.api_url}/{table_name}"
-                response = requests.post(url, headers=headers, json=data)
+                response = self.session.post(url, headers=headers, json=data)
             else:
                 # Mode UPDATE uniquement : requiert que l'enregistrement existe
                 if id_field not in data:
@@ -318,7 +382,7 @@ class SupabaseStorage:
 
                 id_value = data[id_field]
                 url = f"{self.api_url}/{table_name}?{id_field}=eq.{id_value}"
-                response = requests.patch(url, headers=headers, json=data)
+                response = self.session.patch(url, headers=headers, json=data)
 
             if response.status_code in [200, 201, 204]:
                 print(f"✅ Données sauvegardées dans {table_name}")
@@ -366,16 +430,22 @@ class SupabaseStorage:
         table_name: str,
         filters: Optional[Dict[str, Any]] = None,
         select: str = "*",
-        order_by: Optional[str] = None
+        order_by: Optional[str] = None,
+        page_size: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Méthode générique pour récupérer des données depuis n'importe quelle table Supabase.
 
+        Pagine automatiquement (en-têtes Range) : les tables volumineuses ne sont
+        plus tronquées au plafond max-rows de PostgREST. Pour les très gros
+        volumes, préférer iter_data() qui ne matérialise pas la liste.
+
         Args:
             table_name: Nom de la table Supabase
             filters: Dictionnaire de filtres {champ: valeur} (ex: {"technicien": "Allan"})
             select: Champs à récupérer (défaut: "*" pour tous)
             order_by: Champ de tri (ex: "created_at.desc")
+            page_size: Taille des pages (défaut/maximum: MAX_ROWS)
 
         Returns:
             Liste de dictionnaires des résultats
@@ -389,28 +459,13 @@ class SupabaseStorage:
             )
         """
         try:
-            url = f"{self.api_url}/{table_name}?select={select}"
-
-            # Ajouter les filtres
-            if filters:
-                for field, value in filters.items():
-                    url += f"&{field}=eq.{value}"
-
-            # Ajouter le tri
-            if order_by:
-                url += f"&order={order_by}"
-
-            response = requests.get(url, headers=self._get_headers())
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                error_msg = f"❌ Erreur Supabase {response.status_code}: {response.text}"
-                print(error_msg)
-                # Si c'est une erreur critique (table n'existe pas, permissions, etc.), lever une exception
-                if response.status_code in [404, 403, 401]:
-                    raise ValueError(f"Erreur Supabase {response.status_code}: {response.text}")
-                return []
+            return list(self.iter_data(
+                table_name,
+                filters=filters,
+                select=select,
+                order_by=order_by,
+                page_size=page_size
+            ))
 
         except Exception as e:
             error_msg = f"⚠️ Erreur lors de la récupération depuis {table_name}: {e}"
@@ -422,6 +477,122 @@ class SupabaseStorage:
                 raise
             return []
 
+    def iter_data(
+        self,
+        table_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        select: str = "*",
+        order_by: Optional[str] = None,
+        page_size: Optional[int] = None,
+        key_column: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt une table page par page et produit les lignes une à une
+        (mémoire constante, aucune ligne perdue au-delà du plafond PostgREST).
+
+        Deux modes:
+        - key_column fourni → pagination keyset : tri sur la clé, puis
+          `key_column=gt.<dernière valeur>`. Coût constant par page même à
+          100k+ lignes (pas d'OFFSET qui relit tout le début de la table).
+          order_by est ignoré dans ce mode.
+        - sinon → pagination par en-têtes Range, dans l'ordre de order_by.
+          Pour un résultat stable entre les pages, order_by doit être un
+          ordre total (ex: "occurred_at.desc,id.desc"). Sans order_by, tri
+          sur la clé primaire (PRIMARY_KEYS, défaut "id").
+
+        La pagination s'arrête sur la première page incomplète (un seul
+        aller-retour pour une petite table) : SUPABASE_MAX_ROWS doit donc
+        refléter le max-rows configuré côté serveur. Une erreur après la
+        première page lève ConnectionError plutôt que de rendre un résultat
+        tronqué.
+
+        Args:
+            table_name: Nom de la table Supabase
+            filters: Dictionnaire de filtres {champ: valeur} (égalité)
+            select: Champs à récupérer (défaut: "*")
+            order_by: Tri PostgREST (mode Range, défaut: clé primaire)
+            page_size: Taille des pages (défaut/maximum: MAX_ROWS)
+            key_column: Colonne unique et triable pour le mode keyset (ex: "id")
+
+        Yields:
+            Un dictionnaire par ligne
+
+        Raises:
+            ValueError: Erreur Supabase critique (401/403/404)
+            ConnectionError: Erreur Supabase sur une page après la première
+
+        Exemple:
+            for entry in storage.iter_data("gazelle_timeline_entries",
+                                           select="id,client_id,description",
+                                           key_column="id"):
+                ...
+        """
+        page_size = min(page_size or self.MAX_ROWS, self.MAX_ROWS)
+        default_order = not key_column and not order_by
+        if default_order:
+            order_by = f"{self.PRIMARY_KEYS.get(table_name, 'id')}.asc"
+
+        base_url = f"{self.api_url}/{table_name}?select={select}"
+        if filters:
+            for field, value in filters.items():
+                base_url += f"&{field}=eq.{value}"
+
+        # La clé keyset doit revenir dans chaque ligne pour calculer la page suivante
+        strip_key = False
+        if key_column and select != "*" and key_column not in [f.strip() for f in select.split(",")]:
+            base_url = base_url.replace(f"?select={select}", f"?select={select},{key_column}", 1)
+            strip_key = True
+
+        last_key = None
+        offset = 0
+        page = 0
+        while True:
+            headers = self._get_headers()
+            if key_column:
+                url = f"{base_url}&order={key_column}.asc&limit={page_size}"
+                if last_key is None:
+                    # Une clé NULL (triée en dernier) casserait le curseur keyset
+                    url += f"&{key_column}=not.is.null"
+                else:
+                    url += f"&{key_column}=gt.{quote(str(last_key), safe='')}"
+            else:
+                url = base_url + (f"&order={order_by}" if order_by else "")
+                headers["Range-Unit"] = "items"
+                headers["Range"] = f"{offset}-{offset + page_size - 1}"
+
+            response = self.session.get(url, headers=headers)
+            page += 1
+
+            # 416 = Range au-delà de la fin (table vidée entre deux pages)
+            if response.status_code == 416:
+                return
+            if response.status_code == 400 and default_order and page == 1:
+                # Table sans colonne "id" ni entrée dans PRIMARY_KEYS : ancien comportement (non trié)
+                print(f"⚠️ {table_name}: tri par défaut ({order_by}) refusé, pagination sans tri")
+                order_by, default_order, page = None, False, 0
+                continue
+            if response.status_code not in (200, 206):
+                print(f"❌ Erreur Supabase {response.status_code} ({table_name}, page {page}): {response.text}")
+                # Si c'est une erreur critique (table n'existe pas, permissions, etc.), lever une exception
+                if response.status_code in [404, 403, 401]:
+                    raise ValueError(f"Erreur Supabase {response.status_code}: {response.text}")
+                if page > 1:
+                    # Des lignes ont déjà été produites : ne pas finir en silence sur un résultat tronqué
+                    raise ConnectionError(f"Erreur Supabase {response.status_code} ({table_name}, page {page})")
+                return
+
+            rows = response.json() or []
+            for row in rows:
+                if key_column:
+                    last_key = row.get(key_column)
+                    if strip_key:
+                        row = {k: v for k, v in row.items() if k != key_column}
+                yield row
+
+            if len(rows) < page_size:
+                return
+            offset += len(rows)
+
     def delete_data(
         self,
         table_name: str,
@@ -445,7 +616,7 @@ class SupabaseStorage:
         """
         try:
             url = f"{self.api_url}/{table_name}?{id_field}=eq.{id_value}"
-            response = requests.delete(url, headers=self._get_headers())
+            response = self.session.delete(url, headers=self._get_headers())
 
             # Supabase peut retourner 204 (No Content) ou 200 (OK) pour une suppression réussie
             if response.status_code in [200, 204]:
@@ -610,7 +781,7 @@ class SupabaseStorage:
         url += f"&order=created_at.desc&limit={limit}"
 
         try:
-            response = requests.get(url, headers=self._get_headers())
+            response = self.session.get(url, headers=self._get_headers())
             if response.status_code == 200:
                 return response.json()
             return []
@@ -652,10 +823,11 @@ class SupabaseStorage:
             headers["Prefer"] = "resolution=merge-duplicates"
 
             url = f"{self.api_url}/system_settings"
-            response = requests.post(url, headers=headers, json=data)
+            response = self.session.post(url, headers=headers, json=data)
 
             if response.status_code in [200, 201]:
                 print(f"✅ Paramètre système '{key}' sauvegardé dans Supabase")
+                _settings_cache().set_local(key, value)
                 return True
             else:
                 print(f"❌ Erreur sauvegarde system_setting '{key}': {response.status_code}")
@@ -692,10 +864,15 @@ class SupabaseStorage:
         last_err = None
         for attempt in range(3):
             try:
-                response = requests.get(url, headers=self._get_headers(), timeout=15)
+                response = self.session.get(url, headers=self._get_headers(), timeout=15)
                 if response.status_code == 200:
                     data = response.json()
-                    return data[0].get("value") if data else None
+                    value = data[0].get("value") if data else None
+                    if data:
+                        _settings_cache().set_local(key, value)
+                    else:
+                        _settings_cache().forget(key)
+                    return value
                 if response.status_code in (429, 500, 502, 503, 504):
                     last_err = f"HTTP {response.status_code}"  # transitoire -> retry
                 else:
@@ -720,9 +897,12 @@ class SupabaseStorage:
         """
         try:
             url = f"{self.api_url}/system_settings?key=eq.{key}"
-            response = requests.delete(url, headers=self._get_headers())
+            response = self.session.delete(url, headers=self._get_headers())
 
-            return response.status_code in [200, 204]
+            if response.status_code in [200, 204]:
+                _settings_cache().forget(key)
+                return True
+            return False
 
         except Exception as e:
             print(f"⚠️ Erreur lors de la suppression de '{key}': {e}")
@@ -7,8 +7,11 @@ Basé sur check_unconfirmed_appointments.py mais sans dépendances Windows.
 """
 
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
+import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -32,6 +35,53 @@ INSTITUTION_KEYWORDS = [
 ]
 
 
+# Durée de vie du cache des événements Gazelle (lookup par ID), partagé entre
+# le checker et UnconfirmedAlertsService (et entre exécutions rapprochées)
+EVENT_CACHE_TTL = float(os.getenv("ALERTES_EVENT_CACHE_TTL", "300"))
+
+_event_cache: Dict[str, tuple] = {}  # event_id -> (timestamp, event ou None)
+_event_cache_lock = threading.Lock()
+
+
+def lookup_gazelle_events(gazelle_client: GazelleAPIClient, event_ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """
+    Événements Gazelle par ID : cache court (EVENT_CACHE_TTL) puis une requête
+    aliasée pour les IDs manquants.
+
+    Args:
+        gazelle_client: Client Gazelle
+        event_ids: IDs des RV (evt_xxx)
+
+    Returns:
+        {event_id: event} ; None = n'existe plus dans Gazelle ; ID absent = inconnu (erreur API)
+    """
+    ids = [i for i in dict.fromkeys(event_ids) if i]
+    now = time.time()
+    found: Dict[str, Optional[dict]] = {}
+    with _event_cache_lock:
+        for event_id in ids:
+            entry = _event_cache.get(event_id)
+            if entry and now - entry[0] < EVENT_CACHE_TTL:
+                found[event_id] = entry[1]
+
+    missing = [i for i in ids if i not in found]
+    if missing:
+        try:
+            fetched = gazelle_client.get_events_by_ids(missing)
+            print(f"   📋 Gazelle: {len(fetched)}/{len(missing)} RV lus par ID")
+        except Exception as e:
+            print(f"⚠️ Erreur lecture des RV Gazelle par ID: {e}")
+            fetched = {}
+        with _event_cache_lock:
+            for event_id, event in fetched.items():
+                _event_cache[event_id] = (now, event)
+            # Purge des entrées expirées
+            for event_id in [k for k, (ts, _) in _event_cache.items() if now - ts >= EVENT_CACHE_TTL]:
+                del _event_cache[event_id]
+        found.update(fetched)
+    return found
+
+
 def _is_institution_appointment(apt: Dict[str, Any]) -> bool:
     """
     Vérifie si un RV est lié à une institution.
@@ -69,8 +119,6 @@ class AppointmentChecker:
         self.gazelle_client = gazelle_client or GazelleAPIClient()
         # Cache simple en mémoire pour éviter de recharger les mêmes utilisateurs
         self._user_cache: Dict[str, Dict[str, str]] = {}
-        # Cache pour confirmedByClient depuis Gazelle
-        self._confirmed_cache: Dict[str, bool] = {}
 
     def get_unconfirmed_appointments(
         self,
@@ -135,23 +183,13 @@ class AppointmentChecker:
                 filtered.append(apt)
             
             # VÉRIFICATION CRITIQUE: Vérifier confirmedByClient depuis Gazelle API
-            # Ne garder que les RV qui sont vraiment non confirmés
+            # Ne garder que les RV qui sont vraiment non confirmés.
+            # Une seule requête aliasée pour tous les RV de la journée.
+            filtered = [apt for apt in filtered if apt.get('external_id')]
+            events = lookup_gazelle_events(self.gazelle_client, [apt['external_id'] for apt in filtered])
             unconfirmed_filtered = []
             for apt in filtered:
-                external_id = apt.get('external_id')
-                if not external_id:
-                    continue
-                
-                # Vérifier dans le cache d'abord
-                if external_id in self._confirmed_cache:
-                    is_confirmed = self._confirmed_cache[external_id]
-                else:
-                    # Récupérer depuis Gazelle API
-                    is_confirmed = self._check_confirmed_in_gazelle(external_id)
-                    self._confirmed_cache[external_id] = is_confirmed
-                
-                # Ne garder que les RV NON confirmés
-                if not is_confirmed:
+                if not self._is_confirmed(apt['external_id'], events):
                     unconfirmed_filtered.append(apt)
             
             filtered = unconfirmed_filtered
@@ -236,27 +274,27 @@ class AppointmentChecker:
 
         return None
 
-    def _load_gazelle_appointments_cache(self) -> Dict[str, dict]:
+    def _is_confirmed(self, external_id: str, events: Dict[str, Optional[dict]]) -> bool:
         """
-        Charge tous les RV Gazelle en cache (une seule fois par exécution).
-        Retourne un dict {external_id: appointment_data}.
+        confirmedByClient d'un RV d'après le résultat de lookup_gazelle_events.
+
+        Returns:
+            True si le RV est confirmé par le client
+            False si le RV n'est pas confirmé, introuvable OU illisible (sécuritaire: on alerte)
         """
-        if not hasattr(self, '_gazelle_appointments_cache'):
-            try:
-                # Un seul appel API, SANS limite, pour avoir tous les RV
-                all_appointments = self.gazelle_client.get_appointments()
-                self._gazelle_appointments_cache = {
-                    apt.get('id'): apt for apt in all_appointments if apt.get('id')
-                }
-                print(f"   📋 Cache Gazelle chargé: {len(self._gazelle_appointments_cache)} RV")
-            except Exception as e:
-                print(f"⚠️ Erreur chargement cache Gazelle: {e}")
-                self._gazelle_appointments_cache = {}
-        return self._gazelle_appointments_cache
+        if external_id not in events:
+            print(f"   ⚠️ RV {external_id} illisible dans Gazelle - traité comme NON confirmé")
+            return False
+        event = events[external_id]
+        if event is None:
+            # RV non trouvé dans Gazelle — on considère NON confirmé pour ne pas manquer d'alerte
+            print(f"   ⚠️ RV {external_id} non trouvé dans Gazelle - traité comme NON confirmé")
+            return False
+        return bool(event.get('confirmedByClient', False))
 
     def _check_confirmed_in_gazelle(self, external_id: str) -> bool:
         """
-        Vérifie si un RV est confirmé dans Gazelle en récupérant confirmedByClient depuis l'API.
+        Vérifie si un RV est confirmé dans Gazelle (confirmedByClient, lookup par ID).
 
         Args:
             external_id: ID externe du rendez-vous (ex: evt_xxx)
@@ -265,21 +303,7 @@ class AppointmentChecker:
             True si le RV est confirmé par le client
             False si le RV n'est pas confirmé OU en cas d'erreur (sécuritaire: on alerte)
         """
-        try:
-            cache = self._load_gazelle_appointments_cache()
-
-            if external_id in cache:
-                confirmed = cache[external_id].get('confirmedByClient', False)
-                return bool(confirmed)
-
-            # RV non trouvé dans Gazelle — on considère NON confirmé pour ne pas manquer d'alerte
-            print(f"   ⚠️ RV {external_id} non trouvé dans Gazelle - traité comme NON confirmé")
-            return False
-
-        except Exception as e:
-            print(f"⚠️ Erreur vérification confirmedByClient pour {external_id}: {e}")
-            # En cas d'erreur, on traite comme NON confirmé — mieux vaut une alerte de trop que zéro
-            return False
+        return self._is_confirmed(external_id, lookup_gazelle_events(self.gazelle_client, [external_id]))
 
     def format_alert_message(
         self,
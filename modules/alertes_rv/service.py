@@ -8,10 +8,10 @@ from __future__ import annotations
 from datetime import datetime, timedelta, date, timezone
 from typing import Dict, List, Optional
 
-import requests
 
 from core.supabase_storage import SupabaseStorage
-from modules.alertes_rv.checker import AppointmentChecker
+from core.http_session import get_session
+from modules.alertes_rv.checker import AppointmentChecker, lookup_gazelle_events
 from modules.alertes_rv.email_sender import EmailSender
 import os
 
@@ -149,15 +149,18 @@ class UnconfirmedAlertsService:
             if not supabase_appointments.data:
                 return 0
             
-            # Réutiliser le cache du checker pour éviter un appel API redondant
-            gazelle_cache = self.checker._load_gazelle_appointments_cache()
-            gazelle_ids = set(gazelle_cache.keys())
-            
-            # Identifier les RV fantômes (dans Supabase mais vraiment absents de Gazelle)
+            # Lookup par ID des seuls RV de la journée (cache partagé avec le checker)
+            events = lookup_gazelle_events(
+                self.checker.gazelle_client,
+                [apt.get('external_id') for apt in supabase_appointments.data],
+            )
+
+            # Identifier les RV fantômes (dans Supabase mais vraiment absents de Gazelle).
+            # ID illisible (absent du résultat) = état inconnu → conservé.
             ghost_count = 0
             for supabase_apt in supabase_appointments.data:
                 external_id = supabase_apt.get('external_id')
-                if external_id and external_id not in gazelle_ids:
+                if external_id and external_id in events and events[external_id] is None:
                     # Le RV n'existe plus dans Gazelle - marquer comme annulé
                     apt_id = supabase_apt.get('id')
                     try:
@@ -185,7 +188,7 @@ class UnconfirmedAlertsService:
     def _verify_appointment_exists_in_gazelle(self, external_id: str) -> bool:
         """
         Vérifie une dernière fois si un RV existe dans Gazelle avant d'envoyer une alerte.
-        Utilise le cache du checker pour éviter des appels API redondants.
+        Utilise le cache partagé avec le checker (déjà rempli par get_unconfirmed_appointments).
 
         Args:
             external_id: ID externe du rendez-vous
@@ -195,9 +198,9 @@ class UnconfirmedAlertsService:
             False si le RV n'existe définitivement plus
         """
         try:
-            # Réutiliser le cache déjà chargé par le checker
-            cache = self.checker._load_gazelle_appointments_cache()
-            return external_id in cache
+            events = lookup_gazelle_events(self.checker.gazelle_client, [external_id])
+            # Illisible (absent du résultat) : on permet l'envoi
+            return events.get(external_id, True) is not None
 
         except Exception as e:
             print(f"⚠️ Erreur vérification finale pour {external_id}: {e}")
@@ -377,7 +380,7 @@ class UnconfirmedAlertsService:
             f"created_at,client_name,technician_external_id"
         )
         try:
-            resp = requests.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
+            resp = self.storage.session.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
             if resp.status_code != 200:
                 print(f"⚠️ Erreur Supabase long term: {resp.status_code} {resp.text}")
                 return []
@@ -480,7 +483,7 @@ class UnconfirmedAlertsService:
                     url = f"{self.storage.api_url}/alert_logs"
                     headers = self.storage._get_headers()
                     headers["Prefer"] = "resolution=merge-duplicates"
-                    resp = requests.post(url, headers=headers, json=payload, timeout=SUPABASE_TIMEOUT)
+                    resp = get_session().post(url, headers=headers, json=payload, timeout=SUPABASE_TIMEOUT)
                     if resp.status_code not in [200, 201]:
                         print(f"⚠️ Log alert_logs status {resp.status_code}: {resp.text}")
                 except Exception as e:
@@ -495,7 +498,7 @@ class UnconfirmedAlertsService:
                 f"&acknowledged=eq.false"
                 f"&limit=1"
             )
-            resp = requests.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
+            resp = self.storage.session.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
             if resp.status_code != 200:
                 return False
             data = resp.json() or []
@@ -541,7 +544,7 @@ class UnconfirmedAlertsService:
                 headers = self.storage._get_headers()
                 headers["Prefer"] = "resolution=merge-duplicates"
                 
-                resp = requests.post(
+                resp = get_session().post(
                     url,
                     headers=headers,
                     json=alert_data,
@@ -575,7 +578,7 @@ class UnconfirmedAlertsService:
                 f"&acknowledged=eq.false"
                 f"&limit=1"
             )
-            resp = requests.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
+            resp = self.storage.session.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
             if resp.status_code != 200:
                 return False
             data = resp.json() or []
@@ -591,7 +594,7 @@ class UnconfirmedAlertsService:
             url = f"{self.storage.api_url}/alert_logs?acknowledged=eq.false&order=appointment_date.asc,appointment_time.asc"
             if technician_id:
                 url += f"&technician_id=eq.{technician_id}"
-            resp = requests.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
+            resp = self.storage.session.get(url, headers=self.storage._get_headers(), timeout=SUPABASE_TIMEOUT)
             if resp.status_code != 200:
                 print(f"⚠️ Erreur fetch pending: {resp.status_code}")
                 return []
@@ -608,7 +611,7 @@ class UnconfirmedAlertsService:
                 "acknowledged_at": datetime.now(timezone.utc).isoformat(),
                 "acknowledged_by": resolved_by,
             }
-            resp = requests.patch(url, headers=self.storage._get_headers(), json=payload, timeout=SUPABASE_TIMEOUT)
+            resp = self.storage.session.patch(url, headers=self.storage._get_headers(), json=payload, timeout=SUPABASE_TIMEOUT)
             return resp.status_code in [200, 204]
         except Exception as e:
             print(f"⚠️ Erreur resolve_alert: {e}")
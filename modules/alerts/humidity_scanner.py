@@ -13,13 +13,48 @@ Architecture:
 """
 
 import os
+import re
 import json
 from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from core.supabase_storage import SupabaseStorage
 from core.notification_service import get_notification_service
+from core.http_session import get_session
+from core.keyword_matcher import KeywordMatcher
+
+# Notes classées par appel IA groupé (fallback des notes sans mot-clé)
+AI_BATCH_SIZE = int(os.getenv("HUMIDITY_AI_BATCH_SIZE", "25"))
+
+# Fenêtre du scan (jours) : seules les notes récentes peuvent lever une alerte
+SCAN_WINDOW_DAYS = int(os.getenv("HUMIDITY_SCAN_WINDOW_DAYS", "30"))
+
+# Lignes par POST groupé (historique / alertes)
+_BULK_CHUNK = 500
+
+# Mesures normales de température/humidité (pas une alerte)
+# Format: chiffres + C/F/° suivi de chiffres + %
+# Exemples: "21C, 39%", "20°C 45%", "68F, 40%"
+_MEASUREMENT_RE = re.compile(r'\d+\s*[CF°]\s*,?\s*\d+\s*%')
+
+# "environnement" : ces mots seuls ne suffisent pas, il faut un contexte de problème
+_BROAD_ENV_KEYWORDS = ["humidité", "humidite", "humidity", "température", "temperature"]
+_PROBLEM_CONTEXT = [
+    "basse", "haute", "élevée", "elevee", "anormale",
+    "problème", "probleme", "issue", "trop",
+    "low", "high", "abnormal", "problem"
+]
+
+_AI_ISSUES_GUIDE = """Problèmes recherchés:
+- housse: housse enlevée, retirée, manquante, cover removed, etc.
+- alimentation: PLS débranché, déconnecté, prise débranchée, unplugged, etc.
+- reservoir: réservoir vide, tank empty, réservoir manquant, missing reservoir, etc.
+
+Résolutions possibles:
+- housse: replacée, remise, repositionnée, installée, replaced, etc.
+- alimentation: rebranché, reconnecté, plugged back, reconnected, etc.
+- reservoir: rempli, refilled, tank filled, réservoir remis, etc."""
 
 
 class HumidityScanner:
@@ -49,6 +84,7 @@ class HumidityScanner:
             config_path = Path(__file__).parent.parent.parent / "config" / "alerts" / "config.json"
 
         self.config = self._load_config(config_path)
+        self._matcher_cache = None
 
     def _load_config(self, config_path: Path) -> Dict[str, Any]:
         """Charge la configuration depuis JSON."""
@@ -93,53 +129,33 @@ class HumidityScanner:
         if not description or (hasattr(description, '__len__') and len(str(description).strip()) == 0):
             return None
 
-        text_lower = str(description).lower()
-
         # ⚠️ FILTRE: Ignorer les notes de service normales avec mesures
         # Exemples à ignorer: "21C, 39%", "Accord 440Hz, 21C, 39%", "température: 20C"
-        import re
-
-        # Pattern pour détecter des mesures normales de température/humidité
-        # Format: chiffres + C/F/° suivi de chiffres + %
-        # Exemples: "21C, 39%", "20°C 45%", "68F, 40%"
-        measurement_pattern = r'\d+\s*[CF°]\s*,?\s*\d+\s*%'
-
-        if re.search(measurement_pattern, description):
+        if _MEASUREMENT_RE.search(description):
             # C'est une mesure normale, pas une alerte - ignorer
             return None
 
-        # Parcourir chaque type de problème
+        # Un seul passage de l'automate : tous les mots-clés présents
+        found = self._keyword_matcher(alert_keywords, resolution_keywords).matched(str(description))
+
+        # Parcourir chaque type de problème (ordre de la config, comme avant)
         for issue_type, keyword_list in alert_keywords.items():
             for keyword in keyword_list:
-                if keyword.lower() in text_lower:
+                if keyword in found:
                     # ⚠️ FILTRE SPÉCIAL pour "environnement"
                     # Les mots "humidité" et "température" seuls ne suffisent pas
                     # Il faut un contexte de problème (basse, haute, anormale, etc.)
-                    if issue_type == "environnement":
-                        broad_keywords = ["humidité", "humidite", "humidity", "température", "temperature"]
-                        if keyword.lower() in broad_keywords:
-                            # Vérifier qu'il y a un contexte de problème
-                            problem_context = [
-                                "basse", "haute", "élevée", "elevee", "anormale",
-                                "problème", "probleme", "issue", "trop",
-                                "low", "high", "abnormal", "problem"
-                            ]
-                            has_context = any(ctx in text_lower for ctx in problem_context)
-                            if not has_context:
-                                # Juste une mention de température/humidité sans problème
-                                continue
+                    if issue_type == "environnement" and keyword.lower() in _BROAD_ENV_KEYWORDS:
+                        if not any(ctx in found for ctx in _PROBLEM_CONTEXT):
+                            # Juste une mention de température/humidité sans problème
+                            continue
 
                     # Problème détecté, vérifier s'il est résolu
-                    is_resolved = False
-                    resolution_keyword = None
-
-                    # Chercher mot-clé de résolution pour ce type
-                    if issue_type in resolution_keywords:
-                        for res_keyword in resolution_keywords[issue_type]:
-                            if res_keyword.lower() in text_lower:
-                                is_resolved = True
-                                resolution_keyword = res_keyword
-                                break
+                    # (premier mot-clé de résolution de ce type, ordre de la config)
+                    resolution_keyword = next(
+                        (k for k in resolution_keywords.get(issue_type, []) if k in found), None
+                    )
+                    is_resolved = resolution_keyword is not None
 
                     return (
                         issue_type,
@@ -149,6 +165,24 @@ class HumidityScanner:
 
         return None
 
+    def _keyword_matcher(
+        self,
+        alert_keywords: Dict[str, List[str]],
+        resolution_keywords: Dict[str, List[str]]
+    ) -> KeywordMatcher:
+        """Automate construit une fois pour ces listes de mots-clés (en général self.config)."""
+        cached = getattr(self, '_matcher_cache', None)
+        if cached and cached[0] is alert_keywords and cached[1] is resolution_keywords:
+            return cached[2]
+        keywords = [k for kws in alert_keywords.values() for k in kws]
+        keywords += [k for kws in resolution_keywords.values() for k in kws]
+        matcher = KeywordMatcher(
+            keywords + _PROBLEM_CONTEXT,
+            fold=bool(self.config.get('fold_accents', False))
+        )
+        self._matcher_cache = (alert_keywords, resolution_keywords, matcher)
+        return matcher
+
     def analyze_with_ai(
         self,
         description: str,
@@ -180,23 +214,14 @@ class HumidityScanner:
             return None
 
         try:
-            from anthropic import Anthropic
-            client = Anthropic(api_key=api_key)
+            from core.llm_gateway import get_llm_gateway
 
             # Construire le prompt
             prompt = f"""Analyse cette note de service d'un technicien de piano.
 
 Détermine s'il y a un problème d'entretien lié à l'humidité ET s'il a été résolu.
 
-Problèmes recherchés:
-- housse: housse enlevée, retirée, manquante, cover removed, etc.
-- alimentation: PLS débranché, déconnecté, prise débranchée, unplugged, etc.
-- reservoir: réservoir vide, tank empty, réservoir manquant, missing reservoir, etc.
-
-Résolutions possibles:
-- housse: replacée, remise, repositionnée, installée, replaced, etc.
-- alimentation: rebranché, reconnecté, plugged back, reconnected, etc.
-- reservoir: rempli, refilled, tank filled, réservoir remis, etc.
+{_AI_ISSUES_GUIDE}
 
 NOTE DU TECHNICIEN:
 "{description}"
@@ -211,7 +236,9 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
   "confidence": 0.0 à 1.0
 }}"""
 
-            response = client.messages.create(
+            # Rescan de la même note -> réponse en cache, sans rappel IA
+            response = get_llm_gateway().create(
+                "humidity_scanner",
                 model="claude-haiku-4-5-20251001",
                 max_tokens=200,
                 temperature=0.1,
@@ -228,23 +255,94 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
             result_text = result_text.strip()
 
             result = json.loads(result_text)
-
-            # Valider le résultat
-            if result.get('has_issue') and result.get('confidence', 0) > 0.6:
-                return (
-                    result['issue_type'],
-                    f"{result.get('issue_keyword', 'détecté par IA')}" +
-                    (f" - Résolu: {result.get('resolution_keyword')}" if result.get('is_resolved') else ""),
-                    result.get('is_resolved', False),
-                    result.get('confidence', 0)
-                )
-
-            return None
+            return self._ai_result_to_alert(result)
 
         except Exception as e:
             print(f"⚠️ Erreur analyse IA: {e}")
             return None
 
+    @staticmethod
+    def _ai_result_to_alert(result: Dict[str, Any]) -> Optional[Tuple[str, str, bool, float]]:
+        """Valide une réponse IA (has_issue + confiance > 0.6) -> tuple d'alerte."""
+        if result.get('has_issue') and result.get('issue_type') and (result.get('confidence') or 0) > 0.6:
+            return (
+                result['issue_type'],
+                f"{result.get('issue_keyword') or 'détecté par IA'}" +
+                (f" - Résolu: {result.get('resolution_keyword')}" if result.get('is_resolved') else ""),
+                result.get('is_resolved', False),
+                result.get('confidence', 0)
+            )
+        return None
+
+    def analyze_batch_with_ai(
+        self,
+        descriptions: List[str]
+    ) -> Tuple[List[Optional[Tuple[str, str, bool, float]]], set]:
+        """
+        🤖 FALLBACK IA GROUPÉ - plusieurs notes par appel Claude Haiku.
+
+        Les notes sont numérotées et classées par lots de AI_BATCH_SIZE :
+        un rescan de milliers de notes = quelques appels au lieu d'un par note.
+
+        Args:
+            descriptions: Textes des timeline entries (sans match par mots-clés)
+
+        Returns:
+            (résultats alignés sur descriptions, indices dont le lot a échoué).
+            Les notes d'un lot en échec ne doivent PAS être marquées scannées
+            (réessayées au prochain scan).
+        """
+        results: List[Optional[Tuple[str, str, bool, float]]] = [None] * len(descriptions)
+        failed: set = set()
+        if not descriptions or not os.getenv('ANTHROPIC_API_KEY'):
+            return results, failed
+
+        from core.llm_gateway import get_llm_gateway
+
+        for start in range(0, len(descriptions), AI_BATCH_SIZE):
+            chunk = descriptions[start:start + AI_BATCH_SIZE]
+            notes = "\n".join(
+                f"[{i}] {json.dumps(str(d)[:1500], ensure_ascii=False)}" for i, d in enumerate(chunk)
+            )
+            prompt = f"""Analyse ces notes de service de techniciens de piano.
+
+Pour CHAQUE note, détermine s'il y a un problème d'entretien lié à l'humidité ET s'il a été résolu.
+
+{_AI_ISSUES_GUIDE}
+
+NOTES DES TECHNICIENS (numérotées):
+{notes}
+
+Réponds UNIQUEMENT avec un tableau JSON valide, un objet par note (pas de markdown):
+[
+  {{"i": numéro de la note, "has_issue": true/false,
+    "issue_type": "housse" ou "alimentation" ou "reservoir" ou null,
+    "issue_keyword": "le mot exact du problème trouvé" ou null,
+    "is_resolved": true/false,
+    "resolution_keyword": "le mot exact de la résolution" ou null,
+    "confidence": 0.0 à 1.0}}
+]"""
+            try:
+                response = get_llm_gateway().create(
+                    "humidity_scanner_batch",
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=120 * len(chunk),
+                    temperature=0.1,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                match = re.search(r'\[.*\]', response.content[0].text, re.DOTALL)
+                if not match:
+                    raise ValueError("réponse sans tableau JSON")
+                for item in json.loads(match.group(0)):
+                    i = item.get('i') if isinstance(item, dict) else None
+                    if isinstance(i, int) and 0 <= i < len(chunk):
+                        results[start + i] = self._ai_result_to_alert(item)
+            except Exception as e:
+                print(f"⚠️ Erreur analyse IA groupée (notes {start}-{start + len(chunk) - 1}): {e}")
+                failed.update(range(start, start + len(chunk)))
+
+        return results, failed
+
     def _get_institutional_client_ids(self) -> set:
         """
         Récupère les IDs externes des clients institutionnels à surveiller.
@@ -252,7 +350,6 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
         Returns:
             Set des client_external_id pour Vincent d'Indy, Place des Arts et Orford
         """
-        import requests
         
         INSTITUTIONAL_CLIENTS = [
             "Vincent d'Indy",
@@ -264,7 +361,7 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
             # Récupérer tous les clients
             url = f"{self.storage.api_url}/gazelle_clients"
             params = {"select": "external_id,company_name"}
-            response = requests.get(url, headers=self.storage._get_headers(), params=params)
+            response = self.storage.session.get(url, headers=self.storage._get_headers(), params=params)
             
             if response.status_code != 200:
                 print(f"⚠️ Impossible de récupérer les clients pour filtre institutionnel: {response.status_code}")
@@ -291,141 +388,114 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
         """
         Scanne les timeline entries pour détecter alertes.
 
-        Workflow (adapté du PC):
-        1. Charger historique des entries déjà scannées
-        2. Récupérer IDs clients institutionnels (Vincent, PDA, Orford)
-        3. Récupérer entries récentes
-        4. Pour chaque entry NON scannée ET pour client institutionnel:
-           a. detect_issue() (pattern matching)
-           b. analyze_with_ai() si aucun match
-           c. Enregistrer alerte si détectée
-           d. Marquer entry comme scannée
-        5. Envoyer notifications Slack (seulement non résolues)
+        Workflow:
+        1. Récupérer IDs clients institutionnels (Vincent, PDA, Orford)
+        2. Récupérer les entries institutionnelles PAS encore scannées
+           (anti-join côté base, sans télécharger l'historique)
+        3. detect_issue() (pattern matching) sur chaque entry
+        4. analyze_batch_with_ai() pour les entries sans match (appels groupés)
+        5. Enregistrer alertes et marqueurs de scan en lots
+        6. Envoyer notifications Slack (seulement non résolues)
 
         Args:
             limit: Nombre max d'entries à scanner
 
         Returns:
-            Stats: {scanned, alerts_found, notifications_sent, skipped}
+            Stats: {scanned, alerts_found, notifications_sent, skipped, ai_deferred}
         """
-        import requests
 
         stats = {
             'scanned': 0,
             'alerts_found': 0,
             'notifications_sent': 0,
             'errors': 0,
-            'skipped': 0
+            'skipped': 0,
+            'ai_deferred': 0
         }
 
         try:
-            # 1. Charger historique (entries déjà scannées)
-            history_url = f"{self.storage.api_url}/humidity_alerts_history"
-            history_response = requests.get(
-                history_url,
-                headers=self.storage._get_headers(),
-                params={"select": "timeline_entry_id"}
-            )
-
-            scanned_ids = set()
-            if history_response.status_code == 200:
-                scanned_ids = {item['timeline_entry_id'] for item in history_response.json()}
-                print(f"📚 {len(scanned_ids)} entries déjà scannées dans l'historique")
-
-            # 2. Récupérer IDs clients institutionnels
+            # 1. Récupérer IDs clients institutionnels
             institutional_client_ids = self._get_institutional_client_ids()
             if not institutional_client_ids:
                 print("⚠️ Aucun client institutionnel trouvé, scan annulé")
                 return stats
 
-            # 3. Récupérer timeline entries récentes
-            url = f"{self.storage.api_url}/gazelle_timeline_entries"
-            params = {
-                "select": "external_id,description,occurred_at,client_external_id,piano_id",
-                "order": "occurred_at.desc",
-                "limit": limit
-            }
-
-            response = requests.get(url, headers=self.storage._get_headers(), params=params)
-
-            if response.status_code != 200:
-                print(f"❌ Erreur Supabase: {response.status_code}")
+            # 2. Entries à scanner (institutionnelles, absentes de l'historique)
+            entries = self._fetch_unscanned_entries(institutional_client_ids, limit, stats)
+            if entries is None:
                 return stats
+            print(f"📥 {len(entries)} timeline entries à scanner")
 
-            entries = response.json()
-            print(f"📥 {len(entries)} timeline entries récupérées")
+            # 3. Pattern matching
+            markers: List[Tuple[str, bool]] = []
+            detections: List[Tuple[Dict[str, Any], Tuple[str, str, bool]]] = []
+            ai_pending: List[Dict[str, Any]] = []
 
-            # 4. Scanner chaque entry (skip si déjà scannée OU si pas client institutionnel)
             for entry in entries:
-                try:
-                    entry_id = entry.get('external_id')
-                    client_id = entry.get('client_external_id')
-
-                    # Skip si déjà scannée
-                    if entry_id in scanned_ids:
-                        stats['skipped'] += 1
-                        continue
-
-                    # FILTRE INSTITUTIONNEL: Skip si pas un client institutionnel
-                    if client_id not in institutional_client_ids:
-                        stats['skipped'] += 1
-                        continue
-
-                    description = entry.get('description', '')
-                    if not description:
-                        # Marquer comme scannée même si vide
-                        self._mark_as_scanned(entry_id, found_issue=False)
+                entry_id = entry.get('external_id')
+                description = entry.get('description', '')
+                if not description:
+                    # Marquer comme scannée même si vide
+                    markers.append((entry_id, False))
+                    continue
+
+                stats['scanned'] += 1
+                result = self.detect_issue(
+                    description,
+                    self.config['alert_keywords'],
+                    self.config['resolution_keywords']
+                )
+                if result:
+                    detections.append((entry, result))
+                else:
+                    ai_pending.append(entry)
+
+            # 4. Fallback IA groupé pour les entries sans match
+            if ai_pending:
+                ai_results, ai_failed = self.analyze_batch_with_ai(
+                    [e.get('description', '') for e in ai_pending]
+                )
+                for i, entry in enumerate(ai_pending):
+                    if i in ai_failed:
+                        stats['ai_deferred'] += 1  # réessayée au prochain scan
                         continue
-
-                    stats['scanned'] += 1
-
-                    # a. Pattern matching
-                    result = self.detect_issue(
-                        description,
-                        self.config['alert_keywords'],
-                        self.config['resolution_keywords']
-                    )
-
-                    # b. Fallback IA si aucun match
-                    if result is None:
-                        ai_result = self.analyze_with_ai(
-                            description,
-                            self.config['alert_keywords'],
-                            self.config['resolution_keywords']
-                        )
-                        if ai_result and ai_result[3] > 0.6:  # confidence > 60%
-                            result = ai_result[:3]
-
-                    # c. Enregistrer alerte si détectée
-                    if result:
-                        alert_type, alert_desc, is_resolved = result
-
-                        self._save_alert(
-                            entry_id=entry_id,
-                            client_id=entry.get('client_external_id'),
-                            piano_id=entry.get('piano_id'),
-                            alert_type=alert_type,
-                            description=alert_desc,
-                            is_resolved=is_resolved,
-                            observed_at=entry.get('occurred_at')
-                        )
-
-                        stats['alerts_found'] += 1
-
-                        # d. Notifier Slack (seulement non résolues)
-                        if not is_resolved:
-                            self._send_slack_notification(alert_type, alert_desc, entry)
-                            stats['notifications_sent'] += 1
-
-                        # Marquer comme scannée avec problème trouvé
-                        self._mark_as_scanned(entry_id, found_issue=True)
+                    if ai_results[i]:
+                        detections.append((entry, ai_results[i][:3]))
                     else:
-                        # Marquer comme scannée sans problème
-                        self._mark_as_scanned(entry_id, found_issue=False)
-
-                except Exception as e:
-                    print(f"⚠️ Erreur entry {entry.get('external_id')}: {e}")
-                    stats['errors'] += 1
+                        markers.append((entry.get('external_id'), False))
+
+            # 5. Alertes + marqueurs en lots
+            alert_rows = [
+                {
+                    'timeline_entry_id': entry.get('external_id'),
+                    'client_id': entry.get('client_external_id'),
+                    'piano_id': entry.get('piano_id'),
+                    'alert_type': alert_type,
+                    'description': alert_desc,
+                    'is_resolved': is_resolved,
+                    'observed_at': entry.get('occurred_at') or datetime.now(timezone.utc).isoformat()
+                }
+                for entry, (alert_type, alert_desc, is_resolved) in detections
+            ]
+            if not self._save_alerts_bulk(alert_rows):
+                # Alertes non enregistrées : ne pas marquer ces entries, on réessaiera
+                stats['errors'] += len(detections)
+                detections = []
+            markers.extend((entry.get('external_id'), True) for entry, _ in detections)
+            if not self._mark_as_scanned_bulk(markers):
+                stats['errors'] += 1
+
+            # 6. Notifier (seulement non résolues)
+            for entry, (alert_type, alert_desc, is_resolved) in detections:
+                stats['alerts_found'] += 1
+                print(f"✅ Alerte enregistrée: {alert_type} - {'Résolu' if is_resolved else 'NON RÉSOLU'}")
+                if not is_resolved:
+                    try:
+                        self._send_slack_notification(alert_type, alert_desc, entry)
+                        stats['notifications_sent'] += 1
+                    except Exception as e:
+                        print(f"⚠️ Erreur notification entry {entry.get('external_id')}: {e}")
+                        stats['errors'] += 1
 
             print(f"\n✅ Scan terminé: {stats}")
             return stats
@@ -436,6 +506,122 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
             traceback.print_exc()
             return stats
 
+    def _fetch_unscanned_entries(
+        self,
+        client_ids: set,
+        limit: int,
+        stats: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Entries institutionnelles récentes (SCAN_WINDOW_DAYS) absentes de humidity_alerts_history.
+
+        RPC humidity_unscanned_entries (anti-join, sql/create_humidity_unscanned_entries_function.sql).
+        Si la fonction n'est pas déployée : les `limit` entries les plus
+        récentes de la fenêtre, puis vérification de l'historique pour CES ids seulement.
+
+        Returns:
+            Liste d'entries, ou None si Supabase est indisponible
+        """
+        headers = self.storage._get_headers()
+        since = (datetime.now(timezone.utc) - timedelta(days=SCAN_WINDOW_DAYS)).isoformat()
+        response = get_session().post(
+            f"{self.storage.api_url}/rpc/humidity_unscanned_entries",
+            headers=headers,
+            json={"p_client_ids": sorted(client_ids), "p_limit": limit, "p_since": since}
+        )
+        if response.status_code == 200:
+            return response.json()
+        print(f"⚠️ RPC humidity_unscanned_entries indisponible ({response.status_code}), mode compatible")
+
+        # Mode compatible : le timeline stocke le client dans client_id
+        response = self.storage.session.get(
+            f"{self.storage.api_url}/gazelle_timeline_entries",
+            headers=headers,
+            params={
+                "select": "external_id,description,occurred_at,client_external_id:client_id,piano_id",
+                "occurred_at": f"gte.{since}",
+                "order": "occurred_at.desc",
+                "limit": limit
+            }
+        )
+        if response.status_code != 200:
+            print(f"❌ Erreur Supabase: {response.status_code}")
+            return None
+
+        entries = []
+        for entry in response.json():
+            if entry.get('client_external_id') in client_ids:
+                entries.append(entry)
+            else:
+                stats['skipped'] += 1
+
+        ids = [e['external_id'] for e in entries if e.get('external_id')]
+        if not ids:
+            return entries
+        history = get_session().get(
+            f"{self.storage.api_url}/humidity_alerts_history",
+            headers=headers,
+            params={"select": "timeline_entry_id", "timeline_entry_id": f"in.({','.join(ids)})"}
+        )
+        if history.status_code != 200:
+            print(f"❌ Erreur historique: {history.status_code}")
+            return None
+        scanned_ids = {item['timeline_entry_id'] for item in history.json()}
+        stats['skipped'] += len(scanned_ids)
+        return [e for e in entries if e.get('external_id') not in scanned_ids]
+
+    def _post_bulk(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> bool:
+        """POST groupé (lots de _BULK_CHUNK), doublons ignorés."""
+        headers = {
+            **self.storage._get_headers(),
+            "Prefer": "resolution=ignore-duplicates,return=minimal"
+        }
+        ok = True
+        for start in range(0, len(rows), _BULK_CHUNK):
+            response = get_session().post(
+                f"{self.storage.api_url}/{table}",
+                headers=headers,
+                params={"on_conflict": on_conflict},
+                json=rows[start:start + _BULK_CHUNK]
+            )
+            if response.status_code not in [200, 201, 204]:
+                print(f"⚠️ Erreur insertion groupée {table} {response.status_code}: {response.text}")
+                ok = False
+        return ok
+
+    def _mark_as_scanned_bulk(self, markers: List[Tuple[str, bool]]) -> bool:
+        """
+        Marque plusieurs timeline entries comme scannées (un POST par lot).
+
+        Args:
+            markers: [(entry_id, found_issue), ...]
+
+        Returns:
+            True si succès
+        """
+        if not markers:
+            return True
+        try:
+            scanned_at = datetime.now(timezone.utc).isoformat()
+            rows = [
+                {'timeline_entry_id': entry_id, 'found_issues': found_issue, 'scanned_at': scanned_at}
+                for entry_id, found_issue in markers if entry_id
+            ]
+            return self._post_bulk("humidity_alerts_history", rows, "timeline_entry_id")
+        except Exception as e:
+            print(f"❌ Erreur _mark_as_scanned_bulk: {e}")
+            return False
+
+    def _save_alerts_bulk(self, rows: List[Dict[str, Any]]) -> bool:
+        """Enregistre plusieurs alertes (doublons timeline_entry_id/alert_type ignorés)."""
+        if not rows:
+            return True
+        try:
+            return self._post_bulk("humidity_alerts", rows, "timeline_entry_id,alert_type")
+        except Exception as e:
+            print(f"❌ Erreur _save_alerts_bulk: {e}")
+            return False
+
     def _mark_as_scanned(self, entry_id: str, found_issue: bool) -> bool:
         """
         Marque une timeline entry comme scannée dans l'historique.
@@ -447,7 +633,6 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
         Returns:
             True si succès
         """
-        import requests
 
         try:
             url = f"{self.storage.api_url}/humidity_alerts_history"
@@ -458,7 +643,7 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
                 'scanned_at': datetime.now(timezone.utc).isoformat()
             }
 
-            response = requests.post(
+            response = get_session().post(
                 url,
                 headers=self.storage._get_headers(),
                 json=data
@@ -487,7 +672,6 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
         observed_at: Optional[str]
     ) -> bool:
         """Enregistre une alerte dans Supabase."""
-        import requests
 
         try:
             url = f"{self.storage.api_url}/humidity_alerts"
@@ -502,7 +686,7 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
                 'observed_at': observed_at or datetime.now(timezone.utc).isoformat()
             }
 
-            response = requests.post(
+            response = get_session().post(
                 url,
                 headers=self.storage._get_headers(),
                 json=data
@@ -533,7 +717,6 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
         Seulement pour alertes NON RÉSOLUES.
         Utilise le nouveau NotificationService centralisé.
         """
-        import requests
 
         # Enrichir les données avec les informations complètes du client et piano
         client_name = "N/A"
@@ -542,7 +725,7 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
             try:
                 url = f"{self.storage.api_url}/gazelle_clients"
                 params = {"select": "company_name", "external_id": f"eq.{client_id}"}
-                resp = requests.get(url, headers=self.storage._get_headers(), params=params)
+                resp = self.storage.session.get(url, headers=self.storage._get_headers(), params=params)
                 if resp.status_code == 200 and resp.json():
                     client_name = resp.json()[0].get('company_name', 'N/A')
             except Exception as e:
@@ -556,7 +739,7 @@ Réponds UNIQUEMENT avec un JSON valide (pas de markdown, pas de texte avant/apr
             try:
                 url = f"{self.storage.api_url}/gazelle_pianos"
                 params = {"select": "make,model,location", "id": f"eq.{piano_id}"}
-                resp = requests.get(url, headers=self.storage._get_headers(), params=params)
+                resp = self.storage.session.get(url, headers=self.storage._get_headers(), params=params)
                 if resp.status_code == 200 and resp.json():
                     piano_data = resp.json()[0]
                     make = piano_data.get('make', '')
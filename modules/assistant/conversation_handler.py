@@ -14,6 +14,7 @@ from anthropic import Anthropic
 from supabase import Client
 
 from core.supabase_storage import SupabaseStorage
+from core.llm_gateway import get_llm_gateway
 
 
 class ConversationHandler:
@@ -89,7 +90,8 @@ class ConversationHandler:
                 }
             }
         """
-        response = self.anthropic.messages.create(
+        response = get_llm_gateway().create(
+            "assistant_intent", client=self.anthropic,
             model="claude-haiku-4-5-20251001",
             max_tokens=1000,
             system="""Tu es un système de détection d'intention pour un assistant de techniciens de piano.
@@ -568,7 +570,9 @@ Prochain RDV:
 {json.dumps(next_appointment, indent=2, ensure_ascii=False) if next_appointment else "Aucun"}
 """
 
-        response = self.anthropic.messages.create(
+        # Les données client sont dans le prompt : elles changent -> nouvelle clé
+        response = get_llm_gateway().create(
+            "assistant_client_summary", client=self.anthropic,
             model="claude-haiku-4-5-20251001",
             max_tokens=2000,
             temperature=0.3,
@@ -7,39 +7,30 @@ Maison → RV1 → RV2 → ... → Maison
 """
 
 import os
-import time
-import requests
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+from core.distance_service import get_distance_service
+from core.fsa_distance import get_fsa_engine
+
 
 # Charger clé Google Maps depuis Supabase
 # Note: Chargé au runtime dans les fonctions pour éviter erreurs d'import
 def get_google_maps_api_key() -> str:
-    """Récupère la clé Google Maps API depuis Supabase system_settings."""
+    """Récupère la clé Google Maps API depuis system_settings (cache en mémoire), puis .env."""
     try:
-        from core.supabase_storage import SupabaseStorage
-        from supabase import create_client
-
-        storage = SupabaseStorage()
-        supabase = create_client(storage.supabase_url, storage.supabase_key)
-
-        result = supabase.table('system_settings').select('value').eq('key', 'google_maps_api_key').execute()
-
-        if result.data and len(result.data) > 0:
-            return result.data[0]['value']
-        else:
-            # Fallback: essayer .env
-            key = os.getenv('GOOGLE_MAPS_API_KEY')
-            if key:
-                return key
-            raise ValueError("GOOGLE_MAPS_API_KEY non configurée dans Supabase system_settings ni dans .env")
-    except Exception as e:
-        # En cas d'erreur Supabase, essayer .env
-        key = os.getenv('GOOGLE_MAPS_API_KEY')
+        from core.settings_cache import get_settings_cache
+
+        key = get_settings_cache().get_str('google_maps_api_key')
         if key:
             return key
-        raise ValueError(f"Impossible de récupérer GOOGLE_MAPS_API_KEY: {e}")
+    except Exception:
+        pass
+    # Fallback: essayer .env
+    key = os.getenv('GOOGLE_MAPS_API_KEY')
+    if key:
+        return key
+    raise ValueError("GOOGLE_MAPS_API_KEY non configurée dans Supabase system_settings ni dans .env")
 
 # Adresses maison techniciens (IDs Supabase → adresses)
 HOME_ADDRESSES = {
@@ -49,6 +40,13 @@ HOME_ADDRESSES = {
     # Louise n'est pas technicienne
 }
 
+# Codes postaux des adresses maison (estimations hors ligne, core/fsa_distance.py)
+HOME_POSTAL_CODES = {
+    'usr_HcCiFk7o0vZ9xAI0': 'H2X 2L1',  # Nicolas
+    'usr_ofYggsCDt2JAVeNP': 'H4N 2A1',  # Allan
+    'usr_ReUSmIJmBF86ilY1': 'H2L 3V2',  # Jean-Philippe
+}
+
 
 def google_distance_with_duration(
     origin: str,
@@ -75,45 +73,21 @@ def google_distance_with_duration(
     Raises:
         ValueError: Si calcul échoue
     """
-    api_key = get_google_maps_api_key()
-
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-    params = {
-        "origins": origin,
-        "destinations": destination,
-        "mode": google_mode,
-        "units": "metric",
-        "language": "fr",
-        "key": api_key
-    }
-
-    # Ajouter heure départ SEULEMENT si dans le futur (Google Maps n'accepte que futur proche)
-    if departure_time:
-        now = datetime.now(departure_time.tzinfo) if departure_time.tzinfo else datetime.now()
-        if departure_time > now:
-            params["departure_time"] = int(departure_time.timestamp())
+    leg = get_distance_service().distance(
+        origin, destination, api_key=get_google_maps_api_key(),
+        departure_time=departure_time, mode=google_mode,
+    )
+    return _route_info(leg)
 
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-
-        if data["status"] != "OK":
-            raise ValueError(f"Google Maps API error: {data.get('status')}")
-
-        element = data["rows"][0]["elements"][0]
-        if element["status"] != "OK":
-            raise ValueError(f"No route found: {element.get('status')}")
-
-        return {
-            'distance_km': element["distance"]["value"] / 1000.0,
-            'distance_text': element["distance"]["text"],
-            'duration_seconds': element["duration"]["value"],
-            'duration_text': element["duration"]["text"]
-        }
 
-    except requests.exceptions.RequestException as e:
-        raise ValueError(f"Request failed: {e}")
+def _route_info(leg: Dict) -> Dict:
+    """Élément du service de distances -> format historique de google_distance_with_duration."""
+    return {
+        'distance_km': leg['distance_m'] / 1000.0,
+        'distance_text': leg.get('distance_text') or f"{leg['distance_m'] / 1000.0:.1f} km",
+        'duration_seconds': leg['duration_s'],
+        'duration_text': leg.get('duration_text') or f"{leg['duration_s'] // 60} min"
+    }
 
 
 def calculate_day_route(
@@ -171,11 +145,10 @@ def calculate_day_route(
     # Trajet complet: Maison → RV1 → RV2 → ... → Maison
     waypoints = [home_address] + stops_dedup + [home_address]
 
-    # Calculer chaque segment
-    segments = []
-    total_km = 0.0
-    total_duration = 0
-
+    # Heure de départ de chaque segment (trafic), puis TOUS les segments en
+    # une consultation du service de distances : cache d'abord, une requête
+    # groupée par tranche horaire pour les manquants.
+    legs = []
     for i in range(len(waypoints) - 1):
         origin = waypoints[i]
         destination = waypoints[i + 1]
@@ -195,27 +168,45 @@ def calculate_day_route(
                 # Départ maison = heure premier RV - durée trajet estimée - buffer
                 departure_time = first_appt['start_time'] - timedelta(minutes=30)
 
-        try:
-            route_info = google_distance_with_duration(origin, destination, departure_time, google_mode=travel_mode)
+        legs.append((origin, destination, departure_time))
 
-            segments.append({
-                'from': origin[:50] + '...' if len(origin) > 50 else origin,
-                'to': destination[:50] + '...' if len(destination) > 50 else destination,
-                'distance_km': round(route_info['distance_km'], 2),
-                'distance_text': route_info['distance_text'],
-                'duration_seconds': route_info['duration_seconds'],
-                'duration_text': route_info['duration_text']
-            })
-
-            total_km += route_info['distance_km']
-            total_duration += route_info['duration_seconds']
+    try:
+        leg_results = get_distance_service().lookup(legs, api_key=get_google_maps_api_key(), mode=travel_mode)
+    except Exception as e:
+        leg_results = [{'error': str(e)}] * len(legs)
 
-            # Rate limiting (Google Maps: 100 req/sec max)
-            time.sleep(0.1)
+    segments = []
+    total_km = 0.0
+    total_duration = 0
 
-        except Exception as e:
-            print(f"[WARN] Distance calculation failed {origin[:30]} → {destination[:30]}: {e}")
-            # Continuer même si un segment échoue
+    # Sans Google (pas de clé, réseau, adresse introuvable) : estimation hors
+    # ligne par RTA ; la maison est localisée par son code postal.
+    home_postal = HOME_POSTAL_CODES.get(technician_id, home_address)
+    for idx, ((origin, destination, _), leg) in enumerate(zip(legs, leg_results)):
+        if 'error' in leg:
+            estimate = get_fsa_engine().estimate(
+                home_postal if idx == 0 else origin,
+                home_postal if idx == len(legs) - 1 else destination,
+            )
+            if not estimate:
+                print(f"[WARN] Distance calculation failed {origin[:30]} → {destination[:30]}: {leg['error']}")
+                # Continuer même si un segment échoue
+                continue
+            leg = estimate
+
+        route_info = _route_info(leg)
+        segments.append({
+            'from': origin[:50] + '...' if len(origin) > 50 else origin,
+            'to': destination[:50] + '...' if len(destination) > 50 else destination,
+            'distance_km': round(route_info['distance_km'], 2),
+            'distance_text': route_info['distance_text'],
+            'duration_seconds': route_info['duration_seconds'],
+            'duration_text': route_info['duration_text'],
+            'estimated': bool(leg.get('estimated'))
+        })
+
+        total_km += route_info['distance_km']
+        total_duration += route_info['duration_seconds']
 
     # Construire texte trajet
     route_parts = ["🏠 Maison"]
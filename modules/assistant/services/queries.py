@@ -9,6 +9,7 @@ Utilise SupabaseStorage (REST API) au lieu de connexion PostgreSQL directe.
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Union
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 from modules.assistant.services.parser import QueryType
 
 
@@ -91,8 +92,7 @@ class GazelleQueries:
             url += f"&limit={limit}"
             url += "&order=appointment_date.asc,appointment_time.asc"
 
-            import requests
-            response = requests.get(url, headers=self.storage._get_headers())
+            response = self.storage.session.get(url, headers=self.storage._get_headers())
 
             if response.status_code == 200:
                 return response.json()
@@ -123,7 +123,6 @@ class GazelleQueries:
             return []
 
         try:
-            import requests
             from urllib.parse import quote
             
             search_query = search_terms[0] if search_terms else ""
@@ -133,7 +132,6 @@ class GazelleQueries:
 
             # Cas 1: recherche directe par ID externe (cli_..., con_...), avec fallback multi-endpoints
             if search_query.lower().startswith(("cli_", "con_")):
-                import requests
                 client_endpoints = ["gazelle_clients", "gazelle.clients", "clients"]
                 contact_endpoints = ["gazelle_contacts", "gazelle.contacts", "contacts"]
 
@@ -147,7 +145,7 @@ class GazelleQueries:
                             f"&or=(id.eq.{encoded_query},external_id.eq.{encoded_query})"
                             f"&limit={limit}"
                         )
-                        resp = requests.get(client_url, headers=self.storage._get_headers())
+                        resp = self.storage.session.get(client_url, headers=self.storage._get_headers())
                         if resp.status_code == 200:
                             for client in resp.json():
                                 client["_source"] = "client"
@@ -160,7 +158,7 @@ class GazelleQueries:
                                 f"&or=(external_id.ilike.*{encoded_query}*,id.ilike.*{encoded_query}*)"
                                 f"&limit={limit}"
                             )
-                            ilike_resp = requests.get(ilike_url, headers=self.storage._get_headers())
+                            ilike_resp = self.storage.session.get(ilike_url, headers=self.storage._get_headers())
                             if ilike_resp.status_code == 200:
                                 for client in ilike_resp.json():
                                     client["_source"] = "client"
@@ -178,7 +176,7 @@ class GazelleQueries:
                             f"&or=(id.eq.{encoded_query},external_id.eq.{encoded_query})"
                             f"&limit={limit}"
                         )
-                        resp = requests.get(contact_url, headers=self.storage._get_headers())
+                        resp = self.storage.session.get(contact_url, headers=self.storage._get_headers())
                         if resp.status_code == 200:
                             for contact in resp.json():
                                 contact["_source"] = "contact"
@@ -191,7 +189,7 @@ class GazelleQueries:
                                 f"&or=(external_id.ilike.*{encoded_query}*,id.ilike.*{encoded_query}*)"
                                 f"&limit={limit}"
                             )
-                            ilike_resp = requests.get(ilike_url, headers=self.storage._get_headers())
+                            ilike_resp = self.storage.session.get(ilike_url, headers=self.storage._get_headers())
                             if ilike_resp.status_code == 200:
                                 for contact in ilike_resp.json():
                                     contact["_source"] = "contact"
@@ -210,7 +208,7 @@ class GazelleQueries:
                     for field in ['company_name', 'city', 'name', 'address', 'postal_code', 'email', 'phone', 'telephone', 'phone_number']:
                         try:
                             field_url = f"{self.storage.api_url}/{endpoint}?select=*&{field}=ilike.*{encoded_query}*&limit={limit}"
-                            field_response = requests.get(field_url, headers=self.storage._get_headers())
+                            field_response = self.storage.session.get(field_url, headers=self.storage._get_headers())
                             if field_response.status_code == 200:
                                 clients = field_response.json()
                                 for client in clients:
@@ -233,7 +231,7 @@ class GazelleQueries:
                     for field in ['first_name', 'last_name', 'email', 'city', 'address', 'postal_code', 'phone', 'telephone', 'phone_number']:
                         try:
                             field_url = f"{self.storage.api_url}/{endpoint}?select=*&{field}=ilike.*{encoded_query}*&limit={limit}"
-                            field_response = requests.get(field_url, headers=self.storage._get_headers())
+                            field_response = self.storage.session.get(field_url, headers=self.storage._get_headers())
                             if field_response.status_code == 200:
                                 contacts = field_response.json()
                                 for contact in contacts:
@@ -286,8 +284,7 @@ class GazelleQueries:
 
             url += f"&limit={limit}"
 
-            import requests
-            response = requests.get(url, headers=self.storage._get_headers())
+            response = self.storage.session.get(url, headers=self.storage._get_headers())
 
             if response.status_code == 200:
                 return response.json()
@@ -351,14 +348,13 @@ class GazelleQueries:
             # occurred_at est souvent nul; on ordonne sur created_at (desc)
             url += "&order=created_at.desc"
 
-            import requests
             headers = self.storage._get_headers()
             if include_count:
                 # Prefer exact count pour récupérer Content-Range
                 headers = headers.copy()
                 headers["Prefer"] = "count=exact"
 
-            response = requests.get(url, headers=headers)
+            response = get_session().get(url, headers=headers)
 
             entries = []
             if response.status_code == 200:
@@ -412,8 +408,7 @@ class GazelleQueries:
                 f"&order=created_at.desc"
                 f"&limit={limit}"
             )
-            import requests
-            response = requests.get(url, headers=self.storage._get_headers())
+            response = self.storage.session.get(url, headers=self.storage._get_headers())
             if response.status_code != 200:
                 if debug:
                     print(f"⚠️ search_timeline_entity_ids_by_text status {response.status_code}: {response.text}")
@@ -465,7 +460,6 @@ class GazelleQueries:
         }
 
         try:
-            import requests
 
             # Compter les RV dans la période (non filtré par client: conserve le comportement existant)
             appt_url = f"{self.storage.api_url}/gazelle.appointments"
@@ -475,7 +469,7 @@ class GazelleQueries:
             if technicien:
                 appt_url += f"&technicien=eq.{technicien}"
 
-            response = requests.get(appt_url, headers=self.storage._get_headers())
+            response = self.storage.session.get(appt_url, headers=self.storage._get_headers())
             if response.status_code == 200:
                 summary['appointments_count'] = len(response.json())
 
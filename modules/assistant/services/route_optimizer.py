@@ -0,0 +1,360 @@
+"""
+Optimisation de l'ordre de visite d'une journée de technicien.
+
+calculate_day_route additionne les segments dans l'ordre des RV ; ici on
+cherche un meilleur ordre (Maison → RV… → Maison) et on chiffre le gain,
+pour que la répartition puisse comparer des options sans rappeler Google.
+
+- Matrice des trajets : service de distances partagé (core/distance_service.py,
+  cache persistant, une requête groupée pour les paires manquantes) ou,
+  avec offline=True / sans clé, estimation par RTA (core/fsa_distance.py).
+- Résolution : plus proche voisin + ordre actuel comme points de départ,
+  puis recherche locale 2-opt (inversion de tronçon) et Or-opt
+  (déplacement de 1 à 3 RV consécutifs, à l'endroit ou inversés) jusqu'à
+  stabilisation. Journée de 20 RV : ~20 ms sans fenêtres horaires, quelques
+  centaines de ms avec (chaque essai recalcule l'horaire) ; voir
+  scripts/benchmark_route_optimizer.py.
+- Fenêtres horaires optionnelles (window_slack_minutes) : chaque RV doit
+  commencer à ±slack de son heure prévue ; un retard est pénalisé
+  (LATE_PENALTY par minute), une avance se traduit en attente.
+
+Usage:
+    from modules.assistant.services.route_optimizer import optimize_technician_day
+
+    result = optimize_technician_day('usr_ofYggsCDt2JAVeNP', '2026-10-20')
+    result['optimized']['order'], result['km_saved'], result['minutes_saved']
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.distance_service import get_distance_service
+from core.fsa_distance import get_fsa_engine
+from core.supabase_storage import get_shared_storage
+from modules.assistant.services.distance_calculator import (
+    HOME_ADDRESSES, HOME_POSTAL_CODES, get_google_maps_api_key
+)
+
+# Pénalité (minutes de coût) par minute de retard sur une fenêtre horaire
+LATE_PENALTY = 10.0
+# Segment inconnu de Google ET hors table RTA : estimation basique (mode dégradé historique)
+FALLBACK_LEG = (40.0, 30.0)  # km, minutes
+# Taille max des blocs déplacés par Or-opt
+OR_OPT_MAX_SEGMENT = 3
+
+Window = Optional[Tuple[float, float]]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SOLVEUR (matrices -> ordre)
+# ═══════════════════════════════════════════════════════════════════
+
+class _Tour:
+    """Évaluation d'un ordre de visite (nœud 0 = maison, aller-retour)."""
+
+    def __init__(self, minutes: Sequence[Sequence[float]], windows: Sequence[Window],
+                 service: Sequence[float], departure: Optional[float]):
+        self.minutes = minutes
+        self.windows = windows
+        self.service = service
+        self.departure = departure
+        self.timed = any(w is not None for w in windows)
+
+    def cost(self, order: Sequence[int]) -> float:
+        m = self.minutes
+        if not self.timed:
+            total, prev = 0.0, 0
+            for node in order:
+                total += m[prev][node]
+                prev = node
+            return total + m[prev][0]
+        return sum(self.schedule(order)[:2]) if order else 0.0
+
+    def schedule(self, order: Sequence[int]) -> Tuple[float, float, List[float]]:
+        """(minutes de route, pénalité de retard, heures d'arrivée) pour cet ordre."""
+        m, windows, service = self.minutes, self.windows, self.service
+        first = order[0]
+        clock = self.departure
+        if clock is None:
+            # Départ juste à temps pour l'ouverture de la fenêtre du 1er RV
+            opening = windows[first][0] if windows[first] else 8 * 60.0
+            clock = opening - m[0][first]
+        travel, late, arrivals, prev = 0.0, 0.0, [], 0
+        for node in order:
+            leg = m[prev][node]
+            travel += leg
+            clock += leg
+            window = windows[node]
+            if window:
+                clock = max(clock, window[0])
+                late += max(0.0, clock - window[1])
+            arrivals.append(clock)
+            clock += service[node]
+            prev = node
+        travel += m[prev][0]
+        return travel, late * LATE_PENALTY, arrivals
+
+
+def _nearest_neighbour(minutes: Sequence[Sequence[float]], n: int) -> List[int]:
+    order, prev, left = [], 0, set(range(1, n + 1))
+    while left:
+        prev = min(left, key=lambda node: minutes[prev][node])
+        order.append(prev)
+        left.remove(prev)
+    return order
+
+
+def _two_opt(tour: _Tour, order: List[int], best: float) -> Tuple[List[int], float, bool]:
+    n, improved = len(order), False
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+            cost = tour.cost(candidate)
+            if cost < best - 1e-9:
+                order, best, improved = candidate, cost, True
+    return order, best, improved
+
+
+def _or_opt(tour: _Tour, order: List[int], best: float) -> Tuple[List[int], float, bool]:
+    improved = False
+    for size in range(1, OR_OPT_MAX_SEGMENT + 1):
+        i = 0
+        while i + size <= len(order):
+            segment, rest = order[i:i + size], order[:i] + order[i + size:]
+            for pos in range(len(rest) + 1):
+                for block in (segment, segment[::-1]) if size > 1 else (segment,):
+                    if pos == i and block is segment:
+                        continue  # ordre inchangé ; le bloc inversé sur place reste testé
+                    candidate = rest[:pos] + block + rest[pos:]
+                    cost = tour.cost(candidate)
+                    if cost < best - 1e-9:
+                        order, best, improved = candidate, cost, True
+                        break
+                else:
+                    continue
+                break
+            i += 1
+    return order, best, improved
+
+
+def solve_order(minutes: Sequence[Sequence[float]], windows: Optional[Sequence[Window]] = None,
+                service: Optional[Sequence[float]] = None, departure: Optional[float] = None,
+                initial: Optional[List[int]] = None) -> Tuple[List[int], float]:
+    """
+    Meilleur ordre de visite trouvé (plus proche voisin + 2-opt + Or-opt).
+
+    Args:
+        minutes: Matrice (n+1)x(n+1) des durées ; nœud 0 = maison
+        windows: Par nœud, (début, fin) en minutes depuis minuit, ou None
+        service: Par nœud, durée du RV (minutes)
+        departure: Heure de départ de la maison (minutes) ; None = juste à temps
+        initial: Ordre de départ supplémentaire (ex: ordre actuel des RV)
+
+    Returns:
+        (ordre des nœuds 1..n, coût)
+    """
+    n = len(minutes) - 1
+    if n <= 0:
+        return [], 0.0
+    tour = _Tour(minutes, windows or [None] * (n + 1), service or [0.0] * (n + 1), departure)
+
+    starts = [_nearest_neighbour(minutes, n)]
+    if initial:
+        starts.append(list(initial))
+    best_order, best_cost = None, float("inf")
+    for order in starts:
+        cost = tour.cost(order)
+        improved = True
+        while improved:
+            order, cost, improved_2opt = _two_opt(tour, order, cost)
+            order, cost, improved_or = _or_opt(tour, order, cost)
+            improved = improved_2opt or improved_or
+        if cost < best_cost:
+            best_order, best_cost = order, cost
+    return best_order, best_cost
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MATRICE DES TRAJETS + JOURNÉE D'UN TECHNICIEN
+# ═══════════════════════════════════════════════════════════════════
+
+def build_leg_matrix(places: List[str], locators: Optional[List[str]] = None,
+                     offline: bool = False, mode: str = "driving") -> Dict:
+    """
+    Matrices km / minutes entre tous les lieux.
+
+    Args:
+        places: Adresses (Google)
+        locators: Pour l'estimation hors ligne, texte contenant le code postal de
+            chaque lieu (défaut: places)
+        offline: True = aucune requête Google (RTA seulement)
+
+    Returns:
+        {'km': [[...]], 'minutes': [[...]], 'estimated_legs': int}
+    """
+    n = len(places)
+    locators = locators or places
+    google = {}
+    if not offline:
+        try:
+            google = get_distance_service().matrix(places, places, api_key=get_google_maps_api_key(), mode=mode)
+        except Exception as e:
+            print(f"[WARN] Matrice Google indisponible, estimation hors ligne: {e}")
+
+    engine = get_fsa_engine()
+    km = [[0.0] * n for _ in range(n)]
+    minutes = [[0.0] * n for _ in range(n)]
+    estimated = 0
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
+            leg = google.get((places[i], places[j]))
+            if not leg or "error" in leg:
+                leg = engine.estimate(locators[i], locators[j])
+                estimated += 1
+            if leg:
+                km[i][j], minutes[i][j] = leg["distance_m"] / 1000.0, leg["duration_s"] / 60.0
+            else:
+                km[i][j], minutes[i][j] = FALLBACK_LEG
+    return {"km": km, "minutes": minutes, "estimated_legs": estimated}
+
+
+def _hhmm_to_minutes(value: Optional[str]) -> Optional[float]:
+    try:
+        hour, minute = str(value).split(":")[:2]
+        return int(hour) * 60 + int(minute)
+    except (ValueError, AttributeError):
+        return None
+
+
+def _minutes_to_hhmm(value: float) -> str:
+    value = int(round(value))
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def load_day_stops(technician_id: str, date: str) -> List[Dict]:
+    """RV non annulés d'un technicien pour une date, avec adresse client (gazelle_appointments)."""
+    storage = get_shared_storage()
+    resp = storage.session.get(
+        f"{storage.api_url}/gazelle_appointments",
+        headers=storage._get_headers(),
+        params={
+            "technicien": f"eq.{technician_id}",
+            "appointment_date": f"eq.{date}",
+            "status": "neq.CANCELLED",
+            "select": "external_id,title,appointment_time,duration_minutes,client_external_id",
+            "order": "appointment_time.asc",
+        },
+        timeout=15,
+    )
+    resp.raise_for_status()
+    appointments = [a for a in resp.json() if a.get("client_external_id")]
+
+    client_ids = sorted({a["client_external_id"] for a in appointments})
+    clients = {}
+    if client_ids:
+        resp = storage.session.get(
+            f"{storage.api_url}/gazelle_clients",
+            headers=storage._get_headers(),
+            params={
+                "external_id": f"in.({','.join(client_ids)})",
+                "select": "external_id,company_name,address,city,postal_code",
+            },
+            timeout=15,
+        )
+        resp.raise_for_status()
+        clients = {c["external_id"]: c for c in resp.json()}
+
+    stops = []
+    for apt in appointments:
+        client = clients.get(apt["client_external_id"]) or {}
+        parts = [client.get("address"), client.get("city"),
+                 f"QC {client['postal_code']}" if client.get("postal_code") else None]
+        address = ", ".join(p for p in parts if p)
+        if not address:
+            continue
+        stops.append({
+            "appointment_id": apt.get("external_id"),
+            "label": client.get("company_name") or apt.get("title") or "RV",
+            "address": address,
+            "time": (apt.get("appointment_time") or "")[:5] or None,
+            "duration": apt.get("duration_minutes") or 60,
+        })
+    return stops
+
+
+def optimize_stops(stops: List[Dict], home_address: str, home_postal: Optional[str] = None,
+                   window_slack_minutes: Optional[float] = None, offline: bool = False,
+                   mode: str = "driving") -> Dict:
+    """
+    Compare l'ordre actuel des RV à l'ordre optimisé.
+
+    Args:
+        stops: [{'label', 'address', 'time' ('HH:MM' ou None), 'duration'}, ...] dans l'ordre actuel
+        home_address: Adresse maison (départ et retour)
+        home_postal: Code postal de la maison (estimation hors ligne)
+        window_slack_minutes: None = ordre libre ; sinon chaque RV à ±slack de son heure
+        offline: True = aucune requête Google
+
+    Returns:
+        current / optimized ({'order', 'km', 'minutes', 'late_minutes'}),
+        km_saved, minutes_saved, estimated_legs, solve_ms
+    """
+    places = [home_address] + [s["address"] for s in stops]
+    locators = [home_postal or home_address] + [s["address"] for s in stops]
+    legs = build_leg_matrix(places, locators, offline=offline, mode=mode)
+    km, minutes = legs["km"], legs["minutes"]
+
+    windows: List[Window] = [None]
+    for stop in stops:
+        planned = _hhmm_to_minutes(stop.get("time"))
+        if window_slack_minutes is None or planned is None:
+            windows.append(None)
+        else:
+            windows.append((planned - window_slack_minutes, planned + window_slack_minutes))
+    service = [0.0] + [float(s.get("duration") or 60) for s in stops]
+
+    current = list(range(1, len(stops) + 1))
+    t0 = time.perf_counter()
+    optimized, _ = solve_order(minutes, windows, service, initial=current)
+    solve_ms = (time.perf_counter() - t0) * 1000
+    tour = _Tour(minutes, windows, service, None)
+
+    def describe(order: List[int]) -> Dict:
+        path = [0] + order + [0]
+        total_km = sum(km[a][b] for a, b in zip(path, path[1:]))
+        travel, late, arrivals = tour.schedule(order) if order else (0.0, 0.0, [])
+        return {
+            "order": [
+                {**stops[node - 1], "arrival": _minutes_to_hhmm(arrivals[k]) if tour.timed else None}
+                for k, node in enumerate(order)
+            ],
+            "km": round(total_km, 1),
+            "minutes": round(travel),
+            "late_minutes": round(late / LATE_PENALTY),
+        }
+
+    before, after = describe(current), describe(optimized)
+    return {
+        "stops": len(stops),
+        "current": before,
+        "optimized": after,
+        "km_saved": round(before["km"] - after["km"], 1),
+        "minutes_saved": before["minutes"] - after["minutes"],
+        "estimated_legs": legs["estimated_legs"],
+        "solve_ms": round(solve_ms, 1),
+    }
+
+
+def optimize_technician_day(technician_id: str, date: str,
+                            window_slack_minutes: Optional[float] = None,
+                            offline: bool = False, mode: str = "driving") -> Dict:
+    """Charge la journée (gazelle_appointments) d'un technicien et optimise l'ordre de visite."""
+    home_address = HOME_ADDRESSES.get(technician_id, '')
+    if not home_address:
+        raise ValueError(f"Home address not configured for {technician_id}")
+    stops = load_day_stops(technician_id, date)
+    result = optimize_stops(stops, home_address, HOME_POSTAL_CODES.get(technician_id),
+                            window_slack_minutes=window_slack_minutes, offline=offline, mode=mode)
+    return {"technician_id": technician_id, "date": date, **result}
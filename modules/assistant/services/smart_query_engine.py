@@ -20,7 +20,6 @@ import unicodedata
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 
-import requests
 
 try:
     from anthropic import Anthropic
@@ -28,6 +27,7 @@ except ImportError:
     Anthropic = None
 
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -298,7 +298,7 @@ class SmartQueryEngine:
         """Cherche une recette existante qui matche les mots-clés."""
         try:
             url = f"{self.storage.api_url}/learned_queries?select=*&order=times_used.desc&limit=50"
-            response = requests.get(url, headers=self.storage._get_headers())
+            response = self.storage.session.get(url, headers=self.storage._get_headers())
 
             if response.status_code != 200:
                 print(f"⚠️  SmartQuery: erreur lecture learned_queries: {response.status_code}")
@@ -376,7 +376,9 @@ Génère un JSON avec:
 
 JSON:"""
 
-            response = self.anthropic.messages.create(
+            from core.llm_gateway import get_llm_gateway
+            response = get_llm_gateway().create(
+                "smart_query_plan", client=self.anthropic,
                 model="claude-haiku-4-5-20251001",
                 max_tokens=1500,
                 system=system_prompt,
@@ -439,7 +441,7 @@ JSON:"""
             print(f"   📡 Step {i+1}: GET {url[:150]}...")
 
             try:
-                resp = requests.get(url, headers=self.storage._get_headers())
+                resp = self.storage.session.get(url, headers=self.storage._get_headers())
                 if resp.status_code == 200:
                     data = resp.json()
                     step_results[f'step_{i}'] = data
@@ -598,7 +600,7 @@ JSON:"""
             headers = self.storage._get_headers()
             headers["Prefer"] = "return=representation"
 
-            resp = requests.post(url, headers=headers, json=data)
+            resp = get_session().post(url, headers=headers, json=data)
 
             if resp.status_code in [200, 201]:
                 result = resp.json()
@@ -618,7 +620,7 @@ JSON:"""
         try:
             # Lire la valeur actuelle
             url = f"{self.storage.api_url}/learned_queries?id=eq.{recipe_id}&select=times_used"
-            resp = requests.get(url, headers=self.storage._get_headers())
+            resp = self.storage.session.get(url, headers=self.storage._get_headers())
 
             if resp.status_code == 200 and resp.json():
                 current = resp.json()[0].get('times_used', 0)
@@ -628,7 +630,7 @@ JSON:"""
                     'times_used': current + 1,
                     'last_used_at': datetime.now().isoformat()
                 }
-                requests.patch(patch_url, headers=self.storage._get_headers(), json=patch_data)
+                self.storage.session.patch(patch_url, headers=self.storage._get_headers(), json=patch_data)
 
         except Exception as e:
             print(f"⚠️  SmartQuery: erreur increment usage: {e}")
@@ -641,7 +643,7 @@ JSON:"""
         """Liste toutes les recettes apprises."""
         try:
             url = f"{self.storage.api_url}/learned_queries?select=*&order=times_used.desc"
-            resp = requests.get(url, headers=self.storage._get_headers())
+            resp = self.storage.session.get(url, headers=self.storage._get_headers())
             if resp.status_code == 200:
                 return resp.json()
             return []
@@ -652,7 +654,7 @@ JSON:"""
         """Supprime une recette."""
         try:
             url = f"{self.storage.api_url}/learned_queries?id=eq.{recipe_id}"
-            resp = requests.delete(url, headers=self.storage._get_headers())
+            resp = self.storage.session.delete(url, headers=self.storage._get_headers())
             return resp.status_code in [200, 204]
         except Exception:
             return False
@@ -2,10 +2,22 @@
 """
 Service de recherche vectorielle pour l'assistant conversationnel.
 
-Utilise OpenAI embeddings et l'index vectoriel pré-calculé (gazelle_vectors.pkl)
-pour trouver les contextes les plus pertinents selon la question posée.
+Utilise OpenAI embeddings et l'index vectoriel pré-calculé pour trouver les
+contextes les plus pertinents selon la question posée.
+
+Format de l'index (à côté de l'ancien gazelle_vectors.pkl) :
+- gazelle_vectors.npy        matrice float32 (N x D), lignes pré-normalisées,
+                             ouverte en mmap (pas de copie en RAM au démarrage)
+- gazelle_vectors.meta.json  texts / sources / metadata (même ordre que les lignes)
+- gazelle_vectors.ivf.npz    (optionnel, index > IVF_MIN_ROWS) partition grossière
+                             type IVF : centroïdes + lignes regroupées par liste
+
+L'ancien .pkl est converti automatiquement au premier chargement (ou quand il
+est plus récent que la matrice). Une recherche = un produit matrice-vecteur +
+argpartition pour le top-k, au lieu d'une boucle Python sur chaque vecteur.
 """
 
+import json
 import os
 import pickle
 import numpy as np
@@ -13,6 +25,115 @@ from typing import List, Dict, Tuple, Any, Optional
 from pathlib import Path
 import openai
 
+# Au-delà, on construit une partition IVF (recherche sur nprobe listes seulement)
+IVF_MIN_ROWS = int(os.environ.get('VECTOR_IVF_MIN_ROWS', '1000000'))
+IVF_NPROBE = int(os.environ.get('VECTOR_IVF_NPROBE', '8'))
+IVF_TRAIN_SAMPLE = 50000
+IVF_ITERATIONS = 10
+
+
+def _index_paths(base_path: Path) -> Tuple[Path, Path, Path]:
+    """Chemins (matrice .npy, métadonnées .meta.json, partition .ivf.npz) d'un index."""
+    stem = base_path.with_suffix('')
+    return (
+        stem.with_suffix('.npy'),
+        stem.parent / f"{stem.name}.meta.json",
+        stem.parent / f"{stem.name}.ivf.npz",
+    )
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # vecteur nul -> similarité 0 partout
+    return matrix / norms
+
+
+def _build_ivf(matrix: np.ndarray, n_lists: Optional[int] = None, seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Partition grossière type IVF : k-means sur un échantillon, puis affectation
+    de chaque ligne à son centroïde le plus proche (cosinus).
+
+    Returns:
+        {'centroids': (K x D), 'order': indices des lignes triées par liste,
+         'offsets': bornes de chaque liste dans order (K + 1)}
+    """
+    n_rows = matrix.shape[0]
+    n_lists = n_lists or max(1, int(np.sqrt(n_rows)))
+    rng = np.random.default_rng(seed)
+
+    sample_idx = rng.choice(n_rows, size=min(n_rows, IVF_TRAIN_SAMPLE), replace=False)
+    sample = np.asarray(matrix[np.sort(sample_idx)], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=min(n_lists, len(sample)), replace=False)]
+
+    for _ in range(IVF_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for k in range(len(centroids)):
+            members = sample[assign == k]
+            if len(members):
+                centroids[k] = members.mean(axis=0)
+        centroids = _normalize_rows(centroids).astype(np.float32)
+
+    # Affectation de toutes les lignes, par blocs (mmap-friendly)
+    assignments = np.empty(n_rows, dtype=np.int32)
+    for start in range(0, n_rows, 100000):
+        block = np.asarray(matrix[start:start + 100000])
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+    order = np.argsort(assignments, kind='stable').astype(np.int64)
+    counts = np.bincount(assignments, minlength=len(centroids))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return {'centroids': centroids, 'order': order, 'offsets': offsets}
+
+
+def build_vector_index(
+    base_path: Path,
+    texts: List[str],
+    vectors: Any,
+    sources: List[Any],
+    metadata: List[Any],
+    use_ivf: Optional[bool] = None,
+) -> None:
+    """
+    Écrit un index vectoriel au format matrice + sidecar (écriture atomique).
+
+    Args:
+        base_path: Chemin de référence (ex: data/gazelle_vectors.pkl ; l'extension est ignorée)
+        texts, vectors, sources, metadata: Listes alignées (même ordre)
+        use_ivf: Forcer/désactiver la partition IVF (défaut: si N >= IVF_MIN_ROWS)
+    """
+    matrix_path, meta_path, ivf_path = _index_paths(Path(base_path))
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not len(texts):
+        # Corpus vide : index (0 x D) valide, la recherche renvoie []
+        matrix = vectors.reshape(0, vectors.shape[-1] if vectors.ndim == 2 else 0)
+    else:
+        matrix = _normalize_rows(vectors.reshape(len(texts), -1))
+
+    tmp_matrix = matrix_path.with_name(matrix_path.name + '.tmp')
+    with open(tmp_matrix, 'wb') as f:
+        np.save(f, matrix)
+    tmp_meta = meta_path.with_name(meta_path.name + '.tmp')
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump({
+            'count': int(matrix.shape[0]),
+            'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            'texts': list(texts),
+            'sources': list(sources),
+            'metadata': list(metadata),
+        }, f, ensure_ascii=False, default=str)
+
+    if use_ivf is None:
+        use_ivf = matrix.shape[0] >= IVF_MIN_ROWS
+    if use_ivf and matrix.shape[0]:
+        tmp_ivf = ivf_path.with_name(ivf_path.name + '.tmp.npz')
+        np.savez(tmp_ivf, **_build_ivf(matrix))
+        os.replace(tmp_ivf, ivf_path)
+    elif ivf_path.exists():
+        ivf_path.unlink()
+
+    os.replace(tmp_matrix, matrix_path)
+    os.replace(tmp_meta, meta_path)
+
 
 class VectorSearch:
     """Gestionnaire de recherche vectorielle avec OpenAI embeddings."""
@@ -22,7 +143,8 @@ class VectorSearch:
         Initialise le service de recherche vectorielle.
 
         Args:
-            vector_file_path: Chemin vers le fichier .pkl (défaut: data/gazelle_vectors.pkl)
+            vector_file_path: Chemin de l'index (défaut: data/gazelle_vectors.pkl ;
+                la matrice .npy et le sidecar .meta.json sont dérivés de ce chemin)
         """
         # Configuration OpenAI
         self.api_key = os.environ.get('OPENAI_API_KEY')
@@ -45,33 +167,75 @@ class VectorSearch:
 
     def _load_vector_index(self) -> Dict[str, Any]:
         """
-        Charge l'index vectoriel depuis le fichier .pkl.
+        Charge l'index vectoriel (matrice mmap + sidecar), en convertissant
+        l'ancien .pkl si nécessaire.
 
         Returns:
-            Dictionnaire contenant texts, vectors, sources, metadata, etc.
+            Dictionnaire contenant texts, sources, metadata et matrix (N x D, normalisée)
         """
-        if not self.vector_file_path.exists():
+        matrix_path, meta_path, ivf_path = _index_paths(self.vector_file_path)
+        pkl_path = self.vector_file_path.with_suffix('.pkl')
+
+        needs_conversion = pkl_path.exists() and (
+            not matrix_path.exists() or not meta_path.exists()
+            or pkl_path.stat().st_mtime > matrix_path.stat().st_mtime
+        )
+        if needs_conversion:
+            self._convert_pickle(pkl_path)
+
+        if not matrix_path.exists() or not meta_path.exists():
             raise FileNotFoundError(
-                f"Fichier vectoriel non trouvé: {self.vector_file_path}\n"
-                f"Assurez-vous que gazelle_vectors.pkl existe dans le dossier data/"
+                f"Fichier vectoriel non trouvé: {matrix_path}\n"
+                f"Assurez-vous que gazelle_vectors.pkl (ou .npy + .meta.json) existe dans le dossier data/"
             )
 
         try:
-            with open(self.vector_file_path, 'rb') as f:
-                data = pickle.load(f)
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
 
             # Valider la structure
-            required_keys = ['texts', 'vectors', 'sources', 'metadata']
+            required_keys = ['texts', 'sources', 'metadata']
             missing_keys = [key for key in required_keys if key not in data]
 
             if missing_keys:
                 raise ValueError(f"Clés manquantes dans l'index: {missing_keys}")
 
+            data['matrix'] = np.load(matrix_path, mmap_mode='r')
+            if data['matrix'].shape[0] != len(data['texts']):
+                raise ValueError(
+                    f"Index incohérent: {data['matrix'].shape[0]} vecteurs pour {len(data['texts'])} textes"
+                )
+
+            data['ivf'] = None
+            if ivf_path.exists():
+                with np.load(ivf_path) as ivf:
+                    data['ivf'] = {key: ivf[key] for key in ('centroids', 'order', 'offsets')}
+
             return data
 
         except Exception as e:
             raise RuntimeError(f"Erreur lors du chargement de l'index vectoriel: {e}")
 
+    def _convert_pickle(self, pkl_path: Path):
+        """Convertit l'ancien gazelle_vectors.pkl au format matrice + sidecar."""
+        print(f"🔄 Conversion de {pkl_path.name} en matrice float32 + métadonnées...")
+        try:
+            with open(pkl_path, 'rb') as f:
+                data = pickle.load(f)
+
+            required_keys = ['texts', 'vectors', 'sources', 'metadata']
+            missing_keys = [key for key in required_keys if key not in data]
+            if missing_keys:
+                raise ValueError(f"Clés manquantes dans l'index: {missing_keys}")
+
+            build_vector_index(
+                pkl_path, data['texts'], data['vectors'], data['sources'], data['metadata']
+            )
+            print(f"✅ Index converti: {len(data['texts'])} entrées")
+
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors de la conversion de l'index vectoriel: {e}")
+
     def get_embedding(self, text: str, model: str = "text-embedding-ada-002") -> List[float]:
         """
         Génère l'embedding OpenAI pour un texte donné.
@@ -145,31 +309,81 @@ class VectorSearch:
         """
         # Générer l'embedding de la question
         query_vector = self.get_embedding(query)
+        return self.search_vector(query_vector, top_k=top_k, min_similarity=min_similarity)
 
-        # Calculer les similarités avec tous les vecteurs de l'index
-        texts = self.index_data['texts']
-        vectors = self.index_data['vectors']
-        sources = self.index_data['sources']
-        metadata = self.index_data['metadata']
+    def search_vector(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        min_similarity: float = 0.5,
+        nprobe: int = IVF_NPROBE
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k par similarité cosinus pour un vecteur déjà calculé.
+
+        Les lignes de la matrice étant normalisées, les similarités sont un seul
+        produit matrice-vecteur ; argpartition isole le top-k sans tri complet.
+        Avec une partition IVF, seules les nprobe listes les plus proches sont lues.
 
-        similarities = []
-        for i, doc_vector in enumerate(vectors):
-            similarity = self.cosine_similarity(query_vector, doc_vector)
+        Args:
+            query_vector: Embedding de la question
+            top_k: Nombre de résultats à retourner
+            min_similarity: Seuil minimum de similarité (0-1)
+            nprobe: Nombre de listes IVF explorées (si partition présente)
 
-            if similarity >= min_similarity:
-                similarities.append({
-                    'text': texts[i],
-                    'source': sources[i],
-                    'metadata': metadata[i],
-                    'similarity': similarity,
-                    'index': i
-                })
+        Returns:
+            Même format que search()
+        """
+        matrix = self.index_data['matrix']
+        if top_k <= 0 or matrix.shape[0] == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        ivf = self.index_data.get('ivf')
+        if ivf is not None:
+            centroid_scores = ivf['centroids'] @ query
+            probe = np.argsort(-centroid_scores)[:max(1, nprobe)]
+            offsets, order = ivf['offsets'], ivf['order']
+            candidates = np.sort(np.concatenate(
+                [order[offsets[k]:offsets[k + 1]] for k in probe]
+            ))
+            scores = np.asarray(matrix[candidates]) @ query
+        else:
+            candidates = None
+            scores = matrix @ query
+
+        k = min(top_k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        # Tri décroissant du top-k ; à égalité, ordre de l'index (déterministe)
+        top = top[np.lexsort((top, -scores[top]))]
 
-        # Trier par similarité décroissante
-        similarities.sort(key=lambda x: x['similarity'], reverse=True)
+        texts = self.index_data['texts']
+        sources = self.index_data['sources']
+        metadata = self.index_data['metadata']
 
-        # Retourner les top_k résultats
-        return similarities[:top_k]
+        results = []
+        for pos in top:
+            similarity = float(scores[pos])
+            if similarity < min_similarity:
+                break
+            i = int(candidates[pos]) if candidates is not None else int(pos)
+            results.append({
+                'text': texts[i],
+                'source': sources[i],
+                'metadata': metadata[i],
+                'similarity': similarity,
+                'index': i
+            })
+
+        return results
 
     def get_context_for_query(
         self,
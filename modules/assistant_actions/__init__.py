@@ -5,7 +5,7 @@ Architecture :
 - intent_detector : reconnaît l'intention dans le texte du user
 - estimate_actions : crée ou améliore une soumission Gazelle
 - audit_log : logue chaque action dans assistant_actions_log
-- rate_limiter : limite N actions / heure / user
+- rate_limiter : limite N actions / heure / user (fenêtre glissante SQLite locale)
 
 Flow standard :
 1. User → /chat/action/preview avec son texte
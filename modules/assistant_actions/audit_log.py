@@ -5,9 +5,10 @@ from datetime import datetime
 from typing import Dict, Optional
 import uuid
 
-import requests
 
-from core.supabase_storage import SupabaseStorage
+from core.supabase_storage import get_shared_storage
+from core.http_session import get_session
+from .rate_limiter import record_action
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ def log_action(
     preview_token: Optional[str] = None,
 ) -> Optional[str]:
     """Écrit une entrée dans assistant_actions_log. Retourne l'id ou None si échec."""
-    storage = SupabaseStorage(silent=True)
+    storage = get_shared_storage()
     row = {
         'user_id': user_id,
         'user_role': user_role,
@@ -43,21 +44,25 @@ def log_action(
     try:
         url = f"{storage.api_url}/assistant_actions_log"
         headers = {**storage._get_headers(), 'Prefer': 'return=representation'}
-        resp = requests.post(url, headers=headers, json=row, timeout=10)
+        resp = get_session().post(url, headers=headers, json=row, timeout=10)
         if resp.status_code in (200, 201):
             data = resp.json()
-            if isinstance(data, list) and data:
-                return data[0].get('id')
-            return None
+            log_id = data[0].get('id') if isinstance(data, list) and data else None
+            if status == 'executed':
+                record_action(user_id, action_type, log_id=str(log_id) if log_id else None)
+            return log_id
         logger.warning(f"audit_log POST {resp.status_code}: {resp.text[:200]}")
     except Exception as exc:
         logger.warning(f"audit_log error: {exc}")
+    if status == 'executed':
+        # Non journalisée en base : la compter quand même dans la fenêtre locale
+        record_action(user_id, action_type)
     return None
 
 
 def find_pending_preview(token: str) -> Optional[Dict]:
     """Trouve une preview en attente par son token (si pas encore exécutée)."""
-    storage = SupabaseStorage(silent=True)
+    storage = get_shared_storage()
     try:
         url = (
             f"{storage.api_url}/assistant_actions_log"
@@ -65,7 +70,7 @@ def find_pending_preview(token: str) -> Optional[Dict]:
             f"&status=eq.preview"
             f"&order=created_at.desc&limit=1"
         )
-        resp = requests.get(url, headers=storage._get_headers(), timeout=10)
+        resp = storage.session.get(url, headers=storage._get_headers(), timeout=10)
         if resp.status_code == 200:
             data = resp.json() or []
             return data[0] if data else None
@@ -74,12 +79,25 @@ def find_pending_preview(token: str) -> Optional[Dict]:
     return None
 
 
-def mark_executed(log_id: str, response: Dict, status: str = 'executed', error: Optional[str] = None):
-    """Met à jour un log entry comme exécuté."""
-    storage = SupabaseStorage(silent=True)
+def mark_executed(
+    log_id: str,
+    response: Dict,
+    status: str = 'executed',
+    error: Optional[str] = None,
+    user_id: Optional[str] = None,
+    action_type: Optional[str] = None,
+):
+    """Met à jour un log entry comme exécuté.
+
+    Avec status='executed', l'action est aussi inscrite dans la fenêtre locale
+    du rate limiter (comme log_action). user_id/action_type sont relus sur la
+    ligne mise à jour s'ils ne sont pas fournis.
+    """
+    storage = get_shared_storage()
     try:
         url = f"{storage.api_url}/assistant_actions_log?id=eq.{log_id}"
-        headers = {**storage._get_headers(), 'Prefer': 'return=minimal'}
+        prefer = 'return=representation' if status == 'executed' else 'return=minimal'
+        headers = {**storage._get_headers(), 'Prefer': prefer}
         body = {
             'status': status,
             'response': response,
@@ -87,9 +105,16 @@ def mark_executed(log_id: str, response: Dict, status: str = 'executed', error:
         }
         if error:
             body['error_message'] = error[:1000]
-        requests.patch(url, headers=headers, json=body, timeout=10)
+        resp = get_session().patch(url, headers=headers, json=body, timeout=10)
+        if status == 'executed' and not (user_id and action_type) and resp.status_code == 200:
+            rows = resp.json() or []
+            if rows:
+                user_id = user_id or rows[0].get('user_id')
+                action_type = action_type or rows[0].get('action_type')
     except Exception as exc:
         logger.warning(f"mark_executed error: {exc}")
+    if status == 'executed' and user_id and action_type:
+        record_action(user_id, action_type, log_id=str(log_id))
 
 
 def generate_preview_token() -> str:
@@ -3,14 +3,34 @@ Rate limiting pour les actions de l'assistant.
 
 Règle MVP : max 5 actions de type 'estimate.execute' / heure / user.
 Si dépassé → bloque + log + (futur : email à Allan).
+
+Fenêtre glissante tenue dans un SQLite local (RATE_LIMIT_DB_PATH, défaut
+data/rate_limits.sqlite) partagé par les threads ET les workers uvicorn :
+check_rate_limit() est un COUNT indexé (< 1 ms), sans réseau.
+Avant : chaque vérification créait une requête Supabase et téléchargeait
+toutes les lignes de la fenêtre pour en faire len().
+
+- record_action() inscrit une action dès qu'elle est journalisée
+  (audit_log.log_action ou audit_log.mark_executed avec status='executed').
+- Réconciliation avec assistant_actions_log toutes les RATE_LIMIT_SYNC_SECONDS
+  (défaut 300 s), en arrière-plan et par un seul worker à la fois : rattrape
+  les actions loguées ailleurs (autre instance, script) et repeuple le store
+  après un redéploiement. Seule la toute première vérification sur un store
+  vierge attend cette réconciliation ; un échec libère la réservation
+  (nouvel essai rapide) au lieu de laisser le store vide SYNC_SECONDS.
+- Si le SQLite est inutilisable : repli sur l'ancien comptage Supabase.
 """
 import logging
+import os
+import sqlite3
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Tuple
-
-import requests
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-from core.supabase_storage import SupabaseStorage
+from core.supabase_storage import get_shared_storage
+from core.timezone_utils import parse_gazelle_datetime
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +39,204 @@ LIMITS = {
     'estimate.execute': (5, 60),
 }
 
+_DEFAULT_PATH = Path(__file__).resolve().parents[2] / "data" / "rate_limits.sqlite"
+DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", str(_DEFAULT_PATH))
+SYNC_SECONDS = float(os.getenv("RATE_LIMIT_SYNC_SECONDS", "300"))
+# Après une réconciliation ratée : nouvel essai au bout de ce délai (et non SYNC_SECONDS)
+SYNC_RETRY_SECONDS = float(os.getenv("RATE_LIMIT_SYNC_RETRY_SECONDS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    user_id TEXT NOT NULL, action_type TEXT NOT NULL, ts REAL NOT NULL,
+    log_id TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_events_window ON events (user_id, action_type, ts);
+CREATE TABLE IF NOT EXISTS sync (name TEXT PRIMARY KEY, at REAL NOT NULL);
+"""
+
+_limiter: Optional["SlidingWindowLimiter"] = None
+_limiter_lock = threading.Lock()
+
+
+def _parse_ts(value: Optional[str]) -> Optional[float]:
+    try:
+        return parse_gazelle_datetime(value).timestamp() if value else None
+    except ValueError:
+        return None
+
+
+class SlidingWindowLimiter:
+    """Journal d'actions en fenêtre glissante (SQLite WAL, multi-processus)."""
+
+    def __init__(self, path: str = DB_PATH, limits: Dict[str, Tuple[int, int]] = LIMITS):
+        self.path = Path(path)
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._conn = None
+        self._syncing = False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # timeout : attente du verrou d'écriture tenu par un autre worker
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def count(self, user_id: str, action_type: str, window_min: int) -> int:
+        cutoff = time.time() - window_min * 60
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM events WHERE user_id = ? AND action_type = ? AND ts >= ?",
+                (user_id, action_type, cutoff),
+            ).fetchone()
+        return row[0]
+
+    def record(self, user_id: str, action_type: str, ts: Optional[float] = None,
+               log_id: Optional[str] = None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO events (user_id, action_type, ts, log_id) VALUES (?, ?, ?, ?)",
+                (user_id, action_type, ts or time.time(), log_id),
+            )
+
+    # ------------------------------------------------------- réconciliation
+    def _last_sync(self) -> Optional[float]:
+        with self._lock:
+            row = self.conn.execute("SELECT at FROM sync WHERE name = 'audit_log'").fetchone()
+        return row[0] if row else None
+
+    def _claim_sync(self) -> bool:
+        """Réserve la prochaine réconciliation (un seul worker par période)."""
+        now = time.time()
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO sync (name, at) VALUES ('audit_log', ?) "
+                "ON CONFLICT(name) DO UPDATE SET at = excluded.at WHERE sync.at <= ?",
+                (now, now - SYNC_SECONDS),
+            )
+            return cur.rowcount > 0
+
+    def _release_sync(self, first: bool):
+        """Réconciliation ratée : libère la réservation au lieu de bloquer SYNC_SECONDS.
+
+        Store vierge : la réservation est supprimée, la prochaine vérification
+        refait une réconciliation synchrone. Sinon : réservation antidatée pour
+        un nouvel essai dans SYNC_RETRY_SECONDS.
+        """
+        with self._lock, self.conn:
+            if first:
+                self.conn.execute("DELETE FROM sync WHERE name = 'audit_log'")
+            else:
+                self.conn.execute(
+                    "UPDATE sync SET at = ? WHERE name = 'audit_log'",
+                    (time.time() - SYNC_SECONDS + SYNC_RETRY_SECONDS,),
+                )
+
+    def reconcile(self) -> int:
+        """Importe les actions 'executed' récentes d'assistant_actions_log. Retourne le nb de lignes lues."""
+        if not self.limits:
+            return 0
+        window_min = max(w for _, w in self.limits.values())
+        cutoff = (datetime.now() - timedelta(minutes=window_min)).isoformat()
+        storage = get_shared_storage()
+        resp = storage.session.get(
+            f"{storage.api_url}/assistant_actions_log",
+            headers=storage._get_headers(),
+            params={
+                "action_type": f"in.({','.join(self.limits)})",
+                "status": "eq.executed",
+                "created_at": f"gte.{cutoff}",
+                "select": "id,user_id,action_type,created_at",
+            },
+            timeout=10,
+        )
+        resp.raise_for_status()
+        rows = [
+            (r["user_id"], r["action_type"], _parse_ts(r.get("created_at")) or time.time(), str(r["id"]))
+            for r in resp.json() or [] if r.get("user_id")
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO events (user_id, action_type, ts, log_id) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            # Purge : rien ne sert au-delà de la plus longue fenêtre
+            self.conn.execute("DELETE FROM events WHERE ts < ?", (time.time() - 2 * window_min * 60,))
+        return len(rows)
+
+    def _reconcile_safe(self, first: bool = False) -> bool:
+        try:
+            self.reconcile()
+            return True
+        except Exception as exc:
+            logger.warning(f"rate_limit reconcile error: {exc}")
+            try:
+                self._release_sync(first)
+            except sqlite3.Error as release_exc:
+                logger.warning(f"rate_limit release error: {release_exc}")
+            return False
+        finally:
+            self._syncing = False
+
+    def maybe_reconcile(self):
+        """Réconciliation de fond si la dernière date de plus de SYNC_SECONDS.
+
+        Store vierge (1er démarrage, redéploiement) : réconciliation synchrone,
+        sinon les actions déjà faites dans la fenêtre seraient ignorées.
+        """
+        first = self._last_sync() is None
+        if self._syncing or not self._claim_sync():
+            return
+        self._syncing = True
+        if first:
+            self._reconcile_safe(first=True)
+        else:
+            threading.Thread(target=self._reconcile_safe, name="rate-limit-sync", daemon=True).start()
+
+
+def get_limiter() -> SlidingWindowLimiter:
+    """Retourne le limiteur partagé (singleton)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = SlidingWindowLimiter()
+    return _limiter
+
+
+def record_action(user_id: str, action_type: str, log_id: Optional[str] = None):
+    """Inscrit une action exécutée dans la fenêtre locale (no-op si non limitée)."""
+    if action_type not in LIMITS or not user_id:
+        return
+    try:
+        get_limiter().record(user_id, action_type, log_id=log_id)
+    except Exception as exc:
+        logger.warning(f"rate_limit record error: {exc}")
+
+
+def _count_from_supabase(user_id: str, action_type: str, window_min: int) -> Optional[int]:
+    """Ancien comptage (repli si le store local est inutilisable)."""
+    cutoff = (datetime.now() - timedelta(minutes=window_min)).isoformat()
+    storage = get_shared_storage()
+    url = (
+        f"{storage.api_url}/assistant_actions_log"
+        f"?user_id=eq.{user_id}"
+        f"&action_type=eq.{action_type}"
+        f"&status=eq.executed"
+        f"&created_at=gte.{cutoff}"
+        f"&select=id"
+    )
+    resp = storage.session.get(url, headers=storage._get_headers(), timeout=10)
+    if resp.status_code != 200:
+        logger.warning(f"rate_limit check failed: {resp.status_code}")
+        return None
+    return len(resp.json() or [])
+
 
 def check_rate_limit(user_id: str, action_type: str) -> Tuple[bool, str]:
     """Retourne (ok, message). ok=True si l'action peut procéder."""
@@ -26,24 +244,17 @@ def check_rate_limit(user_id: str, action_type: str) -> Tuple[bool, str]:
         return True, ""
 
     max_count, window_min = LIMITS[action_type]
-    cutoff = (datetime.now() - timedelta(minutes=window_min)).isoformat()
-
-    storage = SupabaseStorage(silent=True)
     try:
-        url = (
-            f"{storage.api_url}/assistant_actions_log"
-            f"?user_id=eq.{user_id}"
-            f"&action_type=eq.{action_type}"
-            f"&status=eq.executed"
-            f"&created_at=gte.{cutoff}"
-            f"&select=id"
-        )
-        resp = requests.get(url, headers=storage._get_headers(), timeout=10)
-        if resp.status_code != 200:
-            logger.warning(f"rate_limit check failed: {resp.status_code}")
-            return True, ""  # fail-open : ne pas bloquer si la check échoue
+        try:
+            limiter = get_limiter()
+            limiter.maybe_reconcile()
+            count = limiter.count(user_id, action_type, window_min)
+        except sqlite3.Error as exc:
+            logger.warning(f"rate_limit store error, repli Supabase: {exc}")
+            count = _count_from_supabase(user_id, action_type, window_min)
+            if count is None:
+                return True, ""  # fail-open : ne pas bloquer si la check échoue
 
-        count = len(resp.json() or [])
         if count >= max_count:
             return False, (
                 f"Limite atteinte : {count}/{max_count} actions de type "
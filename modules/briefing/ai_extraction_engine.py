@@ -12,8 +12,8 @@ This module keeps only the shared utility functions:
 from datetime import datetime, date as date_type
 from typing import Dict, List, Optional
 from urllib.parse import quote
+from core.http_session import get_session
 
-import requests as http_requests
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -93,7 +93,7 @@ def fetch_earliest_client_date(storage, client_id: str,
             f"&order=occurred_at.asc"
             f"&limit=1"
         )
-        resp = http_requests.get(url, headers=headers, timeout=8)
+        resp = get_session().get(url, headers=headers, timeout=8)
         if resp.status_code == 200 and resp.json():
             date_str = resp.json()[0].get('occurred_at', '')
             if date_str and len(date_str) >= 10:
@@ -110,7 +110,7 @@ def fetch_earliest_client_date(storage, client_id: str,
             f"&order=appointment_date.asc"
             f"&limit=1"
         )
-        resp = http_requests.get(url, headers=headers, timeout=8)
+        resp = get_session().get(url, headers=headers, timeout=8)
         if resp.status_code == 200 and resp.json():
             date_str = resp.json()[0].get('appointment_date', '')
             if date_str and len(date_str) >= 10:
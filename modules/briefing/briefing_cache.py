@@ -4,11 +4,20 @@ Cache des briefings pour "Ma Journée" V4.
 
 Pré-calcule les briefings narratifs pour aujourd'hui et demain.
 Appelé par le cron de sync ou manuellement.
+
+Incrémental : une entrée par RV (table briefing_cache, voir
+sql/create_briefing_cache_table.sql) avec l'empreinte de ses entrées. À chaque
+warm, seuls les RV dont l'empreinte a changé sont régénérés, et un narratif IA
+dont le prompt est identique est réutilisé sans appel Anthropic.
+Les lignes des dates passées (plus jamais relues) sont purgées à chaque warm,
+au-delà de BRIEFING_CACHE_RETENTION_DAYS.
+Si la table n'existe pas encore : ancien blob par date dans system_settings.
 """
 
+import os
 import json
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 
 import sys
@@ -18,6 +27,24 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from core.supabase_storage import SupabaseStorage
 from modules.briefing.client_intelligence_service import NarrativeBriefingService
 
+CACHE_TABLE = 'briefing_cache'
+# Cache servi tant qu'un warm l'a vérifié récemment (chaque sync le rafraîchit)
+CACHE_MAX_AGE_HOURS = float(os.getenv('BRIEFING_CACHE_MAX_AGE_HOURS', '4'))
+# Au-delà, un briefing inchangé est quand même régénéré (entrées hors
+# empreinte : demande PdA, mode de paiement...). Le narratif reste réutilisé
+# si son prompt n'a pas changé.
+REUSE_MAX_AGE_HOURS = float(os.getenv('BRIEFING_REUSE_MAX_AGE_HOURS', '24'))
+# Lignes gardées pour les dates passées (seules aujourd'hui/demain sont relues)
+RETENTION_DAYS = int(os.getenv('BRIEFING_CACHE_RETENTION_DAYS', '1'))
+
+
+def _age_hours(iso_ts: str) -> Optional[float]:
+    try:
+        ts = datetime.fromisoformat(str(iso_ts).replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    now = datetime.now(ts.tzinfo) if ts.tzinfo else datetime.now()
+    return (now - ts).total_seconds() / 3600
 
 class BriefingCache:
     """Gère le cache des briefings pré-calculés."""
@@ -25,33 +52,53 @@ class BriefingCache:
     def __init__(self):
         self.storage = SupabaseStorage(silent=True)
         self.service = NarrativeBriefingService()
+        self._table_available: Optional[bool] = None
 
     async def warm_cache_async(self, days_ahead: int = 2) -> Dict:
         """
         Pré-calcule les briefings (async version).
         Called from FastAPI endpoints or other async contexts.
         """
-        stats = {'dates': [], 'total_briefings': 0, 'cached': 0, 'errors': 0}
+        stats = {'dates': [], 'total_briefings': 0, 'cached': 0, 'errors': 0,
+                 'reused': 0, 'regenerated': 0, 'ai_calls': 0, 'narrative_hits': 0}
 
-        for i in range(days_ahead):
-            target_date = (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d')
+        dates = [(datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days_ahead)]
+        previous = await asyncio.to_thread(self._load_entries, dates)
+
+        # Narratifs déjà connus (toutes dates) : un RV de « demain » devenu
+        # « aujourd'hui » garde son narratif si le prompt est identique.
+        for rows in previous.values():
+            for row in rows.values():
+                if row.get('narrative_key') and row.get('narrative'):
+                    self.service.narrative_cache[row['narrative_key']] = row['narrative']
+
+        for target_date in dates:
             stats['dates'].append(target_date)
+            before = dict(self.service.stats)
 
             try:
-                briefings = await self.service.get_daily_briefings(target_date=target_date)
-                stats['total_briefings'] += len(briefings)
-
-                cache_key = f"briefings_{target_date}"
-                cache_data = {
-                    'date': target_date,
-                    'generated_at': datetime.now().isoformat(),
-                    'count': len(briefings),
-                    'briefings': briefings,
+                reusable = {
+                    appt_id: row for appt_id, row in previous.get(target_date, {}).items()
+                    if (_age_hours(row.get('generated_at')) or 0) <= REUSE_MAX_AGE_HOURS
                 }
+                briefings = await self.service.get_daily_briefings(
+                    target_date=target_date, cached_entries=reusable
+                )
+                stats['total_briefings'] += len(briefings)
 
-                self._save_cache(cache_key, cache_data)
+                await asyncio.to_thread(
+                    self._save_entries, target_date, briefings, previous.get(target_date, {})
+                )
                 stats['cached'] += len(briefings)
-                print(f"✅ {target_date}: {len(briefings)} briefings mis en cache")
+
+                delta = {k: self.service.stats[k] - before.get(k, 0) for k in self.service.stats}
+                stats['reused'] += delta['reused']
+                stats['regenerated'] += delta['generated']
+                stats['ai_calls'] += delta['ai_calls']
+                stats['narrative_hits'] += delta['narrative_hits']
+                print(f"✅ {target_date}: {len(briefings)} briefings en cache "
+                      f"({delta['reused']} inchangés, {delta['generated']} régénérés, "
+                      f"{delta['ai_calls']} appels IA, {delta['narrative_hits']} narratifs réutilisés)")
 
             except Exception as e:
                 stats['errors'] += 1
@@ -59,6 +106,7 @@ class BriefingCache:
                 import traceback
                 traceback.print_exc()
 
+        await asyncio.to_thread(self._purge_old_entries)
         return stats
 
     def warm_cache(self, days_ahead: int = 2) -> Dict:
@@ -71,8 +119,22 @@ class BriefingCache:
     def get_cached_briefings(self, target_date: str) -> Optional[List[Dict]]:
         """
         Récupère les briefings depuis le cache.
-        Returns None if not cached or cache expired (>4h).
+        Returns None if not cached or cache expired (aucun warm depuis >4h).
         """
+        if self._has_table():
+            rows = self._load_entries([target_date]).get(target_date)
+            if not rows:
+                return None
+            refreshed = max((r.get('refreshed_at') or '') for r in rows.values())
+            age_hours = _age_hours(refreshed)
+            if age_hours is not None and age_hours > CACHE_MAX_AGE_HOURS:
+                print(f"⚠️ Cache périmé ({age_hours:.1f}h)")
+                return None
+            briefings = [r['briefing'] for r in rows.values() if r.get('briefing')]
+            briefings.sort(key=lambda b: (b.get('appointment') or {}).get('time') or '')
+            return briefings
+
+        # Ancien format : un blob par date dans system_settings
         cache_key = f"briefings_{target_date}"
         cached = self._get_cache(cache_key)
 
@@ -82,16 +144,107 @@ class BriefingCache:
         # Check freshness (max 4 hours)
         generated_at = cached.get('generated_at', '')
         if generated_at:
+            age_hours = _age_hours(generated_at)
+            if age_hours is not None and age_hours > CACHE_MAX_AGE_HOURS:
+                print(f"⚠️ Cache périmé ({age_hours:.1f}h)")
+                return None
+
+        return cached.get('briefings', [])
+
+    # ───────────────────────────────────────────────────────────────
+    # Entrées par RV (table briefing_cache)
+    # ───────────────────────────────────────────────────────────────
+
+    def _has_table(self) -> bool:
+        """La table briefing_cache existe-t-elle ? (vérifié une fois)"""
+        if self._table_available is None:
             try:
-                gen_time = datetime.fromisoformat(generated_at)
-                age_hours = (datetime.now() - gen_time).total_seconds() / 3600
-                if age_hours > 4:
-                    print(f"⚠️ Cache périmé ({age_hours:.1f}h)")
-                    return None
+                self.storage.client.table(CACHE_TABLE).select('appointment_id').limit(1).execute()
+                self._table_available = True
             except Exception:
-                pass
+                print(f"⚠️ Table {CACHE_TABLE} absente — cache par date (system_settings)")
+                self._table_available = False
+        return self._table_available
 
-        return cached.get('briefings', [])
+    def _load_entries(self, dates: List[str]) -> Dict[str, Dict[str, Dict]]:
+        """Returns {date: {appointment_id: row}} pour les dates demandées."""
+        if not dates or not self._has_table():
+            return {}
+        try:
+            result = self.storage.client.table(CACHE_TABLE)\
+                .select('*')\
+                .in_('target_date', dates)\
+                .execute()
+        except Exception as e:
+            print(f"⚠️ Erreur lecture cache: {e}")
+            return {}
+        entries: Dict[str, Dict[str, Dict]] = {}
+        for row in result.data or []:
+            entries.setdefault(str(row['target_date'])[:10], {})[row['appointment_id']] = row
+        return entries
+
+    def _save_entries(self, target_date: str, briefings: List[Dict], previous: Dict[str, Dict]):
+        """Upsert une ligne par RV et supprime les RV disparus (annulés, déplacés)."""
+        if not self._has_table():
+            self._save_cache(f"briefings_{target_date}", {
+                'date': target_date,
+                'generated_at': datetime.now(timezone.utc).isoformat(),
+                'count': len(briefings),
+                'briefings': briefings,
+            })
+            return
+
+        # Horodatage UTC explicite : une heure locale naïve serait lue comme UTC
+        # par la colonne timestamptz, faussant les contrôles d'âge
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for b in briefings:
+            appt_id = (b.get('appointment') or {}).get('id')
+            if not appt_id:
+                continue
+            old = previous.get(appt_id) or {}
+            fingerprint = self.service.last_fingerprints.get(appt_id, '')
+            # Réutilisé tel quel -> on garde generated_at et le narratif d'origine
+            unchanged = bool(fingerprint) and old.get('fingerprint') == fingerprint \
+                and old.get('briefing', {}).get('generated_at') == b.get('generated_at')
+            narrative_key = old.get('narrative_key') if unchanged else self.service.last_narrative_keys.get(appt_id)
+            rows.append({
+                'appointment_id': appt_id,
+                'target_date': target_date,
+                'fingerprint': fingerprint,
+                'briefing': b,
+                'narrative_key': narrative_key,
+                'narrative': self.service.narrative_cache.get(narrative_key) if narrative_key else None,
+                'generated_at': old.get('generated_at', now) if unchanged else now,
+                'refreshed_at': now,
+            })
+
+        try:
+            if rows:
+                self.storage.client.table(CACHE_TABLE).upsert(rows, on_conflict='appointment_id').execute()
+            current_ids = {r['appointment_id'] for r in rows}
+            stale = [appt_id for appt_id in previous if appt_id not in current_ids]
+            if stale:
+                # Filtre sur la date : un RV déplacé vers une autre date déjà
+                # traitée a été réécrit (même clé) avec cette autre date
+                self.storage.client.table(CACHE_TABLE).delete() \
+                    .in_('appointment_id', stale).eq('target_date', target_date).execute()
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde cache: {e}")
+
+    def _purge_old_entries(self):
+        """Supprime les lignes des dates passées (au-delà de RETENTION_DAYS)."""
+        if not self._has_table():
+            return
+        cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).strftime('%Y-%m-%d')
+        try:
+            self.storage.client.table(CACHE_TABLE).delete().lt('target_date', cutoff).execute()
+        except Exception as e:
+            print(f"⚠️ Erreur purge cache: {e}")
+
+    # ───────────────────────────────────────────────────────────────
+    # Ancien format (system_settings)
+    # ───────────────────────────────────────────────────────────────
 
     def _save_cache(self, key: str, data: Dict):
         """Sauvegarde dans system_settings."""
@@ -99,7 +252,7 @@ class BriefingCache:
             self.storage.client.table('system_settings').upsert({
                 'key': key,
                 'value': json.dumps(data),
-                'updated_at': datetime.now().isoformat(),
+                'updated_at': datetime.now(timezone.utc).isoformat(),
             }, on_conflict='key').execute()
         except Exception as e:
             print(f"⚠️ Erreur sauvegarde cache: {e}")
@@ -16,6 +16,7 @@ import os
 import re
 import json
 import asyncio
+import hashlib
 from datetime import datetime, date as date_type
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote
@@ -25,6 +26,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from core.supabase_storage import SupabaseStorage
+from core.settings_cache import get_settings_cache
 from modules.briefing.ai_extraction_engine import (
     compute_client_since,
     fetch_earliest_client_date,
@@ -38,7 +40,6 @@ try:
 except ImportError:
     Anthropic = None
 
-import requests as http_requests
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -122,6 +123,30 @@ USEFUL_ENTRY_TYPES = (
     'SERVICE_ENTRY_AUTOMATED',
 )
 
+# Historique chargé PAR CLIENT (fonctions SQL briefing_recent_*, voir
+# sql/create_briefing_recent_history_functions.sql). Un client avec un long
+# historique ne peut plus évincer les autres clients de la journée.
+TIMELINE_PER_CLIENT = int(os.getenv('BRIEFING_TIMELINE_PER_CLIENT', '40'))
+PAST_APPOINTMENTS_PER_CLIENT = int(os.getenv('BRIEFING_PAST_APPOINTMENTS_PER_CLIENT', '10'))
+
+NARRATIVE_MODEL = "claude-haiku-4-5-20251001"
+
+# Champs réécrits à chaque sync (horodatage) : exclus de l'empreinte d'un
+# briefing, sinon chaque sync invaliderait tous les briefings.
+_FINGERPRINT_IGNORED_FIELDS = frozenset({'updated_at', 'synced_at', 'last_synced_at'})
+
+
+def _stable_hash(value: Any) -> str:
+    """Hash court et déterministe d'une structure JSON (champs volatils exclus)."""
+    def _clean(v):
+        if isinstance(v, dict):
+            return {k: _clean(x) for k, x in v.items() if k not in _FINGERPRINT_IGNORED_FIELDS}
+        if isinstance(v, (list, tuple)):
+            return [_clean(x) for x in v]
+        return v
+    raw = json.dumps(_clean(value), sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
 
 class NarrativeBriefingService:
     """Service de briefings narratifs — V4 One-Shot Architecture"""
@@ -130,17 +155,20 @@ class NarrativeBriefingService:
         self.storage = SupabaseStorage(silent=True)
         self.anthropic = self._init_anthropic()
         self.feedback_rules = self._load_training_feedback()
+        # Cache des narratifs IA : hash du prompt -> {narrative, action_items}.
+        # Alimenté par BriefingCache (entrées persistées) et par chaque appel.
+        self.narrative_cache: Dict[str, Dict] = {}
+        # Dernière génération : external_id du RV -> empreinte / clé du narratif
+        self.last_fingerprints: Dict[str, str] = {}
+        self.last_narrative_keys: Dict[str, str] = {}
+        self.stats = {'reused': 0, 'generated': 0, 'ai_calls': 0, 'narrative_hits': 0}
 
     def _init_anthropic(self):
         """Initialize Anthropic client."""
         api_key = os.getenv('ANTHROPIC_API_KEY')
         if not api_key:
-            try:
-                settings = self.storage.get_data('system_settings', filters={'key': 'anthropic_api_key'})
-                if settings and settings[0].get('value'):
-                    api_key = settings[0]['value']
-            except Exception:
-                pass
+            # Cache system_settings en memoire : pas d'aller-retour Supabase par instance
+            api_key = get_settings_cache().get_str('anthropic_api_key')
         if api_key and Anthropic:
             return Anthropic(api_key=api_key)
         print("⚠️  ANTHROPIC_API_KEY manquante — briefings sans narratif IA")
@@ -172,10 +200,18 @@ class NarrativeBriefingService:
 
     async def get_daily_briefings(self, technician_id: str = None,
                                    exclude_technician_id: str = None,
-                                   target_date: str = None) -> List[Dict]:
+                                   target_date: str = None,
+                                   cached_entries: Optional[Dict[str, Dict]] = None) -> List[Dict]:
         """
         Generate narrative briefings for all appointments on a given date.
         Uses batch data fetching + parallel AI generation.
+
+        Args:
+            cached_entries: {appointment_id: {'fingerprint', 'briefing'}} d'une
+                génération précédente. Un RV dont l'empreinte des entrées (RV,
+                client, pianos, historique...) n'a pas changé est réutilisé tel
+                quel, sans régénération. Les empreintes calculées sont exposées
+                dans self.last_fingerprints.
         """
         target_date = target_date or datetime.now().strftime('%Y-%m-%d')
 
@@ -234,6 +270,9 @@ class NarrativeBriefingService:
         # 4. Generate narrative briefings in PARALLEL
         gen_tasks = []
         personal_entries = []
+        reused = []
+        cached_entries = cached_entries or {}
+        self.last_fingerprints = {}
         for appt in appointments:
             event_type = (appt.get('event_type') or '').upper()
             cid = appt.get('client_external_id')
@@ -247,6 +286,27 @@ class NarrativeBriefingService:
                 continue
             if not cid:
                 continue
+
+            appt_id = appt.get('external_id')
+            if appt_id:
+                fingerprint = self.compute_fingerprint(
+                    appt=appt,
+                    client=clients_data.get(cid, {}),
+                    pianos=pianos_data.get(cid, []),
+                    timeline=timeline_data.get(cid, []),
+                    past_appointments=past_appts_data.get(cid, []),
+                    followups=followups_data.get(cid, []),
+                    estimates=estimates_data.get(cid, []),
+                    gazelle_estimates=gazelle_estimates_data.get(cid, []),
+                    technician_id=technician_id,
+                    all_day_appts=[a for a in all_day_appts if a.get('client_external_id') == cid],
+                )
+                self.last_fingerprints[appt_id] = fingerprint
+                previous = cached_entries.get(appt_id)
+                if previous and previous.get('fingerprint') == fingerprint and previous.get('briefing'):
+                    reused.append(previous['briefing'])
+                    continue
+
             gen_tasks.append(self._generate_one_briefing(
                 appt=appt,
                 client=clients_data.get(cid, {}),
@@ -261,11 +321,37 @@ class NarrativeBriefingService:
             ))
 
         briefings = await asyncio.gather(*gen_tasks)
+        self.stats['reused'] += len(reused)
+        self.stats['generated'] += len(gen_tasks)
         # Fusionner RV et entrees perso, tries par heure (journee-complete en tete).
-        all_entries = personal_entries + [b for b in briefings if b]
+        all_entries = personal_entries + reused + [b for b in briefings if b]
         all_entries.sort(key=lambda b: (b.get('appointment') or {}).get('time') or '')
         return all_entries
 
+    def compute_fingerprint(self, appt: Dict, client: Dict, pianos: List[Dict],
+                            timeline: List[Dict], past_appointments: List[Dict],
+                            followups: List[Dict], estimates: List[Dict],
+                            gazelle_estimates: List[Dict], technician_id: str = None,
+                            all_day_appts: List[Dict] = None) -> str:
+        """Empreinte des entrées d'UN briefing : change dès qu'une entrée change.
+
+        Inclut les corrections d'Allan (globales + client) et l'état du rappel
+        PdA, qui modifient aussi le résultat.
+        """
+        cid = appt.get('client_external_id')
+        return _stable_hash({
+            'appointment': _stable_hash(appt),
+            'client': _stable_hash(client),
+            'pianos': _stable_hash(pianos),
+            'timeline': _stable_hash(timeline),
+            'past_appointments': _stable_hash(past_appointments),
+            'followups': _stable_hash(followups),
+            'estimates': _stable_hash([estimates, gazelle_estimates]),
+            'feedback': _stable_hash(self.feedback_rules.get('__GLOBAL__', []) + self.feedback_rules.get(cid, [])),
+            'context': [technician_id, _stable_hash(all_day_appts or []),
+                        bool(getattr(self, '_pda_access_on', False))],
+        })
+
     # ═══════════════════════════════════════════════════════════════
     # PER-CLIENT BRIEFING GENERATION
     # ═══════════════════════════════════════════════════════════════
@@ -711,14 +797,27 @@ class NarrativeBriefingService:
             soumissions_context=soumissions_context,
         )
 
+        # Même prompt -> même narratif : on réutilise sans rappeler l'IA
+        narrative_key = _stable_hash([NARRATIVE_MODEL, prompt])
+        if appt.get('external_id'):
+            self.last_narrative_keys[appt['external_id']] = narrative_key
+        cached = self.narrative_cache.get(narrative_key)
+        if cached:
+            self.stats['narrative_hits'] += 1
+            return cached['narrative'], list(cached.get('action_items') or [])
+
         try:
-            response = self.anthropic.messages.create(
-                model="claude-haiku-4-5-20251001",
+            from core.llm_gateway import get_llm_gateway
+            # Cache persistant de la passerelle : survit aux redémarrages
+            response = get_llm_gateway().create(
+                "briefing_narrative", client=self.anthropic,
+                model=NARRATIVE_MODEL,
                 max_tokens=500,
                 temperature=0.2,
                 system="Tu retournes UNIQUEMENT du JSON valide sans markdown. Sois concis et utile.",
                 messages=[{"role": "user", "content": prompt}],
             )
+            self.stats['narrative_hits' if getattr(response, 'from_cache', False) else 'ai_calls'] += 1
 
             raw = response.content[0].text.strip()
             # Clean markdown fences if present
@@ -731,6 +830,7 @@ class NarrativeBriefingService:
             action_items = result.get('action_items', [])
             # Filter empty items
             action_items = [item for item in action_items if item and len(item) > 3]
+            self.narrative_cache[narrative_key] = {'narrative': narrative, 'action_items': action_items}
             return narrative, action_items
 
         except Exception as e:
@@ -924,7 +1024,6 @@ class NarrativeBriefingService:
         or None if no payment history.
         """
         try:
-            import requests as req
             url = (
                 f"{self.storage.api_url}/gazelle_timeline_entries"
                 f"?client_external_id=eq.{client_external_id}"
@@ -933,7 +1032,7 @@ class NarrativeBriefingService:
                 f"&order=occurred_at.desc"
                 f"&limit=10"
             )
-            resp = req.get(url, headers=self.storage._get_headers())
+            resp = self.storage.session.get(url, headers=self.storage._get_headers())
             if resp.status_code != 200 or not resp.json():
                 return None
 
@@ -980,7 +1079,6 @@ class NarrativeBriefingService:
         # --- Signal 1: Check timeline for estimate→invoice conversions ---
         invoiced_estimate_numbers = set()
         try:
-            import requests as req
             url = (
                 f"{self.storage.api_url}/gazelle_timeline_entries"
                 f"?client_id=eq.{client_id}"
@@ -989,7 +1087,7 @@ class NarrativeBriefingService:
                 f"&select=estimate_id,title"
                 f"&limit=50"
             )
-            resp = req.get(url, headers=self.storage._get_headers())
+            resp = self.storage.session.get(url, headers=self.storage._get_headers())
             if resp.status_code == 200:
                 for entry in resp.json():
                     # estimate_id is Gazelle ID like "est_xxx", extract number from title
@@ -1009,7 +1107,7 @@ class NarrativeBriefingService:
                 f"&order=occurred_at.desc"
                 f"&limit=30"
             )
-            svc_resp = req.get(svc_url, headers=self.storage._get_headers())
+            svc_resp = self.storage.session.get(svc_url, headers=self.storage._get_headers())
             if svc_resp.status_code == 200:
                 for t in svc_resp.json():
                     occ = (t.get('occurred_at', '') or '')[:10]
@@ -1042,7 +1140,7 @@ class NarrativeBriefingService:
                     f"&select=title"
                     f"&limit=1"
                 )
-                resp2 = req.get(url2, headers=self.storage._get_headers())
+                resp2 = self.storage.session.get(url2, headers=self.storage._get_headers())
                 if resp2.status_code == 200 and resp2.json():
                     invoiced = True
             except Exception:
@@ -1113,13 +1211,30 @@ class NarrativeBriefingService:
     def _supabase_get(self, url: str) -> list:
         """Helper: GET from Supabase REST API."""
         try:
-            resp = http_requests.get(url, headers=self.storage._get_headers(), timeout=10)
+            resp = self.storage.session.get(url, headers=self.storage._get_headers(), timeout=10)
             if resp.status_code == 200:
                 return resp.json()
         except Exception as e:
             print(f"⚠️  Supabase GET error: {e}")
         return []
 
+    def _supabase_rpc(self, fn: str, payload: Dict) -> Optional[list]:
+        """Helper: POST /rpc/<fn>. Retourne None si la fonction n'existe pas
+        encore (migration SQL non appliquée) ou en cas d'erreur -> fallback."""
+        try:
+            resp = self.storage.session.post(
+                f"{self.storage.api_url}/rpc/{fn}",
+                headers=self.storage._get_headers(),
+                json=payload,
+                timeout=10,
+            )
+            if resp.status_code == 200:
+                return resp.json()
+            print(f"⚠️  Supabase RPC {fn}: {resp.status_code} — fallback requête globale")
+        except Exception as e:
+            print(f"⚠️  Supabase RPC {fn} error: {e}")
+        return None
+
     # Prefixes de titre qui correspondent a des evenements batch crees par
     # le workflow push_validated_to_gazelle (service_records.py). Ce ne sont
     # pas de vrais RV a afficher dans Ma Journee.
@@ -1166,9 +1281,33 @@ class NarrativeBriefingService:
 
     def _batch_fetch_past_appointments(self, client_ids: List[str]) -> Dict[str, List[Dict]]:
         """Fetch past appointments for all clients (contain rich descriptions/notes).
-        Returns {client_id: [appointments]}."""
+        Les N derniers PAR client (briefing_recent_appointments), par lots qui
+        tiennent sous le max-rows PostgREST. Returns {client_id: [appointments]}."""
         if not client_ids:
             return {}
+        client_ids = list(client_ids)
+        chunk_size = max(1, self.storage.MAX_ROWS // max(1, PAST_APPOINTMENTS_PER_CLIENT))
+        data = []
+        for start in range(0, len(client_ids), chunk_size):
+            chunk = self._supabase_rpc('briefing_recent_appointments', {
+                'p_client_ids': client_ids[start:start + chunk_size],
+                'p_per_client': PAST_APPOINTMENTS_PER_CLIENT,
+            })
+            if chunk is None:
+                data = self._legacy_fetch_past_appointments(client_ids)
+                break
+            data.extend(chunk)
+        result = {}
+        for a in data:
+            cid = a.get('client_external_id')
+            if cid:
+                result.setdefault(cid, []).append(a)
+        for cid in result:
+            result[cid].sort(key=lambda a: a.get('appointment_date') or '', reverse=True)
+        return result
+
+    def _legacy_fetch_past_appointments(self, client_ids: List[str]) -> list:
+        """Ancienne requête (limite globale) — tant que la fonction SQL n'est pas déployée."""
         ids_csv = ",".join(quote(cid) for cid in client_ids)
         url = (
             f"{self.storage.api_url}/gazelle_appointments?"
@@ -1176,13 +1315,7 @@ class NarrativeBriefingService:
             f"&order=appointment_date.desc"
             f"&limit=50"
         )
-        data = self._supabase_get(url)
-        result = {}
-        for a in data:
-            cid = a.get('client_external_id')
-            if cid:
-                result.setdefault(cid, []).append(a)
-        return result
+        return self._supabase_get(url)
 
     def _batch_fetch_clients(self, client_ids: List[str]) -> Dict[str, Dict]:
         """Fetch all clients in one query. Returns {client_id: client_data}."""
@@ -1208,12 +1341,57 @@ class NarrativeBriefingService:
         return result
 
     def _batch_fetch_timeline(self, client_ids: List[str], piano_ids: List[str]) -> Dict[str, List[Dict]]:
-        """Fetch timeline entries for all clients + pianos. Returns {client_id: [entries]}."""
+        """Fetch timeline entries for all clients + pianos. Returns {client_id: [entries]}.
+
+        briefing_recent_timeline : les TIMELINE_PER_CLIENT dernières entrées par
+        client et par piano, dédoublonnées par external_id. Le max-rows de
+        PostgREST s'applique aussi aux RPC (et les lignes reviennent triées par
+        external_id) : les ids sont découpés en lots dont le pire cas
+        (lot x TIMELINE_PER_CLIENT) tient sous MAX_ROWS, sinon les derniers
+        clients perdraient silencieusement tout leur historique.
+        """
         if not client_ids:
             return {}
 
-        types_csv = ",".join(USEFUL_ENTRY_TYPES)
+        ids = [('client', cid) for cid in client_ids]
+        ids += [('piano', pid) for pid in (piano_ids or [])]
+        chunk_size = max(1, self.storage.MAX_ROWS // max(1, TIMELINE_PER_CLIENT))
+
+        entries, seen_ids = [], set()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            data = self._supabase_rpc('briefing_recent_timeline', {
+                'p_client_ids': [i for kind, i in chunk if kind == 'client'],
+                'p_piano_ids': [i for kind, i in chunk if kind == 'piano'],
+                'p_entry_types': list(USEFUL_ENTRY_TYPES),
+                'p_per_client': TIMELINE_PER_CLIENT,
+            })
+            if data is None:
+                entries = self._legacy_fetch_timeline(client_ids, piano_ids)
+                break
+            # Une entrée liée au client ET au piano peut revenir dans deux lots
+            for entry in data:
+                ext_id = entry.get('external_id')
+                if ext_id and ext_id in seen_ids:
+                    continue
+                seen_ids.add(ext_id)
+                entries.append(entry)
+
         result = {}
+        for entry in entries:
+            cid = entry.get('client_id')
+            if cid:
+                result.setdefault(cid, []).append(entry)
+
+        # Sort each client's entries by date desc
+        for cid in result:
+            result[cid].sort(key=lambda e: e.get('occurred_at') or '', reverse=True)
+
+        return result
+
+    def _legacy_fetch_timeline(self, client_ids: List[str], piano_ids: List[str]) -> list:
+        """Ancienne paire de requêtes (limites globales 200/100), dédoublonnée par external_id."""
+        types_csv = ",".join(USEFUL_ENTRY_TYPES)
 
         # Fetch by client_id
         ids_csv = ",".join(quote(cid) for cid in client_ids)
@@ -1224,11 +1402,7 @@ class NarrativeBriefingService:
             f"&order=occurred_at.desc"
             f"&limit=200"
         )
-        client_entries = self._supabase_get(url)
-        for entry in client_entries:
-            cid = entry.get('client_id')
-            if cid:
-                result.setdefault(cid, []).append(entry)
+        entries = list(self._supabase_get(url))
 
         # Fetch by piano_id (may catch entries linked to piano but not client)
         if piano_ids:
@@ -1240,21 +1414,13 @@ class NarrativeBriefingService:
                 f"&order=occurred_at.desc"
                 f"&limit=100"
             )
-            piano_entries = self._supabase_get(url)
-            # Add piano entries to the correct client (deduplicate by external_id)
-            seen_ids = {e.get('external_id') for entries in result.values() for e in entries if e.get('external_id')}
-            for entry in piano_entries:
+            seen_ids = {e.get('external_id') for e in entries if e.get('external_id')}
+            for entry in self._supabase_get(url):
                 if entry.get('external_id') in seen_ids:
                     continue
-                cid = entry.get('client_id')
-                if cid:
-                    result.setdefault(cid, []).append(entry)
+                entries.append(entry)
 
-        # Sort each client's entries by date desc
-        for cid in result:
-            result[cid].sort(key=lambda e: e.get('occurred_at', ''), reverse=True)
-
-        return result
+        return entries
 
     def _batch_fetch_followups(self, client_ids: List[str]) -> Dict[str, List[Dict]]:
         """Fetch open follow-ups for all clients. Returns {client_id: [items]}."""
@@ -1594,7 +1760,7 @@ def save_feedback(client_id: str, category: str, field_name: str,
     }
     try:
         url = f"{storage.api_url}/ai_training_feedback"
-        response = http_requests.post(url, json=record, headers=storage._get_headers())
+        response = storage.session.post(url, json=record, headers=storage._get_headers())
         if response.status_code in (200, 201):
             print(f"✅ Feedback sauvegardé pour client {client_id}")
             return True
@@ -22,10 +22,10 @@ from datetime import datetime, timedelta, date as date_type
 from typing import Dict, List, Optional
 from urllib.parse import quote
 
-import requests as http_requests
 
 from core.supabase_storage import SupabaseStorage
 from core.email_notifier import EmailNotifier
+from core.http_session import get_session
 from modules.briefing.client_intelligence_service import NarrativeBriefingService
 
 
@@ -55,7 +55,7 @@ def _fetch_upcoming_appointments(storage: SupabaseStorage, days_ahead: int) -> L
         f"&order=appointment_date.asc"
     )
     try:
-        r = http_requests.get(url, headers=storage._get_headers(), timeout=15)
+        r = storage.session.get(url, headers=storage._get_headers(), timeout=15)
         if r.status_code != 200:
             print(f"⚠️ Fetch appointments HTTP {r.status_code}: {r.text[:200]}")
             return []
@@ -76,7 +76,7 @@ def _fetch_client_info(storage: SupabaseStorage, client_ids: List[str]) -> Dict[
         f"&external_id=in.({ids_csv})"
     )
     try:
-        r = http_requests.get(url, headers=storage._get_headers(), timeout=15)
+        r = storage.session.get(url, headers=storage._get_headers(), timeout=15)
         if r.status_code == 200:
             return {c["external_id"]: c for c in r.json() if c.get("external_id")}
     except Exception:
@@ -101,7 +101,7 @@ def _already_notified_recently(
         f"&select=id&limit=1"
     )
     try:
-        r = http_requests.get(url, headers=storage._get_headers(), timeout=10)
+        r = storage.session.get(url, headers=storage._get_headers(), timeout=10)
         if r.status_code == 200:
             return len(r.json()) > 0
     except Exception:
@@ -130,7 +130,7 @@ def _record_notification(
     url = f"{storage.api_url}/critical_estimate_notifications"
     try:
         headers = {**storage._get_headers(), "Prefer": "return=minimal"}
-        http_requests.post(url, headers=headers, json=row, timeout=10)
+        get_session().post(url, headers=headers, json=row, timeout=10)
     except Exception as exc:
         print(f"⚠️ Impossible de logger notification : {exc}")
 
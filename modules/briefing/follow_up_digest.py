@@ -21,10 +21,10 @@ import os
 from datetime import datetime, timedelta, date as date_type
 from typing import Dict, List, Optional
 
-import requests as http_requests
 
 from core.supabase_storage import SupabaseStorage
 from core.email_notifier import EmailNotifier
+from core.http_session import get_session
 
 
 DEDUP_WINDOW_DAYS = 7
@@ -42,7 +42,7 @@ def _already_notified(storage, client_id, estimate_number):
         f"&select=id&limit=1"
     )
     try:
-        r = http_requests.get(url, headers=storage._get_headers(), timeout=10)
+        r = storage.session.get(url, headers=storage._get_headers(), timeout=10)
         return r.status_code == 200 and len(r.json()) > 0
     except Exception:
         return False
@@ -61,7 +61,7 @@ def _record_notification(storage, client_id, estimate_number, estimate_summary):
     url = f"{storage.api_url}/critical_estimate_notifications"
     try:
         headers = {**storage._get_headers(), "Prefer": "return=minimal"}
-        http_requests.post(url, headers=headers, json=row, timeout=10)
+        get_session().post(url, headers=headers, json=row, timeout=10)
     except Exception as exc:
         print(f"  Log dedup echoue: {exc}")
 
@@ -20,11 +20,11 @@ system_settings 'pda_access_reminder_enabled' à 'false' (aucun redéploiement).
 """
 from datetime import datetime, timedelta
 
-import requests
 
 from core.supabase_storage import SupabaseStorage
 from core.email_notifier import EmailNotifier
 from core.timezone_utils import MONTREAL_TZ
+from core.settings_cache import get_settings_cache
 from config.techniciens_config import get_technicien_by_id, GAZELLE_IDS
 
 PDA_CLIENT = 'cli_HbEwl9rN11pSuDEU'
@@ -52,17 +52,17 @@ def matches_tm_jd(text: str) -> bool:
     return any(k in t for k in SALLE_KEYWORDS)
 
 
-def is_enabled(storage) -> bool:
-    """Activé par défaut ; désactivable via system_settings sans redéploiement."""
-    try:
-        r = requests.get(
-            f"{storage.api_url}/system_settings?key=eq.pda_access_reminder_enabled&select=value",
-            headers=storage._get_headers(), timeout=10)
-        if r.status_code == 200 and r.json():
-            return str(r.json()[0].get('value')).strip().lower() not in ('false', '0', 'off', 'no')
-    except Exception:
-        pass
-    return True
+def is_enabled(storage=None) -> bool:
+    """Activé par défaut ; désactivable via system_settings sans redéploiement.
+
+    Lu dans le cache system_settings en mémoire (core/settings_cache.py) :
+    appelé à chaque génération de « Ma Journée », sans aller-retour Supabase.
+    `storage` n'est plus utilisé (conservé pour les appelants existants).
+    """
+    value = get_settings_cache().get_str('pda_access_reminder_enabled')
+    if value is None:
+        return True
+    return value.strip().lower() not in ('false', '0', 'off', 'no')
 
 
 def run_pda_access_reminder() -> dict:
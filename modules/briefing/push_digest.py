@@ -25,7 +25,6 @@ from typing import Dict, List, Optional
 from collections import defaultdict
 from urllib.parse import quote
 
-import requests as http_requests
 
 from core.supabase_storage import SupabaseStorage
 from core.email_notifier import EmailNotifier
@@ -66,7 +65,7 @@ def _fetch_draft_records(storage: SupabaseStorage) -> List[Dict]:
         f"&order=institution_slug.asc"
     )
     try:
-        r = http_requests.get(url, headers=storage._get_headers(), timeout=15)
+        r = storage.session.get(url, headers=storage._get_headers(), timeout=15)
         if r.status_code != 200:
             print(f"WARN fetch draft HTTP {r.status_code}: {r.text[:200]}")
             return []
@@ -105,7 +104,7 @@ def _fetch_pianos_info(storage: SupabaseStorage, piano_ids: List[str]) -> Dict[s
         f"&external_id=in.({ids_csv})"
     )
     try:
-        r = http_requests.get(url, headers=storage._get_headers(), timeout=15)
+        r = storage.session.get(url, headers=storage._get_headers(), timeout=15)
         if r.status_code == 200:
             return {p["external_id"]: p for p in r.json() if p.get("external_id")}
     except Exception as exc:
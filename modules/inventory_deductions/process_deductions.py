@@ -112,14 +112,13 @@ class InventoryDeductionProcessor:
     def _get_processed_invoice_ids(self) -> set:
         """Récupère les IDs de factures déjà traitées depuis sync_logs."""
         try:
-            import requests
             url = (
                 f"{self.storage.api_url}/sync_logs"
                 f"?script_name=eq.Deduction_Inventaire_Auto"
                 f"&status=eq.success"
                 f"&select=tables_updated"
             )
-            resp = requests.get(url, headers=self.storage._get_headers(), timeout=10)
+            resp = self.storage.session.get(url, headers=self.storage._get_headers(), timeout=10)
             if resp.status_code == 200:
                 ids = set()
                 for log in resp.json():
@@ -20,10 +20,10 @@ load_dotenv()
 from core.supabase_storage import SupabaseStorage
 from core.email_notifier import EmailNotifier
 from core.timezone_utils import MONTREAL_TZ
+from core.http_session import get_session
 from config.techniciens_config import GAZELLE_IDS, get_technicien_by_id
 import os
 import json
-import requests
 
 
 class LateAssignmentNotifier:
@@ -58,7 +58,7 @@ class LateAssignmentNotifier:
                 f"&status=eq.pending"
                 f"&order=scheduled_send_at.asc"
             )
-            response = requests.get(url, headers=self.storage._get_headers())
+            response = self.storage.session.get(url, headers=self.storage._get_headers())
             
             if response.status_code != 200:
                 print(f"Erreur récupération queue: {response.status_code}")
@@ -115,7 +115,7 @@ class LateAssignmentNotifier:
             f"&select=client_external_id,appointment_date,appointment_time,title"
             f"&limit=1"
         )
-        appt_resp = requests.get(appt_url, headers=self.storage._get_headers())
+        appt_resp = self.storage.session.get(appt_url, headers=self.storage._get_headers())
         if appt_resp.status_code != 200 or not appt_resp.json():
             return None, None, None
         appt = appt_resp.json()[0]
@@ -134,7 +134,7 @@ class LateAssignmentNotifier:
             f"&limit=40"
             f"&select=occurred_at,entry_type,user_id,title,description"
         )
-        tl_resp = requests.get(tl_url, headers=self.storage._get_headers())
+        tl_resp = self.storage.session.get(tl_url, headers=self.storage._get_headers())
         if tl_resp.status_code != 200 or not tl_resp.json():
             return None, None, None
         entries = tl_resp.json()
@@ -169,7 +169,7 @@ class LateAssignmentNotifier:
                 f"{self.storage.api_url}/users"
                 f"?external_id=eq.{uid}&select=first_name,last_name,email&limit=1"
             )
-            resp = requests.get(url, headers=self.storage._get_headers())
+            resp = self.storage.session.get(url, headers=self.storage._get_headers())
             if resp.status_code != 200 or not resp.json():
                 return None
             u = resp.json()[0]
@@ -197,9 +197,9 @@ class LateAssignmentNotifier:
             api_key = os.getenv('ANTHROPIC_API_KEY')
             if not api_key:
                 return None
-            from anthropic import Anthropic
-            client = Anthropic(api_key=api_key)
-            response = client.messages.create(
+            from core.llm_gateway import get_llm_gateway
+            response = get_llm_gateway().create(
+                "late_assignment_notifier",
                 model="claude-haiku-4-5-20251001",
                 max_tokens=max_tokens,
                 system=system_prompt,
@@ -465,7 +465,7 @@ class LateAssignmentNotifier:
             ext_id = queue_item.get('appointment_external_id')
             if ext_id:
                 try:
-                    _a = requests.get(
+                    _a = get_session().get(
                         f"{self.storage.api_url}/gazelle_appointments?external_id=eq.{ext_id}"
                         f"&select=title,location,appointment_time&limit=1",
                         headers=self.storage._get_headers()).json()
@@ -660,7 +660,7 @@ class LateAssignmentNotifier:
                 'updated_at': datetime.now(MONTREAL_TZ).isoformat()
             }
             
-            requests.patch(url, headers=headers, json=data)
+            get_session().patch(url, headers=headers, json=data)
             
         except Exception as e:
             print(f"   Erreur marquage sent {queue_id}: {e}")
@@ -678,7 +678,7 @@ class LateAssignmentNotifier:
                 'updated_at': datetime.now(MONTREAL_TZ).isoformat()
             }
             
-            requests.patch(url, headers=headers, json=data)
+            get_session().patch(url, headers=headers, json=data)
             
         except Exception as e:
             print(f"   Erreur marquage failed {queue_id}: {e}")
@@ -14,6 +14,7 @@ Nicolas garde le contrôle total. Le système ne fait que surveiller et alerter.
 import logging
 from datetime import datetime
 from typing import Optional
+from core.http_session import get_session
 
 logger = logging.getLogger("ptm.pda.auto_scanner")
 
@@ -176,12 +177,11 @@ def _is_short_reply(body: str) -> bool:
 def _get_processed_email_ids() -> set:
     """Récupère les IDs Gmail déjà traités depuis Supabase."""
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         url = f"{storage.api_url}/processed_emails?select=gmail_message_id"
-        resp = http_requests.get(url, headers=storage._get_headers(), timeout=5)
+        resp = storage.session.get(url, headers=storage._get_headers(), timeout=5)
         if resp.status_code == 200:
             return {r.get("gmail_message_id") for r in resp.json() if r.get("gmail_message_id")}
     except Exception:
@@ -192,15 +192,14 @@ def _get_processed_email_ids() -> set:
 def _mark_email_processed(gmail_id: str, subject: str, sender: str, count: int, status: str = "processed"):
     """Enregistre un email comme traité dans processed_emails."""
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         url = f"{storage.api_url}/processed_emails"
         headers = storage._get_headers()
         headers["Prefer"] = "resolution=merge-duplicates"
 
-        http_requests.post(url, headers=headers, json={
+        get_session().post(url, headers=headers, json={
             "gmail_message_id": gmail_id,
             "sender_email": sender[:200] if sender else "",
             "subject": subject[:200] if subject else "",
@@ -215,10 +214,9 @@ def _mark_email_processed(gmail_id: str, subject: str, sender: str, count: int,
 def _add_to_watchlist(req: dict, email_id: str, sender: str, subject: str):
     """Ajoute une demande détectée dans la watchlist de surveillance."""
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         date_str = str(req.get("appointment_date", ""))[:10]
         room = req.get("room", "")
         for_who = req.get("for_who", "")
@@ -229,7 +227,7 @@ def _add_to_watchlist(req: dict, email_id: str, sender: str, subject: str):
             f"key=eq.pda_watchlist_{date_str}_{room}_{for_who}"
             f"&limit=1"
         )
-        check_resp = http_requests.get(check_url, headers=storage._get_headers(), timeout=5)
+        check_resp = storage.session.get(check_url, headers=storage._get_headers(), timeout=5)
         if check_resp.status_code == 200 and check_resp.json():
             return  # Déjà en surveillance
 
@@ -239,7 +237,7 @@ def _add_to_watchlist(req: dict, email_id: str, sender: str, subject: str):
         headers["Prefer"] = "resolution=merge-duplicates"
 
         import json
-        http_requests.post(url, headers=headers, json={
+        get_session().post(url, headers=headers, json={
             "key": f"pda_watchlist_{date_str}_{room}_{for_who}",
             "value": json.dumps({
                 "appointment_date": date_str,
@@ -265,16 +263,15 @@ def _check_overdue_watchlist() -> int:
     Envoie une alerte pour chaque demande non traitée.
     """
     try:
-        from core.supabase_storage import SupabaseStorage
-        import requests as http_requests
+        from core.supabase_storage import get_shared_storage
         import json
 
-        storage = SupabaseStorage(silent=True)
+        storage = get_shared_storage()
         headers = storage._get_headers()
 
         # Récupérer toutes les entrées watchlist
         url = f"{storage.api_url}/system_settings?key=like.pda_watchlist_*"
-        resp = http_requests.get(url, headers=headers, timeout=8)
+        resp = get_session().get(url, headers=headers, timeout=8)
         if resp.status_code != 200:
             return 0
 
@@ -311,7 +308,7 @@ def _check_overdue_watchlist() -> int:
                 # RV créé → marquer comme traité et supprimer de la watchlist
                 data["alerted"] = True
                 data["resolved"] = True
-                http_requests.patch(
+                get_session().patch(
                     f"{storage.api_url}/system_settings?key=eq.{row['key']}",
                     headers={**headers, "Prefer": "return=representation"},
                     json={"value": json.dumps(data)},
@@ -324,7 +321,7 @@ def _check_overdue_watchlist() -> int:
 
             # Marquer comme alerté
             data["alerted"] = True
-            http_requests.patch(
+            get_session().patch(
                 f"{storage.api_url}/system_settings?key=eq.{row['key']}",
                 headers={**headers, "Prefer": "return=representation"},
                 json={"value": json.dumps(data)},
@@ -340,7 +337,6 @@ def _check_overdue_watchlist() -> int:
 def _check_gazelle_rv_exists(storage, headers, date_str: str, room: str, for_who: str) -> bool:
     """Vérifie si un RV Gazelle existe pour cette date (client PDA ou titre PDA)."""
     try:
-        import requests as http_requests
         PDA_CLIENT_ID = "cli_HbEwl9rN11pSuDEU"
 
         url = (
@@ -349,7 +345,7 @@ def _check_gazelle_rv_exists(storage, headers, date_str: str, room: str, for_who
             f"&client_external_id=eq.{PDA_CLIENT_ID}"
             f"&limit=1"
         )
-        resp = http_requests.get(url, headers=headers, timeout=5)
+        resp = get_session().get(url, headers=headers, timeout=5)
         if resp.status_code == 200 and resp.json():
             return True
 
@@ -360,7 +356,7 @@ def _check_gazelle_rv_exists(storage, headers, date_str: str, room: str, for_who
             f"&title=ilike.*Place des Arts*"
             f"&limit=1"
         )
-        resp2 = http_requests.get(url2, headers=headers, timeout=5)
+        resp2 = get_session().get(url2, headers=headers, timeout=5)
         if resp2.status_code == 200 and resp2.json():
             return True
 
@@ -124,12 +124,12 @@ def _parse_with_ai(text: str) -> list[dict]:
         return _parse_compact_fallback(text)
 
     try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=api_key)
+        from core.llm_gateway import get_llm_gateway
 
         today = datetime.now().strftime("%Y-%m-%d")
 
-        response = client.messages.create(
+        response = get_llm_gateway().create(
+            "pda_v6_email_parser",
             model="claude-haiku-4-5-20251001",
             max_tokens=1000,
             temperature=0,
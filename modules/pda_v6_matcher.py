@@ -3,13 +3,20 @@ PDA Matcher V6 — embarqué dans v5 pour comparaison.
 
 Copie du matcher v6 (assistant-v6/sandbox/app/modules/pda/matcher.py)
 pour exécuter la comparaison sans déployer v6 séparément.
+
+Performance : MatchIndex range les RV Gazelle par date normalisée, avec le
+texte de recherche, l'heure et le flag technicien pré-calculés UNE fois par
+run. Le scoring ne touche que les RV du même jour (avant : chaque demande
+parcourait les ~60 jours de RV et reconstruisait le texte de chacun).
+find_best_matches() matche un lot de demandes et regroupe le repli IA en
+UN appel par jour au lieu d'un appel par demande.
 """
 
 import os
 import re
 import json
 import logging
-from typing import Optional, Dict, List
+from typing import NamedTuple, Optional, Dict, List, Union
 
 logger = logging.getLogger("ptm.pda.v6matcher")
 
@@ -37,28 +44,115 @@ def tech_name(tech_id):
     return TECH_NAMES.get(tech_id, tech_id[:15])
 
 
-def find_best_match(request, gazelle_appointments):
+class _IndexedAppointment(NamedTuple):
+    apt: Dict
+    text: str
+    hour: Optional[int]
+    has_real_tech: bool
+
+
+class MatchIndex:
+    """RV Gazelle groupés par date (YYYY-MM-DD), champs de matching pré-calculés.
+
+    Construit une fois par run de sync, puis passé à find_best_match /
+    find_best_matches à la place de la liste brute.
+    """
+
+    def __init__(self, gazelle_appointments: List[Dict]):
+        self.by_date: Dict[str, List[_IndexedAppointment]] = {}
+        for apt in gazelle_appointments:
+            apt_date = _normalize_date(apt.get("appointment_date"))
+            if not apt_date:
+                continue
+            self.by_date.setdefault(apt_date, []).append(_IndexedAppointment(
+                apt=apt,
+                text=_build_search_text(apt),
+                hour=_parse_appointment_hour(apt.get("appointment_time")),
+                has_real_tech=apt.get("technicien") in REAL_TECHNICIAN_IDS,
+            ))
+
+    def same_day(self, date: str) -> List[_IndexedAppointment]:
+        return self.by_date.get(date, [])
+
+
+AppointmentsArg = Union[MatchIndex, List[Dict]]
+
+
+def _as_index(gazelle_appointments: AppointmentsArg) -> MatchIndex:
+    if isinstance(gazelle_appointments, MatchIndex):
+        return gazelle_appointments
+    return MatchIndex(gazelle_appointments)
+
+
+def find_best_match(request, gazelle_appointments: AppointmentsArg, allow_ai=True):
     request_date = _normalize_date(request.get("appointment_date"))
     if not request_date:
         return None
 
+    index = _as_index(gazelle_appointments)
+    match = _direct_match(request, request_date, index)
+    if match or not allow_ai:
+        return match
+
+    # Fallback IA
+    same_day = [entry.apt for entry in index.same_day(request_date)]
+    if same_day:
+        ai_match = _ai_find_match(request, same_day)
+        if ai_match:
+            ai_match["_matched_by"] = "ai"
+            return ai_match
+
+    return None
+
+
+def find_best_matches(requests: List[Dict], gazelle_appointments: AppointmentsArg,
+                      allow_ai=True) -> List[Optional[Dict]]:
+    """
+    Matche un lot de demandes PDA (résultats dans l'ordre des demandes).
+
+    Même résultat que find_best_match pour chaque demande matchée directement ;
+    les demandes restantes d'un même jour partagent UN appel IA.
+    """
+    index = _as_index(gazelle_appointments)
+    dates = [_normalize_date(r.get("appointment_date")) for r in requests]
+    results = [
+        _direct_match(r, d, index) if d else None
+        for r, d in zip(requests, dates)
+    ]
+    if not allow_ai:
+        return results
+
+    unmatched_by_day: Dict[str, List[int]] = {}
+    for i, (match, d) in enumerate(zip(results, dates)):
+        if match is None and d and index.same_day(d):
+            unmatched_by_day.setdefault(d, []).append(i)
+
+    for d, positions in unmatched_by_day.items():
+        same_day = [entry.apt for entry in index.same_day(d)]
+        if len(positions) == 1:
+            picks = [_ai_find_match(requests[positions[0]], same_day)]
+        else:
+            picks = _ai_find_matches_for_day([requests[i] for i in positions], same_day)
+        for i, ai_match in zip(positions, picks):
+            if ai_match:
+                ai_match["_matched_by"] = "ai"
+                results[i] = ai_match
+
+    return results
+
+
+def _direct_match(request, request_date, index: MatchIndex):
     request_room = (request.get("room") or "").upper().strip()
     request_for_who = (request.get("for_who") or "").upper().strip()
     request_hour_limit = _parse_hour_limit(request.get("time") or "")
 
     candidates = []
-    for apt in gazelle_appointments:
-        apt_date = _normalize_date(apt.get("appointment_date"))
-        if apt_date != request_date:
-            continue
-
-        apt_text = _build_search_text(apt)
-        apt_hour = _parse_appointment_hour(apt.get("appointment_time"))
-        has_real_tech = apt.get("technicien") in REAL_TECHNICIAN_IDS
+    for entry in index.same_day(request_date):
+        apt, apt_hour = entry.apt, entry.hour
 
         quality = _evaluate_match(
             request_room, request_for_who, request_hour_limit,
-            apt_text, apt_hour, has_real_tech,
+            entry.text, apt_hour, entry.has_real_tech,
         )
         if quality > 0:
             # Distance horaire, pour departager les egalites : deux RV le meme
@@ -76,17 +170,6 @@ def find_best_match(request, gazelle_appointments):
         candidates.sort(key=lambda x: (-x[1], x[2]))
         return candidates[0][0]
 
-    # Fallback IA
-    same_day = [
-        a for a in gazelle_appointments
-        if _normalize_date(a.get("appointment_date")) == request_date
-    ]
-    if same_day:
-        ai_match = _ai_find_match(request, same_day)
-        if ai_match:
-            ai_match["_matched_by"] = "ai"
-            return ai_match
-
     return None
 
 
@@ -226,9 +309,9 @@ def _ai_confirm_match(request, gazelle_apt):
     if not api_key:
         return False
     try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=api_key)
-        response = client.messages.create(
+        from core.llm_gateway import get_llm_gateway
+        response = get_llm_gateway().create(
+            "pda_v6_confirm",
             model="claude-haiku-4-5-20251001",
             max_tokens=10, temperature=0,
             system=_AI_PROMPT,
@@ -246,10 +329,10 @@ def _ai_find_match(request, same_day_apts):
     if not api_key:
         return None
     try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=api_key)
+        from core.llm_gateway import get_llm_gateway
         apts_str = "\n".join(f"[{i}] {_format_apt(a)}" for i, a in enumerate(same_day_apts))
-        response = client.messages.create(
+        response = get_llm_gateway().create(
+            "pda_v6_find",
             model="claude-haiku-4-5-20251001",
             max_tokens=20, temperature=0,
             system=_AI_PROMPT + "\nS'il y a plusieurs RV, réponds le NUMÉRO [0], [1], etc. Réponds AUCUN si aucun.",
@@ -265,3 +348,35 @@ def _ai_find_match(request, same_day_apts):
     except Exception as e:
         logger.warning(f"AI find failed: {e}")
         return None
+
+
+def _ai_find_matches_for_day(requests, same_day_apts):
+    """Un seul appel IA pour toutes les demandes non matchées d'un même jour.
+
+    Returns: liste alignée sur requests (RV choisi ou None).
+    """
+    picks = [None] * len(requests)
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        return picks
+    try:
+        from core.llm_gateway import get_llm_gateway
+        reqs_str = "\n".join(f"[D{i}] {_format_request(r)}" for i, r in enumerate(requests))
+        apts_str = "\n".join(f"[{i}] {_format_apt(a)}" for i, a in enumerate(same_day_apts))
+        response = get_llm_gateway().create(
+            "pda_v6_find_day",
+            model="claude-haiku-4-5-20251001",
+            max_tokens=20 * len(requests), temperature=0,
+            system=_AI_PROMPT + "\nPour CHAQUE demande, réponds une ligne \"D0: 2\" (numéro du RV) "
+                                "ou \"D0: AUCUN\". Rien d'autre.",
+            messages=[{"role": "user", "content":
+                f"DEMANDES PDA:\n{reqs_str}\n\nRV GAZELLE:\n{apts_str}\n\nQuel RV correspond à chaque demande ?"}],
+        )
+        for m in re.finditer(r"D(\d+)\s*[:=-]\s*\[?(\d+)\]?", response.content[0].text):
+            req_idx, apt_idx = int(m.group(1)), int(m.group(2))
+            if 0 <= req_idx < len(requests) and 0 <= apt_idx < len(same_day_apts):
+                picks[req_idx] = same_day_apts[apt_idx]
+        return picks
+    except Exception as e:
+        logger.warning(f"AI batch find failed: {e}")
+        return picks
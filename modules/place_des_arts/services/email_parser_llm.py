@@ -87,10 +87,11 @@ def parse_email_llm(subject: Optional[str], body: Optional[str]) -> Optional[Lis
         return None  # -> fallback regex
 
     try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=api_key)
+        from core.llm_gateway import get_llm_gateway
         content = f"Objet : {subject or '(sans objet)'}\n\n{body}"
-        resp = client.messages.create(
+        # Même email rescanné -> extraction en cache
+        resp = get_llm_gateway().create(
+            "pda_email_parser",
             model=_MODEL,
             # Sur Sonnet 5, le thinking adaptatif est actif quand le parametre
             # `thinking` est omis, et il partage ce plafond avec la reponse.
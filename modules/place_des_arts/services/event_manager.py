@@ -8,7 +8,7 @@ from __future__ import annotations
 
 from datetime import datetime, date, timezone
 from typing import List, Dict, Any, Tuple
-import requests
+from core.http_session import get_session
 
 # Statuts autorisés
 ALLOWED_STATUS = {"PENDING", "CREATED_IN_GAZELLE", "ASSIGN_OK", "COMPLETED", "BILLED"}
@@ -232,7 +232,7 @@ class EventManager:
         headers["Prefer"] = ",".join(prefer_parts)
 
         url = f"{self.storage.api_url}/place_des_arts_requests"
-        resp = requests.post(url, headers=headers, json=normalized_rows)
+        resp = get_session().post(url, headers=headers, json=normalized_rows)
 
         if resp.status_code not in (200, 201):
             return {
@@ -279,7 +279,7 @@ class EventManager:
         params.append(f"limit={min(limit, 500)}")
 
         url = f"{self.storage.api_url}/place_des_arts_requests?{'&'.join(params)}"
-        resp = requests.get(url, headers=self.storage._get_headers())
+        resp = self.storage.session.get(url, headers=self.storage._get_headers())
         if resp.status_code != 200:
             raise RuntimeError(f"Supabase {resp.status_code}: {resp.text}")
         return resp.json() or []
@@ -297,7 +297,7 @@ class EventManager:
         base = f"{self.storage.api_url}/place_des_arts_requests"
 
         def count(q: str) -> int:
-            r = requests.get(f"{base}?select=id&{q}", headers=hdrs)
+            r = get_session().get(f"{base}?select=id&{q}", headers=hdrs)
             if r.status_code != 200:
                 return 0
             if "content-range" in r.headers:
@@ -367,7 +367,7 @@ class EventManager:
         url = f"{self.storage.api_url}/place_des_arts_requests?id=eq.{request_id}"
         hdrs = self.storage._get_headers().copy()
         hdrs["Prefer"] = "return=representation"
-        resp = requests.patch(url, headers=hdrs, json=payload)
+        resp = get_session().patch(url, headers=hdrs, json=payload)
         if resp.status_code not in (200, 204):
             return {"ok": False, "error": resp.text}
         return {"ok": True, "data": resp.json() if resp.content else {}}
@@ -396,7 +396,7 @@ class EventManager:
         print(f"   URL: {url}")
         print(f"   Payload: {payload}")
 
-        resp = requests.patch(url, headers=hdrs, json=payload)
+        resp = get_session().patch(url, headers=hdrs, json=payload)
         if resp.status_code not in (200, 204):
             print(f"   ❌ Erreur: {resp.status_code} - {resp.text}")
             return {"ok": False, "error": resp.text}
@@ -413,7 +413,7 @@ class EventManager:
         """
         hdrs = self.storage._get_headers()
         url = f"{self.storage.api_url}/place_des_arts_requests?id=in.({','.join(request_ids)})"
-        resp = requests.delete(url, headers=hdrs)
+        resp = get_session().delete(url, headers=hdrs)
         if resp.status_code not in (200, 204):
             return {"ok": False, "error": resp.text}
         return {"ok": True}
@@ -431,7 +431,7 @@ class EventManager:
             "billed_by": billed_by,
             "updated_at": datetime.now(timezone.utc).isoformat()
         }
-        resp = requests.patch(url, headers=hdrs, json=payload)
+        resp = get_session().patch(url, headers=hdrs, json=payload)
         if resp.status_code not in (200, 204):
             return {"ok": False, "error": resp.text}
         data = resp.json() if resp.content else []
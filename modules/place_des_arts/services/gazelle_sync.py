@@ -81,6 +81,9 @@ class GazelleSyncService:
     def __init__(self, storage: Optional[SupabaseStorage] = None):
         """Initialise le service de synchronisation."""
         self.storage = storage or SupabaseStorage()
+        # Index date -> RV pré-normalisés, construit une fois par liste de RV
+        # (voir _appointments_by_date)
+        self._date_index: Optional[Tuple[List[Dict], int, Dict[str, List[Tuple]]]] = None
     
     def sync_requests_with_gazelle(
         self,
@@ -144,23 +147,24 @@ class GazelleSyncService:
             details = []
             warnings = []
             
-            for request in requests:
+            # Chercher les RV correspondants (index par date construit une
+            # seule fois ; v6 : un seul appel IA par jour pour les non-matchés)
+            from core.feature_flags import is_enabled
+            if is_enabled('pda_v6_matcher'):
+                from modules.pda_v6_matcher import find_best_matches
+                all_matches = find_best_matches(requests, gazelle_appointments)
+            else:
+                all_matches = [
+                    self._find_matching_appointment(request, gazelle_appointments)
+                    for request in requests
+                ]
+
+            for request, matched_apt in zip(requests, all_matches):
                 request_id = request.get('id')
                 appointment_date = request.get('appointment_date')
                 room = request.get('room', '')
                 time_str = request.get('time', '')
-                
-                # Chercher un RV correspondant
-                from core.feature_flags import is_enabled
-                if is_enabled('pda_v6_matcher'):
-                    from modules.pda_v6_matcher import find_best_match
-                    matched_apt = find_best_match(request, gazelle_appointments)
-                else:
-                    matched_apt = self._find_matching_appointment(
-                        request,
-                        gazelle_appointments
-                    )
-                
+
                 if matched_apt:
                     matched_count += 1
                     apt_id = matched_apt.get('external_id')
@@ -422,7 +426,51 @@ class GazelleSyncService:
         except Exception as e:
             logger.error(f"Erreur récupération RV Gazelle: {e}")
             return []
-    
+
+    def _appointments_by_date(self, gazelle_appointments: List[Dict]) -> Dict[str, List[Tuple]]:
+        """
+        Groupe les RV par date (YYYY-MM-DD) avec les champs de scoring
+        pré-calculés : (apt, heure, titre, location+description+notes, client PDA).
+
+        L'index est gardé tant que la même liste (même objet, même taille)
+        est repassée : une sync de N demandes ne normalise les ~60 jours de
+        RV qu'une seule fois au lieu de N fois.
+        """
+        cached = self._date_index
+        if cached and cached[0] is gazelle_appointments and cached[1] == len(gazelle_appointments):
+            return cached[2]
+
+        by_date: Dict[str, List[Tuple]] = {}
+        for apt in gazelle_appointments:
+            # Utiliser appointment_date (pas start_datetime qui peut être NULL)
+            apt_date_str = apt.get('appointment_date') or apt.get('start_datetime')
+            if not apt_date_str:
+                continue
+
+            # Extraire l'heure
+            apt_hour = 0
+            apt_time_str = apt.get('appointment_time', '')
+            if apt_time_str:
+                try:
+                    apt_hour = int(apt_time_str.split(':')[0])
+                except:
+                    pass
+
+            apt_title = (apt.get('title', '') or '').upper()
+            apt_location = (apt.get('location', '') or '').upper().strip()
+            apt_description = (apt.get('description', '') or '').upper()
+            apt_notes = (apt.get('notes', '') or '').upper()
+            all_text = apt_location + ' ' + apt_description + ' ' + apt_notes
+            is_pda = ('PLACE DES ARTS' in apt_title
+                      or apt.get('client_external_id', '') == self.PDA_CLIENT_ID)
+
+            by_date.setdefault(apt_date_str[:10], []).append(
+                (apt, apt_hour, apt_title, all_text, is_pda)
+            )
+
+        self._date_index = (gazelle_appointments, len(gazelle_appointments), by_date)
+        return by_date
+
     def _find_matching_appointment(
         self,
         request: Dict,
@@ -439,8 +487,6 @@ class GazelleSyncService:
         5. +3 pts: Salle dans le titre
         6. +4 pts: Heure correspond (±2h)
         """
-        import re
-
         request_date_str = request.get('appointment_date')
         if not request_date_str:
             return None
@@ -452,58 +498,35 @@ class GazelleSyncService:
         request_room = (request.get('room', '') or '').upper().strip()
         request_for_who = (request.get('for_who', '') or '').upper().strip()
 
-        # Filtrer les RV du même jour
+        # RV du même jour (index par date, champs déjà normalisés)
         # Note: Les RV Gazelle ont appointment_date (YYYY-MM-DD) ET appointment_time séparés
-        same_day_appointments = []
-        for apt in gazelle_appointments:
-            # Utiliser appointment_date (pas start_datetime qui peut être NULL)
-            apt_date_str = apt.get('appointment_date')
-            if not apt_date_str:
-                # Fallback sur start_datetime si disponible
-                apt_datetime_str = apt.get('start_datetime')
-                if apt_datetime_str:
-                    apt_date_str = apt_datetime_str[:10]
-                else:
-                    continue
-
-            # Normaliser en YYYY-MM-DD
-            apt_date_str = apt_date_str[:10] if apt_date_str else ''
-
-            if apt_date_str == request_date:
-                # Extraire l'heure
-                apt_hour = 0
-                apt_time_str = apt.get('appointment_time', '')
-                if apt_time_str:
-                    try:
-                        apt_hour = int(apt_time_str.split(':')[0])
-                    except:
-                        pass
-                same_day_appointments.append((apt, apt_hour))
-
+        same_day_appointments = self._appointments_by_date(gazelle_appointments).get(request_date)
         if not same_day_appointments:
             return None
 
+        # Parser l'heure de la demande une seule fois (format "8h", "18h", "avant 9h", etc.)
+        request_hour = None
+        if request_time:
+            time_match = re.search(r'(\d{1,2})h?', str(request_time).upper())
+            if time_match:
+                request_hour = int(time_match.group(1))
+
+        # Extraire les mots significatifs (2+ caractères pour inclure ONJ, OSM, etc.)
+        for_who_words = [w for w in request_for_who.split() if len(w) > 2]
+
         # Scorer chaque RV candidat
         best_match = None
         best_score = 0
 
-        for apt, apt_hour in same_day_appointments:
+        for apt, apt_hour, apt_title, all_text, is_pda in same_day_appointments:
             score = 1  # Base: même jour
 
-            apt_title = (apt.get('title', '') or '').upper()
-            apt_location = (apt.get('location', '') or '').upper().strip()
-            apt_description = (apt.get('description', '') or '').upper()
-            apt_notes = (apt.get('notes', '') or '').upper()
-
             # CRITÈRE 1: Titre contient "Place des Arts" ou RV est du client PDA
-            apt_client_id = apt.get('client_external_id', '')
-            if 'PLACE DES ARTS' in apt_title or apt_client_id == self.PDA_CLIENT_ID:
+            if is_pda:
                 score += 10
 
             # CRITÈRE 2: Titre contient des mots-clés de la demande (for_who)
             if request_for_who:
-                # Extraire les mots significatifs (2+ caractères pour inclure ONJ, OSM, etc.)
-                for_who_words = [w for w in request_for_who.split() if len(w) > 2]
                 for word in for_who_words:
                     if word in apt_title:
                         score += 3
@@ -511,7 +534,6 @@ class GazelleSyncService:
 
             # CRITÈRE 3: Salle correspond
             # Vérifier dans location, description, notes
-            all_text = apt_location + ' ' + apt_description + ' ' + apt_notes
             if request_room:
                 if request_room in all_text:
                     score += 5
@@ -520,14 +542,10 @@ class GazelleSyncService:
                     score += 3
 
             # CRITÈRE 4: Heure correspond (si disponible)
-            if request_time and apt_hour > 0:
-                # Parser l'heure de la demande (format "8h", "18h", "avant 9h", etc.)
-                time_match = re.search(r'(\d{1,2})h?', str(request_time).upper())
-                if time_match:
-                    request_hour = int(time_match.group(1))
-                    # Tolérance de ±2h
-                    if abs(apt_hour - request_hour) <= 2:
-                        score += 4
+            if request_hour is not None and apt_hour > 0:
+                # Tolérance de ±2h
+                if abs(apt_hour - request_hour) <= 2:
+                    score += 4
 
             if score > best_score:
                 best_score = score
@@ -18,11 +18,11 @@ from typing import Dict, List, Optional
 from zoneinfo import ZoneInfo
 
 import gspread
-import requests
 from google.auth.exceptions import DefaultCredentialsError
 from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
 
 from core.supabase_storage import SupabaseStorage
+from core.http_session import get_session
 
 MONTREAL_TZ = ZoneInfo("America/Montreal")
 # Google Sheet: https://docs.google.com/spreadsheets/d/1ZZsMrIT0BEwHKQ6-BKGzFoXR3k99zCEzixp0tsRKUj8
@@ -166,31 +166,25 @@ class ServiceReports:
     def _fetch_clients_map(self) -> Dict[str, str]:
         """Retourne un mapping external_id -> company_name (paginé pour tout récupérer)."""
         result = {}
-        page_size = 1000
-        offset = 0
-        headers = self.storage._get_headers()
-        while True:
-            url = f"{self.storage.api_url}/gazelle_clients?select=external_id,company_name&limit={page_size}&offset={offset}"
-            resp = requests.get(url, headers=headers, timeout=20)
-            if resp.status_code != 200:
-                print(f"⚠️ Impossible de récupérer les clients page {offset//page_size+1} ({resp.status_code})")
-                break
-            data = resp.json() or []
-            for item in data:
+        try:
+            for item in self.storage.iter_data(
+                "gazelle_clients",
+                select="external_id,company_name",
+                key_column="external_id"
+            ):
                 eid = item.get("external_id")
                 if eid:
                     result[eid] = item.get("company_name")
-            if len(data) < page_size:
-                break
-            offset += page_size
+        except Exception as e:
+            print(f"⚠️ Impossible de récupérer tous les clients ({len(result)} chargés): {e}")
         print(f"📋 {len(result)} clients chargés dans le mapping")
         return result
 
     def _fetch_timeline_entries(self, since: Optional[datetime]) -> List[Dict]:
         """Récupère les timeline entries avec infos piano et user (avec pagination)."""
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
-        supabase = create_client(self.storage.supabase_url, self.storage.supabase_key)
+        supabase = get_supabase_client(self.storage.supabase_url, self.storage.supabase_key)
 
         all_entries = []
         page_size = 1000
@@ -257,7 +251,7 @@ class ServiceReports:
             url = f"{self.storage.api_url}/{table_name}"
             params = {"select": "id,client_id,piano_id,date_observation,description,notes,is_resolved,created_at"}
             try:
-                resp = requests.get(url, headers=headers, params=params, timeout=20)
+                resp = get_session().get(url, headers=headers, params=params, timeout=20)
             except Exception as e:
                 print(f"⚠️ Erreur requête {table_name}: {e}")
                 continue
@@ -269,10 +263,10 @@ class ServiceReports:
 
     def _fetch_pda_requests(self) -> List[Dict]:
         """Récupère les demandes Place des Arts depuis Supabase."""
-        from supabase import create_client
+        from core.supabase_storage import get_supabase_client
 
         try:
-            supabase = create_client(self.storage.supabase_url, self.storage.supabase_key)
+            supabase = get_supabase_client(self.storage.supabase_url, self.storage.supabase_key)
             result = supabase.table('place_des_arts_requests').select('*').order('appointment_date', desc=True).execute()
             data = result.data or []
             print(f"📥 {len(data)} demandes Place des Arts récupérées")
@@ -16,11 +16,14 @@ Usage:
     python3 modules/sync_gazelle/sync_to_supabase.py
 """
 
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-import requests
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 # Ajouter le projet au path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -66,7 +69,28 @@ def _is_institution_appointment(title: str, location: str, description: str) ->
 class GazelleToSupabaseSync:
     """Synchronise les données Gazelle vers Supabase."""
 
-    def __init__(self, incremental_mode: bool = True, storage=None):
+    # Taille des lots d'UPSERT (surchargée par SYNC_UPSERT_BATCH_SIZE ou batch_size)
+    DEFAULT_BATCH_SIZE = 500
+
+    # ═══════════════════════════════════════════════════════════════
+    # VERROU SÉCURITÉ #4: Fenêtre timeline élargie à 30 jours
+    # Évite les trous de mémoire si sync interrompue (vacances, panne)
+    # ═══════════════════════════════════════════════════════════════
+    TIMELINE_SYNC_DAYS = 30  # Était 7, maintenant 30 pour résilience
+
+    # Pipeline sync_all : étape -> étapes dont les écritures doivent être
+    # terminées avant (clés étrangères). Les récupérations API, elles, partent
+    # toutes dès le début.
+    STAGE_DEPENDENCIES = {
+        'users': [],
+        'clients': [],
+        'contacts': ['clients'],
+        'pianos': ['clients'],
+        'appointments': ['users', 'clients', 'pianos'],
+        'timeline': ['users', 'clients', 'pianos'],
+    }
+
+    def __init__(self, incremental_mode: bool = True, storage=None, batch_size: Optional[int] = None):
         """Initialise le gestionnaire de synchronisation.
 
         Args:
@@ -75,9 +99,17 @@ class GazelleToSupabaseSync:
             storage: Instance SupabaseStorage à réutiliser (singleton). Si None,
                      une nouvelle est créée. Passer le singleton évite de recréer
                      un client + un aller-retour réseau à chaque appel (ex. sync-manual).
+            batch_size: Nombre de lignes par requête d'UPSERT. Si None, lit
+                        SYNC_UPSERT_BATCH_SIZE (défaut: DEFAULT_BATCH_SIZE).
         """
         print("🔧 Initialisation du service de synchronisation...")
         self.incremental_mode = incremental_mode
+        self.batch_size = max(1, int(batch_size or os.getenv('SYNC_UPSERT_BATCH_SIZE') or self.DEFAULT_BATCH_SIZE))
+        # Lots d'UPSERT envoyés en parallèle (par table) et récupérations API simultanées
+        self.write_workers = max(1, int(os.getenv('SYNC_WRITE_WORKERS', '4')))
+        self.fetch_workers = max(1, int(os.getenv('SYNC_FETCH_WORKERS', '3')))
+        # Les étapes tournent en parallèle dans sync_all : compteurs partagés
+        self._stats_lock = threading.Lock()
 
         try:
             if incremental_mode:
@@ -102,7 +134,9 @@ class GazelleToSupabaseSync:
             'contacts': {'synced': 0, 'errors': 0},
             'pianos': {'synced': 0, 'errors': 0},
             'appointments': {'synced': 0, 'errors': 0},
-            'timeline': {'synced': 0, 'errors': 0}
+            'timeline': {'synced': 0, 'errors': 0},
+            # Durées par étape (fetch / écriture / attente des dépendances), en secondes
+            'timings': {}
         }
 
         # Detail des erreurs, pour que sync_logs porte autre chose qu'un compte.
@@ -124,11 +158,153 @@ class GazelleToSupabaseSync:
         2026-08-18 sur un run a 1 erreur sur 4135 items, impossible a diagnostiquer.
         Borne a MAX_ERROR_DETAILS pour ne pas faire exploser la colonne.
         """
-        self.stats[table]['errors'] += 1
-        if len(self.error_details) < self.MAX_ERROR_DETAILS:
-            self.error_details.append(f"{table}[{ident}] {str(detail)[:200]}")
-        elif len(self.error_details) == self.MAX_ERROR_DETAILS:
-            self.error_details.append("... (details suivants tronques)")
+        with self._stats_lock:
+            self.stats[table]['errors'] += 1
+            if len(self.error_details) < self.MAX_ERROR_DETAILS:
+                self.error_details.append(f"{table}[{ident}] {str(detail)[:200]}")
+            elif len(self.error_details) == self.MAX_ERROR_DETAILS:
+                self.error_details.append("... (details suivants tronques)")
+
+    def _bulk_upsert(
+        self,
+        table_name: str,
+        stats_key: str,
+        records: List[Dict[str, Any]],
+        on_conflict: str = 'external_id'
+    ) -> Tuple[int, Set[str]]:
+        """
+        UPSERT par lots (tableaux JSON) au lieu d'un POST par ligne.
+
+        Une sync complète faisait ~4000 allers-retours (un par client, piano,
+        RV, entrée timeline) : avec un edge Supabase lent, le job de nuit
+        s'étirait sur plusieurs minutes. Ici : quelques dizaines de requêtes.
+
+        Subtilités PostgREST gérées:
+        - Un lot doit avoir des clés homogènes : une clé absente deviendrait NULL
+          et écraserait la valeur en base (cf. VERROU SÉCURITÉ #2 de la timeline,
+          'tags' des clients). On regroupe donc par jeu de colonnes.
+        - Un même external_id deux fois dans un lot fait échouer tout le lot
+          ("cannot affect row a second time") : on garde la dernière occurrence.
+        - Un lot en échec 4xx est coupé en deux récursivement jusqu'à isoler la
+          ligne fautive, pour que _record_error nomme toujours la bonne ligne.
+
+        Les lots (indépendants après dédup) partent en parallèle sur
+        write_workers connexions du pool keep-alive.
+
+        Args:
+            table_name: Table Supabase (ex: 'gazelle_clients')
+            stats_key: Clé dans self.stats (ex: 'clients')
+            records: Lignes à écrire
+            on_conflict: Colonne unique pour la résolution de conflit
+
+        Returns:
+            (nombre de lignes synchronisées, set des ids en erreur)
+        """
+        url = f"{self.storage.api_url}/{table_name}?on_conflict={on_conflict}"
+        headers = self.storage._get_headers()
+        # return=minimal : inutile de recevoir les lignes écrites en retour
+        headers["Prefer"] = "resolution=merge-duplicates,return=minimal"
+
+        # Dédup (dernière occurrence gagne) puis regroupement par jeu de colonnes
+        deduped: Dict[Any, Dict[str, Any]] = {}
+        for record in records:
+            deduped[record.get(on_conflict)] = record
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for record in deduped.values():
+            groups.setdefault(frozenset(record.keys()), []).append(record)
+
+        synced = 0
+        failed_ids: Set[str] = set()
+
+        def _send(chunk: List[Dict[str, Any]]):
+            nonlocal synced
+            try:
+                response = self.storage.session.post(url, headers=headers, json=chunk, idempotent=True)
+                status, text = response.status_code, response.text or ''
+            except Exception as e:
+                status, text = None, str(e)
+
+            if status in (200, 201, 204) or (status == 409 and '23503' not in text):
+                # 409 sans FK violation = conflit d'upsert normal (déjà sync)
+                with self._stats_lock:
+                    synced += len(chunk)
+                    self.stats[stats_key]['synced'] += len(chunk)
+                return
+
+            if len(chunk) > 1 and status is not None and 400 <= status < 500 and status != 429:
+                # Erreur de données : bissection pour isoler la ligne fautive
+                middle = len(chunk) // 2
+                _send(chunk[:middle])
+                _send(chunk[middle:])
+                return
+
+            # Ligne isolée, ou erreur transitoire (réseau/5xx/429) : on attribue
+            # l'erreur à chaque ligne du lot sans multiplier les requêtes.
+            detail = f"UPSERT {status} {text[:150]}" if status is not None else text
+            for record in chunk:
+                ident = record.get(on_conflict)
+                print(f"❌ Erreur UPSERT {stats_key} {ident}: {detail[:200]}")
+                self._record_error(stats_key, ident, detail)
+                failed_ids.add(ident)
+
+        chunks = [
+            group[i:i + self.batch_size]
+            for group in groups.values()
+            for i in range(0, len(group), self.batch_size)
+        ]
+        if len(chunks) <= 1 or self.write_workers == 1:
+            for chunk in chunks:
+                _send(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.write_workers, len(chunks))) as pool:
+                list(pool.map(_send, chunks))
+
+        return synced, failed_ids
+
+    def _update_search_index(self, kind: str, records: List[Dict[str, Any]]):
+        """Répercute les lignes écrites dans l'index local de recherche client.
+
+        No-op si l'index n'existe pas sur cette machine (ex: runner GitHub).
+        Ne fait jamais échouer la sync.
+        """
+        try:
+            from api.chat.client_index import update_client_search_index
+            update_client_search_index(kind, records)
+        except Exception as e:
+            print(f"⚠️  Index recherche client non mis à jour ({kind}): {e}")
+
+    def _fetch_existing_appointments(self, external_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Récupère en lot les anciens records de RV (avant UPSERT), pour la
+        détection de changement Late Assignment.
+
+        Remplace le GET par RV : filtre external_id=in.(...) par paquets de 100
+        (longueur d'URL raisonnable).
+
+        Returns:
+            {external_id: ancien record}
+        """
+        existing: Dict[str, Dict[str, Any]] = {}
+        ids = [i for i in external_ids if i]
+        select_full = "external_id,technicien,last_notified_tech_id,last_notified_schedule,appointment_date,appointment_time,status,updated_at,created_at"
+        # last_notified_schedule peut ne pas exister encore (migration en attente)
+        select_legacy = "external_id,technicien,last_notified_tech_id,appointment_date,appointment_time,status,updated_at,created_at"
+
+        for i in range(0, len(ids), 100):
+            ids_csv = ",".join(ids[i:i + 100])
+            try:
+                check_url = f"{self.storage.api_url}/gazelle_appointments?external_id=in.({ids_csv})&select={select_full}"
+                check_response = self.storage.session.get(check_url, headers=self.storage._get_headers())
+                if check_response.status_code in [400, 406] and 'last_notified_schedule' in (check_response.text or ''):
+                    check_url = f"{self.storage.api_url}/gazelle_appointments?external_id=in.({ids_csv})&select={select_legacy}"
+                    check_response = self.storage.session.get(check_url, headers=self.storage._get_headers())
+                if check_response.status_code == 200:
+                    for row in check_response.json():
+                        existing[row.get('external_id')] = row
+            except Exception as e:
+                print(f"⚠️  Erreur récupération anciens records RV: {e}")
+
+        return existing
 
     def _get_last_sync_date(self) -> Optional[datetime]:
         """
@@ -139,7 +315,7 @@ class GazelleToSupabaseSync:
         """
         try:
             url = f"{self.storage.api_url}/system_settings?key=eq.last_sync_date&select=value"
-            response = requests.get(url, headers=self.storage._get_headers())
+            response = self.storage.session.get(url, headers=self.storage._get_headers())
 
             if response.status_code == 200:
                 results = response.json()
@@ -181,7 +357,7 @@ class GazelleToSupabaseSync:
                 "value": sync_date.isoformat()
             }
 
-            response = requests.post(url, headers=headers, json=data)
+            response = self.storage.session.post(url, headers=headers, json=data)
 
             if response.status_code in [200, 201]:
                 print(f"✅ Dernière sync enregistrée: {sync_date.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -248,7 +424,7 @@ class GazelleToSupabaseSync:
                 f"&change_type=eq.{change_type}"
                 f"&status=in.(pending,sent)"
             )
-            check_response = requests.get(check_url, headers=self.storage._get_headers())
+            check_response = self.storage.session.get(check_url, headers=self.storage._get_headers())
 
             if check_response.status_code == 200:
                 existing = check_response.json()
@@ -271,7 +447,7 @@ class GazelleToSupabaseSync:
                             'updated_at': now.isoformat()
                         }
 
-                        update_response = requests.patch(update_url, headers=update_headers, json=update_data)
+                        update_response = self.storage.session.patch(update_url, headers=update_headers, json=update_data)
                         if update_response.status_code in [200, 204]:
                             print(f"🔄 Alerte mise à jour (reset timer) pour RV {appointment_external_id} → tech {technician_id}")
                         return
@@ -293,12 +469,12 @@ class GazelleToSupabaseSync:
             headers = self.storage._get_headers()
             headers["Prefer"] = "resolution=merge-duplicates"
 
-            response = requests.post(url, headers=headers, json=queue_entry)
+            response = self.storage.session.post(url, headers=headers, json=queue_entry)
 
             # Fallback: si change_type column n'existe pas encore, retry sans
             if response.status_code in [400, 406] and 'change_type' in (response.text or ''):
                 del queue_entry['change_type']
-                response = requests.post(url, headers=headers, json=queue_entry)
+                response = self.storage.session.post(url, headers=headers, json=queue_entry)
             
             if response.status_code in [200, 201]:
                 send_time_str = scheduled_send_at.strftime('%Y-%m-%d %H:%M')
@@ -343,7 +519,7 @@ class GazelleToSupabaseSync:
                 f"&updated_at=gte.{recent_cutoff}"
                 f"&select=external_id,technicien,appointment_date,appointment_time,title,location,description,client_external_id"
             )
-            resp = requests.get(url, headers=self.storage._get_headers())
+            resp = self.storage.session.get(url, headers=self.storage._get_headers())
             if resp.status_code != 200:
                 print(f"   ⚠️  Sweep avis d'annulation: erreur récupération {resp.status_code}")
                 return
@@ -378,28 +554,34 @@ class GazelleToSupabaseSync:
             print(f"   ⚠️  Sweep avis d'annulation: {e}")
             # Ne pas faire échouer la sync pour ça
 
-    def sync_clients(self) -> int:
+    def _fetch_clients(self) -> List[Dict[str, Any]]:
+        """Récupère les clients depuis l'API (incrémental si disponible)."""
+        if self.incremental_mode and hasattr(self.api_client, 'get_clients_incremental'):
+            print("🚀 Mode incrémental activé (early exit sur updatedAt)")
+            return self.api_client.get_clients_incremental(
+                last_sync_date=self.last_sync_date,
+                limit=5000  # Sécurité
+            )
+        # Mode complet (legacy)
+        return self.api_client.get_clients(limit=1000)
+
+    def sync_clients(self, prefetched: Optional[List[Dict[str, Any]]] = None) -> int:
         """
         Synchronise les clients depuis l'API vers Supabase.
 
         Mode incrémental: Seuls les clients modifiés depuis last_sync_date sont récupérés.
 
+        Args:
+            prefetched: Clients déjà récupérés depuis l'API (pipeline sync_all).
+                        Si None, ils sont récupérés ici.
+
         Returns:
             Nombre de clients synchronisés
         """
         print("\n📋 Synchronisation des clients...")
 
         try:
-            # Mode incrémental ou complet
-            if self.incremental_mode and hasattr(self.api_client, 'get_clients_incremental'):
-                print("🚀 Mode incrémental activé (early exit sur updatedAt)")
-                api_clients = self.api_client.get_clients_incremental(
-                    last_sync_date=self.last_sync_date,
-                    limit=5000  # Sécurité
-                )
-            else:
-                # Mode complet (legacy)
-                api_clients = self.api_client.get_clients(limit=1000)
+            api_clients = prefetched if prefetched is not None else self._fetch_clients()
 
             if not api_clients:
                 print("⚠️  Aucun client récupéré depuis l'API")
@@ -407,6 +589,7 @@ class GazelleToSupabaseSync:
 
             print(f"📥 {len(api_clients)} clients récupérés depuis l'API")
 
+            client_records = []
             for client_data in api_clients:
                 try:
                     # Extraire données du client
@@ -489,28 +672,17 @@ class GazelleToSupabaseSync:
                     if tags:
                         client_record['tags'] = tags
 
-                    # UPSERT dans Supabase (via REST API avec on_conflict)
-                    url = f"{self.storage.api_url}/gazelle_clients?on_conflict=external_id"
-                    headers = self.storage._get_headers()
-                    headers["Prefer"] = "resolution=merge-duplicates"
-
-                    response = requests.post(url, headers=headers, json=client_record)
-
-                    if response.status_code in [200, 201]:
-                        self.stats['clients']['synced'] += 1
-                    elif response.status_code == 409 and '23503' not in (response.text or ''):
-                        # 409 sans FK violation = conflit d'upsert normal
-                        self.stats['clients']['synced'] += 1
-                    else:
-                        print(f"❌ Erreur UPSERT client {external_id}: {response.status_code}")
-                        print(f"   Response: {response.text[:300]}")
-                        self._record_error('clients', external_id, f"UPSERT {response.status_code} {response.text[:150]}")
+                    client_records.append(client_record)
 
                 except Exception as e:
                     print(f"❌ Erreur client {client_data.get('id', 'unknown')}: {e}")
                     self._record_error('clients', client_data.get('id', 'unknown'), e)
                     continue
 
+            # UPSERT par lots dans Supabase (via REST API avec on_conflict)
+            _, failed_ids = self._bulk_upsert('gazelle_clients', 'clients', client_records)
+            self._update_search_index('clients', [r for r in client_records if r.get('external_id') not in failed_ids])
+
             print(f"✅ {self.stats['clients']['synced']} clients synchronisés")
             return self.stats['clients']['synced']
 
@@ -518,13 +690,16 @@ class GazelleToSupabaseSync:
             print(f"❌ Erreur lors de la synchronisation des clients: {e}")
             raise
 
-    def sync_contacts(self) -> int:
+    def sync_contacts(self, prefetched: Optional[List[Dict[str, Any]]] = None) -> int:
         """
         Synchronise les contacts depuis l'API vers Supabase.
 
         Note: Dans Gazelle, les contacts sont des personnes individuelles
         associées aux clients (entités qui paient).
 
+        Args:
+            prefetched: Contacts déjà récupérés depuis l'API (pipeline sync_all)
+
         Returns:
             Nombre de contacts synchronisés
         """
@@ -532,13 +707,14 @@ class GazelleToSupabaseSync:
 
         try:
             # Récupérer contacts depuis API Gazelle
-            api_contacts = self.api_client.get_contacts(limit=2000)
+            api_contacts = prefetched if prefetched is not None else self.api_client.get_contacts(limit=2000)
             print(f"📥 {len(api_contacts)} contacts récupérés depuis l'API")
 
             # Initialiser stats
             self.stats['contacts'] = {'total': len(api_contacts), 'synced': 0, 'errors': 0}
 
-            # Synchroniser chaque contact
+            # Préparer chaque contact
+            contact_payloads = []
             for contact_data in api_contacts:
                 try:
                     external_id = contact_data.get('id')
@@ -585,27 +761,16 @@ class GazelleToSupabaseSync:
                         'updated_at': contact_data.get('updatedAt')
                     }
 
-                    # UPSERT dans Supabase via REST API avec on_conflict
-                    url = f"{self.storage.api_url}/gazelle_contacts?on_conflict=external_id"
-                    headers = self.storage._get_headers()
-                    headers['Prefer'] = 'resolution=merge-duplicates'
-
-                    response = requests.post(url, json=contact_payload, headers=headers)
-
-                    if response.status_code in [200, 201]:
-                        self.stats['contacts']['synced'] += 1
-                    elif response.status_code == 409:
-                        # 409 = Conflict (déjà synchronisé, normal avec UPSERT)
-                        self.stats['contacts']['synced'] += 1
-                    else:
-                        print(f"❌ Erreur UPSERT contact {external_id}: {response.status_code}")
-                        self._record_error('contacts', external_id, f"UPSERT {response.status_code} {response.text[:150]}")
+                    contact_payloads.append(contact_payload)
 
                 except Exception as e:
                     print(f"❌ Erreur contact {contact_data.get('id', 'unknown')}: {e}")
                     self._record_error('contacts', contact_data.get('id', 'unknown'), e)
                     continue
 
+            # UPSERT par lots dans Supabase via REST API avec on_conflict
+            self._bulk_upsert('gazelle_contacts', 'contacts', contact_payloads)
+
             print(f"✅ {self.stats['contacts']['synced']} contacts synchronisés")
             return self.stats['contacts']['synced']
 
@@ -613,28 +778,33 @@ class GazelleToSupabaseSync:
             print(f"❌ Erreur lors de la synchronisation des contacts: {e}")
             raise
 
-    def sync_pianos(self) -> int:
+    def _fetch_pianos(self) -> List[Dict[str, Any]]:
+        """Récupère les pianos depuis l'API (incrémental si disponible)."""
+        if self.incremental_mode and hasattr(self.api_client, 'get_pianos_incremental'):
+            print("🚀 Mode incrémental activé (early exit sur updatedAt)")
+            return self.api_client.get_pianos_incremental(
+                last_sync_date=self.last_sync_date,
+                limit=5000  # Sécurité
+            )
+        # Mode complet (legacy)
+        return self.api_client.get_pianos(limit=1000)
+
+    def sync_pianos(self, prefetched: Optional[List[Dict[str, Any]]] = None) -> int:
         """
         Synchronise les pianos depuis l'API vers Supabase.
 
         Mode incrémental: Seuls les pianos modifiés depuis last_sync_date sont récupérés.
 
+        Args:
+            prefetched: Pianos déjà récupérés depuis l'API (pipeline sync_all)
+
         Returns:
             Nombre de pianos synchronisés
         """
         print("\n🎹 Synchronisation des pianos...")
 
         try:
-            # Mode incrémental ou complet
-            if self.incremental_mode and hasattr(self.api_client, 'get_pianos_incremental'):
-                print("🚀 Mode incrémental activé (early exit sur updatedAt)")
-                api_pianos = self.api_client.get_pianos_incremental(
-                    last_sync_date=self.last_sync_date,
-                    limit=5000  # Sécurité
-                )
-            else:
-                # Mode complet (legacy)
-                api_pianos = self.api_client.get_pianos(limit=1000)
+            api_pianos = prefetched if prefetched is not None else self._fetch_pianos()
 
             if not api_pianos:
                 print("⚠️  Aucun piano récupéré depuis l'API")
@@ -642,6 +812,7 @@ class GazelleToSupabaseSync:
 
             print(f"📥 {len(api_pianos)} pianos récupérés depuis l'API")
 
+            piano_records = []
             for piano_data in api_pianos:
                 try:
                     external_id = piano_data.get('id')
@@ -676,27 +847,17 @@ class GazelleToSupabaseSync:
                         'updated_at': datetime.now().isoformat()
                     }
 
-                    # UPSERT avec on_conflict
-                    url = f"{self.storage.api_url}/gazelle_pianos?on_conflict=external_id"
-                    headers = self.storage._get_headers()
-                    headers["Prefer"] = "resolution=merge-duplicates"
-
-                    response = requests.post(url, headers=headers, json=piano_record)
-
-                    if response.status_code in [200, 201]:
-                        self.stats['pianos']['synced'] += 1
-                    elif response.status_code == 409:
-                        # 409 = Conflict (déjà synchronisé, normal avec UPSERT)
-                        self.stats['pianos']['synced'] += 1
-                    else:
-                        print(f"❌ Erreur UPSERT piano {external_id}: {response.status_code}")
-                        self._record_error('pianos', external_id, f"UPSERT {response.status_code} {response.text[:150]}")
+                    piano_records.append(piano_record)
 
                 except Exception as e:
                     print(f"❌ Erreur piano {piano_data.get('id', 'unknown')}: {e}")
                     self._record_error('pianos', piano_data.get('id', 'unknown'), e)
                     continue
 
+            # UPSERT par lots avec on_conflict
+            _, failed_ids = self._bulk_upsert('gazelle_pianos', 'pianos', piano_records)
+            self._update_search_index('pianos', [r for r in piano_records if r.get('external_id') not in failed_ids])
+
             print(f"✅ {self.stats['pianos']['synced']} pianos synchronisés")
             return self.stats['pianos']['synced']
 
@@ -704,7 +865,32 @@ class GazelleToSupabaseSync:
             print(f"❌ Erreur lors de la synchronisation des pianos: {e}")
             raise
 
-    def sync_appointments(self, start_date_override: Optional[str] = None, force_historical: bool = False) -> int:
+    def _default_appointments_window(self) -> Tuple[datetime, str]:
+        """Fenêtre incrémentale par défaut des RV : (début Montréal, filtre UTC Gazelle)."""
+        from core.timezone_utils import MONTREAL_TZ
+        start_dt = datetime.now(MONTREAL_TZ) - timedelta(days=7)
+        return start_dt, format_for_gazelle_filter(start_dt)
+
+    def _fetch_appointments(self, effective_start_date: str) -> List[Dict[str, Any]]:
+        """Récupère les RV depuis l'API (incrémental rapide ou allEventsBatched)."""
+        if self.incremental_mode and hasattr(self.api_client, 'get_appointments_incremental'):
+            print("🚀 Mode incrémental rapide (sortBy DATE_DESC + filtre)")
+            return self.api_client.get_appointments_incremental(
+                last_sync_date=self.last_sync_date,
+                limit=None
+            )
+        # Mode legacy (allEventsBatched sans sortBy)
+        return self.api_client.get_appointments(
+            limit=None,
+            start_date_override=effective_start_date
+        )
+
+    def sync_appointments(
+        self,
+        start_date_override: Optional[str] = None,
+        force_historical: bool = False,
+        prefetched: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
         """
         Synchronise les rendez-vous depuis Gazelle vers Supabase.
 
@@ -717,6 +903,8 @@ class GazelleToSupabaseSync:
         Args:
             start_date_override: Date de début explicite (YYYY-MM-DD). Si fourni, force cette date.
             force_historical: Si True, force un import historique complet même si déjà fait.
+            prefetched: RV déjà récupérés depuis l'API pour la fenêtre par défaut
+                        (pipeline sync_all). Ignoré si start_date_override est fourni.
 
         Returns:
             Nombre de rendez-vous synchronisés
@@ -730,7 +918,7 @@ class GazelleToSupabaseSync:
             try:
                 # Vérifier si l'import historique a déjà été fait
                 url = f"{self.storage.api_url}/system_settings?key=eq.appointments_historical_import_done&select=value"
-                response = requests.get(url, headers=self.storage._get_headers())
+                response = self.storage.session.get(url, headers=self.storage._get_headers())
 
                 if response.status_code == 200:
                     data = response.json()
@@ -754,27 +942,17 @@ class GazelleToSupabaseSync:
         else:
             # TOUJOURS mode incrémental: 7 derniers jours (ignore le marqueur historical_done)
             from core.timezone_utils import MONTREAL_TZ
-            start_dt = datetime.now(MONTREAL_TZ) - timedelta(days=7)
-            effective_start_date = format_for_gazelle_filter(start_dt)
+            start_dt, effective_start_date = self._default_appointments_window()
             print(f"🔄 Sync incrémental SÉCURISÉE: derniers 7 jours")
             print(f"   📍 Depuis: {start_dt.strftime('%Y-%m-%d')} Montreal → {effective_start_date} UTC")
             print(f"   ℹ️  Import historique désactivé pour workflow automatique")
             print(f"   ℹ️  Pour import complet 2017-maintenant: lancer manuellement avec force_historical=True")
 
         try:
-            # Mode incrémental rapide ou legacy
-            if self.incremental_mode and hasattr(self.api_client, 'get_appointments_incremental'):
-                print("🚀 Mode incrémental rapide (sortBy DATE_DESC + filtre)")
-                api_appointments = self.api_client.get_appointments_incremental(
-                    last_sync_date=self.last_sync_date,
-                    limit=None
-                )
+            if prefetched is not None and not start_date_override:
+                api_appointments = prefetched
             else:
-                # Mode legacy (allEventsBatched sans sortBy)
-                api_appointments = self.api_client.get_appointments(
-                    limit=None,
-                    start_date_override=effective_start_date
-                )
+                api_appointments = self._fetch_appointments(effective_start_date)
 
             if not api_appointments:
                 print("⚠️  Aucun rendez-vous récupéré depuis l'API")
@@ -782,6 +960,7 @@ class GazelleToSupabaseSync:
 
             print(f"📥 {len(api_appointments)} rendez-vous récupérés depuis l'API")
 
+            prepared_appointments = []
             for appt_data in api_appointments:
                 try:
                     external_id = appt_data.get('id')
@@ -876,40 +1055,42 @@ class GazelleToSupabaseSync:
                         'updated_at': format_for_supabase(datetime.now())
                     }
 
-                    # Détecter changement AVANT l'UPSERT
-                    # Récupérer l'ancien record pour comparer
-                    old_record = None
-                    try:
-                        # Fetch old record — last_notified_schedule may not exist yet (migration pending)
-                        check_url = f"{self.storage.api_url}/gazelle_appointments?external_id=eq.{external_id}&select=technicien,last_notified_tech_id,last_notified_schedule,appointment_date,appointment_time,status,updated_at,created_at"
-                        check_response = requests.get(check_url, headers=self.storage._get_headers())
-                        if check_response.status_code in [400, 406] and 'last_notified_schedule' in (check_response.text or ''):
-                            check_url = f"{self.storage.api_url}/gazelle_appointments?external_id=eq.{external_id}&select=technicien,last_notified_tech_id,appointment_date,appointment_time,status,updated_at,created_at"
-                            check_response = requests.get(check_url, headers=self.storage._get_headers())
-                        if check_response.status_code == 200:
-                            old_data = check_response.json()
-                            if old_data and len(old_data) > 0:
-                                old_record = old_data[0]
-                    except Exception as e:
-                        print(f"⚠️  Erreur récupération ancien record {external_id}: {e}")
-
-                    # UPSERT avec on_conflict
-                    url = f"{self.storage.api_url}/gazelle_appointments?on_conflict=external_id"
-                    headers = self.storage._get_headers()
-                    headers["Prefer"] = "resolution=merge-duplicates"
+                    prepared_appointments.append((appointment_record, appt_data))
 
-                    response = requests.post(url, headers=headers, json=appointment_record)
+                except Exception as e:
+                    print(f"❌ Erreur appointment {appt_data.get('id', 'unknown')}: {e}")
+                    self._record_error('appointments', appt_data.get('id', 'unknown'), e)
 
-                    if response.status_code in [200, 201]:
-                        self.stats['appointments']['synced'] += 1
-                    elif response.status_code == 409 and '23503' not in (response.text or ''):
-                        # 409 sans FK violation = conflit d'upsert normal (déjà sync)
-                        self.stats['appointments']['synced'] += 1
-                    else:
-                        print(f"❌ Erreur UPSERT appointment {external_id}: {response.status_code} - {response.text[:200]}")
-                        self._record_error('appointments', external_id, f"UPSERT {response.status_code} {response.text[:150]}")
+            # Détecter changement AVANT l'UPSERT : récupérer les anciens records
+            # en lot pour comparer (au lieu d'un GET par RV)
+            old_records = self._fetch_existing_appointments(
+                [record['external_id'] for record, _ in prepared_appointments]
+            )
+
+            # UPSERT par lots avec on_conflict
+            _, failed_ids = self._bulk_upsert(
+                'gazelle_appointments', 'appointments',
+                [record for record, _ in prepared_appointments]
+            )
+
+            for appointment_record, appt_data in prepared_appointments:
+                try:
+                    external_id = appointment_record['external_id']
+                    if external_id in failed_ids:
                         continue  # Skip la détection de changement si l'UPSERT a échoué
 
+                    old_record = old_records.get(external_id)
+                    client_obj = appt_data.get('client', {})
+                    client_id = appointment_record['client_external_id']
+                    title = appointment_record['title']
+                    description = appointment_record['description']
+                    appointment_date = appointment_record['appointment_date']
+                    appointment_time = appointment_record['appointment_time']
+                    technicien = appointment_record['technicien']
+                    location = appointment_record['location']
+                    event_type = appointment_record['event_type']
+                    gazelle_created_at = appt_data.get('createdAt')
+
                     # DÉTECTION DE CHANGEMENT DE TECHNICIEN pour alerte "Late Assignment"
                     # Conditions:
                     # 1. RV avec un CLIENT OU institution (vincent-d'indy, etc.)
@@ -1048,19 +1229,18 @@ class GazelleToSupabaseSync:
                                         'last_notified_tech_id': technicien,
                                         'last_notified_schedule': current_schedule
                                     }
-                                    patch_resp = requests.patch(update_url, headers=update_headers, json=update_data)
+                                    patch_resp = self.storage.session.patch(update_url, headers=update_headers, json=update_data)
                                     # Fallback: si last_notified_schedule n'existe pas encore
                                     if patch_resp.status_code in [400, 406] and 'last_notified_schedule' in (patch_resp.text or ''):
                                         del update_data['last_notified_schedule']
-                                        requests.patch(update_url, headers=update_headers, json=update_data)
+                                        self.storage.session.patch(update_url, headers=update_headers, json=update_data)
                                     
                         except Exception as e:
                             print(f"⚠️  Erreur détection changement technicien {external_id}: {e}")
                             # Ne pas faire échouer la sync pour ça
 
                 except Exception as e:
-                    print(f"❌ Erreur appointment {appt_data.get('id', 'unknown')}: {e}")
-                    self._record_error('appointments', appt_data.get('id', 'unknown'), e)
+                    print(f"⚠️  Erreur post-UPSERT appointment {appt_data.get('id', 'unknown')}: {e}")
 
             print(f"✅ {self.stats['appointments']['synced']} rendez-vous synchronisés")
 
@@ -1089,7 +1269,7 @@ class GazelleToSupabaseSync:
                 future_filter = (datetime.now(MONTREAL_TZ) + timedelta(days=14)).strftime('%Y-%m-%d')
 
                 url = f"{self.storage.api_url}/gazelle_appointments?appointment_date=gte.{date_filter}&appointment_date=lte.{future_filter}&status=neq.CANCELLED&select=external_id"
-                response = requests.get(url, headers=self.storage._get_headers())
+                response = self.storage.session.get(url, headers=self.storage._get_headers())
 
                 if response.status_code == 200:
                     supabase_appointments = response.json()
@@ -1122,7 +1302,7 @@ class GazelleToSupabaseSync:
                                     'status': 'CANCELLED',
                                     'updated_at': format_for_supabase(datetime.now())
                                 }
-                                patch_response = requests.patch(patch_url, headers=headers, json=patch_data)
+                                patch_response = self.storage.session.patch(patch_url, headers=headers, json=patch_data)
 
                                 if patch_response.status_code in [200, 204]:
                                     cancelled_count += 1
@@ -1152,7 +1332,7 @@ class GazelleToSupabaseSync:
                     headers = self.storage._get_headers()
                     headers["Prefer"] = "resolution=merge-duplicates"
 
-                    response = requests.post(url, headers=headers, json={
+                    response = self.storage.session.post(url, headers=headers, json={
                         'key': 'appointments_historical_import_done',
                         'value': 'true'
                     })
@@ -1171,7 +1351,22 @@ class GazelleToSupabaseSync:
             print(f"❌ Erreur lors de la synchronisation des rendez-vous: {e}")
             raise
 
-    def sync_timeline_entries(self) -> int:
+    def _timeline_cutoff(self) -> Tuple[datetime, str]:
+        """Début de la fenêtre glissante timeline : (datetime UTC, filtre Gazelle)."""
+        from core.timezone_utils import UTC_TZ
+        cutoff_date = datetime.now(UTC_TZ) - timedelta(days=self.TIMELINE_SYNC_DAYS)
+        # IMPORTANT: Convertir la date Montreal → UTC pour le filtre API
+        return cutoff_date, format_for_gazelle_filter(cutoff_date)
+
+    def _fetch_timeline_entries(self) -> List[Dict[str, Any]]:
+        """Récupère les timeline entries de la fenêtre glissante depuis l'API."""
+        _, cutoff_iso_utc = self._timeline_cutoff()
+        return self.api_client.get_timeline_entries(
+            since_date=cutoff_iso_utc,
+            limit=None
+        )
+
+    def sync_timeline_entries(self, prefetched: Optional[List[Dict[str, Any]]] = None) -> int:
         """
         Synchronise les timeline entries depuis Gazelle vers Supabase (FENÊTRE GLISSANTE 30 JOURS).
 
@@ -1187,6 +1382,9 @@ class GazelleToSupabaseSync:
         - UPSERT: Pas de doublons même avec fenêtre plus large
         - Leçon apprise: Bug du 21 décembre causé par fenêtre trop courte
 
+        Args:
+            prefetched: Entrées déjà récupérées depuis l'API (pipeline sync_all)
+
         Returns:
             Nombre d'entrées synchronisées
         """
@@ -1194,20 +1392,8 @@ class GazelleToSupabaseSync:
         print("\n📖 Synchronisation timeline (fenêtre glissante 30 jours)...")
 
         try:
-            from datetime import datetime, timedelta
-            from core.timezone_utils import UTC_TZ
-
-            # ═══════════════════════════════════════════════════════════════
-            # VERROU SÉCURITÉ #4: Fenêtre élargie à 30 jours
-            # Évite les trous de mémoire si sync interrompue (vacances, panne)
-            # ═══════════════════════════════════════════════════════════════
-            TIMELINE_SYNC_DAYS = 30  # Était 7, maintenant 30 pour résilience
-
-            now = datetime.now(UTC_TZ)
-            cutoff_date = now - timedelta(days=TIMELINE_SYNC_DAYS)
-
-            # IMPORTANT: Convertir la date Montreal → UTC pour le filtre API
-            cutoff_iso_utc = format_for_gazelle_filter(cutoff_date)
+            TIMELINE_SYNC_DAYS = self.TIMELINE_SYNC_DAYS
+            cutoff_date, cutoff_iso_utc = self._timeline_cutoff()
 
             print(f"📅 Fenêtre de synchronisation: {TIMELINE_SYNC_DAYS} derniers jours (résilience)")
             print(f"   📍 Cutoff: {cutoff_date.strftime('%Y-%m-%d')} UTC → {cutoff_iso_utc} UTC")
@@ -1215,10 +1401,7 @@ class GazelleToSupabaseSync:
 
             # Utiliser le filtre API pour récupérer les N derniers jours
             # Fenêtre élargie à 30j pour ne jamais perdre de SERVICE complétés
-            api_entries = self.api_client.get_timeline_entries(
-                since_date=cutoff_iso_utc,
-                limit=None
-            )
+            api_entries = prefetched if prefetched is not None else self._fetch_timeline_entries()
 
             if not api_entries:
                 print(f"✅ Aucune timeline entry récente ({TIMELINE_SYNC_DAYS} derniers jours)")
@@ -1226,9 +1409,9 @@ class GazelleToSupabaseSync:
 
             print(f"📥 {len(api_entries)} timeline entries reçues ({TIMELINE_SYNC_DAYS} derniers jours)")
 
-            synced_count = 0
             stopped_by_age = False
 
+            timeline_records = []
             for entry_data in api_entries:
                 try:
                     # Parser occurredAt (CoreDateTime) pour validation et stockage
@@ -1323,31 +1506,22 @@ class GazelleToSupabaseSync:
                     if details and details.strip():
                         timeline_record['description'] = details.strip()
 
-                    # UPSERT avec on_conflict sur external_id (clé unique Gazelle)
-                    # IMPORTANT: Garantit aucun doublon, même si sync multiple fois
-                    url = f"{self.storage.api_url}/gazelle_timeline_entries?on_conflict=external_id"
-                    headers = self.storage._get_headers()
-                    headers["Prefer"] = "resolution=merge-duplicates"
-
-                    response = requests.post(url, headers=headers, json=timeline_record)
-
-                    if response.status_code in [200, 201]:
-                        self.stats['timeline']['synced'] += 1
-                        synced_count += 1
-                    elif response.status_code == 409:
-                        # 409 = Déjà existant, mise à jour réussie avec UPSERT
-                        self.stats['timeline']['synced'] += 1
-                        synced_count += 1
-                    else:
-                        print(f"❌ Erreur UPSERT timeline {external_id}: {response.status_code}")
-                        print(f"   Response: {response.text[:200]}")
-                        self._record_error('timeline', external_id, f"UPSERT {response.status_code} {response.text[:150]}")
+                    timeline_records.append(timeline_record)
 
                 except Exception as e:
                     print(f"❌ Erreur timeline entry {entry_data.get('id', 'unknown')}: {e}")
                     self._record_error('timeline', entry_data.get('id', 'unknown'), e)
                     continue
 
+            # UPSERT par lots avec on_conflict sur external_id (clé unique Gazelle)
+            # IMPORTANT: Garantit aucun doublon, même si sync multiple fois.
+            # Les lots sont regroupés par jeu de colonnes : une entrée sans title/
+            # description n'écrase donc jamais les valeurs existantes (VERROU #2).
+            synced_count, failed_ids = self._bulk_upsert('gazelle_timeline_entries', 'timeline', timeline_records)
+            self._update_search_index(
+                'timeline', [r for r in timeline_records if r.get('external_id') not in failed_ids]
+            )
+
             # Affichage final
             if stopped_by_age:
                 print(f"✅ {synced_count} timeline entries synchronisées (fenêtre {TIMELINE_SYNC_DAYS} jours)")
@@ -1387,7 +1561,7 @@ class GazelleToSupabaseSync:
         
         try:
             from datetime import datetime, timedelta
-            from supabase import create_client
+            from core.supabase_storage import get_supabase_client
             import json
             
             # Récupérer les timeline entries récentes (30 jours) avec piano_id
@@ -1396,7 +1570,7 @@ class GazelleToSupabaseSync:
             cutoff_date = datetime.now(UTC_TZ) - timedelta(days=30)
             cutoff_iso = cutoff_date.isoformat()
             
-            supabase = create_client(self.storage.supabase_url, self.storage.supabase_key)
+            supabase = get_supabase_client(self.storage.supabase_url, self.storage.supabase_key)
             
             # Récupérer les timeline entries récentes avec piano_id
             result = supabase.table('gazelle_timeline_entries')\
@@ -1519,7 +1693,7 @@ class GazelleToSupabaseSync:
                             update_url = f"{self.storage.api_url}/gazelle_timeline_entries?id=eq.{entry['id']}"
                             update_headers = self.storage._get_headers()
 
-                            update_resp = requests.patch(
+                            update_resp = self.storage.session.patch(
                                 update_url,
                                 headers=update_headers,
                                 json={'metadata': current_metadata}
@@ -1560,7 +1734,7 @@ class GazelleToSupabaseSync:
         if not force:
             try:
                 url = f"{self.storage.api_url}/users?select=id&limit=1"
-                response = requests.get(url, headers=self.storage._get_headers())
+                response = self.storage.session.get(url, headers=self.storage._get_headers())
                 if response.status_code == 200:
                     existing_users = response.json()
                     if existing_users:
@@ -1606,7 +1780,7 @@ class GazelleToSupabaseSync:
                     headers = self.storage._get_headers()
                     headers["Prefer"] = "resolution=merge-duplicates"
 
-                    response = requests.post(url, headers=headers, json=user_record)
+                    response = self.storage.session.post(url, headers=headers, json=user_record)
 
                     if response.status_code in [200, 201]:
                         synced_count += 1
@@ -1624,6 +1798,81 @@ class GazelleToSupabaseSync:
             print(f"❌ Erreur lors de la synchronisation des users: {e}")
             raise
 
+    def _run_pipeline(self):
+        """
+        Exécute les étapes de sync_all en pipeline.
+
+        Avant : users → clients → contacts → pianos → RV → timeline strictement
+        en série, chaque étape attendant Gazelle PUIS Supabase. Ici :
+        - toutes les récupérations Gazelle partent dès le début (pool de
+          fetch_workers threads), pendant que les premières écritures tournent ;
+        - chaque étape transforme + écrit dès que ses données sont arrivées ET
+          que les étapes dont elle dépend (STAGE_DEPENDENCIES) ont fini d'écrire ;
+        - les étapes indépendantes (contacts/pianos, RV/timeline) écrivent en
+          parallèle.
+
+        Les durées sont notées dans self.stats['timings'][étape] :
+        fetch_s (API), wait_s (attente des dépendances), write_s (transformation
+        + écriture). Si une étape échoue, celles qui en dépendent sont annulées
+        et la première erreur (dans l'ordre des étapes) est relevée.
+        """
+        _, appointments_start = self._default_appointments_window()
+        fetchers = {
+            'clients': self._fetch_clients,
+            'contacts': lambda: self.api_client.get_contacts(limit=2000),
+            'pianos': self._fetch_pianos,
+            'appointments': lambda: self._fetch_appointments(appointments_start),
+            'timeline': self._fetch_timeline_entries,
+        }
+        writers = {
+            # users : vérifie d'abord si la table est vide, pas de prefetch
+            'users': lambda data: self.sync_users(),
+            'clients': lambda data: self.sync_clients(prefetched=data),
+            'contacts': lambda data: self.sync_contacts(prefetched=data),
+            'pianos': lambda data: self.sync_pianos(prefetched=data),
+            'appointments': lambda data: self.sync_appointments(prefetched=data),
+            'timeline': lambda data: self.sync_timeline_entries(prefetched=data),
+        }
+        timings = self.stats['timings']
+        for stage in self.STAGE_DEPENDENCIES:
+            timings[stage] = {'fetch_s': 0.0, 'wait_s': 0.0, 'write_s': 0.0}
+
+        def timed_fetch(stage):
+            t0 = time.perf_counter()
+            try:
+                return fetchers[stage]()
+            finally:
+                timings[stage]['fetch_s'] = round(time.perf_counter() - t0, 2)
+
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="sync-fetch")
+        # Un thread par étape : une étape peut attendre ses dépendances sans bloquer les autres
+        write_pool = ThreadPoolExecutor(max_workers=len(self.STAGE_DEPENDENCIES), thread_name_prefix="sync-write")
+        try:
+            fetch_futures = {stage: fetch_pool.submit(timed_fetch, stage) for stage in fetchers}
+            write_futures = {}
+
+            def run_stage(stage):
+                t0 = time.perf_counter()
+                for dep in self.STAGE_DEPENDENCIES[stage]:
+                    write_futures[dep].result()  # relève l'erreur d'une dépendance
+                data = fetch_futures[stage].result() if stage in fetch_futures else None
+                t1 = time.perf_counter()
+                timings[stage]['wait_s'] = round(t1 - t0, 2)
+                try:
+                    return writers[stage](data)
+                finally:
+                    timings[stage]['write_s'] = round(time.perf_counter() - t1, 2)
+
+            # Soumission dans l'ordre topologique (les dépendances existent déjà)
+            for stage in self.STAGE_DEPENDENCIES:
+                write_futures[stage] = write_pool.submit(run_stage, stage)
+
+            for stage in self.STAGE_DEPENDENCIES:
+                write_futures[stage].result()
+        finally:
+            write_pool.shutdown(wait=True)
+            fetch_pool.shutdown(wait=True, cancel_futures=True)
+
     def sync_all(self) -> Dict[str, Any]:
         """
         Synchronise toutes les tables Gazelle vers Supabase.
@@ -1640,24 +1889,9 @@ class GazelleToSupabaseSync:
         start_time = datetime.now()
 
         try:
-            # Synchroniser dans l'ordre de dépendance
-            # 0. Users/Techniciens (requis pour timeline entries FK)
-            self.sync_users()
-
-            # 1. Clients (requis pour pianos, contacts, etc.)
-            self.sync_clients()
-
-            # 2. Contacts (personnes associées aux clients)
-            self.sync_contacts()
-
-            # 3. Pianos (dépend de clients)
-            self.sync_pianos()
-
-            # 4. Appointments (utilise maintenant allEventsBatched de V4)
-            self.sync_appointments()
-
-            # 5. Timeline entries (notes techniques)
-            self.sync_timeline_entries()
+            # Pipeline : récupérations API en parallèle, écritures dans l'ordre
+            # des clés étrangères (voir STAGE_DEPENDENCIES)
+            self._run_pipeline()
 
             # Résumé
             duration = (datetime.now() - start_time).total_seconds()
@@ -1672,6 +1906,9 @@ class GazelleToSupabaseSync:
             print(f"   • Pianos:       {self.stats['pianos']['synced']:4d} synchronisés, {self.stats['pianos']['errors']:2d} erreurs")
             print(f"   • RV:           {self.stats['appointments']['synced']:4d} synchronisés, {self.stats['appointments']['errors']:2d} erreurs")
             print(f"   • Timeline:     {self.stats['timeline']['synced']:4d} synchronisés, {self.stats['timeline']['errors']:2d} erreurs")
+            print("\n⏱️  Par étape (fetch / attente FK / écriture):")
+            for stage, t in self.stats['timings'].items():
+                print(f"   • {stage:<13} {t.get('fetch_s', 0):6.2f}s / {t.get('wait_s', 0):6.2f}s / {t.get('write_s', 0):6.2f}s")
             print("=" * 70)
 
             # Sauvegarder timestamp de fin de sync (mode incrémental)
@@ -1810,7 +2047,9 @@ def main():
                 'contacts': result['stats'].get('contacts', {}).get('synced', 0),
                 'pianos': result['stats'].get('pianos', {}).get('synced', 0),
                 'appointments': result['stats'].get('appointments', {}).get('synced', 0),
-                'timeline': result['stats'].get('timeline', {}).get('synced', 0)
+                'timeline': result['stats'].get('timeline', {}).get('synced', 0),
+                # Où passe le temps (fetch / attente FK / écriture par étape)
+                'timings': result['stats'].get('timings', {})
             }
         else:
             # Si result n'a pas de stats, utiliser les stats du sync_manager
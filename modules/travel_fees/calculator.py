@@ -17,10 +17,12 @@ Techniciens:
 """
 
 import os
-import requests
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from core.distance_service import get_distance_service
+from core.fsa_distance import get_fsa_engine
+
 
 @dataclass
 class Technician:
@@ -106,24 +108,17 @@ class TravelFeeCalculator:
             )
 
     def _load_api_key_from_supabase(self) -> Optional[str]:
-        """Charge la clé Google Maps depuis Supabase system_settings."""
+        """Charge la clé Google Maps depuis system_settings (cache en mémoire), puis .env."""
         try:
-            from core.supabase_storage import SupabaseStorage
-            from supabase import create_client
-
-            storage = SupabaseStorage()
-            supabase = create_client(storage.supabase_url, storage.supabase_key)
+            from core.settings_cache import get_settings_cache
 
-            result = supabase.table('system_settings').select('value').eq('key', 'google_maps_api_key').execute()
-
-            if result.data and len(result.data) > 0:
-                return result.data[0]['value']
-            else:
-                # Fallback: essayer .env
-                return os.getenv('GOOGLE_MAPS_API_KEY')
+            api_key = get_settings_cache().get_str('google_maps_api_key')
+            if api_key:
+                return api_key
         except Exception:
-            # En cas d'erreur, essayer .env
-            return os.getenv('GOOGLE_MAPS_API_KEY')
+            pass
+        # Fallback: essayer .env
+        return os.getenv('GOOGLE_MAPS_API_KEY')
 
     def _call_distance_matrix_api(
         self,
@@ -131,7 +126,7 @@ class TravelFeeCalculator:
         destination: str
     ) -> Tuple[float, float]:
         """
-        Appelle Google Maps Distance Matrix API pour obtenir distance et temps.
+        Distance et temps via Google Maps Distance Matrix (cache partagé, core/distance_service.py).
 
         Args:
             origin: Adresse de départ
@@ -143,32 +138,8 @@ class TravelFeeCalculator:
         Raises:
             Exception: Si l'API retourne une erreur
         """
-        url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-        params = {
-            'origins': origin,
-            'destinations': destination,
-            'key': self.api_key,
-            'mode': 'driving',
-            'language': 'fr',
-            'units': 'metric'
-        }
-
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if data['status'] != 'OK':
-            raise Exception(f"Google Maps API error: {data['status']}")
-
-        element = data['rows'][0]['elements'][0]
-
-        if element['status'] != 'OK':
-            raise Exception(f"Route calculation error: {element['status']}")
-
-        distance_meters = element['distance']['value']
-        duration_seconds = element['duration']['value']
-
-        return distance_meters, duration_seconds
+        leg = get_distance_service().distance(origin, destination, api_key=self.api_key)
+        return leg['distance_m'], leg['duration_s']
 
     def calculate_fee_for_technician(
         self,
@@ -187,9 +158,14 @@ class TravelFeeCalculator:
         """
         # Obtenir distance et temps ONE-WAY
         if self.degraded_mode:
-            # Mode dégradé: estimation basique (40km, 30min par défaut)
-            distance_meters = 40000  # 40km
-            duration_seconds = 1800  # 30 minutes
+            # Mode dégradé: estimation hors ligne par centroïdes de RTA
+            # (core/fsa_distance.py), sinon estimation basique (40km, 30min)
+            leg = get_fsa_engine().estimate(technician.postal_code, destination_address)
+            if leg:
+                distance_meters, duration_seconds = leg['distance_m'], leg['duration_s']
+            else:
+                distance_meters = 40000  # 40km
+                duration_seconds = 1800  # 30 minutes
         else:
             distance_meters, duration_seconds = self._call_distance_matrix_api(
                 technician.full_address,
@@ -237,6 +213,14 @@ class TravelFeeCalculator:
         """
         results = []
 
+        # Une seule requête Distance Matrix pour tous les techniciens (mise en
+        # cache) ; chaque calcul ci-dessous est ensuite servi localement.
+        if not self.degraded_mode:
+            get_distance_service().matrix(
+                [t.full_address for t in self.TECHNICIANS], [destination_address],
+                api_key=self.api_key,
+            )
+
         for technician in self.TECHNICIANS:
             try:
                 result = self.calculate_fee_for_technician(technician, destination_address)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark : latence du détail de RV du chat (V5DataProvider.get_appointment_detail).
+
+Sur les RV récents ayant un client, compare :
+- chargement : ancienne séquence de 3 appels PostgREST (appointment, pianos,
+  timeline ; copie ci-dessous) vs _fetch_appointment_bundle (un appel
+  imbriqué, ou repli parallèle) ;
+- extraction "confort" : regex relancées à chaque fois vs mémorisation par
+  hash des notes (1re passe à froid, passes suivantes servies du cache) ;
+- get_appointment_detail de bout en bout.
+
+Vérifie que la timeline et les champs confort sont IDENTIQUES RV par RV.
+Code de sortie 1 si un seul RV diverge.
+
+USAGE:
+    python scripts/benchmark_chat_detail.py
+    python scripts/benchmark_chat_detail.py --appointments 50 --repeat 3
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.http_session import get_session
+from core.supabase_storage import SupabaseStorage
+from api.chat.service import V5DataProvider
+
+
+def legacy_fetch(provider: V5DataProvider, appointment_id: str):
+    """Ancien chargement : 3 appels séquentiels (référence)."""
+    storage = provider.storage
+    headers = storage._get_headers()
+    resp = get_session().get(
+        f"{storage.api_url}/gazelle_appointments",
+        headers=headers,
+        params={"select": "*,client:client_external_id(*)", "external_id": f"eq.{appointment_id}"},
+    )
+    apt_raw = resp.json()[0]
+    client = apt_raw.get("client")
+    timeline = []
+    if client:
+        client_id = client.get("external_id")
+        get_session().get(
+            f"{storage.api_url}/gazelle_pianos",
+            headers=headers,
+            params={"select": "external_id,make,model,serial_number", "client_external_id": f"eq.{client_id}"},
+        )
+        resp = get_session().get(
+            f"{storage.api_url}/gazelle_timeline_entries",
+            headers=headers,
+            params={
+                "select": "occurred_at,entry_type,title,description,entry_date,event_type,metadata",
+                "client_external_id": f"eq.{client_id}",
+                "entry_type": "in.(SERVICE_ENTRY_MANUAL,APPOINTMENT,PIANO_MEASUREMENT,NOTE)",
+                "order": "occurred_at.desc",
+                "limit": 50,
+            },
+        )
+        timeline = resp.json() if resp.status_code == 200 else []
+    return apt_raw, timeline
+
+
+def legacy_comfort(provider: V5DataProvider, notes: str):
+    """Extraction confort sans mémorisation (cache vidé à chaque appel)."""
+    V5DataProvider._comfort_cache.clear()
+    return provider._extract_comfort_fields(notes)
+
+
+def load_appointment_ids(storage: SupabaseStorage, count: int):
+    resp = storage.session.get(
+        f"{storage.api_url}/gazelle_appointments",
+        headers=storage._get_headers(),
+        params={
+            "select": "external_id",
+            "client_external_id": "not.is.null",
+            "order": "appointment_date.desc",
+            "limit": count,
+        },
+    )
+    if resp.status_code != 200:
+        print(f"❌ Erreur Supabase {resp.status_code}: {resp.text[:200]}")
+        return []
+    return [r["external_id"] for r in resp.json() if r.get("external_id")]
+
+
+def timed(fn, items, repeat):
+    """Durées (ms) par élément, meilleur de N passes, + derniers résultats."""
+    best, results = None, None
+    for _ in range(repeat):
+        durations, results = [], []
+        for item in items:
+            t0 = time.perf_counter()
+            results.append(fn(item))
+            durations.append((time.perf_counter() - t0) * 1000)
+        if best is None or sum(durations) < sum(best):
+            best = durations
+    return best, results
+
+
+def report(name, old_ms, new_ms):
+    old_p50, new_p50 = statistics.median(old_ms), statistics.median(new_ms)
+    print("=" * 60)
+    print(f"🧪 {name}")
+    print(f"   Ancien:  p50 {old_p50:.2f} ms  max {max(old_ms):.2f} ms")
+    print(f"   Nouveau: p50 {new_p50:.2f} ms  max {max(new_ms):.2f} ms"
+          + (f"  (x{old_p50 / new_p50:.1f})" if new_p50 else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark détail de RV du chat")
+    parser.add_argument("--appointments", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3, help="Meilleur de N passes")
+    args = parser.parse_args()
+
+    storage = SupabaseStorage()
+    provider = V5DataProvider(storage)
+
+    print("📥 Chargement des RV récents...")
+    ids = load_appointment_ids(storage, args.appointments)
+    print(f"   {len(ids)} RV\n")
+    if not ids:
+        sys.exit(1)
+
+    failures = 0
+
+    # 1. Chargement
+    old_ms, old_res = timed(lambda i: legacy_fetch(provider, i), ids, args.repeat)
+    new_ms, new_res = timed(provider._fetch_appointment_bundle, ids, args.repeat)
+    report("Chargement (appointment + pianos + timeline)", old_ms, new_ms)
+    mode = "imbriqué" if V5DataProvider._embedded_detail_supported else "repli parallèle"
+    print(f"   Mode: {mode}")
+    for apt_id, (_, old_timeline), new_apt in zip(ids, old_res, new_res):
+        new_timeline = (new_apt.get("client") or {}).get("timeline") or []
+        key = lambda entries: [(e.get("occurred_at"), e.get("title")) for e in entries]
+        if key(old_timeline) != key(new_timeline):
+            failures += 1
+            print(f"   ⚠️ Timeline différente pour {apt_id}")
+
+    # 2. Extraction confort
+    notes = [apt.get("notes") or "" for apt in new_res]
+    old_ms, old_res = timed(lambda n: legacy_comfort(provider, n), notes, args.repeat)
+    V5DataProvider._comfort_cache.clear()
+    cold_res = [provider._extract_comfort_fields(n) for n in notes]
+    new_ms, new_res = timed(provider._extract_comfort_fields, notes, args.repeat)
+    report("Extraction confort (regex vs mémorisée)", old_ms, new_ms)
+    diffs = [i for i, (a, b) in enumerate(zip(old_res, new_res)) if a != b]
+    diffs += [i for i, (a, b) in enumerate(zip(cold_res, new_res)) if a != b]
+    failures += len(diffs)
+    for i in sorted(set(diffs))[:5]:
+        print(f"   ⚠️ {ids[i]}: {old_res[i]} != {new_res[i]}")
+
+    # 3. Bout en bout
+    e2e_ms, _ = timed(provider.get_appointment_detail, ids, args.repeat)
+    print("=" * 60)
+    print("🧪 get_appointment_detail (bout en bout)")
+    print(f"   p50 {statistics.median(e2e_ms):.2f} ms  max {max(e2e_ms):.2f} ms")
+
+    if failures:
+        print("\n❌ Résultats différents")
+        sys.exit(1)
+    print("\n✅ Résultats identiques")
+
+
+if __name__ == "__main__":
+    main()
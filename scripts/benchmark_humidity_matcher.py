@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark : détection d'alertes humidité, ancien balayage vs automate.
+
+Charge tout l'historique timeline (descriptions) depuis Supabase, puis passe
+chaque note dans :
+- l'ancienne implémentation (copie ci-dessous : `kw in texte` par mot-clé,
+  regex relues à chaque appel) ;
+- HumidityScanner.detect_issue et detect_humidity_issue (automate partagé,
+  core/keyword_matcher.py).
+
+Vérifie que les résultats sont IDENTIQUES note par note et affiche les
+durées. Code de sortie 1 si une seule note diverge.
+
+USAGE:
+    python scripts/benchmark_humidity_matcher.py
+    python scripts/benchmark_humidity_matcher.py --max-entries 20000 --repeat 3
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.supabase_storage import SupabaseStorage
+from core.humidity_alert_detector import HUMIDITY_KEYWORDS, detect_humidity_issue
+from modules.alerts.humidity_scanner import HumidityScanner
+
+
+def legacy_detect_issue(description, alert_keywords, resolution_keywords):
+    """Ancienne HumidityScanner.detect_issue (référence)."""
+    if not description or len(str(description).strip()) == 0:
+        return None
+    text_lower = str(description).lower()
+    if re.search(r'\d+\s*[CF°]\s*,?\s*\d+\s*%', description):
+        return None
+    for issue_type, keyword_list in alert_keywords.items():
+        for keyword in keyword_list:
+            if keyword.lower() in text_lower:
+                if issue_type == "environnement":
+                    broad_keywords = ["humidité", "humidite", "humidity", "température", "temperature"]
+                    if keyword.lower() in broad_keywords:
+                        problem_context = [
+                            "basse", "haute", "élevée", "elevee", "anormale",
+                            "problème", "probleme", "issue", "trop",
+                            "low", "high", "abnormal", "problem"
+                        ]
+                        if not any(ctx in text_lower for ctx in problem_context):
+                            continue
+                is_resolved = False
+                resolution_keyword = None
+                if issue_type in resolution_keywords:
+                    for res_keyword in resolution_keywords[issue_type]:
+                        if res_keyword.lower() in text_lower:
+                            is_resolved = True
+                            resolution_keyword = res_keyword
+                            break
+                return (
+                    issue_type,
+                    f"{keyword} détecté" + (f" - Résolu: {resolution_keyword}" if is_resolved else ""),
+                    is_resolved
+                )
+    return None
+
+
+def legacy_detect_humidity_issue(notes):
+    """Ancienne detect_humidity_issue (référence, sans detected_at)."""
+    if not notes:
+        return None
+    notes_lower = notes.lower()
+    for alert_type, patterns in HUMIDITY_KEYWORDS.items():
+        for pattern in patterns:
+            match = re.search(pattern, notes_lower, re.IGNORECASE)
+            if match:
+                return (alert_type, match.group(0))
+    return None
+
+
+def load_descriptions(storage: SupabaseStorage, max_entries: int, page_size: int = 1000):
+    url = f"{storage.api_url}/gazelle_timeline_entries"
+    descriptions, offset = [], 0
+    while offset < max_entries:
+        resp = storage.session.get(
+            url,
+            headers=storage._get_headers(),
+            params={
+                "select": "description",
+                "description": "not.is.null",
+                "order": "occurred_at.desc",
+                "offset": offset,
+                "limit": min(page_size, max_entries - offset),
+            },
+        )
+        if resp.status_code != 200:
+            print(f"❌ Erreur Supabase {resp.status_code}: {resp.text[:200]}")
+            break
+        rows = resp.json()
+        descriptions += [r["description"] for r in rows if r.get("description")]
+        if len(rows) < page_size:
+            break
+        offset += page_size
+    return descriptions
+
+
+def timed(fn, notes, repeat):
+    best, results = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [fn(n) for n in notes]
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark détection alertes humidité")
+    parser.add_argument("--max-entries", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Meilleur de N passes")
+    args = parser.parse_args()
+
+    scanner = HumidityScanner()
+    alerts, resolutions = scanner.config["alert_keywords"], scanner.config["resolution_keywords"]
+
+    print("📥 Chargement de l'historique timeline...")
+    notes = load_descriptions(scanner.storage, args.max_entries)
+    print(f"   {len(notes)} notes\n")
+    if not notes:
+        sys.exit(1)
+
+    failures = 0
+    benches = [
+        ("HumidityScanner.detect_issue",
+         lambda n: legacy_detect_issue(n, alerts, resolutions),
+         lambda n: scanner.detect_issue(n, alerts, resolutions)),
+        ("detect_humidity_issue",
+         legacy_detect_humidity_issue,
+         lambda n: (lambda r: r and (r["alert_type"], r["matched_pattern"]))(detect_humidity_issue(n))),
+    ]
+    for name, legacy, new in benches:
+        old_t, old_res = timed(legacy, notes, args.repeat)
+        new_t, new_res = timed(new, notes, args.repeat)
+        diffs = [i for i, (a, b) in enumerate(zip(old_res, new_res)) if a != b]
+        failures += len(diffs)
+        print("=" * 60)
+        print(f"🧪 {name}")
+        print(f"   Ancien:   {old_t * 1000:.0f} ms")
+        print(f"   Automate: {new_t * 1000:.0f} ms  (x{old_t / new_t:.1f})" if new_t else "")
+        print(f"   Détections: {sum(1 for r in new_res if r)}  Divergences: {len(diffs)}")
+        for i in diffs[:5]:
+            print(f"   ⚠️ {notes[i][:80]!r}: {old_res[i]} != {new_res[i]}")
+
+    if failures:
+        print("\n❌ Résultats différents")
+        sys.exit(1)
+    print("\n✅ Résultats identiques")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark : solveur d'ordre de visite (modules/assistant/services/route_optimizer.py).
+
+Journées synthétiques (points aléatoires autour de Montréal, graine fixe), sans
+réseau ni Supabase. Pour chaque taille de journée, avec et sans fenêtres
+horaires :
+- durée de solve_order (p50 / max) ;
+- écart de coût vs l'ordre optimal exhaustif (petites journées seulement).
+
+Repères mesurés (journée de 20 RV) : ~20 ms sans fenêtres, quelques centaines
+de ms avec fenêtres (chaque essai recalcule l'horaire complet).
+
+USAGE:
+    python scripts/benchmark_route_optimizer.py
+    python scripts/benchmark_route_optimizer.py --sizes 8 12 20 --days 20
+"""
+
+import argparse
+import itertools
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.assistant.services.route_optimizer import _Tour, solve_order
+
+# Au-delà, l'énumération exhaustive devient trop longue
+BRUTE_FORCE_MAX = 8
+
+
+def synthetic_day(rng: random.Random, n: int, windowed: bool, slack: float = 30.0):
+    """Matrice minutes (maison = nœud 0), fenêtres autour d'un horaire plausible, durées de RV."""
+    points = [(0.0, 0.0)] + [(rng.uniform(-25, 25), rng.uniform(-25, 25)) for _ in range(n)]
+    minutes = [[math.dist(a, b) * 1.4 for b in points] for a in points]  # ~43 km/h
+    service = [0.0] + [rng.choice([60.0, 90.0, 120.0]) for _ in range(n)]
+    windows = [None] * (n + 1)
+    if windowed:
+        # Horaire "prévu" : ordre aléatoire, enchaîné depuis 8 h
+        clock, prev = 8 * 60.0, 0
+        for node in rng.sample(range(1, n + 1), n):
+            clock += minutes[prev][node]
+            windows[node] = (clock - slack, clock + slack)
+            clock += service[node]
+            prev = node
+    return minutes, windows, service
+
+
+def brute_force(minutes, windows, service) -> float:
+    tour = _Tour(minutes, windows, service, None)
+    return min(tour.cost(list(p)) for p in itertools.permutations(range(1, len(minutes))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark solveur d'ordre de visite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 12, 20])
+    parser.add_argument("--days", type=int, default=10, help="Journées par taille")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for windowed in (False, True):
+        print("=" * 60)
+        print(f"🧪 {'Avec' if windowed else 'Sans'} fenêtres horaires")
+        for n in args.sizes:
+            durations, gaps = [], []
+            for _ in range(args.days):
+                minutes, windows, service = synthetic_day(rng, n, windowed)
+                t0 = time.perf_counter()
+                _, cost = solve_order(minutes, windows, service, initial=list(range(1, n + 1)))
+                durations.append((time.perf_counter() - t0) * 1000)
+                if n <= BRUTE_FORCE_MAX:
+                    optimum = brute_force(minutes, windows, service)
+                    gaps.append((cost - optimum) / optimum * 100 if optimum else 0.0)
+            line = (f"   {n:>2} RV : p50 {statistics.median(durations):7.1f} ms"
+                    f"  max {max(durations):7.1f} ms")
+            if gaps:
+                optimal = sum(1 for g in gaps if g < 1e-6)
+                line += f"  | optimal {optimal}/{len(gaps)}, écart max {max(gaps):.2f} %"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Recalibre le modèle hors ligne (core/fsa_distance.py) sur les trajets Google
+déjà en cache (core/distance_service.py, data/distance_cache.sqlite).
+
+Seules les paires en voiture, hors trafic (tranche "any"), dont les deux
+lieux sont identifiés par un code postal complet sont utilisées. Affiche
+les paramètres ajustés, l'erreur du modèle actuel vs ajusté, et les
+variables d'environnement à poser.
+
+USAGE:
+    python scripts/calibrate_fsa_distance.py
+    python scripts/calibrate_fsa_distance.py --db /chemin/distance_cache.sqlite
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from core.distance_service import CACHE_PATH
+from core.fsa_distance import FSADistanceEngine, calibrate
+
+
+def load_samples(db_path: str):
+    conn = sqlite3.connect(db_path)
+    samples = []
+    for key, value in conn.execute("SELECT key, value FROM distance_cache"):
+        mode, bucket, origin, destination = key.split("|", 3)
+        if mode != "driving" or bucket != "any" or len(origin) != 6 or len(destination) != 6:
+            continue
+        leg = json.loads(value)
+        samples.append((origin, destination, leg["distance_m"], leg["duration_s"]))
+    return samples
+
+
+def errors(engine: FSADistanceEngine, samples):
+    km_err, min_err = [], []
+    for origin, destination, distance_m, duration_s in samples:
+        est = engine.estimate(origin, destination)
+        if est:
+            km_err.append(abs(est["distance_m"] - distance_m) / 1000.0)
+            min_err.append(abs(est["duration_s"] - duration_s) / 60.0)
+    return (np.median(km_err) if km_err else float("nan"),
+            np.median(min_err) if min_err else float("nan"), len(km_err))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration du modèle de distances hors ligne")
+    parser.add_argument("--db", default=CACHE_PATH, help="Cache SQLite du service de distances")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Cache introuvable: {args.db}")
+        sys.exit(1)
+
+    samples = load_samples(args.db)
+    print(f"📥 {len(samples)} trajets Google utilisables\n")
+    if len(samples) < 10:
+        print("⚠️ Trop peu de trajets pour calibrer (minimum 10)")
+        sys.exit(1)
+
+    fitted = calibrate(samples)
+    current = FSADistanceEngine()
+    params = {**current.params, **{k: v for k, v in fitted.items() if k != "n"}}
+    tuned = FSADistanceEngine(**params)
+
+    for name, engine in (("Actuel", current), ("Ajusté", tuned)):
+        km, minutes, n = errors(engine, samples)
+        print(f"   {name:7s} erreur médiane: {km:.2f} km, {minutes:.1f} min ({n} paires)")
+
+    print("\n✅ Variables d'environnement suggérées:")
+    print(f"   FSA_ROAD_FACTOR={params['road_factor']}")
+    print(f"   FSA_INTRA_KM={params['intra_km']}")
+    print(f"   FSA_MINUTES_BASE={params['minutes_base']}")
+    print(f"   FSA_MINUTES_PER_KM={params['minutes_per_km']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test de charge : les routes lentes ne bloquent plus la boucle uvicorn.
+
+Lance N requêtes simultanées sur une route lente (Gazelle/Supabase) et, en
+parallèle, sonde /health. Avant @offload_blocking, les requêtes passaient
+une par une (durée totale ≈ N x durée d'une requête) et /health attendait
+derrière elles. Attendu maintenant : durée totale ≈ durée d'une requête,
+/health en quelques ms.
+
+USAGE:
+    python scripts/test_concurrent_routes.py
+    python scripts/test_concurrent_routes.py --base-url http://localhost:8000 \\
+        --path /vincent-dindy/pianos -n 8
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+
+def timed_get(url: str) -> float:
+    t0 = time.perf_counter()
+    resp = requests.get(url, timeout=120)
+    elapsed = time.perf_counter() - t0
+    print(f"   {resp.status_code} {url} en {elapsed:.2f}s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de concurrence des routes bloquantes")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/vincent-dindy/pianos", help="Route lente à solliciter")
+    parser.add_argument("-n", type=int, default=8, help="Requêtes simultanées")
+    args = parser.parse_args()
+
+    slow_url = f"{args.base_url}{args.path}"
+    health_url = f"{args.base_url}/health"
+
+    print("=" * 60)
+    print(f"🧪 1 requête seule sur {args.path}")
+    print("=" * 60)
+    single = timed_get(slow_url)
+
+    print("\n" + "=" * 60)
+    print(f"🧪 {args.n} requêtes simultanées + sondes /health")
+    print("=" * 60)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.n + 1) as pool:
+        slow = [pool.submit(timed_get, slow_url) for _ in range(args.n)]
+        time.sleep(0.2)  # laisser les requêtes lentes démarrer
+        health = [timed_get(health_url) for _ in range(3)]
+        for f in slow:
+            f.result()
+    total = time.perf_counter() - t0
+
+    print("\n📊 Résultat:")
+    print(f"   Requête seule:        {single:.2f}s")
+    print(f"   {args.n} simultanées:      {total:.2f}s (série ≈ {single * args.n:.2f}s)")
+    print(f"   /health pendant:      max {max(health) * 1000:.0f} ms")
+
+    serialised = total > single * args.n * 0.8
+    if serialised:
+        print("❌ Les requêtes semblent encore sérialisées")
+        sys.exit(1)
+    print("✅ Les requêtes s'exécutent en parallèle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+-- ============================================================
+-- Cache des briefings "Ma Journée" PAR RENDEZ-VOUS
+-- Created: 2026-10-17
+-- ============================================================
+--
+-- Avant : un seul gros JSON par date dans system_settings (briefings_YYYY-MM-DD),
+-- entièrement régénéré à chaque warm et jeté après 4 h.
+--
+-- Ici : une ligne par RV, avec l'empreinte (hash) de ses entrées (RV, client,
+-- pianos, historique...). Après chaque sync, seuls les RV dont l'empreinte a
+-- changé sont régénérés ; un narratif IA est réutilisé tel quel quand son
+-- prompt est identique (narrative_key = hash du prompt).
+-- Purge : BriefingCache supprime à chaque warm les dates passées
+-- (target_date < aujourd'hui - BRIEFING_CACHE_RETENTION_DAYS).
+
+CREATE TABLE IF NOT EXISTS briefing_cache (
+    appointment_id TEXT PRIMARY KEY,
+    target_date DATE NOT NULL,
+    fingerprint TEXT NOT NULL,
+    briefing JSONB NOT NULL,
+    narrative_key TEXT,
+    narrative JSONB,                 -- {narrative, action_items} bruts de l'IA
+    generated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),  -- dernière régénération
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()   -- dernière vérification d'empreinte
+);
+
+CREATE INDEX IF NOT EXISTS idx_briefing_cache_date
+ON briefing_cache (target_date);
+
+COMMENT ON TABLE briefing_cache IS 'Briefings Ma Journée pré-calculés, un par RV, invalidés par empreinte des entrées';
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,84 @@
+-- ============================================================
+-- Historique récent PAR CLIENT pour les briefings "Ma Journée"
+-- Created: 2026-10-17
+-- ============================================================
+--
+-- Avant : NarrativeBriefingService chargeait la timeline de TOUS les clients
+-- du jour avec un seul limit=200 global (et limit=50 pour les RV passés).
+-- Un jour chargé, un client avec un long historique remplissait la limite à
+-- lui seul -> les autres briefings arrivaient sans historique.
+--
+-- Ici : deux fonctions appelées via PostgREST (/rpc/...) qui renvoient les N
+-- dernières lignes PAR client, en UN aller-retour. LATERAL + index
+-- (client_id, date DESC) : coût ≈ nb_clients x N lectures d'index, quelle
+-- que soit la taille de l'historique.
+
+-- Index qui servent les LATERAL ci-dessous
+CREATE INDEX IF NOT EXISTS idx_timeline_client_occurred
+ON gazelle_timeline_entries (client_id, occurred_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_timeline_piano_occurred
+ON gazelle_timeline_entries (piano_id, occurred_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_appointments_client_date
+ON gazelle_appointments (client_external_id, appointment_date DESC);
+
+
+-- Timeline : N dernières entrées par client ET par piano (entrées liées au
+-- piano mais pas au client), dédoublonnées par external_id.
+CREATE OR REPLACE FUNCTION briefing_recent_timeline(
+    p_client_ids TEXT[],
+    p_piano_ids TEXT[] DEFAULT '{}',
+    p_entry_types TEXT[] DEFAULT NULL,
+    p_per_client INT DEFAULT 40
+)
+RETURNS SETOF gazelle_timeline_entries AS $$
+    SELECT DISTINCT ON (e.external_id) e.*
+    FROM (
+        SELECT t.*
+        FROM unnest(p_client_ids) AS c(client_id)
+        CROSS JOIN LATERAL (
+            SELECT *
+            FROM gazelle_timeline_entries te
+            WHERE te.client_id = c.client_id
+              AND (p_entry_types IS NULL OR te.entry_type = ANY(p_entry_types))
+            ORDER BY te.occurred_at DESC NULLS LAST
+            LIMIT p_per_client
+        ) t
+        UNION ALL
+        SELECT t.*
+        FROM unnest(COALESCE(p_piano_ids, '{}')) AS p(piano_id)
+        CROSS JOIN LATERAL (
+            SELECT *
+            FROM gazelle_timeline_entries te
+            WHERE te.piano_id = p.piano_id
+              AND (p_entry_types IS NULL OR te.entry_type = ANY(p_entry_types))
+            ORDER BY te.occurred_at DESC NULLS LAST
+            LIMIT p_per_client
+        ) t
+    ) e
+    ORDER BY e.external_id;
+$$ LANGUAGE sql STABLE;
+
+
+-- RV passés : N derniers par client
+CREATE OR REPLACE FUNCTION briefing_recent_appointments(
+    p_client_ids TEXT[],
+    p_per_client INT DEFAULT 10
+)
+RETURNS SETOF gazelle_appointments AS $$
+    SELECT a.*
+    FROM unnest(p_client_ids) AS c(client_id)
+    CROSS JOIN LATERAL (
+        SELECT *
+        FROM gazelle_appointments ga
+        WHERE ga.client_external_id = c.client_id
+        ORDER BY ga.appointment_date DESC NULLS LAST
+        LIMIT p_per_client
+    ) a;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION briefing_recent_timeline IS 'Briefings: N dernières timeline entries par client/piano en une requête (remplace limit=200 global)';
+COMMENT ON FUNCTION briefing_recent_appointments IS 'Briefings: N derniers RV par client en une requête (remplace limit=50 global)';
+
+NOTIFY pgrst, 'reload schema';
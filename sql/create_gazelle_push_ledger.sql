@@ -0,0 +1,37 @@
+-- ============================================================
+-- Registre d'idempotence des push vers Gazelle (GazellePushService)
+-- Created: 2026-10-17
+-- ============================================================
+--
+-- Une ligne par service poussé, clé = hash(piano, note, date de complétion).
+-- Si l'événement Gazelle a été créé mais que la mise à jour Supabase qui suit
+-- a échoué (mark_piano_as_pushed), la ligne garde l'id de l'événement : la
+-- tentative suivante (même lot ou lot relancé) réutilise cet événement au lieu
+-- d'en créer un second.
+--
+-- status : 'pending' = création en cours (réservée par un worker)
+--          'pushed'  = événement créé (gazelle_event_id renseigné)
+--          'unknown' = réservation abandonnée ou enregistrement raté :
+--                      l'événement existe peut-être, à vérifier à la main
+--                      (jamais repris automatiquement)
+
+CREATE TABLE IF NOT EXISTS gazelle_push_ledger (
+    idempotency_key TEXT PRIMARY KEY,
+    piano_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'pushed', 'unknown')),
+    gazelle_event_id TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Tables créées avant l'ajout de 'unknown'
+ALTER TABLE gazelle_push_ledger DROP CONSTRAINT IF EXISTS gazelle_push_ledger_status_check;
+ALTER TABLE gazelle_push_ledger ADD CONSTRAINT gazelle_push_ledger_status_check
+    CHECK (status IN ('pending', 'pushed', 'unknown'));
+
+CREATE INDEX IF NOT EXISTS idx_gazelle_push_ledger_piano
+ON gazelle_push_ledger (piano_id);
+
+COMMENT ON TABLE gazelle_push_ledger IS 'Idempotence des push Gazelle : évite de créer deux fois le même événement lors d''un retry';
+
+NOTIFY pgrst, 'reload schema';
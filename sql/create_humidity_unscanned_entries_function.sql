@@ -0,0 +1,53 @@
+-- ============================================================
+-- Entrées timeline NON encore scannées (alertes humidité)
+-- Created: 2026-10-17
+-- ============================================================
+--
+-- Avant : HumidityScanner.scan_timeline_entries téléchargeait TOUTE la table
+-- humidity_alerts_history (qui grossit à chaque scan) pour construire
+-- l'ensemble des entrées déjà vues, puis filtrait en Python.
+--
+-- Ici : anti-join côté base (NOT EXISTS sur la clé primaire de l'historique),
+-- restreint aux clients institutionnels. Seules les entrées à scanner
+-- traversent le réseau, quelle que soit la taille de l'historique.
+-- client_id est renvoyé sous le nom client_external_id attendu par le scanner.
+-- p_since borne la fenêtre (comme l'ancien scan des `limit` entrées les plus
+-- récentes) : sans elle, une fois les notes récentes traitées, chaque
+-- exécution remonterait plus loin dans l'historique et de vieilles notes
+-- seraient alertées comme nouvelles.
+
+-- Sert le filtre client + tri par date ci-dessous
+CREATE INDEX IF NOT EXISTS idx_timeline_client_occurred
+ON gazelle_timeline_entries (client_id, occurred_at DESC);
+
+-- Ancienne signature (sans p_since) : la remplacer plutôt que créer une surcharge
+DROP FUNCTION IF EXISTS humidity_unscanned_entries(TEXT[], INT);
+
+CREATE OR REPLACE FUNCTION humidity_unscanned_entries(
+    p_client_ids TEXT[],
+    p_limit INT DEFAULT 100,
+    p_since TIMESTAMPTZ DEFAULT now() - INTERVAL '30 days'
+)
+RETURNS TABLE (
+    external_id TEXT,
+    description TEXT,
+    occurred_at TIMESTAMPTZ,
+    client_external_id TEXT,
+    piano_id TEXT
+) AS $$
+    SELECT te.external_id::text, te.description::text, te.occurred_at::timestamptz,
+           te.client_id::text, te.piano_id::text
+    FROM gazelle_timeline_entries te
+    WHERE te.client_id = ANY(p_client_ids)
+      AND te.occurred_at >= p_since
+      AND NOT EXISTS (
+          SELECT 1 FROM humidity_alerts_history h
+          WHERE h.timeline_entry_id = te.external_id
+      )
+    ORDER BY te.occurred_at DESC NULLS LAST
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION humidity_unscanned_entries IS 'Alertes humidité: entrées timeline institutionnelles pas encore dans humidity_alerts_history (anti-join)';
+
+NOTIFY pgrst, 'reload schema';